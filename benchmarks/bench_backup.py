@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark de backup e restauração de um workspace grande: o caminho zipfile
+legado (um arquivo por vez na thread do chamador, `extractall` + `rglob` na
+restauração) contra o BackupSystem (chunk store endereçado por conteúdo,
+lotes em paralelo em threads ou processos, zstd quando disponível).
+
+O workspace sintético tem, por padrão, 10.000 arquivos: código-fonte pequeno
+e repetitivo, alguns arquivos médios e alguns binários já comprimidos. Mede
+também o backup incremental após alterar 1% dos arquivos.
+
+Uso: python benchmarks/bench_backup.py [arquivos] [--workers N]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from evolux_engine.services.backup_system import BackupSystem
+from evolux_engine.services.chunk_store import default_codec
+
+
+def make_workspace(root: Path, files: int):
+    rng = random.Random(42)
+    for i in range(files):
+        directory = root / f"pkg_{i % 50:02d}" / f"sub_{i % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+        if i % 500 == 0:
+            (directory / f"asset_{i}.png").write_bytes(rng.randbytes(256 * 1024))
+        elif i % 50 == 0:
+            (directory / f"data_{i}.json").write_text(
+                "".join(f'{{"id": {j}, "valor": {rng.random():.6f}}}\n' for j in range(5000)))
+        else:
+            lines = "".join(f"    resultado_{j} = calcular({i}, {j})\n" for j in range(rng.randrange(20, 120)))
+            (directory / f"module_{i}.py").write_text(f"def handler_{i}():\n{lines}    return resultado_0\n")
+
+
+def zip_backup(source: Path, backup_file: Path):
+    with zipfile.ZipFile(backup_file, "w", zipfile.ZIP_DEFLATED) as backup_zip:
+        for file_path in source.rglob("*"):
+            if file_path.is_file():
+                backup_zip.write(file_path, f"artifacts/{file_path.relative_to(source)}")
+
+
+def zip_restore(backup_file: Path, destination: Path) -> int:
+    with zipfile.ZipFile(backup_file) as backup_zip:
+        backup_zip.extractall(destination)
+    return sum(1 for path in destination.rglob("*") if path.is_file())
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def directory_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="?", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=BackupSystem.MAX_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        workspace = tmp / "workspace"
+        make_workspace(workspace, args.files)
+        print(f"Workspace: {args.files} arquivos, {directory_size(workspace) / 1e6:.1f} MB, "
+              f"codec do chunk store: {default_codec()}, workers: {args.workers}\n")
+
+        elapsed, _ = timed(lambda: zip_backup(workspace, tmp / "legacy.zip"))
+        print(f"{'zipfile (legado)':<28} backup {elapsed:7.2f}s  "
+              f"{(tmp / 'legacy.zip').stat().st_size / 1e6:7.1f} MB", end="")
+        elapsed, restored = timed(lambda: zip_restore(tmp / "legacy.zip", tmp / "restored_zip"))
+        print(f"  restore {elapsed:6.2f}s ({restored} arquivos)")
+
+        for parallelism in ("threads", "processes"):
+            backups = BackupSystem(str(tmp / f"backups_{parallelism}"), max_workers=args.workers,
+                                   parallelism=parallelism)
+            elapsed, backup_file = timed(lambda: backups.create_directory_backup("bench", str(workspace)))
+            print(f"{'chunks (' + parallelism + ')':<28} backup {elapsed:7.2f}s  "
+                  f"{directory_size(backups.backup_dir) / 1e6:7.1f} MB", end="")
+            destination = tmp / f"restored_{parallelism}"
+            elapsed, result = timed(lambda: backups.restore_snapshot(backup_file, str(destination)))
+            print(f"  restore {elapsed:6.2f}s ({result['restored_files']} arquivos)")
+            shutil.rmtree(destination)
+
+        # Incremental: 1% dos arquivos alterados
+        changed = sorted(workspace.rglob("module_*.py"))[::100]
+        for path in changed:
+            path.write_text(path.read_text() + "# alterado\n")
+        elapsed, _ = timed(lambda: zip_backup(workspace, tmp / "legacy_2.zip"))
+        print(f"\nIncremental ({len(changed)} arquivos alterados)")
+        print(f"{'zipfile (legado)':<28} backup {elapsed:7.2f}s  (cópia completa)")
+        elapsed, _ = timed(lambda: backups.create_directory_backup("bench", str(workspace)))
+        stored = backups.list_backups("bench")[0]["backup_size_bytes"]
+        print(f"{'chunks':<28} backup {elapsed:7.2f}s  ({stored / 1e3:.1f} KB novos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência de put/get do CognitiveCache com 1k, 10k e 100k entradas.
+
+O cenário "1 partição" coloca todas as entradas no mesmo tipo de tarefa (pior
+caso da busca semântica); o cenário "97 arquivos" distribui tarefas CREATE_FILE
+entre 97 file_paths, como em um projeto real.
+
+Uso: python benchmarks/bench_cognitive_cache.py [--mode vector|keywords] [tamanhos...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from evolux_engine.cache.cognitive_cache import CognitiveCache
+from evolux_engine.schemas.contracts import Task, TaskType, TaskDetailsExecuteCommand, TaskDetailsCreateFile
+
+SAMPLES = 2000
+
+
+def make_task(i: int, files: bool = False) -> Task:
+    description = f"executar etapa {i} do pipeline modulo{i % 97} componente{i}"
+    if files:
+        return Task(
+            task_id=f"task-{i}",
+            description=description,
+            type=TaskType.CREATE_FILE,
+            details=TaskDetailsCreateFile(file_path=f"src/modulo{i % 97}.py", content_guideline=description),
+            acceptance_criteria="ok",
+        )
+    return Task(
+        task_id=f"task-{i}",
+        description=description,
+        type=TaskType.EXECUTE_COMMAND,
+        details=TaskDetailsExecuteCommand(command_description=description, expected_outcome="ok"),
+        acceptance_criteria="ok",
+    )
+
+
+def bench(size: int, mode: str, files: bool):
+    cache = CognitiveCache(max_cache_size=size, similarity_mode=mode)
+    tasks = [make_task(i, files) for i in range(size + SAMPLES)]
+
+    for task in tasks[:size]:
+        cache.put(task, {"command": task.description})
+
+    # put com cache cheio (inclui evicção)
+    start = time.perf_counter()
+    for task in tasks[size:]:
+        cache.put(task, {"command": task.description})
+    put_us = (time.perf_counter() - start) / SAMPLES * 1e6
+
+    # get de entradas existentes (hits exatos)
+    hits = tasks[-min(size, SAMPLES):]
+    start = time.perf_counter()
+    for task in hits:
+        cache.get(task)
+    get_us = (time.perf_counter() - start) / len(hits) * 1e6
+
+    # get de tarefas ausentes (passa pela busca semântica)
+    misses = [make_task(size + SAMPLES + i, files) for i in range(200)]
+    start = time.perf_counter()
+    for task in misses:
+        cache.get(task)
+    miss_us = (time.perf_counter() - start) / len(misses) * 1e6
+
+    print(
+        f"{mode:>8} | {'97 arquivos' if files else '1 partição':>11} | {size:>8} entries | put {put_us:8.1f} µs/op | get hit {get_us:8.1f} µs/op | "
+        f"get miss {miss_us:10.1f} µs/op | {cache.get_stats()['evictions']} evictions"
+    )
+
+
+if __name__ == "__main__":
+    logger.disable("evolux_engine")
+    args = sys.argv[1:]
+    modes = ["vector", "keywords"]
+    if "--mode" in args:
+        position = args.index("--mode")
+        modes = [args[position + 1]]
+        del args[position:position + 2]
+    sizes = [int(arg) for arg in args] or [1_000, 10_000, 100_000]
+    for mode in modes:
+        for files in (False, True):
+            for size in sizes:
+                bench(size, mode, files)
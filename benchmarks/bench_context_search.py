@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark da busca de contextos: a varredura linear do índice em
+memória (como `search_contexts` fazia antes) contra o índice SQLite/FTS5
+(`ContextSearchIndex`), com paginação e facetas.
+
+Os dados sintéticos têm termos comuns (cada um em ~25% dos projetos, o pior
+caso para ordenar e contar) e termos raros, mais próximos de buscas reais.
+
+Uso: python benchmarks/bench_context_search.py [projetos] [repetições]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from evolux_engine.services.context_search_index import ContextSearchIndex
+
+WORDS = ["api", "autenticação", "dashboard", "métricas", "migração", "dados", "cli", "serviço",
+         "relatórios", "pagamentos", "chat", "agenda", "estoque", "vendas", "blog", "jogo"]
+TAGS = ["python", "backend", "frontend", "fastapi", "react", "cli", "data", "ml"]
+STATUSES = ["active", "paused", "completed", "archived", "error"]
+
+
+def make_rows(projects: int):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    for i in range(projects):
+        words = rng.sample(WORDS, 4)
+        term = f"modulo{rng.randrange(2000)}"  # Termo raro: ~0,05% dos projetos
+        yield {
+            'context_id': f"proj_{i:06d}",
+            'project_name': " ".join(words[:2]).title(),
+            'project_goal': f"Criar {' '.join(words)} com {term} (número {i})",
+            'status': rng.choice(STATUSES),
+            'created_at': start + timedelta(minutes=i),
+            'last_modified': start + timedelta(minutes=i + rng.randint(0, 10_000)),
+            'tags': set(rng.sample(TAGS, 2)),
+            'artifacts': [f"src/{words[0]}_{j}.py" for j in range(3)],
+        }
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def linear_search(rows, query, tags, status, limit=50):
+    results = [row for row in rows
+               if (query in row['project_name'].lower() or query in row['project_goal'].lower())
+               and (not tags or tags & row['tags']) and (not status or row['status'] == status)]
+    results.sort(key=lambda row: row['last_modified'], reverse=True)
+    return results[:limit]
+
+
+if __name__ == "__main__":
+    projects = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = list(make_rows(projects))
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = ContextSearchIndex(str(Path(directory) / "index.db"))
+        start = time.perf_counter()
+        index.upsert_many(rows)
+        print(f"{projects} projetos indexados em {time.perf_counter() - start:.1f} s")
+        single = timed(lambda: index.upsert_many([{**rows[0], 'last_modified': datetime.now()}]), repeat)
+        print(f"upsert de um contexto: {single * 1e3:.2f} ms")
+
+        cases = [("", None, None), ("modulo1234", None, None), ("pagamentos", None, None), ("pagamentos", {"python"}, "active"),
+                 ("", None, "active"), ("", {"ml"}, None)]
+        for query, tags, status in cases:
+            linear = timed(lambda: linear_search(rows, query, tags, status), repeat)
+            indexed = timed(lambda: index.search(query or None, tags, status, limit=50), repeat)
+            facets = timed(lambda: index.facets(query or None, tags, status), repeat)
+            print(f"query={query!r:13} tags={tags} status={status}: linear {linear * 1e3:7.2f} ms | "
+                  f"índice {indexed * 1e3:6.2f} ms | facetas {facets * 1e3:6.2f} ms")
+        index.close()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark da serialização do ProjectContext: o formato JSON legado
+(`json.dumps(model_dump(), indent=2, default=str)` ao salvar e `json.load` +
+validação completa ao carregar) contra o formato binário versionado
+(`to_bytes` / `from_bytes`, com o carregamento rápido para dados confiáveis).
+
+Mede contextos com 10, 100 e 1000 tarefas, cada uma com detalhes e um
+histórico de execução, e também o carregamento binário com `trusted=False`
+para separar o ganho do codec do ganho da validação.
+
+Uso: python benchmarks/bench_context_serialization.py [--codec msgpack|orjson|json] [repetições]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from evolux_engine.models.project_context import ProjectContext, ArtifactState
+from evolux_engine.models.serialization import default_codec
+from evolux_engine.schemas.contracts import (
+    Task, TaskType, TaskStatus, ExecutionResult,
+    TaskDetailsCreateFile, TaskDetailsExecuteCommand,
+)
+
+
+def make_context(tasks: int) -> ProjectContext:
+    queue = []
+    for i in range(tasks):
+        if i % 4 == 3:
+            task_type = TaskType.EXECUTE_COMMAND
+            details = TaskDetailsExecuteCommand(command_description=f"rodar testes do módulo {i}", expected_outcome="testes passam")
+        else:
+            task_type = TaskType.CREATE_FILE
+            details = TaskDetailsCreateFile(file_path=f"app/module_{i}.py", content_guideline="Implementar o serviço " * 10)
+        queue.append(Task(
+            task_id=f"task-{i}",
+            description=f"Criar o módulo {i} da API de tarefas",
+            type=task_type,
+            details=details,
+            dependencies=[f"task-{i - 1}"] if i else [],
+            status=TaskStatus.COMPLETED if i % 2 else TaskStatus.PENDING,
+            acceptance_criteria="O arquivo existe e os testes passam",
+            execution_history=[ExecutionResult(exit_code=0, stdout="ok\n" * 5, stderr="")],
+        ))
+    return ProjectContext(
+        project_id="bench",
+        project_name="Benchmark",
+        project_goal="API de tarefas com autenticação",
+        workspace_path=Path("/tmp/bench"),
+        task_queue=queue,
+        artifacts_state={f"app/module_{i}.py": ArtifactState(path=f"app/module_{i}.py", hash=f"{i:064x}") for i in range(tasks)},
+    )
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def legacy_dump(context: ProjectContext) -> bytes:
+    return json.dumps(context.model_dump(), indent=2, default=str).encode("utf-8")
+
+
+def legacy_load(payload: bytes) -> ProjectContext:
+    return ProjectContext(**json.loads(payload))
+
+
+def bench(tasks: int, codec: str, repeat: int):
+    context = make_context(tasks)
+    legacy = legacy_dump(context)
+    binary = context.to_bytes(codec)
+
+    save_legacy = timed(lambda: legacy_dump(context), repeat)
+    save_binary = timed(lambda: context.to_bytes(codec), repeat)
+    load_legacy = timed(lambda: legacy_load(legacy), repeat)
+    load_binary = timed(lambda: ProjectContext.from_bytes(binary), repeat)
+    load_validated = timed(lambda: ProjectContext.from_bytes(binary, trusted=False), repeat)
+
+    print(f"{tasks:>5} tarefas | tamanho {len(legacy) / 1024:8.1f} KB -> {len(binary) / 1024:8.1f} KB | "
+          f"save {save_legacy * 1e3:7.2f} -> {save_binary * 1e3:7.2f} ms ({save_legacy / save_binary:4.1f}x) | "
+          f"load {load_legacy * 1e3:7.2f} -> {load_binary * 1e3:7.2f} ms ({load_legacy / load_binary:4.1f}x, "
+          f"validação completa {load_validated * 1e3:7.2f} ms)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    codec = default_codec()
+    if "--codec" in args:
+        position = args.index("--codec")
+        codec = args[position + 1]
+        del args[position:position + 2]
+    repeat = int(args[0]) if args else 20
+
+    print(f"codec: {codec}, {repeat} repetições")
+    for tasks in (10, 100, 1000):
+        bench(tasks, codec, repeat)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do serviço de contagem de tokens (TokenCounter) contra a
+codificação por chamada (`tiktoken.encoding_for_model` por cliente e
+`len(encoder.encode(texto))` a cada contagem).
+
+Cenários:
+- clientes: criação de N otimizadores/encoders, como cada LLMClient faz;
+- prompts repetidos: conversas que repetem o prompt de sistema e os templates
+  do PromptEngine, com uma mensagem de usuário nova por rodada;
+- lote grande: documentos grandes e distintos (cache frio), contados em lote.
+
+Requer os arquivos de encoding do tiktoken (baixados na primeira execução).
+
+Uso: python benchmarks/bench_token_counter.py [--model gpt-4o-mini] [rodadas]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import tiktoken
+
+from evolux_engine.utils.token_counter import TokenCounter, get_token_counter
+from evolux_engine.utils.token_optimizer import TokenOptimizer
+
+SYSTEM_PROMPT = (
+    "Você é um desenvolvedor sênior especializado em Python. Siga as convenções do projeto, "
+    "retorne APENAS o código puro, sem explicações, e trate erros de forma explícita.\n"
+) * 30
+TEMPLATES = [
+    f"CONTEXTO DO PROJETO {i}:\n" + "\n".join(f"- app/module_{j}.py: class Service{j}, def handle_{j}" for j in range(60))
+    for i in range(8)
+]
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def report(name: str, baseline_s: float, service_s: float, unit: str):
+    print(f"{name:>18} | por chamada {baseline_s * 1e3:9.2f} ms | serviço {service_s * 1e3:9.2f} ms | "
+          f"{baseline_s / service_s if service_s else float('inf'):6.1f}x ({unit})")
+
+
+def bench_clients(model: str, clients: int = 200):
+    baseline = timed(lambda: [tiktoken.encoding_for_model(model) for _ in range(clients)])
+    service = timed(lambda: [TokenOptimizer(model) for _ in range(clients)])
+    report("clientes", baseline, service, f"{clients} clientes")
+
+
+def bench_repeated_prompts(model: str, rounds: int):
+    encoder = tiktoken.encoding_for_model(model)
+    conversations = [
+        [SYSTEM_PROMPT, TEMPLATES[i % len(TEMPLATES)], f"Crie o arquivo app/feature_{i}.py com testes"]
+        for i in range(rounds)
+    ]
+
+    def per_call():
+        for messages in conversations:
+            sum(len(encoder.encode(text)) for text in messages)
+
+    counter = TokenCounter(tiktoken.encoding_name_for_model(model), encoder=encoder)
+
+    def service():
+        for messages in conversations:
+            sum(counter.count_many(messages))
+
+    report("prompts repetidos", timed(per_call), timed(service), f"{rounds} conversas")
+    print(f"{'':>18} | {counter.get_stats()}")
+
+
+def bench_large_batch(model: str, documents: int = 32, size: int = 40_000):
+    encoder = tiktoken.encoding_for_model(model)
+    texts = [(f"documento {i}: " + "def handle(request): return process(request.body) # comentário\n" * (size // 64))
+             for i in range(documents)]
+    counter = TokenCounter(tiktoken.encoding_name_for_model(model), encoder=encoder)
+
+    baseline = timed(lambda: [len(encoder.encode(text)) for text in texts])
+    service = timed(lambda: counter.count_many(texts))
+    report("lote grande", baseline, service, f"{documents} docs x {size // 1000}k chars, {TokenCounter.MAX_WORKERS} threads")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    model = "gpt-4o-mini"
+    if "--model" in args:
+        position = args.index("--model")
+        model = args[position + 1]
+        del args[position:position + 2]
+    rounds = int(args[0]) if args else 2_000
+
+    get_token_counter(model).encoder  # Carrega o encoding fora das medições
+    bench_clients(model)
+    bench_repeated_prompts(model, rounds)
+    bench_large_batch(model)
@@ -0,0 +1,314 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, List, Tuple
+
+from loguru import logger
+
+
+class CacheBackend(ABC):
+    """
+    Armazenamento persistente plugável para o CognitiveCache.
+
+    As entradas são dicionários com as chaves `data`, `timestamp`,
+    `access_count`, `keywords`, `task_type`, `file_path` e `description`,
+    como as do cache em memória.
+    Cada backend aplica seu próprio TTL e limite de tamanho e mantém suas
+    próprias estatísticas de acerto.
+    """
+    name = "backend"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna a entrada válida (não expirada) para a chave, registrando hit/miss."""
+
+    @abstractmethod
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Armazena ou substitui uma entrada."""
+
+    @abstractmethod
+    def find_similar(self, keywords: List[str], min_overlap: float,
+                     task_type: Optional[str] = None, file_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a entrada válida com maior sobreposição de palavras-chave, se
+        atingir `min_overlap`. Se `task_type` for informado, só considera
+        entradas desse tipo e com o mesmo `file_path` (None casa com None).
+        """
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove uma entrada."""
+
+    @abstractmethod
+    def cleanup_expired(self) -> int:
+        """Remove entradas expiradas e retorna quantas foram removidas."""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do backend."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove todas as entradas e zera as estatísticas."""
+
+    def close(self):
+        """Libera recursos do backend."""
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Backend em arquivo SQLite em modo WAL, que sobrevive a reinicializações e
+    pode ser compartilhado com segurança por vários processos do engine no
+    mesmo host. Contagem de entradas e bytes é mantida por triggers, e as
+    estatísticas de hit/miss são persistidas e agregadas entre processos.
+    """
+    name = "sqlite"
+    _ENTRY_COLUMNS = "data, task_type, file_path, description, created_at, access_count"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            task_type TEXT,
+            file_path TEXT,
+            description TEXT,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            access_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries(expires_at);
+        CREATE INDEX IF NOT EXISTS idx_cache_entries_lfu ON cache_entries(access_count, created_at);
+        CREATE TABLE IF NOT EXISTS cache_keywords (
+            keyword TEXT NOT NULL,
+            key TEXT NOT NULL REFERENCES cache_entries(key) ON DELETE CASCADE,
+            PRIMARY KEY (keyword, key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_cache_keywords_key ON cache_keywords(key);
+        CREATE INDEX IF NOT EXISTS idx_cache_entries_partition ON cache_entries(task_type, file_path);
+        CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO cache_meta (name, value) VALUES
+            ('entries', 0), ('bytes', 0), ('hits', 0), ('misses', 0), ('evictions', 0), ('expirations', 0);
+        CREATE TRIGGER IF NOT EXISTS trg_cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+            UPDATE cache_meta SET value = value + 1 WHERE name = 'entries';
+            UPDATE cache_meta SET value = value + length(NEW.data) WHERE name = 'bytes';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_cache_entries_update AFTER UPDATE OF data ON cache_entries BEGIN
+            UPDATE cache_meta SET value = value - length(OLD.data) + length(NEW.data) WHERE name = 'bytes';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+            UPDATE cache_meta SET value = value - 1 WHERE name = 'entries';
+            UPDATE cache_meta SET value = value - length(OLD.data) WHERE name = 'bytes';
+        END;
+    """
+    # Colunas adicionadas depois da primeira versão do schema
+    MIGRATED_COLUMNS = {"file_path": "TEXT", "description": "TEXT"}
+
+    def __init__(self, db_path: str, default_ttl: int = 7 * 24 * 3600,
+                 max_entries: int = 100_000, max_bytes: Optional[int] = 512 * 1024 * 1024):
+        self.db_path = db_path
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local_stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+        self._conn.executescript(self.SCHEMA)
+        logger.info(f"SQLiteCacheBackend inicializado em '{db_path}' (TTL={default_ttl}s, max_entries={max_entries})")
+
+    def _migrate(self):
+        """Adiciona colunas novas a bancos criados por versões anteriores do schema."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache_entries)")}
+        if not columns:
+            return  # Banco novo: o SCHEMA cria a tabela completa
+        for column, column_type in self.MIGRATED_COLUMNS.items():
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE cache_entries ADD COLUMN {column} {column_type}")
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE serializa escritores entre processos sem bloquear leitores (WAL)."""
+        return _ImmediateTransaction(self._conn)
+
+    def _bump(self, name: str, amount: int = 1):
+        self._conn.execute("UPDATE cache_meta SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._conn.execute(
+                f"SELECT {self._ENTRY_COLUMNS} FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self._local_stats["misses"] += 1
+                self._bump("misses")
+                return None
+            self._conn.execute(
+                "UPDATE cache_entries SET access_count = access_count + 1, last_access = ? WHERE key = ?",
+                (now, key),
+            )
+            self._local_stats["hits"] += 1
+            self._bump("hits")
+            return self._row_to_entry(key, row)
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        now = time.time()
+        data = json.dumps(entry['data'], ensure_ascii=False)
+        with self._lock, self._transaction():
+            self._conn.execute(
+                """
+                INSERT INTO cache_entries
+                    (key, data, task_type, file_path, description, created_at, expires_at, last_access, access_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT(key) DO UPDATE SET
+                    data = excluded.data, task_type = excluded.task_type, file_path = excluded.file_path,
+                    description = excluded.description, created_at = excluded.created_at,
+                    expires_at = excluded.expires_at, last_access = excluded.last_access, access_count = 0
+                """,
+                (key, data, entry.get('task_type'), entry.get('file_path'), entry.get('description'),
+                 entry.get('timestamp', now), now + self.default_ttl, now),
+            )
+            self._conn.execute("DELETE FROM cache_keywords WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cache_keywords (keyword, key) VALUES (?, ?)",
+                [(keyword, key) for keyword in entry.get('keywords', [])],
+            )
+            self._enforce_limits()
+
+    def find_similar(self, keywords: List[str], min_overlap: float,
+                     task_type: Optional[str] = None, file_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if not keywords:
+            return None
+        placeholders = ",".join("?" for _ in keywords)
+        params: List[Any] = [*keywords, time.time()]
+        partition_filter = ""
+        if task_type is not None:
+            partition_filter = "AND e.task_type = ? AND e.file_path IS ?"
+            params += [task_type, file_path]
+        with self._lock:
+            row = self._conn.execute(
+                f"""
+                SELECT e.key, e.data, e.task_type, e.file_path, e.description, e.created_at, e.access_count,
+                       COUNT(*) AS score
+                FROM cache_keywords k JOIN cache_entries e ON e.key = k.key
+                WHERE k.keyword IN ({placeholders}) AND e.expires_at > ? {partition_filter}
+                GROUP BY e.key ORDER BY score DESC, e.access_count DESC LIMIT 1
+                """,
+                params,
+            ).fetchone()
+        if row is None or row[-1] < len(keywords) * min_overlap:
+            return None
+        return self._row_to_entry(row[0], row[1:-1])
+
+    def delete(self, key: str):
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def cleanup_expired(self) -> int:
+        with self._lock, self._transaction():
+            removed = self._conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),)).rowcount
+            if removed:
+                self._bump("expirations", removed)
+        if removed:
+            logger.info(f"SQLiteCacheBackend cleanup: removed {removed} expired entries")
+        return removed
+
+    def _enforce_limits(self):
+        """Remove as entradas menos usadas (LFU) enquanto os limites de tamanho forem excedidos."""
+        entries, total_bytes = self._meta("entries", "bytes")
+        excess = max(0, entries - self.max_entries)
+        if excess:
+            self._evict(excess)
+        while self.max_bytes is not None and total_bytes > self.max_bytes and entries > 0:
+            removed = self._evict(max(1, entries // 20))
+            if not removed:
+                break
+            entries, total_bytes = self._meta("entries", "bytes")
+
+    def _evict(self, count: int) -> int:
+        removed = self._conn.execute(
+            "DELETE FROM cache_entries WHERE key IN "
+            "(SELECT key FROM cache_entries ORDER BY access_count, created_at LIMIT ?)",
+            (count,),
+        ).rowcount
+        self._bump("evictions", removed)
+        return removed
+
+    def _meta(self, *names: str) -> Tuple[int, ...]:
+        values = dict(self._conn.execute(
+            f"SELECT name, value FROM cache_meta WHERE name IN ({','.join('?' for _ in names)})", names
+        ).fetchall())
+        return tuple(values.get(name, 0) for name in names)
+
+    def _row_to_entry(self, key: str, row: Tuple) -> Dict[str, Any]:
+        data, task_type, file_path, description, created_at, access_count = row
+        keywords = [r[0] for r in self._conn.execute("SELECT keyword FROM cache_keywords WHERE key = ?", (key,))]
+        return {
+            'data': json.loads(data),
+            'timestamp': created_at,
+            'last_access': time.time(),
+            'access_count': access_count,
+            'keywords': keywords,
+            'task_type': task_type,
+            'file_path': file_path,
+            'description': description,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total_bytes, hits, misses, evictions, expirations = self._meta(
+                "entries", "bytes", "hits", "misses", "evictions", "expirations"
+            )
+        total_requests = hits + misses
+        return {
+            "backend": self.name,
+            "path": self.db_path,
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.default_ttl,
+            "hit_rate": f"{(hits / total_requests * 100) if total_requests else 0:.1f}%",
+            "total_hits": hits,
+            "total_misses": misses,
+            "process_hits": self._local_stats["hits"],
+            "process_misses": self._local_stats["misses"],
+            "evictions": evictions,
+            "expirations": expirations,
+        }
+
+    def clear(self):
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM cache_entries")
+            self._conn.execute(
+                "UPDATE cache_meta SET value = 0 WHERE name IN ('hits', 'misses', 'evictions', 'expirations')"
+            )
+        self._local_stats = {"hits": 0, "misses": 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _ImmediateTransaction:
+    """Context manager de transação `BEGIN IMMEDIATE` para conexões em modo autocommit."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -1,25 +1,71 @@
 import json
 import hashlib
+import heapq
 import time
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Set, Tuple
 from loguru import logger
 from evolux_engine.schemas.contracts import Task
+from evolux_engine.cache.cache_backends import CacheBackend, SQLiteCacheBackend
+from evolux_engine.cache.similarity_index import SimilarityIndex, IS_SCIPY_AVAILABLE
+
+# Limiar padrão de similaridade de cada modo de busca semântica
+DEFAULT_SIMILARITY_THRESHOLDS = {"vector": 0.8, "keywords": 0.5}
 
 class CognitiveCache:
     """
     Armazena e recupera soluções para tarefas, evitando chamadas repetitivas à LLM.
     O cache é baseado na semântica da tarefa, não apenas no texto exato do prompt.
     Versão melhorada com TTL, limpeza automática e matching semântico.
+
+    Estruturas internas (todas com custo independente do tamanho do cache):
+    - índice invertido palavra -> conjunto de chaves, com as palavras de cada
+      entrada guardadas na própria entrada para remoção em O(palavras);
+    - heap LFU (acessos, timestamp) com invalidação preguiçosa para evicção em O(log n);
+    - roda de TTL com baldes por fatia de tempo, expirando apenas os baldes vencidos.
+
+    A busca semântica só considera entradas com o mesmo tipo de tarefa e o
+    mesmo `file_path`. No modo "vector" (padrão quando o scipy está
+    disponível) as descrições ficam como vetores esparsos de n-gramas em um
+    `SimilarityIndex`, e todos os candidatos são pontuados por similaridade de
+    cosseno em um único produto matriz-vetor; no modo "keywords" vale a
+    fração de palavras-chave em comum. Em ambos, `similarity_threshold` define
+    o mínimo para aceitar um resultado.
+
+    Opcionalmente, um `CacheBackend` persistente funciona como segunda camada:
+    escritas vão para as duas camadas e faltas na memória são buscadas no
+    backend, que sobrevive a reinicializações e é compartilhado entre processos.
     """
-    def __init__(self, default_ttl: int = 3600, max_cache_size: int = 1000):
-        self._cache: Dict[str, Dict[str, Any]] = {}  # key -> {data, timestamp, access_count}
-        self._semantic_index: Dict[str, List[str]] = {}  # palavra -> [keys]
+    # Número de fatias em que o TTL é dividido na roda de expiração
+    TTL_WHEEL_SLOTS = 60
+
+    def __init__(self, default_ttl: int = 3600, max_cache_size: int = 1000, backend: Optional[CacheBackend] = None,
+                 similarity_mode: Optional[str] = None, similarity_threshold: Optional[float] = None):
+        self._cache: Dict[str, Dict[str, Any]] = {}  # key -> {data, timestamp, access_count, keywords, ...}
+        self._semantic_index: Dict[str, Set[str]] = {}  # palavra -> {keys}
+        self._lfu_heap: List[Tuple[int, float, str]] = []  # (access_count, timestamp, key)
+        self._ttl_wheel: Dict[int, Set[str]] = {}  # fatia de expiração -> {keys}
         self.default_ttl = default_ttl
         self.max_cache_size = max_cache_size
-        self._last_cleanup = time.time()
-        self._access_stats = {"hits": 0, "misses": 0}
-        logger.info(f"CognitiveCache inicializado com TTL={default_ttl}s, max_size={max_cache_size}")
+        self._wheel_resolution = max(1.0, default_ttl / self.TTL_WHEEL_SLOTS)
+        self._next_wheel_slot = self._wheel_slot(time.time())
+        self._access_stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._memory_stats = {"hits": 0, "misses": 0}
+        self.backend = backend
+        self._last_backend_cleanup = time.time()
 
+        if similarity_mode is None:
+            similarity_mode = "vector" if IS_SCIPY_AVAILABLE else "keywords"
+        if similarity_mode not in DEFAULT_SIMILARITY_THRESHOLDS:
+            raise ValueError(f"similarity_mode inválido: '{similarity_mode}' (use 'vector' ou 'keywords')")
+        if similarity_mode == "vector" and not IS_SCIPY_AVAILABLE:
+            logger.warning("scipy não instalado; CognitiveCache usando busca semântica por palavras-chave.")
+            similarity_mode = "keywords"
+        self.similarity_mode = similarity_mode
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else DEFAULT_SIMILARITY_THRESHOLDS[similarity_mode]
+        )
+        self._similarity_index = SimilarityIndex() if similarity_mode == "vector" else None
+        logger.info(f"CognitiveCache inicializado com TTL={default_ttl}s, max_size={max_cache_size}, backend={backend.name if backend else 'memory'}, similarity={similarity_mode}>={self.similarity_threshold}")
     def _generate_cache_key(self, task: Task) -> str:
         """
         Gera uma chave de cache baseada no tipo e na descrição semântica da tarefa.
@@ -42,6 +88,10 @@ class CognitiveCache:
         task_str = json.dumps(task_data, sort_keys=True)
         return hashlib.md5(task_str.encode()).hexdigest()
     
+    @staticmethod
+    def _task_file_path(task: Task) -> Optional[str]:
+        return getattr(task.details, 'file_path', None) if task.details else None
+
     def _extract_keywords(self, text: str) -> List[str]:
         """Extrai palavras-chave de um texto para indexação semântica."""
         import re
@@ -55,58 +105,95 @@ class CognitiveCache:
         
         return list(set(keywords))  # Remove duplicatas
     
+    def _wheel_slot(self, timestamp: float) -> int:
+        return int(timestamp // self._wheel_resolution)
+
     def _cleanup_expired(self):
-        """Remove entradas expiradas do cache."""
+        """Remove entradas expiradas, percorrendo apenas as fatias da roda de TTL já vencidas."""
         current_time = time.time()
-        expired_keys = []
-        
-        for key, entry in self._cache.items():
-            if current_time - entry['timestamp'] > self.default_ttl:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            self._remove_from_semantic_index(key)
-            del self._cache[key]
-            
-        if expired_keys:
-            logger.info(f"Cache cleanup: removed {len(expired_keys)} expired entries")
-    
-    def _remove_from_semantic_index(self, key: str):
+        current_slot = self._wheel_slot(current_time)
+        if current_slot < self._next_wheel_slot:
+            return
+
+        # Após longos períodos ociosos, percorrer só as fatias existentes
+        if current_slot - self._next_wheel_slot > len(self._ttl_wheel):
+            due_slots = sorted(slot for slot in self._ttl_wheel if slot <= current_slot)
+        else:
+            due_slots = range(self._next_wheel_slot, current_slot + 1)
+
+        expired = 0
+        for slot in due_slots:
+            keys = self._ttl_wheel.get(slot)
+            if not keys:
+                continue
+            for key in list(keys):
+                entry = self._cache.get(key)
+                if entry is None or current_time - entry['timestamp'] > self.default_ttl:
+                    keys.discard(key)
+                    if entry is not None:
+                        self._remove(key)
+                        expired += 1
+            if not keys:
+                del self._ttl_wheel[slot]
+        # A fatia atual pode conter entradas que ainda não venceram
+        self._next_wheel_slot = current_slot
+
+        if expired:
+            self._access_stats["expirations"] += expired
+            logger.info(f"Cache cleanup: removed {expired} expired entries")
+
+    def _remove(self, key: str):
+        """Remove uma entrada do cache e dos índices em O(palavras-chave da entrada)."""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return
+        self._remove_from_semantic_index(key, entry['keywords'])
+        if self._similarity_index is not None:
+            self._similarity_index.remove(key)
+        slot_keys = self._ttl_wheel.get(self._wheel_slot(entry['timestamp'] + self.default_ttl))
+        if slot_keys is not None:
+            slot_keys.discard(key)
+        # A entrada no heap LFU é descartada preguiçosamente
+
+    def _remove_from_semantic_index(self, key: str, keywords: List[str]):
         """Remove uma chave do índice semântico."""
-        for keywords in self._semantic_index.values():
-            if key in keywords:
-                keywords.remove(key)
-    
+        for keyword in keywords:
+            keys = self._semantic_index.get(keyword)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._semantic_index[keyword]
+
+    def _push_lfu(self, key: str, entry: Dict[str, Any]):
+        heapq.heappush(self._lfu_heap, (entry['access_count'], entry['timestamp'], key))
+        # Compactar o heap quando as entradas obsoletas dominam
+        if len(self._lfu_heap) > 2 * len(self._cache) + 64:
+            self._lfu_heap = [(e['access_count'], e['timestamp'], k) for k, e in self._cache.items()]
+            heapq.heapify(self._lfu_heap)
+
     def _evict_least_used(self):
-        """Remove as entradas menos usadas quando o cache está cheio."""
-        if len(self._cache) <= self.max_cache_size:
-            return
-            
-        # Ordenar por número de acessos e timestamp
-        sorted_items = sorted(
-            self._cache.items(),
-            key=lambda x: (x[1]['access_count'], x[1]['timestamp'])
-        )
-        
-        # Remove 20% das entradas menos usadas
-        remove_count = len(self._cache) // 5
-        for key, _ in sorted_items[:remove_count]:
-            self._remove_from_semantic_index(key)
-            del self._cache[key]
-            
-        logger.info(f"Cache eviction: removed {remove_count} least used entries")
+        """Remove as entradas menos usadas (e mais antigas) até liberar espaço para uma nova entrada."""
+        removed = 0
+        while len(self._cache) >= self.max_cache_size and self._lfu_heap:
+            access_count, timestamp, key = heapq.heappop(self._lfu_heap)
+            entry = self._cache.get(key)
+            if entry is None or entry['access_count'] != access_count or entry['timestamp'] != timestamp:
+                continue  # Registro obsoleto
+            self._remove(key)
+            removed += 1
+
+        if removed:
+            self._access_stats["evictions"] += removed
+            logger.debug(f"Cache eviction: removed {removed} least used entries")
 
     def get(self, task: Task) -> Optional[Any]:
         """
         Tenta recuperar uma solução em cache para uma determinada tarefa.
         Versão melhorada com limpeza automática e estatísticas.
         """
-        # Limpeza periódica do cache
+        self._cleanup_expired()
         current_time = time.time()
-        if current_time - self._last_cleanup > 300:  # Cleanup a cada 5 minutos
-            self._cleanup_expired()
-            self._last_cleanup = current_time
-        
+
         key = self._generate_cache_key(task)
         entry = self._cache.get(key)
 
@@ -114,24 +201,76 @@ class CognitiveCache:
             # Atualizar estatísticas de acesso
             entry['access_count'] += 1
             entry['last_access'] = current_time
-            self._access_stats["hits"] += 1
+            self._push_lfu(key, entry)
+            self._record_hit(memory=True)
             
-            logger.info(f"Cache HIT para a tarefa: {task.description[:50]}... (accessed {entry['access_count']} times)")
+            logger.debug(f"Cache HIT para a tarefa: {task.description[:50]}... (accessed {entry['access_count']} times)")
             return entry['data']
         
         # Tentar busca semântica se busca exata falhou
         semantic_result = self._semantic_search(task)
         if semantic_result:
-            self._access_stats["hits"] += 1
-            logger.info(f"Cache SEMANTIC HIT para a tarefa: {task.description[:50]}...")
+            self._record_hit(memory=True)
+            logger.debug(f"Cache SEMANTIC HIT para a tarefa: {task.description[:50]}...")
             return semantic_result
+        self._memory_stats["misses"] += 1
+
+        # Consultar a camada persistente (possivelmente preenchida por outro processo)
+        if self.backend is not None:
+            backend_entry = self._backend_lookup(key, task)
+            if backend_entry is not None:
+                self._record_hit(memory=False)
+                logger.debug(f"Cache BACKEND HIT ({self.backend.name}) para a tarefa: {task.description[:50]}...")
+                return backend_entry['data']
         
         self._access_stats["misses"] += 1
-        logger.info(f"Cache MISS para a tarefa: {task.description[:50]}...")
+        logger.debug(f"Cache MISS para a tarefa: {task.description[:50]}...")
         return None
+
+    def _record_hit(self, memory: bool):
+        self._access_stats["hits"] += 1
+        if memory:
+            self._memory_stats["hits"] += 1
+
+    def _backend_lookup(self, key: str, task: Task) -> Optional[Dict[str, Any]]:
+        """Busca exata e depois semântica no backend; acertos exatos são promovidos para a memória."""
+        try:
+            entry = self.backend.get(key)
+            if entry is not None:
+                self._store(key, entry['data'], entry['keywords'], entry['task_type'],
+                            entry.get('file_path'), entry.get('description'))
+                return entry
+
+            # Pré-seleção por palavras-chave no próprio backend, confirmada pelo limiar do modo atual
+            min_overlap = self.similarity_threshold if self.similarity_mode == "keywords" else 0.5
+            entry = self.backend.find_similar(
+                self._extract_keywords(task.description), min_overlap=min_overlap,
+                task_type=task.type.value, file_path=self._task_file_path(task),
+            )
+            if entry is not None and self._similarity_index is not None:
+                similarity = self._similarity_index.similarity(task.description, entry.get('description') or "")
+                if similarity < self.similarity_threshold:
+                    return None
+            return entry
+        except Exception as e:
+            logger.warning(f"Falha ao consultar o backend do cache ({self.backend.name}): {e}")
+            return None
     
     def _semantic_search(self, task: Task) -> Optional[Any]:
-        """Busca semântica baseada em palavras-chave."""
+        """Busca semântica entre as entradas do mesmo tipo de tarefa e file_path."""
+        task_type = task.type.value
+        file_path = self._task_file_path(task)
+        current_time = time.time()
+
+        if self._similarity_index is not None:
+            match = self._similarity_index.search(task.description, (task_type, file_path), self.similarity_threshold)
+            if match is None:
+                return None
+            entry = self._cache.get(match[0])
+            if not entry or current_time - entry['timestamp'] > self.default_ttl:
+                return None
+            return entry['data']
+
         keywords = self._extract_keywords(task.description)
         if not keywords:
             return None
@@ -148,12 +287,13 @@ class CognitiveCache:
         # Avaliar candidatos por relevância
         best_score = 0
         best_result = None
-        current_time = time.time()
         
         for key in candidate_keys:
             entry = self._cache.get(key)
             if not entry or current_time - entry['timestamp'] > self.default_ttl:
                 continue
+            if entry['task_type'] != task_type or entry.get('file_path') != file_path:
+                continue
                 
             # Calcular score de similaridade simples
             score = len(set(keywords) & set(entry.get('keywords', [])))
@@ -161,7 +301,7 @@ class CognitiveCache:
                 best_score = score
                 best_result = entry['data']
                 
-        return best_result if best_score >= len(keywords) * 0.5 else None  # Pelo menos 50% de match
+        return best_result if best_score >= len(keywords) * self.similarity_threshold else None
 
     def put(self, task: Task, solution: Any):
         """
@@ -172,42 +312,76 @@ class CognitiveCache:
             logger.warning(f"Solução para a tarefa {task.task_id} não é serializável em JSON e não será armazenada em cache.")
             return
 
-        # Verificar e fazer limpeza se necessário
-        self._evict_least_used()
-
         key = self._generate_cache_key(task)
         keywords = self._extract_keywords(task.description)
+        self._store(key, solution, keywords, task.type.value, self._task_file_path(task), task.description)
+
+        if self.backend is not None:
+            try:
+                self.backend.put(key, self._cache[key])
+                if time.time() - self._last_backend_cleanup > 300:  # Cleanup do backend a cada 5 minutos
+                    self._last_backend_cleanup = time.time()
+                    self.backend.cleanup_expired()
+            except Exception as e:
+                logger.warning(f"Falha ao gravar no backend do cache ({self.backend.name}): {e}")
+
+        logger.debug(f"Solução para a tarefa '{task.description[:50]}...' armazenada no cache com {len(keywords)} palavras-chave.")
+
+    def _store(self, key: str, solution: Any, keywords: List[str], task_type: Optional[str],
+               file_path: Optional[str] = None, description: Optional[str] = None):
+        """Armazena uma entrada na camada em memória, atualizando todos os índices."""
         current_time = time.time()
 
-        try:
-            # Armazenar com metadados
-            entry = {
-                'data': solution,
-                'timestamp': current_time,
-                'last_access': current_time,
-                'access_count': 0,
-                'keywords': keywords,
-                'task_type': task.type.value
-            }
-            
-            self._cache[key] = entry
-            
-            # Atualizar índice semântico
-            for keyword in keywords:
-                if keyword not in self._semantic_index:
-                    self._semantic_index[keyword] = []
-                self._semantic_index[keyword].append(key)
-            
-            logger.info(f"Solução para a tarefa '{task.description[:50]}...' armazenada no cache com {len(keywords)} palavras-chave.")
-            
-        except (TypeError, ValueError) as e:
-            logger.warning(f"Erro ao serializar solução para a tarefa {task.task_id}: {e}")
+        # Substituir uma entrada existente ou abrir espaço para uma nova
+        self._cleanup_expired()
+        if key in self._cache:
+            self._remove(key)
+        else:
+            self._evict_least_used()
+
+        # Armazenar com metadados
+        entry = {
+            'data': solution,
+            'timestamp': current_time,
+            'last_access': current_time,
+            'access_count': 0,
+            'keywords': keywords,
+            'task_type': task_type,
+            'file_path': file_path,
+            'description': description,
+        }
+        self._cache[key] = entry
+        self._push_lfu(key, entry)
+        self._ttl_wheel.setdefault(self._wheel_slot(current_time + self.default_ttl), set()).add(key)
+
+        # Atualizar índice semântico
+        for keyword in keywords:
+            self._semantic_index.setdefault(keyword, set()).add(key)
+        if self._similarity_index is not None:
+            # Entradas antigas do backend sem descrição são indexadas pelas palavras-chave
+            self._similarity_index.add(key, description or " ".join(keywords), (task_type, file_path))
 
     def get_stats(self) -> Dict[str, Any]:
-        """Retorna estatísticas do cache."""
+        """Retorna estatísticas do cache, com detalhamento por camada em `backends`."""
         total_requests = self._access_stats["hits"] + self._access_stats["misses"]
         hit_rate = (self._access_stats["hits"] / total_requests * 100) if total_requests > 0 else 0
+        memory_requests = self._memory_stats["hits"] + self._memory_stats["misses"]
+        memory_hit_rate = (self._memory_stats["hits"] / memory_requests * 100) if memory_requests > 0 else 0
         
+        backends = {
+            "memory": {
+                "entries": len(self._cache),
+                "hit_rate": f"{memory_hit_rate:.1f}%",
+                "total_hits": self._memory_stats["hits"],
+                "total_misses": self._memory_stats["misses"],
+            }
+        }
+        if self.backend is not None:
+            try:
+                backends[self.backend.name] = self.backend.get_stats()
+            except Exception as e:
+                backends[self.backend.name] = {"error": str(e)}
+
         return {
             "cache_size": len(self._cache),
             "max_size": self.max_cache_size,
@@ -215,22 +389,53 @@ class CognitiveCache:
             "total_hits": self._access_stats["hits"],
             "total_misses": self._access_stats["misses"],
             "semantic_keywords": len(self._semantic_index),
-            "ttl_seconds": self.default_ttl
+            "similarity_mode": self.similarity_mode,
+            "similarity_threshold": self.similarity_threshold,
+            "ttl_seconds": self.default_ttl,
+            "evictions": self._access_stats["evictions"],
+            "expirations": self._access_stats["expirations"],
+            "backends": backends
         }
 
+    def invalidate(self, task: Task):
+        """Remove a solução da tarefa (ex.: rejeitada na validação) da memória e do backend."""
+        key = self._generate_cache_key(task)
+        self._remove(key)
+        if self.backend is not None:
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                logger.warning(f"Falha ao remover do backend do cache ({self.backend.name}): {e}")
+
     def clear(self):
-        """Limpa completamente o cache."""
+        """Limpa completamente o cache, incluindo o backend persistente."""
         self._cache.clear()
         self._semantic_index.clear()
-        self._access_stats = {"hits": 0, "misses": 0}
+        self._lfu_heap.clear()
+        self._ttl_wheel.clear()
+        if self._similarity_index is not None:
+            self._similarity_index.clear()
+        self._access_stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._memory_stats = {"hits": 0, "misses": 0}
+        if self.backend is not None:
+            self.backend.clear()
         logger.info("Cache completamente limpo.")
 
 # Singleton para garantir que o mesmo cache seja usado em todo o sistema
 _cognitive_cache_instance: Optional[CognitiveCache] = None
 
-def get_cognitive_cache() -> CognitiveCache:
-    """Retorna a instância singleton do CognitiveCache."""
+def get_cognitive_cache(persistent_path: Optional[str] = None) -> CognitiveCache:
+    """
+    Retorna a instância singleton do CognitiveCache.
+    Se `persistent_path` for informado, um SQLiteCacheBackend nesse arquivo é
+    anexado ao singleton (caso ainda não tenha backend).
+    """
     global _cognitive_cache_instance
     if _cognitive_cache_instance is None:
         _cognitive_cache_instance = CognitiveCache()
+    if persistent_path and _cognitive_cache_instance.backend is None:
+        try:
+            _cognitive_cache_instance.backend = SQLiteCacheBackend(persistent_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível abrir o cache persistente em '{persistent_path}': {e}. Usando apenas memória.")
     return _cognitive_cache_instance
@@ -0,0 +1,228 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Set
+
+from loguru import logger
+
+from evolux_engine.cache.cache_backends import CacheBackend, SQLiteCacheBackend
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Normaliza mensagens para a chave de cache: quebras de linha unificadas e
+    espaços à direita removidos, sem alterar a indentação (relevante em código).
+    """
+    normalized = []
+    for message in messages:
+        content = (message.get("content") or "").replace("\r\n", "\n").replace("\r", "\n")
+        content = "\n".join(line.rstrip() for line in content.split("\n")).strip()
+        normalized.append({"role": (message.get("role") or "").strip().lower(), "content": content})
+    return normalized
+
+
+class LLMResponseCache:
+    """
+    Cache de respostas completas da LLM, chaveado por hash de
+    (modelo, mensagens normalizadas, temperatura, max_tokens).
+
+    A camada em memória é um LRU limitado a `max_entries`; opcionalmente um
+    `CacheBackend` persistente guarda as respostas entre execuções (e entre
+    processos), de modo que reexecuções de testes e replanejamentos do mesmo
+    objetivo não gastam tokens nem latência. Com `deterministic_only` (padrão),
+    apenas requisições com temperatura 0 são armazenadas: respostas amostradas
+    não são reproduzidas entre execuções.
+
+    Entradas lidas ou gravadas com uma `tag` (ex.: o id da tarefa) podem ser
+    removidas com `invalidate_tag`, para que uma resposta rejeitada na
+    validação não seja devolvida de novo na próxima tentativa. O índice de
+    tags só acompanha as entradas em memória: uma entrada despejada sai do
+    índice e volta a ele quando é lida do backend com a tag.
+    """
+
+    def __init__(self, max_entries: int = 1000, deterministic_only: bool = True,
+                 backend: Optional[CacheBackend] = None):
+        self.max_entries = max_entries
+        self.deterministic_only = deterministic_only
+        self.backend = backend
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._category_stats: Dict[str, Dict[str, float]] = {}
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._tags_by_key: Dict[str, Set[str]] = {}
+        self._evictions = 0
+        self._invalidations = 0
+        logger.info(f"LLMResponseCache inicializado com max_entries={max_entries}, deterministic_only={deterministic_only}, backend={backend.name if backend else 'memory'}")
+
+    @staticmethod
+    def make_key(model_name: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        payload = {
+            "model": model_name,
+            "messages": normalize_messages(messages),
+            "temperature": round(float(temperature), 4),
+            "max_tokens": max_tokens,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return not self.deterministic_only or temperature == 0
+
+    def _stats_for(self, category: str) -> Dict[str, float]:
+        stats = self._category_stats.get(category)
+        if stats is None:
+            stats = self._category_stats[category] = {
+                "hits": 0, "misses": 0, "stores": 0, "saved_tokens": 0, "saved_latency_ms": 0.0,
+            }
+        return stats
+
+    def get(self, key: str, category: str, tag: Optional[str] = None) -> Optional[str]:
+        """Retorna a resposta armazenada para a chave (memória e depois backend), registrando hit/miss por categoria."""
+        stats = self._stats_for(category)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self.backend is not None:
+            try:
+                backend_entry = self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"Falha ao consultar o backend do cache de respostas ({self.backend.name}): {e}")
+                backend_entry = None
+            if backend_entry is not None:
+                entry = backend_entry['data']
+                self._remember(key, entry)
+
+        if entry is None:
+            stats["misses"] += 1
+            return None
+
+        if tag is not None:
+            self._tag(key, tag)
+        stats["hits"] += 1
+        stats["saved_tokens"] += entry.get("prompt_tokens", 0) + entry.get("completion_tokens", 0)
+        stats["saved_latency_ms"] += entry.get("latency_ms", 0.0)
+        return entry["response"]
+
+    def put(self, key: str, category: str, response: str, latency_ms: float = 0.0,
+            prompt_tokens: int = 0, completion_tokens: int = 0, tag: Optional[str] = None):
+        """Armazena uma resposta não vazia nas duas camadas."""
+        if not response or not response.strip():
+            return
+        entry = {
+            "response": response,
+            "latency_ms": latency_ms,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+        self._remember(key, entry)
+        if tag is not None:
+            self._tag(key, tag)
+        self._stats_for(category)["stores"] += 1
+
+        if self.backend is not None:
+            try:
+                self.backend.put(key, {"data": entry, "keywords": [], "task_type": category})
+            except Exception as e:
+                logger.warning(f"Falha ao gravar no backend do cache de respostas ({self.backend.name}): {e}")
+
+    def invalidate(self, key: str):
+        """Remove a resposta da chave das duas camadas."""
+        self._entries.pop(key, None)
+        self._untag(key)
+        if self.backend is not None:
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                logger.warning(f"Falha ao remover do backend do cache de respostas ({self.backend.name}): {e}")
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Remove as respostas lidas ou gravadas com a `tag` e retorna quantas chaves foram invalidadas."""
+        keys = set(self._keys_by_tag.get(tag, ()))
+        for key in keys:
+            self.invalidate(key)
+        self._invalidations += len(keys)
+        if keys:
+            logger.debug(f"Cache de respostas: {len(keys)} entrada(s) invalidada(s) para '{tag}'")
+        return len(keys)
+
+    def _tag(self, key: str, tag: str):
+        self._keys_by_tag.setdefault(tag, set()).add(key)
+        self._tags_by_key.setdefault(key, set()).add(tag)
+
+    def _untag(self, key: str):
+        for tag in self._tags_by_key.pop(key, ()):
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._untag(evicted_key)
+            self._evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas globais e por categoria de tarefa."""
+        categories = {}
+        for category, stats in self._category_stats.items():
+            requests = stats["hits"] + stats["misses"]
+            categories[category] = {
+                **stats,
+                "hit_rate": f"{(stats['hits'] / requests * 100) if requests else 0:.1f}%",
+            }
+        hits = sum(stats["hits"] for stats in self._category_stats.values())
+        misses = sum(stats["misses"] for stats in self._category_stats.values())
+        result = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "deterministic_only": self.deterministic_only,
+            "hit_rate": f"{(hits / (hits + misses) * 100) if hits + misses else 0:.1f}%",
+            "total_hits": hits,
+            "total_misses": misses,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "saved_tokens": sum(stats["saved_tokens"] for stats in self._category_stats.values()),
+            "saved_latency_ms": sum(stats["saved_latency_ms"] for stats in self._category_stats.values()),
+            "categories": categories,
+        }
+        if self.backend is not None:
+            try:
+                result["backend"] = self.backend.get_stats()
+            except Exception as e:
+                result["backend"] = {"error": str(e)}
+        return result
+
+    def clear(self):
+        """Limpa o cache, incluindo o backend persistente."""
+        self._entries.clear()
+        self._category_stats.clear()
+        self._keys_by_tag.clear()
+        self._tags_by_key.clear()
+        self._evictions = 0
+        self._invalidations = 0
+        if self.backend is not None:
+            self.backend.clear()
+        logger.info("Cache de respostas da LLM limpo.")
+
+
+# Singleton compartilhado por todos os LLMClients do processo
+_llm_response_cache_instance: Optional[LLMResponseCache] = None
+
+def get_llm_response_cache(persistent_path: Optional[str] = None, max_entries: int = 1000,
+                           deterministic_only: bool = True) -> LLMResponseCache:
+    """
+    Retorna a instância singleton do LLMResponseCache.
+    Se `persistent_path` for informado, um SQLiteCacheBackend nesse arquivo é
+    anexado ao singleton (caso ainda não tenha backend).
+    """
+    global _llm_response_cache_instance
+    if _llm_response_cache_instance is None:
+        _llm_response_cache_instance = LLMResponseCache(max_entries=max_entries, deterministic_only=deterministic_only)
+    if persistent_path and _llm_response_cache_instance.backend is None:
+        try:
+            _llm_response_cache_instance.backend = SQLiteCacheBackend(persistent_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível abrir o cache de respostas persistente em '{persistent_path}': {e}. Usando apenas memória.")
+    return _llm_response_cache_instance
@@ -0,0 +1,205 @@
+import re
+import zlib
+from typing import Optional, Dict, List, Set, Tuple, Hashable
+
+import numpy as np
+from loguru import logger
+
+try:
+    import scipy.sparse as sp
+    IS_SCIPY_AVAILABLE = True
+except ImportError:
+    sp = None
+    IS_SCIPY_AVAILABLE = False
+
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+class HashedNgramVectorizer:
+    """
+    Converte textos em vetores esparsos L2-normalizados de palavras e
+    n-gramas de caracteres, projetados por hashing em `n_features` dimensões
+    (sem vocabulário a manter, portanto sem custo de reindexação).
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, ngram_size: int = 3):
+        self.n_features = n_features
+        self.ngram_size = ngram_size
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in _WORD_RE.findall(text.lower()):
+            features.append(f"w:{word}")
+            padded = f"<{word}>"
+            features.extend(
+                padded[i:i + self.ngram_size] for i in range(max(1, len(padded) - self.ngram_size + 1))
+            )
+        return features
+
+    def transform(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (índices, pesos) do vetor esparso do texto, com pesos log(1 + tf)."""
+        counts: Dict[int, int] = {}
+        for feature in self._features(text):
+            index = zlib.crc32(feature.encode()) % self.n_features
+            counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        values /= np.linalg.norm(values)
+        return indices, values
+
+
+class _Partition:
+    """
+    Vetores de uma partição (tipo de tarefa + arquivo) em uma matriz CSR
+    principal, mais um buffer de linhas recentes que é incorporado quando
+    passa de uma fração da matriz (limitada a MAX_PENDING_ROWS). Remoções só
+    desativam a linha até a próxima compactação, com o mesmo limite.
+    """
+    MAX_PENDING_ROWS = 512
+
+    def __init__(self, n_features: int, merge_ratio: float):
+        self.n_features = n_features
+        self.merge_ratio = merge_ratio
+        self.row_keys: List[Optional[str]] = []  # linha -> chave (None se removida)
+        self.row_of: Dict[str, int] = {}
+        self.main = None  # matriz CSR (linhas x features) com as primeiras `main_rows` linhas
+        self.main_rows = 0
+        self.pending: List[Tuple[np.ndarray, np.ndarray]] = []  # linhas após `main_rows`
+        self.dead_rows: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def _limit(self, rows: int) -> float:
+        return max(64, min(self.merge_ratio * rows, self.MAX_PENDING_ROWS))
+
+    def add(self, key: str, vector: Tuple[np.ndarray, np.ndarray]):
+        self.remove(key)
+        self.row_of[key] = len(self.row_keys)
+        self.row_keys.append(key)
+        self.pending.append(vector)
+        if len(self.pending) > self._limit(self.main_rows):
+            self._rebuild()
+
+    def remove(self, key: str):
+        row = self.row_of.pop(key, None)
+        if row is None:
+            return
+        self.row_keys[row] = None
+        self.dead_rows.add(row)
+        if len(self.dead_rows) > self._limit(len(self.row_keys)):
+            self._rebuild()
+
+    def _rebuild(self):
+        """Compacta linhas removidas e incorpora o buffer na matriz principal."""
+        live = np.array([row for row, key in enumerate(self.row_keys) if key is not None], dtype=np.int64)
+        live_main = live[live < self.main_rows]
+        live_pending = [self.pending[row - self.main_rows] for row in live[live >= self.main_rows]]
+
+        blocks = []
+        if self.main is not None and len(live_main):
+            blocks.append(self.main[live_main] if len(live_main) < self.main_rows else self.main)
+        if live_pending:
+            blocks.append(self._to_matrix(live_pending))
+        self.main = sp.vstack(blocks, format="csr") if blocks else None
+
+        self.row_keys = [self.row_keys[row] for row in live]
+        self.row_of = {key: row for row, key in enumerate(self.row_keys)}
+        self.main_rows = len(self.row_keys)
+        self.pending = []
+        self.dead_rows = set()
+
+    def _to_matrix(self, rows: List[Tuple[np.ndarray, np.ndarray]]):
+        lengths = [len(indices) for indices, _ in rows]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.concatenate([r[0] for r in rows])
+        values = np.concatenate([r[1] for r in rows])
+        return sp.csr_matrix((values, indices, indptr), shape=(len(rows), self.n_features))
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Similaridade de cosseno da consulta (vetor denso de `n_features`) com
+        todas as linhas, em um único produto matriz-vetor.
+        """
+        scores = np.zeros(len(self.row_keys), dtype=np.float32)
+        if self.main_rows:
+            scores[:self.main_rows] = self.main @ query
+        if self.pending:
+            scores[self.main_rows:] = self._to_matrix(self.pending) @ query
+        if self.dead_rows:
+            scores[list(self.dead_rows)] = -1.0
+        return scores
+
+
+class SimilarityIndex:
+    """
+    Índice de similaridade vetorial para o CognitiveCache. As entradas são
+    particionadas por uma chave de filtro (ex.: tipo da tarefa e file_path),
+    e cada busca pontua todos os candidatos da partição de uma só vez.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, merge_ratio: float = 0.1):
+        if not IS_SCIPY_AVAILABLE:
+            raise ImportError("SimilarityIndex requer scipy (pip install scipy).")
+        self.vectorizer = HashedNgramVectorizer(n_features=n_features)
+        self.merge_ratio = merge_ratio
+        self._partitions: Dict[Hashable, _Partition] = {}
+        self._partition_of: Dict[str, Hashable] = {}
+        # Buffer denso reutilizado para a consulta; só os índices da consulta ficam não nulos
+        self._query = np.zeros(n_features, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._partition_of)
+
+    def add(self, key: str, text: str, partition: Hashable):
+        """Indexa (ou reindexa) uma chave na partição informada."""
+        self.remove(key)
+        bucket = self._partitions.get(partition)
+        if bucket is None:
+            bucket = self._partitions[partition] = _Partition(self.vectorizer.n_features, self.merge_ratio)
+        bucket.add(key, self.vectorizer.transform(text))
+        self._partition_of[key] = partition
+
+    def remove(self, key: str):
+        partition = self._partition_of.pop(key, None)
+        if partition is None:
+            return
+        bucket = self._partitions[partition]
+        bucket.remove(key)
+        if not len(bucket):
+            del self._partitions[partition]
+
+    def search(self, text: str, partition: Hashable, threshold: float) -> Optional[Tuple[str, float]]:
+        """Retorna (chave, similaridade) do vizinho mais próximo na partição, se atingir o limiar."""
+        bucket = self._partitions.get(partition)
+        query = self.vectorizer.transform(text)
+        if bucket is None or not len(query[0]):
+            return None
+
+        q_indices, q_values = query
+        self._query[q_indices] = q_values
+        try:
+            scores = bucket.scores(self._query)
+        finally:
+            self._query[q_indices] = 0.0
+        best_row = int(np.argmax(scores))
+        best_score = float(scores[best_row])
+        if best_score < threshold or bucket.row_keys[best_row] is None:
+            return None
+        return bucket.row_keys[best_row], best_score
+
+    def similarity(self, text_a: str, text_b: str) -> float:
+        """Similaridade de cosseno entre dois textos, sem consultar o índice."""
+        indices_a, values_a = self.vectorizer.transform(text_a)
+        indices_b, values_b = self.vectorizer.transform(text_b)
+        _, pos_a, pos_b = np.intersect1d(indices_a, indices_b, assume_unique=True, return_indices=True)
+        return float(values_a[pos_a] @ values_b[pos_b])
+
+    def clear(self):
+        self._partitions.clear()
+        self._partition_of.clear()
+        logger.debug("SimilarityIndex limpo.")
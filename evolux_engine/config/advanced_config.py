@@ -193,6 +193,33 @@ class AdvancedSystemConfig(BaseSettings):
         description="Intervalo de backup em horas"
     )
     
+    context_storage_format: str = Field(
+        default="json",
+        pattern="^(json|binary)$",
+        description="Formato de contextos e snapshots em disco (json ou binary: msgpack/orjson versionado)"
+    )
+    
+    context_cache_size: int = Field(
+        default=100,
+        ge=1,
+        le=10000,
+        description="Máximo de contextos mantidos no cache em memória"
+    )
+    
+    context_cache_max_mb: int = Field(
+        default=256,
+        ge=1,
+        le=16384,
+        description="Memória máxima (estimada pelo tamanho serializado) dos contextos em cache, em MB"
+    )
+    
+    context_write_back_seconds: int = Field(
+        default=30,
+        ge=1,
+        le=3600,
+        description="Intervalo entre as gravações em lote dos contextos modificados no cache"
+    )
+    
     # === Development Configuration ===
     debug_mode: bool = Field(
         default=False,
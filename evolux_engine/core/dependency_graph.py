@@ -1,27 +1,116 @@
-from typing import List, Dict, Set, Optional
-from evolux_engine.schemas.contracts import Task, TaskStatus
+from typing import List, Dict, Set, Optional, Iterable, Tuple
+from evolux_engine.schemas.contracts import Task, TaskStatus, TaskType
+
+# Status que encerram uma tarefa para fins de conclusão do grafo
+FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+# Durações base (ms) usadas enquanto não há histórico de execução para o TaskType
+DEFAULT_TYPE_DURATION_MS: Dict[TaskType, float] = {
+    TaskType.CREATE_FILE: 20000,
+    TaskType.MODIFY_FILE: 15000,
+    TaskType.DELETE_FILE: 1000,
+    TaskType.EXECUTE_COMMAND: 30000,
+    TaskType.VALIDATE_ARTIFACT: 8000,
+    TaskType.ANALYZE_OUTPUT: 8000,
+    TaskType.PLAN_SUB_TASKS: 15000,
+    TaskType.GENERIC_LLM_QUERY: 10000,
+}
+DEFAULT_DURATION_MS = 10000
+# Custo estimado por token (≈4 caracteres) das instruções da tarefa
+MS_PER_ESTIMATED_TOKEN = 20
+# Variação relativa da média histórica que força o recálculo das prioridades
+PRIORITY_REFRESH_THRESHOLD = 0.1
 
 class DependencyGraph:
     """
     Gerencia o grafo de dependências entre tarefas, permitindo
     a execução paralela e a análise do fluxo de trabalho.
+
+    O grafo mantém, para cada tarefa, o número de dependências ainda não
+    concluídas e um conjunto de tarefas prontas, atualizados incrementalmente
+    por `update_task_status`. Assim, `get_runnable_tasks` e `is_completed`
+    custam O(1) amortizado em vez de O(V+E) por iteração.
+
+    As tarefas prontas são devolvidas em ordem decrescente de caminho restante
+    mais longo (duração estimada da tarefa somada à do seu maior caminho de
+    dependentes), para que o caminho crítico seja iniciado primeiro quando a
+    concorrência é limitada.
     """
     def __init__(self):
         self.nodes: Dict[str, Task] = {}
         self.dependencies: Dict[str, Set[str]] = {}  # task_id -> set of dependency_ids
         self.dependents: Dict[str, Set[str]] = {}   # dependency_id -> set of task_ids
 
+        self._status: Dict[str, TaskStatus] = {}     # status conhecido pelo grafo
+        self._remaining: Dict[str, int] = {}         # task_id -> dependências ainda não concluídas
+        self._ready: Dict[str, None] = {}            # tarefas PENDING sem dependências pendentes (ordem de inserção)
+        self._unfinished = 0                         # tarefas fora de FINISHED_STATUSES
+
+        self._type_durations: Dict[TaskType, Tuple[int, float]] = {}  # tipo -> (amostras, média em ms)
+        self._actual_ms: Dict[str, float] = {}       # task_id -> duração medida da última execução
+        self._priority: Optional[Dict[str, float]] = None  # task_id -> caminho restante (ms), calculado sob demanda
+
     def add_task(self, task: Task):
-        """Adiciona uma tarefa (nó) ao grafo."""
+        """
+        Adiciona uma tarefa (nó) ao grafo.
+
+        Todas as dependências já devem estar no grafo; use `add_tasks` para
+        inserir um lote em qualquer ordem. Levanta ValueError para dependências
+        inexistentes ou ciclos.
+        """
         if task.task_id in self.nodes:
             return  # Evita duplicatas
-        
-        self.nodes[task.task_id] = task
-        self.dependencies[task.task_id] = set(task.dependencies)
-        self.dependents.setdefault(task.task_id, set())
 
-        for dep_id in task.dependencies:
-            self.dependents.setdefault(dep_id, set()).add(task.task_id)
+        missing = [dep_id for dep_id in task.dependencies if dep_id not in self.nodes]
+        if task.task_id in task.dependencies:
+            raise ValueError(f"Ciclo de dependências detectado: a tarefa '{task.task_id}' depende de si mesma.")
+        if missing:
+            raise ValueError(f"Tarefa '{task.task_id}' depende de tarefas inexistentes no grafo: {missing}")
+
+        self._insert(task)
+
+    def add_tasks(self, tasks: Iterable[Task]):
+        """
+        Adiciona um lote de tarefas em qualquer ordem, validando dependências
+        inexistentes e ciclos sobre o lote inteiro antes de alterar o grafo.
+        """
+        batch: Dict[str, Task] = {}
+        for task in tasks:
+            if task.task_id not in self.nodes:
+                batch.setdefault(task.task_id, task)
+
+        for task in batch.values():
+            missing = [dep_id for dep_id in task.dependencies if dep_id not in self.nodes and dep_id not in batch]
+            if missing:
+                raise ValueError(f"Tarefa '{task.task_id}' depende de tarefas inexistentes no grafo: {missing}")
+
+        for task in self._topological_order(batch):
+            self._insert(task)
+
+    def set_dependencies(self, task_id: str, dependency_ids: Iterable[str]):
+        """Substitui as dependências de uma tarefa já existente no grafo."""
+        if task_id not in self.nodes:
+            raise ValueError(f"Tarefa com ID '{task_id}' não encontrada no grafo.")
+        new_deps = set(dependency_ids)
+        missing = [dep_id for dep_id in new_deps if dep_id not in self.nodes]
+        if missing:
+            raise ValueError(f"Tarefa '{task_id}' depende de tarefas inexistentes no grafo: {missing}")
+        cycle = self._find_path(task_id, new_deps)
+        if cycle:
+            raise ValueError(f"Ciclo de dependências detectado: {' -> '.join([task_id] + cycle)}")
+
+        for dep_id in self.dependencies[task_id]:
+            self.dependents[dep_id].discard(task_id)
+        for dep_id in new_deps:
+            self.dependents.setdefault(dep_id, set()).add(task_id)
+        self.dependencies[task_id] = new_deps
+        self.nodes[task_id].dependencies = list(new_deps)
+        self._priority = None
+
+        self._remaining[task_id] = sum(
+            1 for dep_id in new_deps if self._status[dep_id] != TaskStatus.COMPLETED
+        )
+        self._refresh_ready(task_id)
 
     def get_task(self, task_id: str) -> Optional[Task]:
         """Retorna uma tarefa pelo seu ID."""
@@ -35,58 +124,258 @@ class DependencyGraph:
         """
         Retorna uma lista de todas as tarefas que estão prontas para serem executadas,
         ou seja, estão com status PENDING e todas as suas dependências estão COMPLETED.
+        As tarefas vêm ordenadas pela prioridade de caminho crítico.
         """
-        runnable = []
-        for task_id, task in self.nodes.items():
-            if task.status == TaskStatus.PENDING:
-                if self.are_dependencies_met(task_id):
-                    runnable.append(task)
-        return runnable
+        if len(self._ready) < 2:
+            return [self.nodes[task_id] for task_id in self._ready]
+        priority = self._get_priorities()
+        return [self.nodes[task_id] for task_id in sorted(self._ready, key=lambda t: -priority[t])]
 
     def are_dependencies_met(self, task_id: str) -> bool:
         """Verifica se todas as dependências de uma tarefa foram concluídas."""
         if task_id not in self.dependencies:
             return False  # Tarefa não existe no grafo
-
-        for dep_id in self.dependencies[task_id]:
-            dep_task = self.nodes.get(dep_id)
-            if not dep_task or dep_task.status != TaskStatus.COMPLETED:
-                return False
-        return True
+        return self._remaining[task_id] == 0
 
     def update_task_status(self, task_id: str, status: TaskStatus):
         """Atualiza o status de uma tarefa no grafo."""
-        if task_id in self.nodes:
-            self.nodes[task_id].status = status
-        else:
+        if task_id not in self.nodes:
             raise ValueError(f"Tarefa com ID '{task_id}' não encontrada no grafo.")
 
+        self.nodes[task_id].status = status
+        old_status = self._status[task_id]
+        if old_status == status:
+            return
+        self._status[task_id] = status
+
+        if (old_status in FINISHED_STATUSES) != (status in FINISHED_STATUSES):
+            self._unfinished += 1 if old_status in FINISHED_STATUSES else -1
+            if old_status in FINISHED_STATUSES:
+                # Tarefa reaberta volta a contar no caminho restante
+                self._priority = None
+
+        if old_status == TaskStatus.COMPLETED or status == TaskStatus.COMPLETED:
+            delta = -1 if status == TaskStatus.COMPLETED else 1
+            for dependent_id in self.dependents.get(task_id, ()):
+                self._remaining[dependent_id] += delta
+                self._refresh_ready(dependent_id)
+
+        self._refresh_ready(task_id)
+
     def is_completed(self) -> bool:
         """Verifica se todas as tarefas no grafo estão concluídas ou falharam."""
-        return all(
-            task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED]
-            for task in self.nodes.values()
+        return self._unfinished == 0
+
+    # ------------------------------------------------------------------
+    # Estimativa de duração e caminho crítico
+    # ------------------------------------------------------------------
+
+    def record_execution_time(self, task_id: str, duration_ms: float):
+        """Registra a duração medida de uma execução e atualiza a média do seu TaskType."""
+        task = self.nodes.get(task_id)
+        if task is None:
+            raise ValueError(f"Tarefa com ID '{task_id}' não encontrada no grafo.")
+        self._actual_ms[task_id] = duration_ms
+        self._learn_duration(task.type, duration_ms)
+
+    def estimate_task_duration(self, task: Task) -> float:
+        """
+        Estima a duração (ms) de uma tarefa: média histórica de `execution_time_ms`
+        do seu TaskType quando disponível, senão uma estimativa baseada no
+        tamanho em tokens das suas instruções.
+        """
+        history = self._type_durations.get(task.type)
+        if history:
+            return history[1]
+
+        text = task.description
+        if task.details is not None:
+            text += " " + " ".join(str(value) for value in task.details.model_dump().values() if isinstance(value, str))
+        estimated_tokens = len(text) // 4
+        return DEFAULT_TYPE_DURATION_MS.get(task.type, DEFAULT_DURATION_MS) + estimated_tokens * MS_PER_ESTIMATED_TOKEN
+
+    def get_remaining_path_ms(self, task_id: str) -> float:
+        """Duração estimada do caminho mais longo que começa nesta tarefa e ainda precisa ser executado."""
+        return self._get_priorities()[task_id]
+
+    def get_critical_path(self, remaining_only: bool = True) -> Tuple[List[str], float]:
+        """
+        Retorna o caminho crítico (lista de task_ids na ordem de execução) e sua
+        duração estimada em ms. Com `remaining_only=False`, tarefas já
+        finalizadas entram com a duração medida, explicando o tempo total do projeto.
+        """
+        priority = self._get_priorities() if remaining_only else self._compute_path_lengths(remaining_only=False)
+        candidates = [
+            task_id for task_id in self.nodes
+            if not (remaining_only and self._status[task_id] in FINISHED_STATUSES)
+        ]
+        if not candidates:
+            return [], 0.0
+
+        # O caminho começa na tarefa de maior caminho (em empate, a que não tem dependências)
+        current = max(candidates, key=lambda t: (priority[t], not self.dependencies[t]))
+        total_ms = priority[current]
+        path = []
+        while current is not None:
+            path.append(current)
+            current = max(
+                (t for t in self.dependents.get(current, ())
+                 if not (remaining_only and self._status[t] in FINISHED_STATUSES)),
+                key=lambda t: priority[t],
+                default=None,
+            )
+        return path, total_ms
+
+    def _task_duration(self, task_id: str, remaining_only: bool) -> float:
+        if self._status[task_id] in FINISHED_STATUSES:
+            if remaining_only:
+                return 0.0
+            if task_id in self._actual_ms:
+                return self._actual_ms[task_id]
+        return self.estimate_task_duration(self.nodes[task_id])
+
+    def _get_priorities(self) -> Dict[str, float]:
+        if self._priority is None:
+            self._priority = self._compute_path_lengths(remaining_only=True)
+        return self._priority
+
+    def _compute_path_lengths(self, remaining_only: bool) -> Dict[str, float]:
+        """Caminho mais longo a partir de cada tarefa, em ordem topológica reversa (O(V+E))."""
+        path_ms: Dict[str, float] = {}
+        for task in reversed(self._topological_order(self.nodes)):
+            longest_dependent = max(
+                (path_ms[dependent_id] for dependent_id in self.dependents.get(task.task_id, ())),
+                default=0.0,
+            )
+            path_ms[task.task_id] = self._task_duration(task.task_id, remaining_only) + longest_dependent
+        return path_ms
+
+    def _learn_duration(self, task_type: TaskType, duration_ms: float):
+        samples, mean = self._type_durations.get(task_type, (0, 0.0))
+        new_mean = mean + (duration_ms - mean) / (samples + 1)
+        self._type_durations[task_type] = (samples + 1, new_mean)
+        # Recalcular prioridades só quando a estimativa muda de forma relevante
+        if samples == 0 or abs(new_mean - mean) > PRIORITY_REFRESH_THRESHOLD * mean:
+            self._priority = None
+
+    def _insert(self, task: Task):
+        """Insere uma tarefa cujas dependências já estão no grafo."""
+        status = task.status
+        self._priority = None
+        for execution in task.execution_history:
+            if execution.resource_usage and execution.resource_usage.execution_time_ms:
+                self._learn_duration(task.type, execution.resource_usage.execution_time_ms)
+        self.nodes[task.task_id] = task
+        self.dependencies[task.task_id] = set(task.dependencies)
+        self.dependents.setdefault(task.task_id, set())
+        for dep_id in task.dependencies:
+            self.dependents.setdefault(dep_id, set()).add(task.task_id)
+
+        self._status[task.task_id] = status
+        self._remaining[task.task_id] = sum(
+            1 for dep_id in self.dependencies[task.task_id] if self._status[dep_id] != TaskStatus.COMPLETED
         )
+        if status not in FINISHED_STATUSES:
+            self._unfinished += 1
+        self._refresh_ready(task.task_id)
+
+    def _refresh_ready(self, task_id: str):
+        if self._status[task_id] == TaskStatus.PENDING and self._remaining[task_id] == 0:
+            self._ready[task_id] = None
+        else:
+            self._ready.pop(task_id, None)
+
+    def _topological_order(self, batch: Dict[str, Task]) -> List[Task]:
+        """Ordena um lote de tarefas (Kahn), levantando ValueError se houver ciclo."""
+        in_batch_deps = {
+            task_id: {dep_id for dep_id in task.dependencies if dep_id in batch}
+            for task_id, task in batch.items()
+        }
+        batch_dependents: Dict[str, List[str]] = {task_id: [] for task_id in batch}
+        for task_id, deps in in_batch_deps.items():
+            for dep_id in deps:
+                batch_dependents[dep_id].append(task_id)
+
+        remaining = {task_id: len(deps) for task_id, deps in in_batch_deps.items()}
+        queue = [task_id for task_id in batch if remaining[task_id] == 0]
+        order = []
+        for task_id in queue:  # a lista cresce durante a iteração
+            order.append(batch[task_id])
+            for dependent_id in batch_dependents[task_id]:
+                remaining[dependent_id] -= 1
+                if remaining[dependent_id] == 0:
+                    queue.append(dependent_id)
+
+        if len(order) < len(batch):
+            stuck = [task_id for task_id in batch if remaining[task_id] > 0]
+            raise ValueError(f"Ciclo de dependências detectado entre as tarefas: {stuck}")
+        return order
+
+    def _find_path(self, target_id: str, start_ids: Iterable[str]) -> Optional[List[str]]:
+        """Retorna um caminho de dependências de algum nó em start_ids até target_id, se existir."""
+        stack = [(start_id, [start_id]) for start_id in start_ids]
+        visited: Set[str] = set()
+        while stack:
+            node_id, path = stack.pop()
+            if node_id == target_id:
+                return path
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+            for dep_id in self.dependencies.get(node_id, ()):
+                stack.append((dep_id, path + [dep_id]))
+        return None
+
+    def to_mermaid(self, highlight_critical_path: bool = False) -> str:
+        """
+        Gera uma representação do grafo em formato Mermaid para visualização.
+        Com `highlight_critical_path`, os nós exibem a duração estimada e o
+        caminho crítico do projeto é destacado com borda e arestas grossas.
+        """
+        critical_nodes: Set[str] = set()
+        critical_edges: Set[Tuple[str, str]] = set()
+        if highlight_critical_path:
+            critical_path, total_ms = self.get_critical_path(remaining_only=False)
+            critical_nodes = set(critical_path)
+            critical_edges = set(zip(critical_path, critical_path[1:]))
 
-    def to_mermaid(self) -> str:
-        """Gera uma representação do grafo em formato Mermaid para visualização."""
         mermaid_str = "graph TD\n"
+        if highlight_critical_path:
+            mermaid_str += f"    %% Caminho crítico: {len(critical_nodes)} tarefas, ~{total_ms / 1000:.1f}s\n"
         for task_id, task in self.nodes.items():
             # Usar descrição curta e ID para o nó
             description = task.description.replace('"', "'").split('\n')[0]
             label = f"{task_id[:8]}[{description[:30]}...]"
+            if highlight_critical_path:
+                duration_s = self._task_duration(task_id, remaining_only=False) / 1000
+                label = f"{task_id[:8]}[\"{description[:30]}... ({duration_s:.1f}s)\"]"
             mermaid_str += f"    {label}\n"
-            
+
             # Adicionar estilo baseado no status
+            style = ""
             if task.status == TaskStatus.COMPLETED:
-                mermaid_str += f"    style {task_id[:8]} fill:#d4edda,stroke:#c3e6cb\n"
+                style = "fill:#d4edda,stroke:#c3e6cb"
             elif task.status == TaskStatus.IN_PROGRESS:
-                mermaid_str += f"    style {task_id[:8]} fill:#fff3cd,stroke:#ffeeba\n"
+                style = "fill:#fff3cd,stroke:#ffeeba"
             elif task.status == TaskStatus.FAILED:
-                mermaid_str += f"    style {task_id[:8]} fill:#f8d7da,stroke:#f5c6cb\n"
+                style = "fill:#f8d7da,stroke:#f5c6cb"
+            if task_id in critical_nodes:
+                style = ",".join(part for part in style.split(",") if part and not part.startswith("stroke"))
+                style += ("," if style else "") + "stroke:#d9534f,stroke-width:3px"
+            if style:
+                mermaid_str += f"    style {task_id[:8]} {style}\n"
 
+        edge_index = 0
+        critical_edge_indexes = []
         for task_id, deps in self.dependencies.items():
             for dep_id in deps:
-                mermaid_str += f"    {dep_id[:8]} --> {task_id[:8]}\n"
-        
+                arrow = "==>" if (dep_id, task_id) in critical_edges else "-->"
+                if arrow == "==>":
+                    critical_edge_indexes.append(str(edge_index))
+                mermaid_str += f"    {dep_id[:8]} {arrow} {task_id[:8]}\n"
+                edge_index += 1
+
+        if critical_edge_indexes:
+            mermaid_str += f"    linkStyle {','.join(critical_edge_indexes)} stroke:#d9534f,stroke-width:3px\n"
+
         return mermaid_str
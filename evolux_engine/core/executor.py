@@ -2,10 +2,16 @@ import asyncio
 import json
 import os
 import uuid
+from contextlib import aclosing
 from typing import Dict, Any, Optional, List, Union
 
 from loguru import logger
-from evolux_engine.utils.string_utils import extract_json_from_llm_response, sanitize_llm_response, extract_content_from_json_response
+from evolux_engine.utils.string_utils import (
+    extract_json_from_llm_response,
+    sanitize_llm_response,
+    extract_content_from_json_response,
+    StreamingContentExtractor,
+)
 
 from evolux_engine.llms.llm_client import LLMClient
 from evolux_engine.llms.llm_factory import LLMFactory
@@ -17,6 +23,7 @@ from evolux_engine.schemas.contracts import (
     ExecutionResult,
     ArtifactChange,
     ArtifactChangeType,
+    ResourceUsage,
     TaskDetailsCreateFile,
     TaskDetailsModifyFile,
     TaskDetailsDeleteFile,
@@ -29,6 +36,7 @@ from evolux_engine.schemas.contracts import (
     LLMCallMetrics,
 )
 from evolux_engine.services.file_service import FileService
+from evolux_engine.services.artifact_tracker import ArtifactChangeTracker
 from evolux_engine.services.shell_service import ShellService # Assumindo que ele retorna um dict com stdout, stderr, exit_code
 from evolux_engine.security.security_gateway import SecurityGateway
 from evolux_engine.execution.secure_executor import SecureExecutor
@@ -36,6 +44,7 @@ from evolux_engine.llms.model_router import ModelRouter, ModelInfo, TaskCategory
 from evolux_engine.cache.cognitive_cache import get_cognitive_cache
 from evolux_engine.core.simulation import SimulationEngine
 from evolux_engine.services.config_manager import ConfigManager
+from evolux_engine.utils.token_optimizer import TokenOptimizer, ContextBudgeter, ContextSection
 
 # Prompts do executor_prompts.py
 from .executor_prompts import (
@@ -76,7 +85,12 @@ class TaskExecutorAgent:
         self.model_router = model_router or ModelRouter()
         self.agent_id = agent_id
         self.enable_refinement = enable_iterative_refinement
-        self.cache = get_cognitive_cache()
+        cache_path = None
+        if self.config_manager.get_global_setting("cognitive_cache_persistent", False):
+            cache_path = self.config_manager.get_global_setting("cognitive_cache_path") or os.path.join(
+                self.config_manager.get_global_setting("project_base_dir", "project_workspaces"), ".cognitive_cache.db"
+            )
+        self.cache = get_cognitive_cache(persistent_path=cache_path)
         
         # A fábrica de LLM será usada para obter clientes dinamicamente
         self.llm_factory = LLMFactory()
@@ -104,33 +118,73 @@ class TaskExecutorAgent:
             f"TaskExecutorAgent (ID: {self.agent_id}) inicializado para o projeto ID: {self.project_context.project_id}. Refinamento iterativo: {self.enable_refinement}"
         )
     
+    @property
+    def artifact_tracker(self) -> ArtifactChangeTracker:
+        """Rastreador de mudanças no diretório de artefatos, criado no primeiro comando"""
+        if getattr(self, "_artifact_tracker", None) is None:
+            self._artifact_tracker = ArtifactChangeTracker(self.project_context.workspace_path)
+        return self._artifact_tracker
+
+    @property
+    def artifact_window_lock(self) -> asyncio.Lock:
+        """Serializa as janelas start()/collect() do artifact_tracker entre comandos concorrentes"""
+        if getattr(self, "_artifact_window_lock", None) is None:
+            self._artifact_window_lock = asyncio.Lock()
+        return self._artifact_window_lock
+
+    def forget_cached_outputs(self, task: Task):
+        """Descarta dos caches a solução e as respostas da LLM de uma tarefa rejeitada na validação"""
+        self.cache.invalidate(task)
+        self.llm_factory.invalidate_cached_responses(task.task_id)
+
+    @property
+    def context_budgeter(self) -> ContextBudgeter:
+        """Budgeter de contexto, criado no primeiro uso (carrega o encoder do tokenizer)"""
+        if getattr(self, "_context_budgeter", None) is None:
+            self._context_budgeter = ContextBudgeter(TokenOptimizer())
+        return self._context_budgeter
+
     def _build_project_context(self, task: Task) -> str:
-        """Constrói contexto rico do projeto para injetar nas LLMs"""
-        context_parts = []
-        
-        # Objetivo do projeto
-        context_parts.append(f"OBJETIVO DO PROJETO: {self.project_context.project_goal}")
-        
-        # Tipo de projeto
-        if self.project_context.project_type:
-            context_parts.append(f"TIPO: {self.project_context.project_type}")
-        
-        # Arquivos já existentes
-        existing_files = self._get_existing_files_summary()
-        if existing_files:
-            context_parts.append(f"ARQUIVOS EXISTENTES:\n{existing_files}")
-        
-        # Tarefas concluídas relacionadas
-        related_tasks = self._get_related_completed_tasks(task)
-        if related_tasks:
-            context_parts.append(f"TAREFAS RELACIONADAS CONCLUÍDAS:\n{related_tasks}")
-        
-        # Padrões identificados no projeto
-        patterns = self._identify_project_patterns()
-        if patterns:
-            context_parts.append(f"PADRÕES DO PROJETO:\n{patterns}")
-        
-        return "\n\n".join(context_parts)
+        """
+        Constrói contexto rico do projeto para injetar nas LLMs, dentro do
+        orçamento `prompt_context_max_tokens`. Objetivo e tipo são obrigatórios;
+        as demais seções têm orçamento próprio e são comprimidas (assinaturas,
+        resumo, entradas mais recentes) antes de serem cortadas ou descartadas.
+        """
+        max_tokens = self.config_manager.get_global_setting("prompt_context_max_tokens", 2000)
+        sections = [
+            # Objetivo e tipo do projeto
+            ContextSection("goal", f"OBJETIVO DO PROJETO: {self.project_context.project_goal}", priority=0),
+            ContextSection("type", f"TIPO: {self.project_context.project_type}" if self.project_context.project_type else "", priority=0),
+            # Arquivos já existentes
+            ContextSection("artifacts", self._get_existing_files_summary(), priority=2, compression="signatures",
+                           max_tokens=int(max_tokens * 0.4), title="ARQUIVOS EXISTENTES"),
+            # Tarefas concluídas relacionadas
+            ContextSection("related_tasks", self._get_related_completed_tasks(task), priority=3,
+                           max_tokens=int(max_tokens * 0.2), title="TAREFAS RELACIONADAS CONCLUÍDAS"),
+            # Erros das tentativas anteriores desta tarefa
+            ContextSection("errors", self._get_error_history(task), priority=1, compression="recent",
+                           max_tokens=int(max_tokens * 0.25), title="HISTÓRICO DE ERROS"),
+            # Padrões identificados no projeto
+            ContextSection("patterns", self._identify_project_patterns(), priority=3,
+                           title="PADRÕES DO PROJETO"),
+        ]
+        result = self.context_budgeter.fit(sections, max_tokens)
+        if result.tokens < result.original_tokens:
+            changed = {name: entry["action"] for name, entry in result.sections.items() if entry["action"] != "kept"}
+            logger.debug(f"Contexto do projeto reduzido de {result.original_tokens} para {result.tokens} tokens: {changed}")
+        return result.text
+
+    def _get_error_history(self, task: Task) -> str:
+        """Erros e problemas de validação das tentativas anteriores da tarefa, do mais antigo ao mais recente"""
+        lines = []
+        for attempt, result in enumerate(task.execution_history, 1):
+            if not result.success and result.stderr and result.stderr.strip():
+                lines.append(f"- Tentativa {attempt}: {result.stderr.strip().splitlines()[-1][:300]}")
+        for validation in task.validation_history:
+            for issue in validation.critical_problems + validation.identified_issues:
+                lines.append(f"- Validação: {issue[:300]}")
+        return "\n".join(lines)
     
     def _get_existing_files_summary(self) -> str:
         """Retorna resumo dos arquivos existentes com conteúdo relevante"""
@@ -216,14 +270,15 @@ class TaskExecutorAgent:
         self,
         messages: List[Dict[str, str]],
         action_description: str,
-        task_category: TaskCategory
+        task_category: TaskCategory,
+        cache_tag: Optional[str] = None
     ) -> Optional[str]:
         """
         Invoca o LLM e retorna o conteúdo limpo, sem wrappers JSON.
         """
         try:
             llm_client = self.llm_factory.get_client(task_category)
-            response = await llm_client.generate_response(messages, category=task_category)
+            response = await llm_client.generate_response(messages, category=task_category, cache_tag=cache_tag)
             
             if response and response.strip():
                 cleaned_content = self._clean_llm_response(response)
@@ -241,6 +296,48 @@ class TaskExecutorAgent:
             logger.opt(exception=True).error(f"Erro ao invocar LLM para '{action_description}'.")
             return None
 
+    async def _stream_llm_to_file(
+        self,
+        messages: List[Dict[str, str]],
+        relative_file_path: str,
+        action_description: str,
+        task_category: TaskCategory,
+        cache_tag: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Gera o conteúdo de um arquivo em streaming, gravando-o em disco à medida que
+        os trechos chegam e encerrando a geração assim que o bloco de código (ou o
+        objeto JSON) é fechado. A resposta passa por `_clean_llm_response` ao final;
+        o arquivo anterior só é substituído se o conteúdo limpo for válido.
+        """
+        extractor = StreamingContentExtractor()
+        try:
+            llm_client = self.llm_factory.get_client(task_category)
+            with self.file_service.open_incremental(relative_file_path) as writer:
+                stream = llm_client.generate_response_stream(messages, category=task_category, cache_tag=cache_tag)
+                async with aclosing(stream):
+                    async for chunk in stream:
+                        writer.write(extractor.feed(chunk))
+                        if extractor.done:
+                            logger.debug(f"Streaming de '{action_description}' encerrado ao fechar o {extractor.mode} ({len(extractor.raw)} chars)")
+                            break
+                writer.write(extractor.finish())
+
+                cleaned_content = self._clean_llm_response(extractor.raw) if extractor.raw.strip() else ""
+                if len(cleaned_content.strip()) <= 10:
+                    logger.warning(f"Conteúdo muito pequeno após limpeza: {len(cleaned_content)} chars")
+                    writer.discard()
+                    return None
+                if cleaned_content != extractor.content:
+                    writer.rewrite(cleaned_content)
+
+            logger.info(f"✅ Conteúdo gerado em streaming ({len(cleaned_content)} chars)")
+            return cleaned_content
+
+        except Exception:
+            logger.opt(exception=True).error(f"Erro ao gerar '{action_description}' em streaming.")
+            return None
+
     def _clean_llm_response(self, response: str) -> str:
         """
         Limpa a resposta do LLM removendo wrappers JSON e blocos de código desnecessários.
@@ -357,7 +454,8 @@ class TaskExecutorAgent:
         messages: List[Dict[str, str]],
         expected_json_key: str,
         action_description: str,
-        task_category: TaskCategory
+        task_category: TaskCategory,
+        cache_tag: Optional[str] = None
     ) -> Optional[Any]:
         """
         Invoca o LLM com a nova lógica de fallback e extrai uma chave JSON.
@@ -367,7 +465,7 @@ class TaskExecutorAgent:
             llm_client = self.llm_factory.get_client(task_category)
             
             # A lógica de fallback agora está dentro do próprio cliente
-            response = await llm_client.generate_response(messages, category=task_category)
+            response = await llm_client.generate_response(messages, category=task_category, cache_tag=cache_tag)
             
             if response:
                 content = extract_content_from_json_response(response, expected_json_key)
@@ -422,20 +520,24 @@ class TaskExecutorAgent:
         )
         messages = [{"role": "system", "content": FILE_MANIPULATION_SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}]
 
-        # 1. Tentar obter do cache
-        cached_solution = self.cache.get(task)
+        # 1. Tentar obter do cache (não em novas tentativas: a solução anterior foi rejeitada)
+        cached_solution = self.cache.get(task) if not task.retries else None
+        already_written = False
         if cached_solution:
             file_content = cached_solution.get("file_content")
         else:
-            # 2. Se não estiver no cache, invocar LLM
-            file_content = await self._invoke_llm_for_clean_content(
-                messages, 
-                action_desc, 
-                TaskCategory.CODE_GENERATION
+            # 2. Se não estiver no cache, invocar LLM em streaming, gravando o arquivo à medida que é gerado
+            file_content = await self._stream_llm_to_file(
+                messages,
+                relative_file_path,
+                action_desc,
+                TaskCategory.CODE_GENERATION,
+                cache_tag=task.task_id
             )
             if file_content is not None:
                 # 3. Armazenar a nova solução no cache
                 self.cache.put(task, {"file_content": file_content})
+                already_written = True
             else:
                 file_content = None
 
@@ -444,7 +546,8 @@ class TaskExecutorAgent:
             return ExecutionResult(exit_code=1, stderr=f"Falha ao gerar conteúdo da LLM para {details.file_path}. Verifique logs para detalhes.")
 
         try:
-            self.file_service.save_file(relative_file_path, str(file_content)) # Garantir que é string
+            if not already_written:
+                self.file_service.save_file(relative_file_path, str(file_content)) # Garantir que é string
             artifact_change = ArtifactChange(path=relative_file_path, change_type=ArtifactChangeType.CREATED)
             file_hash = self.file_service.get_file_hash(relative_file_path)
             self.project_context.update_artifact_state(
@@ -486,8 +589,8 @@ class TaskExecutorAgent:
         )
         messages = [{"role": "system", "content": FILE_MANIPULATION_SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}]
         
-        # 1. Tentar obter do cache
-        cached_solution = self.cache.get(task)
+        # 1. Tentar obter do cache (não em novas tentativas: a solução anterior foi rejeitada)
+        cached_solution = self.cache.get(task) if not task.retries else None
         if cached_solution:
             modified_content = cached_solution.get("modified_content")
         else:
@@ -496,7 +599,8 @@ class TaskExecutorAgent:
                 messages, 
                 "modified_content", 
                 action_desc, 
-                TaskCategory.CODE_GENERATION
+                TaskCategory.CODE_GENERATION,
+                cache_tag=task.task_id
             )
             if llm_output is not None:
                 # 3. Armazenar a nova solução no cache
@@ -566,8 +670,8 @@ class TaskExecutorAgent:
         )
         messages = [{"role": "system", "content": COMMAND_GENERATION_SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}]
 
-        # 1. Tentar obter do cache
-        cached_solution = self.cache.get(task)
+        # 1. Tentar obter do cache (não em novas tentativas: a solução anterior foi rejeitada)
+        cached_solution = self.cache.get(task) if not task.retries else None
         if cached_solution:
             command_to_execute = cached_solution.get("command_to_execute")
         else:
@@ -576,7 +680,8 @@ class TaskExecutorAgent:
                 messages, 
                 "command_to_execute", 
                 action_desc, 
-                TaskCategory.GENERIC # Usando GENERIC para comandos por enquanto
+                TaskCategory.GENERIC, # Usando GENERIC para comandos por enquanto
+                cache_tag=task.task_id
             )
             if llm_output and isinstance(llm_output, str):
                 # 3. Armazenar a nova solução no cache
@@ -627,65 +732,65 @@ class TaskExecutorAgent:
             if not os.path.exists(working_dir):
                 os.makedirs(working_dir, exist_ok=True)
             
-            # Capturar estado dos artefatos ANTES do comando (para diff simples)
-            # hashes_before = {p: s.hash for p, s in self.project_context.artifacts_state.items() if s.hash}
-
-            # Usar SecureExecutor se disponível, senão fallback para shell_service
-            if self.secure_executor:
-                try:
-                    shell_result = await self.secure_executor.execute_secure_command(
-                        command_to_execute,
-                        working_directory=working_dir,
-                        timeout_seconds=details.timeout_seconds
-                    )
-                except Exception as e:
-                    logger.warning(f"Erro no SecureExecutor, usando shell_service: {e}")
+            # Uma janela de observação por comando: com comandos concorrentes, as mudanças de um
+            # seriam entregues ao que coletasse primeiro
+            async with self.artifact_window_lock:
+                await asyncio.to_thread(self.artifact_tracker.start)
+
+                # Usar SecureExecutor se disponível, senão fallback para shell_service
+                resource_usage: Optional[ResourceUsage] = None
+                if self.secure_executor:
+                    try:
+                        secure_result = await self.secure_executor.execute_command(
+                            command_to_execute,
+                            working_directory=working_dir,
+                            timeout_seconds=details.timeout_seconds,
+                            track_file_changes=False  # O artifact_tracker já observa o diretório de artefatos
+                        )
+                        shell_result = {
+                            "exit_code": secure_result.exit_code,
+                            "stdout": secure_result.stdout,
+                            "stderr": secure_result.stderr,
+                        }
+                        # Uso real de recursos (CPU, pico de memória, I/O), usado pelo escalonamento das tarefas
+                        resource_usage = ResourceUsage(**{
+                            key: value for key, value in secure_result.resource_usage.items()
+                            if key in ResourceUsage.model_fields
+                        })
+                    except Exception as e:
+                        logger.warning(f"Erro no SecureExecutor, usando shell_service: {e}")
+                        shell_result = await self.shell_service.execute_command(
+                            command_to_execute,
+                            working_directory=working_dir,
+                            timeout=details.timeout_seconds
+                        )
+                else:
                     shell_result = await self.shell_service.execute_command(
                         command_to_execute,
                         working_directory=working_dir,
                         timeout=details.timeout_seconds
                     )
-            else:
-                shell_result = await self.shell_service.execute_command(
-                    command_to_execute,
-                    working_directory=working_dir,
-                    timeout=details.timeout_seconds
-                )
             
-            # Capturar estado dos artefatos DEPOIS e calcular diff
-            # Esta é uma forma simplificada. Idealmente, o ShellService ou SecureExecutor poderiam
-            # monitorar acessos a arquivos para fornecer uma lista mais precisa de artefatos alterados.
-            artifacts_changed: List[ArtifactChange] = []
-            # TODO: Implementar uma forma mais robusta de detectar mudanças em artefatos após um comando.
-            # Por exemplo, iterar sobre self.project_context.artifacts_state, recalcular hashes e comparar.
-            # Ou, mais avançado, usar inotify/fswatch dentro de um container.
-
-            # Provisoriamente, vamos re-hashear tudo se o comando for bem sucedido.
-            if shell_result["exit_code"] == 0:
-                 for artifact_path_rel, artifact_state_obj in list(self.project_context.artifacts_state.items()): # list() para poder modificar
-                    full_artifact_path = self.project_context.get_artifact_path(artifact_path_rel)
-                    relative_artifact_path = os.path.join("artifacts", artifact_path_rel)
-                    if os.path.exists(full_artifact_path):
-                        new_hash = self.file_service.get_file_hash(relative_artifact_path)
-                        if new_hash != artifact_state_obj.hash:
-                            artifacts_changed.append(ArtifactChange(
-                                path=artifact_path_rel,
-                                change_type=ArtifactChangeType.MODIFIED,
-                                old_hash=artifact_state_obj.hash,
-                                new_hash=new_hash
-                            ))
-                            self.project_context.update_artifact_state(
-                                artifact_path_rel,
-                                ArtifactState(path=artifact_path_rel, hash=new_hash, summary=f"Modificado pelo comando: {command_to_execute}")
-                            )
-                    else: # Arquivo foi deletado pelo comando
-                        artifacts_changed.append(ArtifactChange(
-                            path=artifact_path_rel,
-                            change_type=ArtifactChangeType.DELETED,
-                            old_hash=artifact_state_obj.hash
-                        ))
-                        self.project_context.remove_artifact_state(artifact_path_rel)
-                 await self.project_context.save_context()
+                # O comando pode ter criado ou removido arquivos sem passar pelo FileService
+                self.file_service.note_external_changes()
+
+                # Só os arquivos que o comando tocou são examinados (e relidos, se a assinatura mudou),
+                # inclusive os que ele criou; mudanças de comandos que falharam também são registradas
+                artifacts_changed: List[ArtifactChange] = await asyncio.to_thread(
+                    self.artifact_tracker.collect, self.project_context.artifacts_state
+                )
+                for change in artifacts_changed:
+                    if change.change_type == ArtifactChangeType.DELETED:
+                        self.project_context.remove_artifact_state(change.path)
+                    else:
+                        verb = "Criado" if change.change_type == ArtifactChangeType.CREATED else "Modificado"
+                        self.project_context.update_artifact_state(
+                            change.path,
+                            ArtifactState(path=change.path, hash=change.new_hash, summary=f"{verb} pelo comando: {command_to_execute}")
+                        )
+                if artifacts_changed:
+                    logger.info(f"TaskExecutor (ID: {self.agent_id}): comando alterou {len(artifacts_changed)} artefato(s)")
+                    await self.project_context.save_context()
 
 
             return ExecutionResult(
@@ -693,6 +798,7 @@ class TaskExecutorAgent:
                 exit_code=shell_result["exit_code"],
                 stdout=shell_result["stdout"],
                 stderr=shell_result["stderr"],
+                resource_usage=resource_usage,
                 artifacts_changed=artifacts_changed,
             )
         except Exception as e:
@@ -4,6 +4,7 @@ from loguru import logger
 
 # --- Imports Corrigidos para a Nova Estrutura ---
 from evolux_engine.core.dependency_graph import DependencyGraph
+from evolux_engine.core.task_scheduler import ReadyQueueScheduler, SchedulerReport
 from evolux_engine.models.project_context import ProjectContext
 from evolux_engine.schemas.contracts import Task, TaskType, TaskStatus, ProjectStatus, ExecutionResult, ValidationResult
 from evolux_engine.services.config_manager import ConfigManager
@@ -36,6 +37,7 @@ class Orchestrator:
         self.config_manager = config_manager
         self.agent_id = f"orchestrator-{self.project_context.project_id}"
         self.dependency_graph = DependencyGraph()
+        self.last_schedule_report: Optional[SchedulerReport] = None
 
         # --- Bloco de Inicialização Corrigido ---
         # A LLMFactory agora gerencia a criação de clientes e o roteamento
@@ -50,7 +52,7 @@ class Orchestrator:
         
         # Inicializar componentes conforme especificação
         self.prompt_engine = PromptEngine()
-        self.backup_system = BackupSystem()
+        self.backup_system = BackupSystem(storage_format=self.project_context.engine_config.storage_format)
         self.criteria_engine = CriteriaEngine()
         
         # Inicializar componentes de segurança e observabilidade
@@ -152,6 +154,10 @@ class Orchestrator:
             self.project_context.status = ProjectStatus.FAILED
             await self.project_context.save_context()
             return self.project_context.status
+        finally:
+            # Saves disparados sem espera durante o ciclo precisam chegar ao disco
+            if not await self.project_context.flush_context(timeout=30):
+                logger.warning("Timed out waiting for pending context saves to be written")
 
     async def _run_project_cycle_internal(self) -> ProjectStatus:
         """
@@ -248,44 +254,46 @@ class Orchestrator:
             self.project_context.status = ProjectStatus.PLANNED
             await self.project_context.save_context()
 
-        # Construir o grafo de dependências a partir da task_queue do projeto
-        for task in self.project_context.task_queue:
-            self.dependency_graph.add_task(task)
+        # Construir o grafo de dependências a partir da task_queue do projeto.
+        # Tarefas já concluídas ou falhas entram no grafo para satisfazer as
+        # dependências de tarefas retomadas de um contexto salvo.
+        try:
+            self.dependency_graph.add_tasks(
+                self.project_context.completed_tasks
+                + self.project_context.failed_tasks
+                + self.project_context.task_queue
+            )
+        except ValueError as e:
+            logger.error(f"Invalid task plan: {e}")
+            self.project_context.status = ProjectStatus.PLANNING_FAILED
+            await self.project_context.save_context()
+            return self.project_context.status
         
         # Loop principal P.O.D.A. (Plan, Orient, Decide, Act)
-        max_iterations = self.project_context.engine_config.max_project_iterations
-        while not self.dependency_graph.is_completed() and self.project_context.metrics.total_iterations < max_iterations:
-            self.project_context.metrics.total_iterations += 1
-            iteration = self.project_context.metrics.total_iterations
-            logger.info(f"--- Starting P.O.D.A. Cycle #{iteration} ---")
-            
-            # P.O.D.A. PHASE 1 & 2: PLAN & ORIENT (Planejar e Orientar)
-            # Obter todas as tarefas prontas para execução paralela
-            runnable_tasks = await self._get_runnable_tasks()
-            if not runnable_tasks:
-                logger.info("No runnable tasks found. Checking for project completion.")
-                break
-
-            # Marcar todas as tarefas como IN_PROGRESS no grafo e no contexto
-            for task in runnable_tasks:
-                self.dependency_graph.update_task_status(task.task_id, TaskStatus.IN_PROGRESS)
-            await self.project_context.save_context() # Salva o estado geral
-
-            # P.O.D.A. PHASE 3 & 4: DECIDE & ACT (Decidir e Agir)
-            # Criar e executar as corrotinas de execução de tarefas em paralelo
-            execution_coroutines = [self._execute_and_process_task(task) for task in runnable_tasks]
-            results = await asyncio.gather(*execution_coroutines, return_exceptions=True)
-
-            # Processar resultados e atualizar o contexto
-            for result in results:
-                if isinstance(result, Exception):
-                    logger.error(f"Unexpected error during parallel task execution: {result}")
-                    # Aqui, precisaríamos de uma forma de mapear o erro de volta para a tarefa
-                    # Por enquanto, vamos logar e continuar. Uma implementação mais robusta
-                    # retornaria uma tupla (task_id, result) de _execute_and_process_task.
-                # O processamento do resultado da tarefa (sucesso/falha) já é feito dentro de _execute_and_process_task
-            
-            await self.project_context.save_context()
+        report = await self._run_scheduler()
+
+        # Exceções inesperadas ficam associadas à tarefa que as levantou
+        failed_ids = {t.task_id for t in self.project_context.failed_tasks}
+        for task_id, error in report.errors.items():
+            task = self.dependency_graph.get_task(task_id)
+            logger.error(f"Unexpected error during execution of task {task_id}: {error!r}")
+            if task and task.status == TaskStatus.FAILED and task_id not in failed_ids:
+                self.project_context.failed_tasks.append(task)
+        self.project_context.task_queue = [
+            t for t in self.project_context.task_queue
+            if t.status not in [TaskStatus.COMPLETED, TaskStatus.FAILED]
+        ]
+
+        logger.info(
+            f"⏱️ Scheduler report: {report.to_dict()} "
+            f"(saved {report.time_saved_s:.2f}s vs. level-synchronous waves)"
+        )
+        critical_path, critical_ms = self.dependency_graph.get_critical_path(remaining_only=False)
+        logger.info(f"🛤️ Critical path: {len(critical_path)} task(s), ~{critical_ms / 1000:.1f}s: {' -> '.join(t[:8] for t in critical_path)}")
+        logger.opt(lazy=True).debug(
+            "Dependency graph:\n{}", lambda: self.dependency_graph.to_mermaid(highlight_critical_path=True)
+        )
+        await self.project_context.save_context()
 
         # Fase 3: Conclusão e Entrega conforme especificação
         logger.info("🏁 CONCLUSION: Starting final project verification")
@@ -296,11 +304,21 @@ class Orchestrator:
         # 2. Relatório e Backup (BackupSystem)
         artifacts_dir = str(self.project_context.workspace_path / "artifacts")
         backup_description = f"Backup final - Status: {completion_report.status.value}"
+        reported_tenths = 0
+        
+        def report_backup_progress(done: int, total: int):
+            # Chamado na thread do backup; registra a cada 10% concluídos
+            nonlocal reported_tenths
+            if total and done * 10 // total > reported_tenths:
+                reported_tenths = done * 10 // total
+                logger.info(f"📦 Final backup: {done}/{total} files")
+        
         try:
-            backup_path = self.backup_system.create_snapshot(
+            backup_path = await self.backup_system.create_snapshot_async(
                 self.project_context, 
                 artifacts_dir, 
-                backup_description
+                backup_description,
+                progress=report_backup_progress
             )
             logger.info(f"📦 Final backup created: {backup_path}")
         except Exception as e:
@@ -322,6 +340,39 @@ class Orchestrator:
         logger.info(f"🎯 Project cycle finished with status: {self.project_context.status.value}")
         return self.project_context.status
 
+    async def _run_scheduler(self) -> SchedulerReport:
+        """
+        Executa as tarefas do grafo com o ReadyQueueScheduler. Cada tarefa é
+        despachada assim que suas dependências são concluídas, e a execução
+        inteira conta como uma única iteração P.O.D.A.: o despacho de uma
+        tarefa não consome `max_project_iterations`.
+        """
+        max_iterations = self.project_context.engine_config.max_project_iterations
+        max_concurrency = self.config_manager.get_global_setting("max_concurrent_tasks", 5)
+        scheduler = ReadyQueueScheduler(self.dependency_graph, max_concurrency=max_concurrency)
+
+        if self.project_context.metrics.total_iterations < max_iterations:
+            self.project_context.metrics.total_iterations += 1
+            logger.info(f"--- Starting P.O.D.A. Cycle #{self.project_context.metrics.total_iterations} ---")
+            max_rounds = None
+        else:
+            logger.warning(f"Maximum project iterations ({max_iterations}) reached. No tasks will be dispatched.")
+            max_rounds = 0
+
+        report = await scheduler.run(
+            self._execute_and_process_task,
+            max_rounds=max_rounds,
+            on_dispatch=self._on_tasks_dispatched,
+        )
+        self.last_schedule_report = report
+        return report
+
+    async def _on_tasks_dispatched(self, tasks: List[Task]):
+        """Registra uma rodada de despacho do escalonador."""
+        logger.info(f"Orchestrator: dispatching {len(tasks)} task(s).")
+        # Salva o estado geral sem bloquear o despacho; o ciclo faz flush ao final
+        await self.project_context.save_context(wait=False)
+
     async def _execute_and_process_task(self, task: Task):
         """
         Encapsula a lógica completa de execução e processamento de uma única tarefa.
@@ -338,10 +389,14 @@ class Orchestrator:
 
         # Validar o resultado
         validation_result = await self.semantic_validator_agent.validate_task_output(task, execution_result)
+        # Histórico da tentativa: alimenta a seção de erros do prompt das próximas tentativas
+        task.execution_history.append(execution_result)
+        task.validation_history.append(validation_result)
         
         # Métricas de observabilidade
         end_time = asyncio.get_event_loop().time()
         execution_time = end_time - start_time
+        self.dependency_graph.record_execution_time(task.task_id, execution_time * 1000)
         if self.observability:
             await self.observability.record_task_completion(
                 task.task_id, 
@@ -363,6 +418,8 @@ class Orchestrator:
         else:
             issues_str = ', '.join(validation_result.identified_issues) if validation_result.identified_issues else "Unspecified reasons"
             logger.warning(f"Validation for task {task.task_id} failed: {issues_str}")
+            # A saída rejeitada não pode ser reaproveitada pelos caches na próxima tentativa
+            self.task_executor_agent.forget_cached_outputs(task)
             task.retries += 1
             if task.retries >= task.max_retries:
                 logger.error(f"Task {task.task_id} exceeded maximum retries. Triggering replanning.")
@@ -171,8 +171,7 @@ class PlannerAgent(A2ACapableMixin):
         if not hasattr(self, 'llm_client') or not self.llm_client:
             logger.warning("LLM client not available for plan improvement. Returning original plan.")
             graph = DependencyGraph()
-            for task in current_tasks:
-                graph.add_task(task)
+            graph.add_tasks(current_tasks)
             return graph
 
         try:
@@ -294,15 +293,11 @@ class PlannerAgent(A2ACapableMixin):
                     # Segunda passagem: adicionar as dependências usando os UUIDs mapeados
                     for task_data in tasks_data:
                         task_uuid = id_to_uuid_map[task_data['id']]
-                        task_obj = new_graph.get_task(task_uuid)
                         
                         dep_uuids = [id_to_uuid_map[dep_id] for dep_id in task_data.get('dependencies', [])]
-                        task_obj.dependencies = dep_uuids
                         
-                        # Atualizar o grafo com as dependências corretas
-                        new_graph.dependencies[task_uuid] = set(dep_uuids)
-                        for dep_uuid in dep_uuids:
-                            new_graph.dependents.setdefault(dep_uuid, set()).add(task_uuid)
+                        # Atualizar o grafo com as dependências corretas (valida ciclos)
+                        new_graph.set_dependencies(task_uuid, dep_uuids)
 
                     logger.info(f"✅ Successfully built new dependency graph with {len(new_graph.get_all_tasks())} improved tasks.")
                     return new_graph
@@ -311,8 +306,7 @@ class PlannerAgent(A2ACapableMixin):
                     logger.error(f"Error parsing improved plan from LLM: {e}. Response: {response.strip()}")
                     # Fallback: se a análise falhar, retorna o plano original para evitar quebrar o ciclo.
                     graph = DependencyGraph()
-                    for task in current_tasks:
-                        graph.add_task(task)
+                    graph.add_tasks(current_tasks)
                     return graph
             else:
                 logger.warning("LLM returned an empty response for plan improvement.")
@@ -322,8 +316,7 @@ class PlannerAgent(A2ACapableMixin):
             logger.error(f"Error improving plan with feedback: {e}", exc_info=True)
             # Fallback em caso de erro inesperado
             graph = DependencyGraph()
-            for task in current_tasks:
-                graph.add_task(task)
+            graph.add_tasks(current_tasks)
             return graph
 
     def _analyze_prompt_specificity(self, prompt: str) -> float:
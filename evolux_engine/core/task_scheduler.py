@@ -0,0 +1,182 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from evolux_engine.core.dependency_graph import DependencyGraph
+from evolux_engine.schemas.contracts import Task, TaskStatus
+
+
+@dataclass
+class TaskRunRecord:
+    """Registro de uma execução (tentativa) de tarefa feita pelo escalonador."""
+    task_id: str
+    started_at: float
+    finished_at: float
+    error: Optional[BaseException] = None
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+
+@dataclass
+class SchedulerReport:
+    """Resumo de uma execução do ReadyQueueScheduler."""
+    max_concurrency: int
+    wall_clock_s: float = 0.0
+    wave_model_estimate_s: float = 0.0
+    dispatch_rounds: int = 0
+    runs: List[TaskRunRecord] = field(default_factory=list)
+    results: Dict[str, Any] = field(default_factory=dict)  # task_id -> resultado ou exceção da última tentativa
+
+    @property
+    def time_saved_s(self) -> float:
+        """Tempo de parede economizado em relação ao modelo de ondas sincronizadas."""
+        return self.wave_model_estimate_s - self.wall_clock_s
+
+    @property
+    def errors(self) -> Dict[str, BaseException]:
+        return {task_id: result for task_id, result in self.results.items() if isinstance(result, BaseException)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "tasks_executed": len(self.results),
+            "attempts": len(self.runs),
+            "dispatch_rounds": self.dispatch_rounds,
+            "errors": len(self.errors),
+            "wall_clock_s": round(self.wall_clock_s, 3),
+            "wave_model_estimate_s": round(self.wave_model_estimate_s, 3),
+            "time_saved_s": round(self.time_saved_s, 3),
+        }
+
+
+class ReadyQueueScheduler:
+    """
+    Escalonador orientado a dependências: cada tarefa é iniciada assim que sua
+    última dependência no DependencyGraph é concluída, respeitando um limite de
+    concorrência, em vez de esperar a tarefa mais lenta de uma "onda" inteira.
+    """
+
+    def __init__(self, dependency_graph: DependencyGraph, max_concurrency: int = 5):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency deve ser maior ou igual a 1.")
+        self.dependency_graph = dependency_graph
+        self.max_concurrency = max_concurrency
+
+    async def run(
+        self,
+        execute_task: Callable[[Task], Awaitable[Any]],
+        max_rounds: Optional[int] = None,
+        on_dispatch: Optional[Callable[[List[Task]], Awaitable[None]]] = None,
+    ) -> SchedulerReport:
+        """
+        Executa as tarefas do grafo até que não haja mais trabalho disponível.
+
+        `execute_task` é responsável por atualizar o status da tarefa no grafo
+        (COMPLETED, FAILED ou PENDING para nova tentativa). Se ela levantar uma
+        exceção, a tarefa é marcada como FAILED e a exceção fica associada ao
+        task_id correspondente em `SchedulerReport.results`.
+
+        `max_rounds` limita o número de rodadas de despacho. Uma nova rodada
+        começa sempre que um slot é liberado, então o limite se aproxima do
+        número de tentativas despachadas, não das ondas do modelo anterior.
+        `on_dispatch` é aguardado a cada rodada com as tarefas que estão sendo
+        iniciadas.
+        """
+        report = SchedulerReport(max_concurrency=self.max_concurrency)
+        in_flight: Dict[asyncio.Task, Task] = {}
+        started_at: Dict[str, float] = {}
+        run_start = time.monotonic()
+
+        try:
+            while True:
+                can_dispatch = max_rounds is None or report.dispatch_rounds < max_rounds
+                free_slots = self.max_concurrency - len(in_flight)
+                if can_dispatch and free_slots > 0:
+                    ready = self.dependency_graph.get_runnable_tasks()[:free_slots]
+                    if ready:
+                        report.dispatch_rounds += 1
+                        for task in ready:
+                            self.dependency_graph.update_task_status(task.task_id, TaskStatus.IN_PROGRESS)
+                        if on_dispatch:
+                            await on_dispatch(ready)
+                        for task in ready:
+                            started_at[task.task_id] = time.monotonic()
+                            in_flight[asyncio.ensure_future(execute_task(task))] = task
+                        logger.debug(f"Scheduler: dispatched {len(ready)} task(s), {len(in_flight)} in flight.")
+
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(in_flight.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    record = TaskRunRecord(
+                        task_id=task.task_id,
+                        started_at=started_at.pop(task.task_id),
+                        finished_at=time.monotonic(),
+                    )
+                    if future.cancelled():
+                        record.error = asyncio.CancelledError()
+                    else:
+                        record.error = future.exception()
+
+                    if record.error is not None:
+                        logger.error(f"Scheduler: task {task.task_id} raised an unexpected error: {record.error!r}")
+                        report.results[task.task_id] = record.error
+                        if self.dependency_graph.get_task(task.task_id).status == TaskStatus.IN_PROGRESS:
+                            self.dependency_graph.update_task_status(task.task_id, TaskStatus.FAILED)
+                    else:
+                        report.results[task.task_id] = future.result()
+                    report.runs.append(record)
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight.keys(), return_exceptions=True)
+
+        report.wall_clock_s = time.monotonic() - run_start
+        report.wave_model_estimate_s = self.estimate_wave_model_time(report.runs)
+        return report
+
+    def estimate_wave_model_time(self, runs: List[TaskRunRecord]) -> float:
+        """
+        Estima o tempo de parede que o modelo de ondas sincronizadas (um
+        `asyncio.gather` por iteração) levaria para as mesmas tentativas, com as
+        mesmas durações medidas e o mesmo limite de concorrência.
+        """
+        attempts: Dict[str, List[float]] = {}
+        for record in runs:
+            attempts.setdefault(record.task_id, []).append(record.duration)
+
+        next_attempt = {task_id: 0 for task_id in attempts}
+        finished = set()
+        total = 0.0
+        while len(finished) < len(attempts):
+            wave = [
+                task_id for task_id in attempts
+                if task_id not in finished
+                and all(
+                    dep_id in finished or dep_id not in attempts
+                    for dep_id in self.dependency_graph.dependencies.get(task_id, ())
+                )
+            ]
+            if not wave:
+                break
+
+            durations = []
+            for task_id in wave:
+                durations.append(attempts[task_id][next_attempt[task_id]])
+                next_attempt[task_id] += 1
+                if next_attempt[task_id] == len(attempts[task_id]):
+                    finished.add(task_id)
+
+            # Cada onda é processada em lotes do tamanho do limite de concorrência,
+            # e cada lote espera pela sua tarefa mais lenta.
+            for i in range(0, len(durations), self.max_concurrency):
+                total += max(durations[i:i + self.max_concurrency])
+        return total
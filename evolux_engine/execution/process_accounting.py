@@ -0,0 +1,219 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+try:
+    import resource
+    IS_RUSAGE_AVAILABLE = True
+except ImportError:  # Windows
+    resource = None
+    IS_RUSAGE_AVAILABLE = False
+
+from evolux_engine.utils.logging_utils import get_structured_logger
+
+logger = get_structured_logger("process_accounting")
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+RUSAGE_BLOCK_SIZE = 512  # ru_inblock/ru_oublock contam blocos de 512 bytes
+
+
+@dataclass
+class ProcessUsage:
+    """Recursos realmente consumidos pela árvore de processos de um comando"""
+    execution_time_ms: int = 0
+    cpu_user_ms: int = 0
+    cpu_system_ms: int = 0
+    memory_mb_peak: float = 0.0
+    io_read_bytes: int = 0
+    io_write_bytes: int = 0
+    source: str = "rusage"  # "cgroup" (cgroup v2 do comando) ou "rusage" (wait4 do processo filho)
+
+    @property
+    def cpu_time_ms(self) -> int:
+        return self.cpu_user_ms + self.cpu_system_ms
+
+    def to_dict(self) -> Dict[str, float]:
+        usage = asdict(self)
+        usage.pop("source")
+        usage["cpu_time_ms"] = self.cpu_time_ms
+        return usage
+
+
+@dataclass
+class ProcessOutcome:
+    exit_code: int
+    stdout: bytes
+    stderr: bytes
+    usage: ProcessUsage
+    timed_out: bool = False
+
+
+class _CgroupV2:
+    """
+    Cgroup v2 temporário, filho do cgroup do processo atual, que contabiliza
+    toda a árvore do comando (inclusive processos que não são esperados pelo
+    shell). Só é usado quando a hierarquia unificada está montada e o
+    cgroup atual foi delegado (gravável).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._procs_file = os.path.join(path, "cgroup.procs").encode()
+
+    @classmethod
+    def create(cls) -> Optional["_CgroupV2"]:
+        if sys.platform != "linux" or not os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+            return None
+        try:
+            with open("/proc/self/cgroup") as f:
+                own = next(line.split("::", 1)[1].strip() for line in f if line.startswith("0::"))
+            path = os.path.join(CGROUP_ROOT, own.lstrip("/"), f"evolux-{uuid.uuid4().hex[:12]}")
+            os.mkdir(path)
+        except (OSError, StopIteration):
+            return None
+        return cls(path)
+
+    def attach_current_process(self):
+        """Roda no filho, entre o fork e o exec: só chamadas de baixo nível"""
+        fd = os.open(self._procs_file, os.O_WRONLY)
+        try:
+            os.write(fd, b"0")
+        finally:
+            os.close(fd)
+
+    def _read_lines(self, name: str):
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return f.read().splitlines()
+        except OSError:
+            return []
+
+    def read_usage(self, usage: ProcessUsage):
+        """Substitui em `usage` os valores que o cgroup mede melhor que o rusage"""
+        # cpu.stat: "chave valor" por linha
+        cpu = {key: int(value) for key, _, value in (line.partition(" ") for line in self._read_lines("cpu.stat"))
+               if value.isdigit()}
+        if "user_usec" in cpu:
+            usage.cpu_user_ms = cpu["user_usec"] // 1000
+            usage.cpu_system_ms = cpu.get("system_usec", 0) // 1000
+            usage.source = "cgroup"
+        try:
+            with open(os.path.join(self.path, "memory.peak")) as f:
+                usage.memory_mb_peak = int(f.read()) / (1024 * 1024)
+        except (OSError, ValueError):
+            pass
+        # io.stat: "<maj:min> rbytes=... wbytes=... ..." por dispositivo
+        io: Dict[str, int] = {}
+        for line in self._read_lines("io.stat"):
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                if value.isdigit():
+                    io[key] = io.get(key, 0) + int(value)
+        if "rbytes" in io:
+            usage.io_read_bytes, usage.io_write_bytes = io["rbytes"], io.get("wbytes", 0)
+
+    def destroy(self):
+        """Encerra processos remanescentes (ex.: daemons do comando) e remove o cgroup"""
+        try:
+            with open(os.path.join(self.path, "cgroup.kill"), "w") as f:
+                f.write("1")
+        except OSError:
+            pass
+        for _ in range(50):
+            try:
+                os.rmdir(self.path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.01)
+        logger.warning(f"Could not remove command cgroup: {self.path}")
+
+
+def run_accounted(command: str, cwd: str, env: Optional[Dict[str, str]], timeout_seconds: float) -> ProcessOutcome:
+    """
+    Executa `command` no shell (bloqueante; use numa thread) e mede os
+    recursos da árvore de processos: CPU de usuário e de sistema, pico de
+    RSS e I/O de blocos, via `wait4` (rusage do filho e dos descendentes
+    que ele esperou) ou, quando disponível, via cgroup v2, que cobre a
+    árvore inteira. No timeout, todo o grupo de processos é encerrado.
+    """
+    cgroup = _CgroupV2.create()
+    start = time.monotonic()
+    process = subprocess.Popen(
+        command, shell=True, cwd=cwd, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        start_new_session=True,  # Grupo próprio: o timeout encerra também os netos
+        preexec_fn=cgroup.attach_current_process if cgroup else None,
+    )
+    output = {}
+
+    def drain(name: str, pipe):
+        output[name] = pipe.read()
+        pipe.close()
+
+    readers = [threading.Thread(target=drain, args=(name, pipe), daemon=True)
+               for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr))]
+    for reader in readers:
+        reader.start()
+
+    timed_out = threading.Event()
+
+    def kill_group():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def on_timeout():
+        if process.returncode is None:
+            timed_out.set()
+            kill_group()
+
+    timer = threading.Timer(timeout_seconds, on_timeout)
+    timer.start()
+    try:
+        if IS_RUSAGE_AVAILABLE:
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            process.wait()
+            rusage = None
+    finally:
+        timer.cancel()
+    elapsed_ms = int((time.monotonic() - start) * 1000)
+
+    # Descendentes que herdaram stdout/stderr podem mantê-los abertos
+    for reader in readers:
+        reader.join(max(0.0, timeout_seconds - elapsed_ms / 1000) + 1)
+    if any(reader.is_alive() for reader in readers):
+        kill_group()
+        for reader in readers:
+            reader.join()
+
+    usage = ProcessUsage(execution_time_ms=elapsed_ms)
+    if rusage is not None:
+        # ru_maxrss é em KiB no Linux e em bytes no macOS
+        rss_bytes = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        usage.cpu_user_ms = int(rusage.ru_utime * 1000)
+        usage.cpu_system_ms = int(rusage.ru_stime * 1000)
+        usage.memory_mb_peak = rss_bytes / (1024 * 1024)
+        usage.io_read_bytes = rusage.ru_inblock * RUSAGE_BLOCK_SIZE
+        usage.io_write_bytes = rusage.ru_oublock * RUSAGE_BLOCK_SIZE
+    if cgroup is not None:
+        cgroup.read_usage(usage)
+        cgroup.destroy()
+
+    return ProcessOutcome(
+        exit_code=124 if timed_out.is_set() else process.returncode,
+        stdout=output.get("stdout", b""),
+        stderr=output.get("stderr", b""),
+        usage=usage,
+        timed_out=timed_out.is_set(),
+    )
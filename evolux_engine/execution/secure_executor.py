@@ -4,13 +4,17 @@ import shutil
 import os
 import json
 import time
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 import uuid
+from collections import OrderedDict
 
 from evolux_engine.utils.logging_utils import get_structured_logger
 from evolux_engine.security import SecurityGateway, SecurityValidationResult, SecurityLevel
+from evolux_engine.execution.process_accounting import run_accounted
+from evolux_engine.schemas.contracts import ArtifactChange, ArtifactChangeType
+from evolux_engine.services.artifact_tracker import ArtifactChangeTracker
 
 logger = get_structured_logger("secure_executor")
 
@@ -35,6 +39,7 @@ class ExecutionResult:
     container_id: Optional[str] = None
     files_created: List[str] = None
     files_modified: List[str] = None
+    files_deleted: List[str] = None
     security_warnings: List[str] = None
     
     def __post_init__(self):
@@ -42,6 +47,8 @@ class ExecutionResult:
             self.files_created = []
         if self.files_modified is None:
             self.files_modified = []
+        if self.files_deleted is None:
+            self.files_deleted = []
         if self.security_warnings is None:
             self.security_warnings = []
 
@@ -50,6 +57,7 @@ class SecureExecutor:
     Executor seguro que executa comandos em containers Docker isolados.
     Implementa a especificação de segurança da Seção 6 do README.
     """
+    MAX_TRACKERS = 8  # Diretórios de trabalho observados ao mesmo tempo pela sandbox local
     
     def __init__(self, 
                  security_gateway: Optional[SecurityGateway] = None,
@@ -60,6 +68,7 @@ class SecureExecutor:
         self.config_manager = config_manager
         self.execution_count = 0
         self.active_containers: Dict[str, str] = {}  # execution_id -> container_id
+        self._trackers: "OrderedDict[str, ArtifactChangeTracker]" = OrderedDict()  # working_directory -> tracker (LRU)
         
         # Verificar se Docker está disponível
         self.docker_available = self._check_docker_availability()
@@ -83,7 +92,8 @@ class SecureExecutor:
                             working_directory: str,
                             limits: Optional[ResourceLimits] = None,
                             environment: Optional[Dict[str, str]] = None,
-                            timeout_seconds: Optional[int] = None) -> ExecutionResult:
+                            timeout_seconds: Optional[int] = None,
+                            track_file_changes: bool = True) -> ExecutionResult:
         """
         Executa comando de forma segura com isolamento.
         
@@ -93,6 +103,8 @@ class SecureExecutor:
             limits: Limites de recursos (usa padrão se None)
             environment: Variáveis de ambiente
             timeout_seconds: Timeout específico
+            track_file_changes: Se False, a sandbox local não detecta os arquivos
+                alterados (para chamadores que já observam o diretório)
             
         Returns:
             Resultado da execução
@@ -138,7 +150,8 @@ class SecureExecutor:
                 working_directory=working_directory,
                 limits=exec_limits,
                 environment=environment,
-                timeout_seconds=exec_timeout
+                timeout_seconds=exec_timeout,
+                track_file_changes=track_file_changes
             )
         
         # 4. Adicionar warnings de segurança
@@ -172,6 +185,10 @@ class SecureExecutor:
                 else:
                     os.makedirs(f"{temp_dir}/workspace", exist_ok=True)
                 
+                # Manifesto da cópia antes do comando, para devolver só o que mudou
+                tracker = ArtifactChangeTracker(f"{temp_dir}/workspace", subdir="")
+                await asyncio.to_thread(tracker.start)
+                
                 # Construir comando Docker
                 docker_cmd = [
                     'docker', 'run',
@@ -215,6 +232,7 @@ class SecureExecutor:
                     logger.warning(f"Docker execution timeout for execution_id: {execution_id}")
                     process.kill()
                     await process.wait()
+                    tracker.close()
                     
                     return ExecutionResult(
                         command_executed=command,
@@ -228,13 +246,12 @@ class SecureExecutor:
                 
                 execution_time_ms = int((time.time() - start_time) * 1000)
                 
-                # Copiar arquivos modificados de volta
-                files_created, files_modified = await self._detect_file_changes(
-                    working_directory, f"{temp_dir}/workspace"
-                )
-                
-                if os.path.exists(f"{temp_dir}/workspace"):
-                    shutil.copytree(f"{temp_dir}/workspace", working_directory, dirs_exist_ok=True)
+                # Copiar de volta apenas os arquivos criados/modificados e aplicar as remoções
+                changes = await asyncio.to_thread(tracker.collect, {})
+                tracker.close()
+                files_created, files_modified, files_deleted = self._split_changes(changes)
+                await asyncio.to_thread(self._sync_back, f"{temp_dir}/workspace", working_directory,
+                                        files_created + files_modified, files_deleted)
                 
                 return ExecutionResult(
                     command_executed=command,
@@ -242,10 +259,11 @@ class SecureExecutor:
                     stdout=stdout.decode('utf-8', errors='replace'),
                     stderr=stderr.decode('utf-8', errors='replace'),
                     execution_time_ms=execution_time_ms,
-                    resource_usage=self._estimate_resource_usage(execution_time_ms),
+                    resource_usage={'execution_time_ms': execution_time_ms},
                     container_id=container_id,
                     files_created=files_created,
-                    files_modified=files_modified
+                    files_modified=files_modified,
+                    files_deleted=files_deleted
                 )
                 
         except Exception as e:
@@ -269,10 +287,14 @@ class SecureExecutor:
                                    working_directory: str,
                                    limits: ResourceLimits,
                                    environment: Optional[Dict[str, str]],
-                                   timeout_seconds: int) -> ExecutionResult:
-        """Executa comando em sandbox local (fallback quando Docker não disponível)"""
-        
-        import subprocess
+                                   timeout_seconds: int,
+                                   track_file_changes: bool = True) -> ExecutionResult:
+        """
+        Executa comando em sandbox local (fallback quando Docker não disponível),
+        medindo CPU, pico de memória e I/O da árvore de processos e, com
+        `track_file_changes`, os arquivos criados, modificados e removidos no
+        working_directory.
+        """
         
         start_time = time.time()
 
@@ -286,7 +308,7 @@ class SecureExecutor:
                 stdout="Dependencies installation skipped in test mode.",
                 stderr="",
                 execution_time_ms=int((time.time() - start_time) * 1000),
-                resource_usage=self._estimate_resource_usage(0),
+                resource_usage={'execution_time_ms': 0},
                 security_warnings=["Dependency installation skipped due to test mode."]
             )
         
@@ -296,52 +318,32 @@ class SecureExecutor:
             if environment:
                 env.update(environment)
             
-            # Executar comando com timeout
-            process = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=working_directory,
-                env=env
-            )
+            # Manifesto pré-execução: só o que o comando tocar é examinado depois
+            tracker = self._change_tracker(working_directory) if track_file_changes else None
+            if tracker is not None:
+                await asyncio.to_thread(tracker.start)
+            outcome = await asyncio.to_thread(run_accounted, command, working_directory, env, timeout_seconds)
+            changes = await asyncio.to_thread(tracker.collect, {}) if tracker is not None else []
             
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=timeout_seconds
-                )
-                
-                exit_code = process.returncode
-                
-            except asyncio.TimeoutError:
-                logger.warning(f"Local execution timeout for execution_id: {execution_id}")
-                process.kill()
-                await process.wait()
-                
-                return ExecutionResult(
-                    command_executed=command,
-                    exit_code=124,
-                    stdout="",
-                    stderr="Execution timed out",
-                    execution_time_ms=int(timeout_seconds * 1000),
-                    resource_usage={'timeout': True}
-                )
+            resource_usage = outcome.usage.to_dict()
+            logger.debug(f"Resource usage for execution_id: {execution_id} (source: {outcome.usage.source}): {resource_usage}")
             
-            execution_time_ms = int((time.time() - start_time) * 1000)
+            if outcome.timed_out:
+                logger.warning(f"Local execution timeout for execution_id: {execution_id}")
+                resource_usage['timeout'] = True
             
-            # Detectar mudanças em arquivos (simplificado para modo local)
-            files_created = []
-            files_modified = []
+            files_created, files_modified, files_deleted = self._split_changes(changes)
             
             return ExecutionResult(
                 command_executed=command,
-                exit_code=exit_code,
-                stdout=stdout.decode('utf-8', errors='replace'),
-                stderr=stderr.decode('utf-8', errors='replace'),
-                execution_time_ms=execution_time_ms,
-                resource_usage=self._estimate_resource_usage(execution_time_ms),
+                exit_code=outcome.exit_code,
+                stdout=outcome.stdout.decode('utf-8', errors='replace'),
+                stderr="Execution timed out" if outcome.timed_out else outcome.stderr.decode('utf-8', errors='replace'),
+                execution_time_ms=outcome.usage.execution_time_ms,
+                resource_usage=resource_usage,
                 files_created=files_created,
                 files_modified=files_modified,
+                files_deleted=files_deleted,
                 security_warnings=["Executed in local sandbox (Docker not available)"]
             )
             
@@ -359,54 +361,42 @@ class SecureExecutor:
                 resource_usage={}
             )
     
-    async def _detect_file_changes(self, 
-                                 original_dir: str, 
-                                 modified_dir: str) -> tuple[List[str], List[str]]:
-        """Detecta arquivos criados e modificados"""
-        
-        files_created = []
-        files_modified = []
-        
-        try:
-            if not os.path.exists(modified_dir):
-                return files_created, files_modified
-            
-            # Listar arquivos no diretório modificado
-            for root, dirs, files in os.walk(modified_dir):
-                for file in files:
-                    rel_path = os.path.relpath(os.path.join(root, file), modified_dir)
-                    original_file = os.path.join(original_dir, rel_path)
-                    
-                    if not os.path.exists(original_file):
-                        files_created.append(rel_path)
-                    else:
-                        # Verificar se foi modificado (timestamp ou tamanho)
-                        modified_stat = os.stat(os.path.join(root, file))
-                        original_stat = os.stat(original_file)
-                        
-                        if (modified_stat.st_mtime > original_stat.st_mtime or 
-                            modified_stat.st_size != original_stat.st_size):
-                            files_modified.append(rel_path)
-            
-        except Exception as e:
-            logger.warning(f"Error detecting file changes: {str(e)}")
-        
-        return files_created, files_modified
+    def _change_tracker(self, working_directory: str) -> ArtifactChangeTracker:
+        """
+        Tracker do diretório inteiro, mantido entre execuções (o manifesto não
+        é refeito a cada comando). Só os MAX_TRACKERS diretórios usados mais
+        recentemente ficam observados; os demais são fechados.
+        """
+        path = os.path.abspath(working_directory)
+        tracker = self._trackers.get(path)
+        if tracker is None:
+            tracker = self._trackers[path] = ArtifactChangeTracker(path, subdir="")
+            while len(self._trackers) > self.MAX_TRACKERS:
+                _, evicted = self._trackers.popitem(last=False)
+                evicted.close()
+        self._trackers.move_to_end(path)
+        return tracker
     
-    def _estimate_resource_usage(self, execution_time_ms: int) -> Dict[str, float]:
-        """Estima uso de recursos baseado no tempo de execução"""
-        
-        # Estimativas simplificadas
-        # Em produção, isso seria coletado via Docker stats ou ferramentas de monitoramento
-        
-        base_cpu = min(50.0, execution_time_ms / 100)  # Estimativa de CPU
-        base_memory = min(100.0, execution_time_ms / 50)  # Estimativa de memória em MB
-        
-        return {
-            'cpu_percent_peak': base_cpu,
-            'memory_mb_peak': base_memory,
-            'execution_time_ms': execution_time_ms
-        }
+    @staticmethod
+    def _sync_back(source_dir: str, target_dir: str, changed: List[str], deleted: List[str]):
+        """Aplica em `target_dir` as mudanças feitas na cópia `source_dir`"""
+        for rel_path in changed:
+            target = os.path.join(target_dir, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(source_dir, rel_path), target)
+        for rel_path in deleted:
+            try:
+                os.remove(os.path.join(target_dir, rel_path))
+            except FileNotFoundError:
+                pass
+    
+    @staticmethod
+    def _split_changes(changes: List[ArtifactChange]) -> Tuple[List[str], List[str], List[str]]:
+        """Separa as mudanças em arquivos criados, modificados e removidos"""
+        by_type = {change_type: [] for change_type in ArtifactChangeType}
+        for change in changes:
+            by_type[change.change_type].append(change.path)
+        return by_type[ArtifactChangeType.CREATED], by_type[ArtifactChangeType.MODIFIED], by_type[ArtifactChangeType.DELETED]
     
     async def cleanup_execution(self, execution_id: str):
         """Limpa recursos de uma execução específica com timeout e força"""
@@ -502,6 +492,10 @@ class SecureExecutor:
         if cleanup_tasks:
             await asyncio.gather(*cleanup_tasks, return_exceptions=True)
         
+        for tracker in self._trackers.values():
+            tracker.close()
+        self._trackers.clear()
+        
         logger.info(f"All executions cleaned up: {self.execution_count}")
     
     def get_executor_stats(self) -> Dict[str, Any]:
@@ -1,3 +1,4 @@
+from .hedging import HedgingPolicy, RequestHedger
 from .llm_client import LLMClient
 from .llm_factory import LLMFactory
 from .model_router import ModelRouter, TaskCategory, ModelInfo, ModelPerformance
@@ -5,6 +6,8 @@ from .model_router import ModelRouter, TaskCategory, ModelInfo, ModelPerformance
 __all__ = [
     "LLMClient",
     "LLMFactory",
+    "HedgingPolicy",
+    "RequestHedger",
     "ModelRouter",
     "TaskCategory",
     "ModelInfo",
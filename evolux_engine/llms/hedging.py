@@ -0,0 +1,107 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+from loguru import logger
+
+from evolux_engine.llms.model_router import ModelInfo, ModelRouter, TaskCategory
+
+
+@dataclass
+class HedgingPolicy:
+    """Parâmetros do hedging de requisições (desativado por padrão)"""
+    enabled: bool = False
+    percentile: float = 95.0  # Dispara o hedge quando o primário passa deste percentil de latência
+    min_samples: int = 20  # Amostras de latência necessárias antes de confiar no percentil
+    min_delay_s: float = 1.0  # Nunca dispara o hedge antes disto
+    max_cost_ratio: float = 1.0  # Custo por 1k tokens do modelo de hedge / custo do primário
+    max_extra_token_ratio: float = 0.1  # Tokens gastos com hedges / tokens totais
+
+
+class RequestHedger:
+    """
+    Decide quando disparar uma requisição de hedge e contabiliza o resultado.
+
+    Se o modelo primário ainda não respondeu ao atingir o p95 de latência
+    registrado no ModelRouter, a mesma requisição é enviada ao próximo modelo
+    da cadeia de fallback; a primeira resposta válida vence e a outra é
+    cancelada. Dois limites de custo impedem que o hedging dobre o gasto: o
+    modelo de hedge não pode ser mais caro que `max_cost_ratio` vezes o
+    primário, e os tokens gastos com hedges não podem passar de
+    `max_extra_token_ratio` do total.
+
+    As métricas comparam a latência de cauda (p95/p99 das requisições com
+    hedging habilitado) com o p95 do modelo primário sozinho e com os tokens
+    extras gastos.
+    """
+
+    def __init__(self, policy: Optional[HedgingPolicy] = None):
+        self.policy = policy or HedgingPolicy()
+        self.total_tokens = 0
+        self.extra_tokens = 0
+        self._latencies_ms: deque = deque(maxlen=1000)
+        self._primary_p95_ms: deque = deque(maxlen=1000)
+        self._stats = {
+            "requests": 0, "hedges_launched": 0, "hedge_wins": 0, "primary_wins": 0,
+            "skipped_by_cost": 0, "skipped_by_budget": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy.enabled
+
+    def hedge_delay(self, model_router: ModelRouter, model_name: str, category: TaskCategory) -> Optional[float]:
+        """Atraso (s) antes do hedge: o p95 de latência do modelo, ou None sem amostras suficientes."""
+        perf = model_router._get_performance(model_name, category)
+        latency_ms = perf.latency_percentile(self.policy.percentile, self.policy.min_samples)
+        if latency_ms is None:
+            return None
+        self._primary_p95_ms.append(latency_ms)
+        return max(self.policy.min_delay_s, latency_ms / 1000.0)
+
+    def allow_hedge(self, primary: Optional[ModelInfo], hedge: ModelInfo) -> bool:
+        """
+        Aplica os limites de custo antes de disparar um hedge. O orçamento de
+        tokens extras é verificado contra o gasto já realizado, então a razão
+        só pode ultrapassar o limite pelo custo de um único hedge.
+        """
+        primary_cost = primary.cost_per_1k_tokens if primary else 0.0
+        if hedge.cost_per_1k_tokens > primary_cost * self.policy.max_cost_ratio:
+            self._stats["skipped_by_cost"] += 1
+            logger.debug(f"Hedge para '{hedge.name}' ignorado: custo {hedge.cost_per_1k_tokens} > {self.policy.max_cost_ratio}x {primary_cost}")
+            return False
+        if self.extra_tokens > self.policy.max_extra_token_ratio * self.total_tokens:
+            self._stats["skipped_by_budget"] += 1
+            logger.debug(f"Hedge para '{hedge.name}' ignorado: orçamento de tokens extras esgotado")
+            return False
+        return True
+
+    def record_request(self, latency_ms: float, tokens: int):
+        self._stats["requests"] += 1
+        self.total_tokens += tokens
+        self._latencies_ms.append(latency_ms)
+
+    def record_hedge_result(self, hedge_won: bool, extra_tokens: int):
+        self._stats["hedges_launched"] += 1
+        self._stats["hedge_wins" if hedge_won else "primary_wins"] += 1
+        self.extra_tokens += extra_tokens
+
+    @staticmethod
+    def _percentile(values, percentile: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))], 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "enabled": self.policy.enabled,
+            "p50_latency_ms": self._percentile(self._latencies_ms, 50),
+            "p95_latency_ms": self._percentile(self._latencies_ms, 95),
+            "p99_latency_ms": self._percentile(self._latencies_ms, 99),
+            "primary_p95_latency_ms": self._percentile(self._primary_p95_ms, 50),
+            "total_tokens": self.total_tokens,
+            "extra_tokens": self.extra_tokens,
+            "extra_token_ratio": round(self.extra_tokens / self.total_tokens, 4) if self.total_tokens else 0.0,
+        }
@@ -2,7 +2,8 @@ import json
 import asyncio
 import os
 import time
-from typing import Optional, Dict, Any, List, Union
+from contextlib import aclosing
+from typing import Optional, Dict, Any, List, Tuple, Union, AsyncIterator, Awaitable, Callable
 
 import httpx
 import google.generativeai as genai
@@ -10,10 +11,19 @@ from google.api_core.exceptions import ResourceExhausted
 from loguru import logger
 
 from evolux_engine.schemas.contracts import LLMProvider
+from evolux_engine.cache.llm_response_cache import LLMResponseCache
+from evolux_engine.llms.hedging import RequestHedger
 from evolux_engine.llms.model_router import ModelRouter, TaskCategory, ModelInfo
-from evolux_engine.utils.resilience import CircuitBreaker, RateLimiter
+from evolux_engine.llms.provider_pool import ProviderPool, get_provider_pool
+from evolux_engine.utils.resilience import CircuitBreaker, RateLimiter, SingleFlight
 from evolux_engine.utils.token_optimizer import TokenOptimizer
 
+# Erros transitórios tratados com retry/fallback em `_recover_from_error`
+RETRYABLE_ERRORS = (ResourceExhausted, httpx.HTTPStatusError, httpx.TimeoutException, httpx.ConnectError)
+
+# Requisições idênticas em andamento são compartilhadas por todos os clientes do processo
+_request_single_flight = SingleFlight(name="llm_requests")
+
 class LLMClient:
     def __init__(
         self,
@@ -26,6 +36,9 @@ class LLMClient:
         http_referer: Optional[str] = None,
         x_title: Optional[str] = None,
         model_manager=None,
+        response_cache: Optional[LLMResponseCache] = None,
+        hedger: Optional[RequestHedger] = None,
+        client_resolver: Optional[Callable[[str], Optional["LLMClient"]]] = None,
     ):
         if not api_key: raise ValueError("API key é obrigatória")
         if not model_name: raise ValueError("Nome do modelo é obrigatório")
@@ -38,17 +51,29 @@ class LLMClient:
         self.model_router = model_router
         self._token_optimizer = TokenOptimizer(model_name=self.model_name)
         
-        self._rate_limiter = RateLimiter(requests_per_minute=15, name=f"{self.provider.value}_{self.model_name}_limiter")
-        self._circuit_breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60, name=f"{self.provider.value}_{self.model_name}_breaker")
         self.model_manager = model_manager  # Sistema inteligente de gerenciamento
+        self.response_cache = response_cache  # Cache de respostas completas (compartilhado entre clientes)
+        # Hedging opcional: `client_resolver` obtém o cliente do modelo de hedge pelo nome
+        self.hedger = hedger
+        self.client_resolver = client_resolver
 
-        self._async_client: Optional[httpx.AsyncClient] = None
+        # Rate limiter, circuit breaker e conexões HTTP são compartilhados por provedor + chave de API
+        self._pool: Optional[ProviderPool] = None
         self._gemini_model: Optional[genai.GenerativeModel] = None
         
         self._configure_client()
 
+    @property
+    def _rate_limiter(self) -> RateLimiter:
+        return self._pool.rate_limiter
+
+    @property
+    def _circuit_breaker(self) -> CircuitBreaker:
+        return self._pool.circuit_breaker
+
     def _configure_client(self):
         """Configura o cliente (Gemini ou HTTPX) com base no provedor e modelo atuais."""
+        self._pool = get_provider_pool(self.provider, self.api_key)
         if self.provider == LLMProvider.GOOGLE:
             # A chave de API é configurada globalmente para o Gemini
             genai.configure(api_key=self.api_key)
@@ -63,9 +88,6 @@ class LLMClient:
                 x_title = os.getenv("OPENROUTER_X_TITLE", "Evolux Engine")
                 if http_referer: self.headers["HTTP-Referer"] = str(http_referer)
                 if x_title: self.headers["X-Title"] = str(x_title)
-            
-            # Garante que o cliente HTTPX seja recriado com os novos cabeçalhos/configurações
-            self._async_client = None 
             logger.info(f"LLMClient reconfigurado para HTTPX: Provedor='{self.provider.value}', Modelo='{self.model_name}'.")
 
     def _get_default_base_url(self) -> str:
@@ -73,24 +95,16 @@ class LLMClient:
         return "https://openrouter.ai/api/v1"
 
     async def _get_async_client(self) -> httpx.AsyncClient:
-        if self._async_client is None or self._async_client.is_closed:
-            # Configurar cliente com logs menos verbosos
-            self._async_client = httpx.AsyncClient(
-                headers=self.headers, 
-                timeout=self.timeout,
-                # Reduzir logs HTTP verbosos
-                event_hooks={
-                    'request': [],
-                    'response': []
-                }
-            )
-        return self._async_client
+        return self._pool.get_http_client()
 
     async def close(self):
-        if self._async_client and not self._async_client.is_closed:
-            await self._async_client.aclose()
+        """
+        O cliente HTTP pertence ao ProviderPool compartilhado e não é fechado aqui;
+        use `close_provider_pools()` ao encerrar o processo.
+        """
 
-    async def _generate_gemini_response(self, messages: List[Dict[str, str]]) -> Optional[str]:
+    @staticmethod
+    def _to_gemini_messages(messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         gemini_messages = []
         system_content = ""
         for msg in messages:
@@ -107,13 +121,22 @@ class LLMClient:
         
         if system_content and not any(msg['role'] == 'user' for msg in gemini_messages):
             gemini_messages.append({'role': "user", 'parts': [system_content + "Please provide your response."]})
+        return gemini_messages
 
+    async def _generate_gemini_response(self, messages: List[Dict[str, str]], estimated_tokens: int = 0) -> Optional[str]:
+        gemini_messages = self._to_gemini_messages(messages)
         try:
             async with self._circuit_breaker:
-                await self._rate_limiter.wait_for_token()
-                logger.debug(f"Enviando requisição para Gemini: Modelo='{self.model_name}'")
-                response = await self._gemini_model.generate_content_async(gemini_messages)
-                return response.text
+                reserved_tokens = await self._rate_limiter.wait_for_token(estimated_tokens)
+                used_tokens = None
+                try:
+                    logger.debug(f"Enviando requisição para Gemini: Modelo='{self.model_name}'")
+                    response = await self._gemini_model.generate_content_async(gemini_messages)
+                    usage = getattr(response, "usage_metadata", None)
+                    used_tokens = getattr(usage, "total_token_count", None)
+                    return response.text
+                finally:
+                    self._rate_limiter.settle(reserved_tokens, used_tokens)
         except ConnectionAbortedError as e:
             logger.error(f"Circuit Breaker está aberto. A chamada para {self.model_name} foi bloqueada. Erro: {e}")
             return None
@@ -122,31 +145,38 @@ class LLMClient:
             # A exceção será capturada pelo Circuit Breaker, que decidirá se abre o circuito.
             raise e
 
-    async def _generate_httpx_response(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Optional[str]:
+    async def _generate_httpx_response(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                                       estimated_tokens: int = 0) -> Optional[str]:
         endpoint_url = f"{self.base_url}/chat/completions"
         payload = {"model": self.model_name, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
         
         try:
             async with self._circuit_breaker:
-                await self._rate_limiter.wait_for_token()
-                logger.debug(f"Enviando requisição para LLM via HTTPX: Modelo='{self.model_name}'")
-                client = await self._get_async_client()
-                response = await client.post(endpoint_url, json=payload)
-                response.raise_for_status()
-                result = response.json()
-                message = result.get('choices', [{}])[0].get('message', {})
-                content = message.get('content', '')
+                reserved_tokens = await self._rate_limiter.wait_for_token(estimated_tokens)
+                used_tokens = None
+                try:
+                    logger.debug(f"Enviando requisição para LLM via HTTPX: Modelo='{self.model_name}'")
+                    client = await self._get_async_client()
+                    response = await client.post(endpoint_url, json=payload, headers=self.headers, timeout=self.timeout)
+                    self._pool.record_response(response.status_code, response.headers)
+                    response.raise_for_status()
+                    result = response.json()
+                    used_tokens = (result.get('usage') or {}).get('total_tokens')
+                    message = result.get('choices', [{}])[0].get('message', {})
+                    content = message.get('content', '')
                 
-                # Se content está vazio, tenta extrair do reasoning (para modelos como deepseek)
-                if not content or not content.strip():
-                    reasoning = message.get('reasoning', '')
-                    if reasoning and reasoning.strip():
-                        logger.info(f"LLM '{self.model_name}' retornou reasoning em vez de content, usando reasoning")
-                        content = reasoning
-                    else:
-                        logger.warning(f"LLM '{self.model_name}' retornou conteúdo vazio. Resultado completo: {result}")
+                    # Se content está vazio, tenta extrair do reasoning (para modelos como deepseek)
+                    if not content or not content.strip():
+                        reasoning = message.get('reasoning', '')
+                        if reasoning and reasoning.strip():
+                            logger.info(f"LLM '{self.model_name}' retornou reasoning em vez de content, usando reasoning")
+                            content = reasoning
+                        else:
+                            logger.warning(f"LLM '{self.model_name}' retornou conteúdo vazio. Resultado completo: {result}")
                 
-                return content
+                    return content
+                finally:
+                    self._rate_limiter.settle(reserved_tokens, used_tokens)
         except ConnectionAbortedError as e:
             logger.error(f"Circuit Breaker está aberto. A chamada para {self.model_name} foi bloqueada. Erro: {e}")
             return None
@@ -160,6 +190,66 @@ class LLMClient:
             logger.opt(exception=True).error(f"Erro inesperado na requisição HTTPX para '{self.model_name}'")
             raise e
 
+    async def _stream_gemini_response(self, messages: List[Dict[str, str]], estimated_tokens: int = 0) -> AsyncIterator[str]:
+        gemini_messages = self._to_gemini_messages(messages)
+        async with self._circuit_breaker:
+            reserved_tokens = await self._rate_limiter.wait_for_token(estimated_tokens)
+            used_tokens = None
+            try:
+                logger.debug(f"Enviando requisição em streaming para Gemini: Modelo='{self.model_name}'")
+                response = await self._gemini_model.generate_content_async(gemini_messages, stream=True)
+                async for chunk in response:
+                    usage = getattr(chunk, "usage_metadata", None)
+                    used_tokens = getattr(usage, "total_token_count", None) or used_tokens
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        continue  # Trecho sem partes de texto (ex.: só metadados)
+                    if text:
+                        yield text
+            finally:
+                self._rate_limiter.settle(reserved_tokens, used_tokens)
+
+    async def _stream_httpx_response(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                                     estimated_tokens: int = 0) -> AsyncIterator[str]:
+        endpoint_url = f"{self.base_url}/chat/completions"
+        payload = {
+            "model": self.model_name, "messages": messages, "max_tokens": max_tokens, "temperature": temperature,
+            "stream": True, "stream_options": {"include_usage": True},
+        }
+        async with self._circuit_breaker:
+            reserved_tokens = await self._rate_limiter.wait_for_token(estimated_tokens)
+            used_tokens = None
+            try:
+                logger.debug(f"Enviando requisição em streaming via HTTPX: Modelo='{self.model_name}'")
+                client = await self._get_async_client()
+                async with client.stream("POST", endpoint_url, json=payload, headers=self.headers, timeout=self.timeout) as response:
+                    self._pool.record_response(response.status_code, response.headers)
+                    if response.is_error:
+                        await response.aread()  # Corpo necessário para a mensagem de erro
+                        logger.error(f"Erro HTTP {response.status_code} para '{self.model_name}': {response.text}")
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        # Server-sent events: ignora linhas vazias e comentários (": OPENROUTER PROCESSING")
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            event = json.loads(data)
+                        except json.JSONDecodeError:
+                            logger.warning(f"Evento SSE inválido de '{self.model_name}': {data[:200]}")
+                            continue
+                        if event.get("usage"):
+                            used_tokens = event["usage"].get("total_tokens", used_tokens)
+                        for choice in event.get("choices") or []:
+                            text = (choice.get("delta") or {}).get("content")
+                            if text:
+                                yield text
+            finally:
+                self._rate_limiter.settle(reserved_tokens, used_tokens)
+
     async def _handle_fallback(self, failed_model_name: str, category: TaskCategory) -> bool:
         """
         Gerencia a lógica de fallback, marcando o modelo com falha como indisponível
@@ -190,24 +280,105 @@ class LLMClient:
         max_tokens: int = 8000,
         temperature: float = 0.5,
         max_retries: int = 3,
-        max_prompt_tokens: int = 4096
+        max_prompt_tokens: int = 4096,
+        use_cache: bool = True,
+        cache_tag: Optional[str] = None
     ) -> Optional[str]:
         """
         Generates a response from the LLM with robust retry and fallback logic.
+        Identical requests are answered from the response cache when one is configured
+        (pass use_cache=False to always reach the network); entries read or stored with
+        `cache_tag` can later be evicted with LLMResponseCache.invalidate_tag (e.g. after
+        the output of a task fails validation). Concurrent identical cacheable
+        requests share a single in-flight call. With hedging enabled, a slow primary
+        model races against the next model in the fallback chain.
         """
         initial_model = self.model_name
-        current_model = initial_model
         start_time = time.time()  # Para medir tempo de resposta
         
         optimized_messages = self._token_optimizer.truncate_messages(messages, max_prompt_tokens)
-        
+        request_key = LLMResponseCache.make_key(initial_model, optimized_messages, temperature, max_tokens)
+
+        use_response_cache = use_cache and self.response_cache is not None and self.response_cache.is_cacheable(temperature)
+        if use_response_cache:
+            cached_response = self.response_cache.get(request_key, category.value, tag=cache_tag)
+            if cached_response is not None:
+                logger.debug(f"LLM response cache HIT for '{initial_model}' ({category.value})")
+                return cached_response
+
+        prompt_tokens = sum(self._token_optimizer.count_tokens_many([msg["content"] for msg in optimized_messages]))
+
+        def generate() -> Awaitable[Tuple[Optional[str], str]]:
+            return self._generate_hedged(
+                optimized_messages, category, max_tokens, temperature, max_retries, start_time, prompt_tokens
+            )
+
+        if not use_response_cache:
+            # Respostas amostradas ou pedidas sem cache não são compartilhadas entre chamadores
+            response, _ = await generate()
+            return response
+
+        def saved_tokens(result: Tuple[Optional[str], str]) -> int:
+            shared_response = result[0]
+            return prompt_tokens + (self._token_optimizer.count_tokens(shared_response) if shared_response else 0)
+
+        (response, answered_by), shared = await _request_single_flight.do(request_key, generate, savings=saved_tokens)
+        if shared:
+            logger.debug(f"LLM request coalesced with an identical in-flight request for '{initial_model}' ({category.value})")
+        elif response and response.strip():
+            # Uma resposta do fallback ou do hedge fica sob a chave do modelo que respondeu
+            if answered_by != initial_model:
+                request_key = LLMResponseCache.make_key(answered_by, optimized_messages, temperature, max_tokens)
+            self.response_cache.put(
+                request_key, category.value, response,
+                latency_ms=(time.time() - start_time) * 1000,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=self._token_optimizer.count_tokens(response),
+                tag=cache_tag,
+            )
+        return response
+
+    @staticmethod
+    def get_coalescing_stats() -> Dict[str, int]:
+        """Requisições executadas, agrupadas (single-flight) e tokens poupados no processo."""
+        stats = _request_single_flight.get_stats()
+        return {
+            "requests_executed": stats["executions"],
+            "requests_coalesced": stats["coalesced"],
+            "saved_tokens": stats["saved"],
+            "in_flight": stats["in_flight"],
+        }
+
+    async def _generate_with_retries(
+        self,
+        optimized_messages: List[Dict[str, str]],
+        category: TaskCategory,
+        max_tokens: int,
+        temperature: float,
+        max_retries: int,
+        start_time: float,
+        prompt_tokens: int = 0
+    ) -> Optional[str]:
+        """
+        Executa a requisição com retries e fallback de modelo. O rate limiter
+        reserva prompt_tokens + max_tokens e acerta com o uso real da resposta.
+        """
+        estimated_tokens = prompt_tokens + max_tokens
+        initial_model = self.model_name
+        current_model = initial_model
+
         for attempt in range(max_retries):
             try:
                 if self.provider == LLMProvider.GOOGLE:
-                    response = await self._generate_gemini_response(optimized_messages)
+                    response = await self._generate_gemini_response(optimized_messages, estimated_tokens)
                 else:
-                    response = await self._generate_httpx_response(optimized_messages, max_tokens, temperature)
+                    response = await self._generate_httpx_response(optimized_messages, max_tokens, temperature, estimated_tokens)
                 
+                if response is not None:
+                    self.model_router.update_model_performance(
+                        current_model, category, success=bool(response.strip()), latency_ms=(time.time() - start_time) * 1000
+                    )
+
                 # Registrar sucesso no sistema inteligente
                 if self.model_manager and response is not None:
                     response_time = (time.time() - start_time) * 1000  # em ms
@@ -224,29 +395,11 @@ class LLMClient:
                 
                 return response
 
-            except (ResourceExhausted, httpx.HTTPStatusError, httpx.TimeoutException, httpx.ConnectError) as e:
-                is_rate_limit_error = isinstance(e, ResourceExhausted) or (isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429)
-                is_timeout_error = isinstance(e, (httpx.TimeoutException, httpx.ConnectError))
-
-                if is_rate_limit_error:
-                    logger.warning(f"Rate limit error with {current_model} on attempt {attempt + 1}/{max_retries}. Triggering fallback.")
-                    fallback_successful = await self._handle_fallback(current_model, category)
-                    if fallback_successful:
-                        current_model = self.model_name
-                        continue
-                    else:
-                        logger.critical(f"Fallback failed for {current_model}. No other models available.")
-                        raise e
-                
-                elif is_timeout_error:
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    logger.warning(f"Timeout/Connection error with {current_model}. Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
+            except RETRYABLE_ERRORS as e:
+                if await self._recover_from_error(e, current_model, category, attempt, max_retries):
+                    current_model = self.model_name
                     continue
-
-                else:
-                    logger.error(f"Unhandled HTTP error with {current_model}: {e}")
-                    raise e
+                raise e
 
             except Exception as e:
                 logger.opt(exception=True).error(f"Unexpected error on attempt {attempt + 1}/{max_retries} with {current_model}.")
@@ -264,3 +417,205 @@ class LLMClient:
         
         logger.error(f"Failed to generate response from {initial_model} after {max_retries} attempts and potential fallbacks.")
         return None
+
+    async def _generate_hedged(
+        self,
+        optimized_messages: List[Dict[str, str]],
+        category: TaskCategory,
+        max_tokens: int,
+        temperature: float,
+        max_retries: int,
+        start_time: float,
+        prompt_tokens: int = 0
+    ) -> Tuple[Optional[str], str]:
+        """
+        Executa a requisição com hedging, quando habilitado: se o modelo primário
+        não responder até o p95 de latência dele, a requisição também é enviada ao
+        próximo modelo da cadeia de fallback. A primeira resposta não vazia vence
+        e a outra é cancelada. Retorna (resposta, modelo que respondeu).
+        """
+        def request(client: "LLMClient", retries: int):
+            started = start_time if client is self else time.time()
+            return client._generate_with_retries(
+                optimized_messages, category, max_tokens, temperature, retries, started, prompt_tokens
+            )
+
+        hedger = self.hedger
+        if hedger is None or not hedger.enabled or self.client_resolver is None:
+            response = await request(self, max_retries)
+            return response, self.model_name  # Após um fallback, o modelo do cliente já é o que respondeu
+
+        primary_model = self.model_name
+        delay = hedger.hedge_delay(self.model_router, primary_model, category)
+        primary = asyncio.create_task(request(self, max_retries))
+        tasks = {primary}
+        answered_by = None
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+            hedge_client = None
+            if not primary.done() and delay is not None:
+                hedge_info = self.model_router.get_fallback_model(primary_model, category)
+                primary_info = self.model_router.available_models.get(primary_model)
+                if hedge_info and hedger.allow_hedge(primary_info, hedge_info):
+                    try:
+                        hedge_client = self.client_resolver(hedge_info.name)
+                    except ValueError as e:
+                        logger.warning(f"Hedging: cliente para '{hedge_info.name}' indisponível: {e}")
+
+            if hedge_client is None:
+                response = await primary
+            else:
+                logger.info(f"Hedging: '{primary_model}' sem resposta após {delay:.1f}s, disparando '{hedge_client.model_name}'")
+                hedge = asyncio.create_task(request(hedge_client, 1))
+                tasks.add(hedge)
+                winner = None
+                pending = set(tasks)
+                while pending and winner is None:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if not task.exception() and task.result() and task.result().strip():
+                            winner = task
+                            break
+                if winner is None:
+                    response = await primary  # Ambos falharam: propaga o resultado do primário
+                else:
+                    response = winner.result()
+                # Estimativa conservadora: o perdedor pode ser cobrado pelo prompt e por uma resposta completa
+                completion_tokens = self._token_optimizer.count_tokens(response) if response else 0
+                hedger.record_hedge_result(hedge_won=winner is hedge, extra_tokens=prompt_tokens + completion_tokens)
+                if winner is hedge:
+                    answered_by = hedge_client.model_name
+                    logger.info(f"Hedging: '{hedge_client.model_name}' respondeu antes de '{primary_model}'")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        completion_tokens = self._token_optimizer.count_tokens(response) if response else 0
+        hedger.record_request((time.time() - start_time) * 1000, prompt_tokens + completion_tokens)
+        return response, answered_by or self.model_name
+
+    async def _recover_from_error(self, error: Exception, current_model: str, category: TaskCategory,
+                                  attempt: int, max_retries: int) -> bool:
+        """
+        Decide se a requisição pode ser repetida: rate limit aciona o fallback de
+        modelo e timeout/conexão espera com backoff exponencial.
+        """
+        is_rate_limit_error = isinstance(error, ResourceExhausted) or (isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429)
+        is_timeout_error = isinstance(error, (httpx.TimeoutException, httpx.ConnectError))
+
+        if is_rate_limit_error:
+            logger.warning(f"Rate limit error with {current_model} on attempt {attempt + 1}/{max_retries}. Triggering fallback.")
+            if await self._handle_fallback(current_model, category):
+                return True
+            logger.critical(f"Fallback failed for {current_model}. No other models available.")
+            return False
+
+        if is_timeout_error:
+            wait_time = 2 ** attempt  # Exponential backoff
+            logger.warning(f"Timeout/Connection error with {current_model}. Retrying in {wait_time}s...")
+            await asyncio.sleep(wait_time)
+            return True
+
+        logger.error(f"Unhandled HTTP error with {current_model}: {error}")
+        return False
+
+    async def generate_response_stream(
+        self,
+        messages: List[Dict[str, str]],
+        category: TaskCategory,
+        max_tokens: int = 8000,
+        temperature: float = 0.5,
+        max_retries: int = 3,
+        max_prompt_tokens: int = 4096,
+        use_cache: bool = True,
+        cache_tag: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming version of generate_response: yields text chunks as they arrive
+        (SSE for OpenRouter/OpenAI, streaming for Gemini). The consumer may stop
+        iterating at any time (e.g. once a code block is closed); the connection
+        is then closed and the partial response is not cached. Errors before the
+        first chunk follow the same retry/fallback logic as generate_response.
+        Time-to-first-byte and tokens/s are recorded per model in the ModelRouter.
+        """
+        initial_model = self.model_name
+        start_time = time.time()
+
+        optimized_messages = self._token_optimizer.truncate_messages(messages, max_prompt_tokens)
+        request_key = LLMResponseCache.make_key(initial_model, optimized_messages, temperature, max_tokens)
+
+        use_response_cache = use_cache and self.response_cache is not None and self.response_cache.is_cacheable(temperature)
+        if use_response_cache:
+            cached_response = self.response_cache.get(request_key, category.value, tag=cache_tag)
+            if cached_response is not None:
+                logger.debug(f"LLM response cache HIT for '{initial_model}' ({category.value})")
+                yield cached_response
+                return
+
+        prompt_tokens = sum(self._token_optimizer.count_tokens_many([msg["content"] for msg in optimized_messages]))
+        estimated_tokens = prompt_tokens + max_tokens
+        chunks: List[str] = []
+
+        for attempt in range(max_retries):
+            current_model = self.model_name
+            if self.provider == LLMProvider.GOOGLE:
+                stream = self._stream_gemini_response(optimized_messages, estimated_tokens)
+            else:
+                stream = self._stream_httpx_response(optimized_messages, max_tokens, temperature, estimated_tokens)
+
+            request_start = time.monotonic()
+            first_chunk_at: Optional[float] = None
+            try:
+                async with aclosing(stream):
+                    async for chunk in stream:
+                        if first_chunk_at is None:
+                            first_chunk_at = time.monotonic()
+                        chunks.append(chunk)
+                        yield chunk
+                break
+            except ConnectionAbortedError as e:
+                logger.error(f"Circuit Breaker está aberto. A chamada para {current_model} foi bloqueada. Erro: {e}")
+                return
+            except RETRYABLE_ERRORS as e:
+                # Trechos já entregues ao consumidor não podem ser refeitos
+                if chunks or not await self._recover_from_error(e, current_model, category, attempt, max_retries):
+                    raise e
+            finally:
+                if first_chunk_at is not None:
+                    self._record_stream_metrics(current_model, category, request_start, first_chunk_at, chunks)
+        else:
+            logger.error(f"Failed to stream response from {initial_model} after {max_retries} attempts and potential fallbacks.")
+            return
+
+        response = "".join(chunks)
+        if self.model_manager:
+            self.model_manager.record_request(
+                model_name=self.model_name,
+                success=bool(response.strip()),
+                response_empty=not response.strip(),
+                response_time=(time.time() - start_time) * 1000,
+                tokens_generated=len(response.split()),
+            )
+        if use_response_cache and response.strip():
+            if current_model != initial_model:
+                request_key = LLMResponseCache.make_key(current_model, optimized_messages, temperature, max_tokens)
+            self.response_cache.put(
+                request_key, category.value, response,
+                latency_ms=(time.time() - start_time) * 1000,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=self._token_optimizer.count_tokens(response),
+                tag=cache_tag,
+            )
+
+    def _record_stream_metrics(self, model_name: str, category: TaskCategory, request_start: float,
+                               first_chunk_at: float, chunks: List[str]):
+        """Registra TTFB e tokens/s de um streaming (completo ou interrompido pelo consumidor)."""
+        ttfb_ms = (first_chunk_at - request_start) * 1000
+        generation_time = time.monotonic() - first_chunk_at
+        completion_tokens = self._token_optimizer.count_tokens("".join(chunks))
+        tokens_per_second = completion_tokens / generation_time if generation_time > 0 else 0.0
+        self.model_router.update_stream_performance(model_name, category, ttfb_ms, tokens_per_second)
+        logger.debug(f"Streaming de '{model_name}': TTFB {ttfb_ms:.0f}ms, {tokens_per_second:.1f} tokens/s")
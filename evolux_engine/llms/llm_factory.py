@@ -1,7 +1,12 @@
-from typing import Dict, Optional
+import os
+from typing import Dict, Optional, Any
 from loguru import logger
 
+from evolux_engine.cache.llm_response_cache import LLMResponseCache, get_llm_response_cache
+
+from evolux_engine.llms.hedging import HedgingPolicy, RequestHedger
 from evolux_engine.llms.llm_client import LLMClient
+from evolux_engine.llms.provider_pool import get_provider_pool
 from evolux_engine.llms.model_router import ModelRouter, TaskCategory
 from evolux_engine.schemas.contracts import LLMProvider
 from evolux_engine.services.config_manager import ConfigManager
@@ -14,6 +19,8 @@ class LLMFactory:
     _clients: Dict[str, LLMClient] = {}
     _model_router: Optional[ModelRouter] = None
     _config_manager: Optional[ConfigManager] = None
+    _response_cache: Optional[LLMResponseCache] = None
+    _hedger: Optional[RequestHedger] = None
 
     @classmethod
     def _initialize(cls):
@@ -22,6 +29,31 @@ class LLMFactory:
             cls._model_router = ModelRouter()
         if cls._config_manager is None:
             cls._config_manager = ConfigManager()
+        if cls._response_cache is None and cls._config_manager.get_global_setting("llm_response_cache_enabled", False):
+            cls._response_cache = cls._create_response_cache()
+        if cls._hedger is None:
+            settings = cls._config_manager
+            cls._hedger = RequestHedger(HedgingPolicy(
+                enabled=settings.get_global_setting("llm_hedging_enabled", False),
+                min_samples=settings.get_global_setting("llm_hedging_min_samples", 20),
+                max_cost_ratio=settings.get_global_setting("llm_hedging_max_cost_ratio", 1.0),
+                max_extra_token_ratio=settings.get_global_setting("llm_hedging_max_extra_token_ratio", 0.1),
+            ))
+
+    @classmethod
+    def _create_response_cache(cls) -> LLMResponseCache:
+        """Cria o cache de respostas compartilhado, com persistência em disco se configurada."""
+        settings = cls._config_manager
+        cache_path = None
+        if settings.get_global_setting("llm_response_cache_persistent", False):
+            cache_path = settings.get_global_setting("llm_response_cache_path") or os.path.join(
+                settings.get_global_setting("project_base_dir", "project_workspaces"), ".llm_response_cache.db"
+            )
+        return get_llm_response_cache(
+            persistent_path=cache_path,
+            max_entries=settings.get_global_setting("llm_response_cache_max_entries", 1000),
+            deterministic_only=settings.get_global_setting("llm_response_cache_deterministic_only", True),
+        )
 
     @classmethod
     def get_client(
@@ -43,6 +75,13 @@ class LLMFactory:
         if not model_name:
             raise ValueError(f"Nenhum modelo disponível encontrado para a categoria de tarefa: {task_category.value}")
 
+        return cls.get_client_for_model(model_name)
+
+    @classmethod
+    def get_client_for_model(cls, model_name: str) -> LLMClient:
+        """Obtém (ou cria) o cliente LLM de um modelo específico do ModelRouter."""
+        cls._initialize()
+
         # A chave do cliente é baseada apenas no nome do modelo, pois ele é único
         if model_name not in cls._clients:
             logger.info(f"Criando novo cliente LLM para o modelo selecionado: {model_name}")
@@ -56,14 +95,36 @@ class LLMFactory:
             if not api_key:
                 raise ValueError(f"API Key para o provedor '{provider.value}' não encontrada.")
 
+            # O pool do provedor é compartilhado: a cota vale para todos os clientes desta chave
+            get_provider_pool(
+                provider, api_key,
+                requests_per_minute=cls._config_manager.get_global_setting("llm_requests_per_minute", 15),
+                tokens_per_minute=cls._config_manager.get_global_setting("llm_tokens_per_minute"),
+            )
             cls._clients[model_name] = LLMClient(
                 provider=provider,
                 model_name=model_name,
                 api_key=api_key,
                 model_router=cls._model_router,
                 http_referer=cls._config_manager.get_global_setting("openrouter_http_referer"),
-                x_title=cls._config_manager.get_global_setting("openrouter_x_title")
+                x_title=cls._config_manager.get_global_setting("openrouter_x_title"),
+                response_cache=cls._response_cache,
+                hedger=cls._hedger,
+                client_resolver=cls.get_client_for_model,
             )
         
         logger.debug(f"Retornando cliente LLM para o modelo: {model_name}")
         return cls._clients[model_name]
+
+    @classmethod
+    def invalidate_cached_responses(cls, tag: str) -> int:
+        """Remove do cache de respostas as entradas associadas à `tag` (ex.: uma tarefa que falhou na validação)."""
+        if cls._response_cache is None:
+            return 0
+        return cls._response_cache.invalidate_tag(tag)
+
+    @classmethod
+    def get_hedging_stats(cls) -> Dict[str, Any]:
+        """Latência de cauda e tokens extras do hedging de requisições."""
+        cls._initialize()
+        return cls._hedger.get_stats()
@@ -1,4 +1,5 @@
 from typing import Dict, List, Optional, Any
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
 import asyncio
@@ -27,7 +28,12 @@ class ModelPerformance:
     avg_latency_ms: float = 0.0
     avg_cost_per_token: float = 0.0
     total_calls: int = 0
+    avg_ttfb_ms: float = 0.0
+    avg_tokens_per_second: float = 0.0
+    streamed_calls: int = 0
     last_updated: datetime = field(default_factory=datetime.now)
+    # Latências recentes de chamadas bem-sucedidas, para percentis (ex.: p95 do hedging)
+    latency_samples: deque = field(default_factory=lambda: deque(maxlen=200), repr=False)
     
     def update_metrics(self, success: bool, latency_ms: float, cost: float = 0.0):
         """Atualiza métricas baseado em nova execução"""
@@ -40,6 +46,8 @@ class ModelPerformance:
         
         # Update latency with exponential smoothing
         self.avg_latency_ms = alpha * latency_ms + (1 - alpha) * self.avg_latency_ms
+        if success:
+            self.latency_samples.append(latency_ms)
         
         # Update cost
         if cost > 0:
@@ -47,6 +55,26 @@ class ModelPerformance:
         
         self.last_updated = datetime.now()
 
+    def latency_percentile(self, percentile: float, min_samples: int = 20) -> Optional[float]:
+        """Percentil das latências recentes (ms), ou None se ainda houver poucas amostras"""
+        if len(self.latency_samples) < min_samples:
+            return None
+        ordered = sorted(self.latency_samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def update_stream_metrics(self, ttfb_ms: float, tokens_per_second: float):
+        """Atualiza tempo até o primeiro byte e vazão de uma chamada em streaming"""
+        self.streamed_calls += 1
+        if self.streamed_calls == 1:
+            self.avg_ttfb_ms = ttfb_ms
+            self.avg_tokens_per_second = tokens_per_second
+        else:
+            alpha = 0.1  # Smoothing factor
+            self.avg_ttfb_ms = alpha * ttfb_ms + (1 - alpha) * self.avg_ttfb_ms
+            self.avg_tokens_per_second = alpha * tokens_per_second + (1 - alpha) * self.avg_tokens_per_second
+        self.last_updated = datetime.now()
+
 @dataclass 
 class ModelInfo:
     """Informações sobre um modelo disponível"""
@@ -337,6 +365,16 @@ class ModelRouter:
         
         logger.debug(f"Model performance updated for model: {model_name}, category: {category.value}, success: {success}, new_success_rate: {round(perf.success_rate, 3)}")
     
+    def update_stream_performance(self,
+                                  model_name: str,
+                                  category: TaskCategory,
+                                  ttfb_ms: float,
+                                  tokens_per_second: float):
+        """Registra TTFB e tokens/s de uma chamada em streaming"""
+        
+        perf = self._get_performance(model_name, category)
+        perf.update_stream_metrics(ttfb_ms, tokens_per_second)
+    
     def get_fallback_model(self, 
                            failed_model_name: str, 
                            category: TaskCategory) -> Optional[ModelInfo]:
@@ -400,7 +438,11 @@ class ModelRouter:
                 model_stats[category.value] = {
                     'success_rate': round(perf.success_rate, 3),
                     'avg_latency_ms': round(perf.avg_latency_ms, 1),
-                    'total_calls': perf.total_calls
+                    'total_calls': perf.total_calls,
+                    'p95_latency_ms': perf.latency_percentile(95, min_samples=1),
+                    'avg_ttfb_ms': round(perf.avg_ttfb_ms, 1),
+                    'avg_tokens_per_second': round(perf.avg_tokens_per_second, 1),
+                    'streamed_calls': perf.streamed_calls
                 }
             stats['performance_data'][model_name] = model_stats
         
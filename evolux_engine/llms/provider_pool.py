@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Any, Mapping
+
+import httpx
+from loguru import logger
+
+from evolux_engine.schemas.contracts import LLMProvider
+from evolux_engine.utils.resilience import CircuitBreaker, RateLimiter
+
+try:
+    import h2  # noqa: F401  (necessário para HTTP/2 no httpx)
+    IS_HTTP2_AVAILABLE = True
+except ImportError:
+    IS_HTTP2_AVAILABLE = False
+
+# Limite inicial por provedor, corrigido pelos cabeçalhos de rate limit das respostas
+DEFAULT_REQUESTS_PER_MINUTE = 15
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Converte durações como '1s', '6m0s', '250ms' ou '12' em segundos."""
+    value = value.strip().lower()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, number = 0.0, ""
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char.isdigit() or char == ".":
+            number += char
+        elif value.startswith("ms", i):
+            total += float(number or 0) / 1000
+            number = ""
+            i += 1
+        elif char in "hms":
+            total += float(number or 0) * {"h": 3600, "m": 60, "s": 1}[char]
+            number = ""
+        else:
+            return None
+        i += 1
+    return total
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """retry-after em segundos ou como data HTTP."""
+    seconds = _parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderPool:
+    """
+    Recursos compartilhados por todos os LLMClients de um mesmo provedor e
+    chave de API: um token bucket (ajustado pelos cabeçalhos de rate limit do
+    provedor, em requisições e tokens por minuto), um circuit breaker e um `httpx.AsyncClient` com keep-alive e,
+    quando o pacote `h2` está instalado, HTTP/2.
+
+    Assim, N agentes usando o mesmo provedor dividem a mesma cota em vez de
+    cada um supor que tem a cota inteira.
+    """
+
+    def __init__(self, provider: LLMProvider, name: str, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: Optional[int] = None, max_connections: int = 20,
+                 max_keepalive_connections: int = 10, timeout: float = 120):
+        self.provider = provider
+        self.name = name
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute, name=f"{name}_limiter"
+        )
+        self.circuit_breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60, name=f"{name}_breaker")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=30,
+        )
+        self.timeout = timeout
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"requests": 0, "rate_limited": 0, "header_updates": 0}
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        """Retorna o cliente HTTP compartilhado, recriando-o se foi fechado ou pertence a outro event loop."""
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_client.is_closed or self._http_client_loop is not loop:
+            self._discard_http_client()
+            self._http_client = httpx.AsyncClient(
+                http2=IS_HTTP2_AVAILABLE,
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+            self._http_client_loop = loop
+            logger.debug(f"ProviderPool '{self.name}': novo AsyncClient (http2={IS_HTTP2_AVAILABLE})")
+        return self._http_client
+
+    def _discard_http_client(self):
+        """
+        Fecha o cliente HTTP de outro event loop antes de substituí-lo. Se aquele
+        loop ainda roda (em outra thread), o `aclose()` é agendado nele; se já
+        parou, os sockets das conexões abertas são fechados diretamente, já que
+        não há mais loop para aguardar o fechamento do pool.
+        """
+        client, loop = self._http_client, self._http_client_loop
+        self._http_client = None
+        self._http_client_loop = None
+        if client is None or client.is_closed:
+            return
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+
+        pool = getattr(client._transport, "_pool", None)
+        closed = 0
+        for connection in list(getattr(pool, "_connections", ())):
+            protocol = getattr(connection, "_connection", None)
+            stream = getattr(protocol, "_network_stream", None)
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            if sock is not None:
+                getattr(sock, "_sock", sock).close()  # asyncio expõe um TransportSocket, sem close()
+                closed += 1
+        if pool is not None:
+            pool._connections = []
+        logger.debug(f"ProviderPool '{self.name}': AsyncClient de um event loop encerrado descartado ({closed} socket(s) fechado(s))")
+
+    def record_response(self, status_code: int, headers: Mapping[str, str]):
+        """Atualiza o rate limiter a partir dos cabeçalhos de uma resposta do provedor."""
+        self._stats["requests"] += 1
+        if status_code == 429:
+            self._stats["rate_limited"] += 1
+
+        headers = {key.lower(): value for key, value in headers.items()}
+        retry_after = headers.get("retry-after")
+        feedback: Dict[str, Any] = {}
+        for argument, names in (
+            ("limit", ("x-ratelimit-limit-requests",)),
+            ("remaining", ("x-ratelimit-remaining-requests", "x-ratelimit-remaining")),
+            ("token_limit", ("x-ratelimit-limit-tokens",)),
+            ("token_remaining", ("x-ratelimit-remaining-tokens",)),
+        ):
+            value = next((headers[name] for name in names if name in headers), None)
+            if value and value.isdigit():
+                feedback[argument] = int(value)
+        if retry_after:
+            feedback["retry_after"] = _parse_retry_after(retry_after)
+        elif status_code == 429:
+            reset = headers.get("x-ratelimit-reset-requests") or headers.get("x-ratelimit-reset-tokens")
+            feedback["retry_after"] = (_parse_duration(reset) if reset else None) or 1.0
+
+        if feedback:
+            self._stats["header_updates"] += 1
+            self.rate_limiter.apply_feedback(**feedback)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "circuit_state": self.circuit_breaker.state,
+            "http2": IS_HTTP2_AVAILABLE,
+        }
+
+    async def aclose(self):
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+
+
+# Registro global de pools por provedor + chave de API
+_provider_pools: Dict[str, ProviderPool] = {}
+
+def get_provider_pool(provider: LLMProvider, api_key: str, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                      tokens_per_minute: Optional[int] = None) -> ProviderPool:
+    """Obtém ou cria o pool compartilhado do provedor para a chave de API informada."""
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    pool_key = f"{provider.value}:{key_hash}"
+    if pool_key not in _provider_pools:
+        _provider_pools[pool_key] = ProviderPool(
+            provider, name=f"{provider.value}_{key_hash[:6]}",
+            requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+        )
+        logger.info(f"ProviderPool criado para '{provider.value}' ({requests_per_minute} reqs/min iniciais)")
+    return _provider_pools[pool_key]
+
+def list_provider_pools() -> Dict[str, Dict[str, Any]]:
+    """Lista os pools de provedores e suas métricas"""
+    return {pool.name: pool.get_stats() for pool in _provider_pools.values()}
+
+async def close_provider_pools():
+    """Fecha os clientes HTTP de todos os pools"""
+    for pool in _provider_pools.values():
+        await pool.aclose()
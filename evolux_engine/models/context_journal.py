@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from ..utils.coalescing_writer import atomic_write_bytes, get_context_writer
+from .serialization import BINARY_SUFFIX, encode_document, read_document
+
+# Listas de tarefas do ProjectContext, na ordem em que são serializadas
+TASK_LISTS = ("task_queue", "completed_tasks", "failed_tasks")
+JOURNALED_FIELDS = set(TASK_LISTS) | {"artifacts_state"}
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+def _fingerprint(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+
+
+def context_records(context: Any) -> Tuple[Dict[str, str], bool]:
+    """
+    Serializa o contexto em registros independentes (chave -> JSON): cabeçalho,
+    cada tarefa de cada lista, ordem das listas e cada artefato. Retorna também
+    se alguma lista tem IDs de tarefa repetidos, caso em que os registros não
+    representam o estado com exatidão.
+    """
+    records = {"header": context.model_dump_json(exclude=JOURNALED_FIELDS)}
+    order: Dict[str, List[str]] = {}
+    duplicated = False
+    for list_name in TASK_LISTS:
+        ids = []
+        for task in getattr(context, list_name):
+            records[json.dumps(["task", list_name, task.task_id])] = task.model_dump_json()
+            ids.append(task.task_id)
+        duplicated = duplicated or len(set(ids)) != len(ids)
+        order[list_name] = ids
+    records["order"] = json.dumps(order)
+    for path, state in context.artifacts_state.items():
+        records[json.dumps(["artifact", path])] = state.model_dump_json()
+    return records, duplicated
+
+
+def records_to_data(records: Dict[str, str]) -> Dict[str, Any]:
+    """Reconstrói os dados do contexto (como em `model_dump(mode="json")`) a partir dos registros."""
+    data = json.loads(records["header"])
+    order = json.loads(records["order"])
+    for list_name in TASK_LISTS:
+        data[list_name] = [json.loads(records[json.dumps(["task", list_name, task_id])])
+                           for task_id in order.get(list_name, [])]
+    data["artifacts_state"] = {
+        json.loads(key)[1]: json.loads(value) for key, value in records.items() if key.startswith('["artifact"')
+    }
+    return data
+
+
+def fingerprint_records(records: Dict[str, str]) -> Dict[str, bytes]:
+    return {key: _fingerprint(value) for key, value in records.items()}
+
+
+class ContextJournal:
+    """
+    Persistência incremental do ProjectContext.
+
+    O `context.json` passa a ser um checkpoint compactado, e cada
+    `save_context` só acrescenta ao `context.journal.jsonl` uma linha com os
+    registros que mudaram desde o último save: cabeçalho (status, métricas,
+    configuração), tarefas de cada lista, ordem das listas e artefatos
+    atualizados ou removidos. Mudanças são detectadas comparando a impressão
+    digital (hash) do JSON de cada registro com a do último save.
+
+    Pedidos de save que chegam dentro de `COALESCE_WINDOW` segundos são
+    atendidos por uma única captura do estado, e a gravação roda fora do event
+    loop no CoalescingWriter compartilhado.
+
+    A cada `CHECKPOINT_INTERVAL` linhas o estado completo é gravado em um
+    arquivo temporário e renomeado atomicamente sobre o `context.json`. Cada
+    checkpoint tem uma geração, e as linhas do journal registram a geração
+    sobre a qual foram escritas: ao carregar, só são reaplicadas as linhas da
+    geração do checkpoint, então uma queda entre o rename e a limpeza do
+    journal não reaplica eventos antigos. Uma linha incompleta no fim do
+    arquivo (queda durante o append) é descartada inteira.
+
+    Um checkpoint com sufixo `.bin` é gravado no formato binário versionado
+    de `serialization`; o journal continua em JSON Lines nos dois formatos.
+    """
+    CHECKPOINT_INTERVAL = 100
+    COALESCE_WINDOW = 0.05
+    FSYNC = True
+
+    def __init__(self, context_file: Path, superseded: Tuple[Path, ...] = ()):
+        self.context_file = Path(context_file)
+        # Checkpoints em outro formato, removidos quando este é gravado
+        self.superseded = tuple(Path(path) for path in superseded)
+        self.journal_file = self.context_file.with_name(self.context_file.stem + JOURNAL_SUFFIX)
+        self.generation: Optional[str] = None
+        self.entries = 0
+        self.lock = asyncio.Lock()
+        self._pending: Optional[asyncio.Future] = None
+        self._flush_now = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+        self._fingerprints: Dict[str, bytes] = {}
+        self._checkpoint_stat: Optional[Tuple[int, int]] = None
+        self._stats = {"appends": 0, "checkpoints": 0, "events": 0, "bytes_written": 0, "coalesced": 0}
+
+    # --- Captura de estado ---
+
+    def track(self, context: Any, generation: Optional[str], entries: int = 0):
+        """Registra o estado carregado do disco como base para os próximos deltas."""
+        records, _ = context_records(context)
+        self._fingerprints = fingerprint_records(records)
+        self.generation = generation
+        self.entries = entries
+        self._checkpoint_stat = self._stat_checkpoint()
+
+    def _stat_checkpoint(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.context_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _needs_checkpoint(self, duplicated: bool) -> bool:
+        if self.generation is None or duplicated or self.entries >= self.CHECKPOINT_INTERVAL:
+            return True
+        # context.json reescrito por outro componente: o journal não se aplica mais a ele
+        return self._stat_checkpoint() != self._checkpoint_stat
+
+    # --- Coalescência ---
+
+    async def request_save(self, context: Any, wait: bool = True):
+        """
+        Agenda um save do contexto. Pedidos feitos antes de a captura do estado
+        começar são atendidos pelo mesmo save; com `wait=False` retorna sem
+        esperar a gravação (use `flush` antes de encerrar).
+        """
+        if self._pending is None:
+            loop = asyncio.get_running_loop()
+            self._pending = loop.create_future()
+            task = loop.create_task(self._save_after_window(context, self._pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._stats["coalesced"] += 1
+        if wait:
+            await asyncio.shield(self._pending)
+
+    async def _save_after_window(self, context: Any, future: asyncio.Future):
+        try:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.COALESCE_WINDOW)
+            except asyncio.TimeoutError:
+                pass
+            async with self.lock:
+                # Pedidos a partir daqui formam o próximo lote: o estado ainda vai ser capturado
+                if self._pending is future:
+                    self._pending = None
+                    self._flush_now.clear()
+                await self.save(context)
+        except Exception as e:
+            logger.error(f"Falha ao salvar o contexto em {self.context_file}: {e}")
+            future.set_exception(e)
+            future.exception()  # Evita o aviso quando nenhum pedido está esperando
+        else:
+            future.set_result(None)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Antecipa o save pendente e espera todos terminarem. Retorna False no timeout."""
+        if not self._tasks:
+            return True
+        self._flush_now.set()
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        return not pending
+
+    # --- Escrita ---
+
+    async def save(self, context: Any):
+        """Grava o delta do contexto no journal, ou um checkpoint quando é hora de compactar."""
+        records, duplicated = context_records(context)
+        fingerprints = fingerprint_records(records)
+
+        if self._needs_checkpoint(duplicated):
+            data = context.model_dump(mode="json")
+            generation = uuid.uuid4().hex
+            await get_context_writer().write(str(self.context_file), partial(self._write_checkpoint, data, generation))
+            self.generation = generation
+            self.entries = 0
+            self._fingerprints = fingerprints
+            return
+
+        events = []
+        for key, value in records.items():
+            if key != "order" and self._fingerprints.get(key) != fingerprints[key]:
+                events.append(f'["set",{json.dumps(key)},{value}]')
+        for key in self._fingerprints.keys() - fingerprints.keys():
+            if key.startswith('["artifact"'):
+                events.append(f'["remove",{json.dumps(key)},null]')
+        # A ordem das listas vem por último para que as tarefas já existam ao reaplicar
+        if self._fingerprints.get("order") != fingerprints["order"]:
+            events.append(f'["set","order",{records["order"]}]')
+        if events:
+            line = f'{{"base":"{self.generation}","events":[{",".join(events)}]}}\n'
+            await get_context_writer().write(str(self.context_file), partial(self._append, line))
+            self.entries += 1
+            self._stats["events"] += len(events)
+        self._fingerprints = fingerprints
+
+    def _append(self, line: str):
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            if self.FSYNC:
+                os.fsync(f.fileno())
+        self._stats["appends"] += 1
+        self._stats["bytes_written"] += len(line)
+
+    def _write_checkpoint(self, data: Dict[str, Any], generation: str):
+        data["journal_generation"] = generation
+        if self.context_file.suffix == BINARY_SUFFIX:
+            payload = encode_document("ProjectContext", data)
+        else:
+            payload = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        atomic_write_bytes(self.context_file, payload, fsync=self.FSYNC)
+        self._checkpoint_stat = self._stat_checkpoint()
+        for path in self.superseded:
+            path.unlink(missing_ok=True)
+        # Linhas de gerações anteriores já estão no checkpoint; se a queda ocorrer
+        # antes desta limpeza, elas são ignoradas na leitura por causa da geração
+        with open(self.journal_file, "w", encoding="utf-8"):
+            pass
+        self._stats["checkpoints"] += 1
+        self._stats["bytes_written"] += len(payload)
+        logger.debug(f"Checkpoint do contexto gravado em {self.context_file} ({len(payload)} bytes)")
+
+    # --- Leitura ---
+
+    @staticmethod
+    def replay(context_file: Path) -> Tuple[Dict[str, Any], Optional[str], int]:
+        """
+        Reconstrói os dados do contexto a partir do checkpoint e do journal.
+        Retorna (dados, geração do checkpoint, linhas reaplicadas).
+        """
+        context_file = Path(context_file)
+        data = read_document(context_file, "ProjectContext")
+        generation = data.pop("journal_generation", None)
+        journal_file = context_file.with_name(context_file.stem + JOURNAL_SUFFIX)
+        if generation is None or not journal_file.exists():
+            return data, generation, 0
+
+        tasks = {(name, task["task_id"]): task for name in TASK_LISTS for task in data.get(name, [])}
+        order = {name: [task["task_id"] for task in data.get(name, [])] for name in TASK_LISTS}
+        artifacts = dict(data.get("artifacts_state", {}))
+        applied = 0
+        with open(journal_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Linha incompleta descartada no journal {journal_file}")
+                    break
+                if entry.get("base") != generation:
+                    continue
+                for operation, key, value in entry["events"]:
+                    if key == "header":
+                        data.update(value)
+                    elif key == "order":
+                        order = value
+                    else:
+                        kind, *name = json.loads(key)
+                        if kind == "task":
+                            tasks[tuple(name)] = value
+                        elif operation == "remove":
+                            artifacts.pop(name[0], None)
+                        else:
+                            artifacts[name[0]] = value
+                applied += 1
+
+        for name in TASK_LISTS:
+            data[name] = [tasks[(name, task_id)] for task_id in order.get(name, [])]
+        data["artifacts_state"] = artifacts
+        return data, generation, applied
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "generation": self.generation, "pending_entries": self.entries}
@@ -3,8 +3,32 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
-from ..schemas.contracts import Task, ProjectStatus
+from pydantic import BaseModel, Field, PrivateAttr
+from ..schemas.contracts import (
+    Task, TaskType, ProjectStatus,
+    TaskDetails, TaskDetailsCreateFile, TaskDetailsModifyFile, TaskDetailsDeleteFile,
+    TaskDetailsExecuteCommand, TaskDetailsValidateArtifact, TaskDetailsAnalyzeOutput,
+    TaskDetailsPlanSubTasks, TaskDetailsHumanInterventionRequired, TaskDetailsGenericLLMQuery,
+)
+from .context_journal import ContextJournal, TASK_LISTS
+from .serialization import encode_document, decode_document, paused_gc, STORAGE_FORMATS, BINARY_SUFFIX
+
+# Arquivo de checkpoint do contexto em cada formato de armazenamento
+CONTEXT_FILES = {"json": "context.json", "binary": "context" + BINARY_SUFFIX}
+
+# Classe de detalhes esperada para cada tipo de tarefa (carregamento rápido)
+_DETAILS_BY_TYPE = {
+    TaskType.CREATE_FILE.value: TaskDetailsCreateFile,
+    TaskType.MODIFY_FILE.value: TaskDetailsModifyFile,
+    TaskType.DELETE_FILE.value: TaskDetailsDeleteFile,
+    TaskType.EXECUTE_COMMAND.value: TaskDetailsExecuteCommand,
+    TaskType.VALIDATE_ARTIFACT.value: TaskDetailsValidateArtifact,
+    TaskType.ANALYZE_OUTPUT.value: TaskDetailsAnalyzeOutput,
+    TaskType.PLAN_SUB_TASKS.value: TaskDetailsPlanSubTasks,
+    TaskType.HUMAN_INTERVENTION_REQUIRED.value: TaskDetailsHumanInterventionRequired,
+    TaskType.GENERIC_LLM_QUERY.value: TaskDetailsGenericLLMQuery,
+    TaskType.END_PROJECT.value: TaskDetails,
+}
 
 class EngineConfig(BaseModel):
     """Configurações do engine para o projeto"""
@@ -12,6 +36,7 @@ class EngineConfig(BaseModel):
     max_iterations_per_task: int = 3
     default_executor_model: Optional[str] = None
     timeout_seconds: int = 300
+    storage_format: str = "json"  # "json" ou "binary" (checkpoint em context.bin)
 
 class ProjectMetrics(BaseModel):
     """Métricas do projeto"""
@@ -56,6 +81,9 @@ class ProjectContext(BaseModel):
     # Histórico de iterações seria adicionado aqui
     # iteration_history: List[IterationLog] = Field(default_factory=list)
 
+    # Journal de persistência incremental (não serializado)
+    _journal: Optional[ContextJournal] = PrivateAttr(default=None)
+
     class Config:
         arbitrary_types_allowed = True
 
@@ -97,24 +125,109 @@ class ProjectContext(BaseModel):
             summary += "\n"
         return summary
     
-    async def save_context(self):
-        """Salva o contexto em arquivo JSON"""
-        context_file = self.workspace_path / "context.json"
-        # Converter Path para string para serialização JSON
-        data = self.model_dump(mode='json')
-        data['workspace_path'] = str(self.workspace_path)
-        
-        with open(context_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-    
+    def get_context_file(self) -> Path:
+        """Arquivo de checkpoint do contexto no formato configurado em engine_config"""
+        storage_format = self.engine_config.storage_format
+        if storage_format not in STORAGE_FORMATS:
+            raise ValueError(f"Formato de armazenamento desconhecido: {storage_format}")
+        return self.workspace_path / CONTEXT_FILES[storage_format]
+
+    @staticmethod
+    def find_context_file(workspace_path: Path) -> Optional[Path]:
+        """Localiza o checkpoint do contexto em um workspace, em qualquer formato"""
+        candidates = [Path(workspace_path) / name for name in CONTEXT_FILES.values()]
+        existing = [path for path in candidates if path.exists()]
+        if not existing:
+            return None
+        return max(existing, key=lambda path: path.stat().st_mtime_ns)
+
+    def _get_journal(self) -> ContextJournal:
+        context_file = self.get_context_file()
+        if self._journal is None or self._journal.context_file != context_file:
+            superseded = tuple(self.workspace_path / name for name in CONTEXT_FILES.values()
+                               if self.workspace_path / name != context_file)
+            self._journal = ContextJournal(context_file, superseded)
+        return self._journal
+
+    async def save_context(self, wait: bool = True):
+        """
+        Persiste o contexto: acrescenta ao journal apenas o que mudou desde o
+        último save e, periodicamente, grava um checkpoint completo em
+        context.json (via arquivo temporário e rename atômico). Saves pedidos
+        em sequência rápida são coalescidos e gravados fora do event loop.
+        Com `wait=False` não espera a gravação; veja `flush_context`.
+        """
+        await self._get_journal().request_save(self, wait=wait)
+
+    async def flush_context(self, timeout: Optional[float] = None) -> bool:
+        """Barreira para shutdown e timeouts: espera os saves pendentes serem gravados."""
+        if self._journal is None:
+            return True
+        return await self._journal.flush(timeout)
+
+    def to_bytes(self, codec: Optional[str] = None) -> bytes:
+        """Serializa o contexto no formato binário versionado"""
+        with paused_gc():
+            return encode_document("ProjectContext", self.model_dump(mode='json'), codec)
+
     @classmethod
-    def load_from_file(cls, context_file: Path) -> 'ProjectContext':
-        """Carrega contexto de arquivo JSON"""
-        with open(context_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
+    def from_bytes(cls, payload: bytes, trusted: bool = True) -> 'ProjectContext':
+        """Carrega um contexto serializado em formato binário ou JSON legado"""
+        return cls.from_data(decode_document(payload, "ProjectContext"), trusted)
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any], trusted: bool = True) -> 'ProjectContext':
+        """
+        Constrói o contexto a partir dos dados serializados. Com `trusted=True`
+        (dados gravados pelo próprio engine), os detalhes de cada tarefa são
+        validados diretamente pela classe do seu tipo, sem a busca da Union
+        de detalhes, que domina o custo de validação, e o `updated_at` gravado
+        é preservado. O coletor de ciclos fica suspenso durante a construção.
+        """
+        if not trusted:
+            return cls(**data)
+        with paused_gc():
+            return cls._from_trusted_data(data)
+
+    @classmethod
+    def _from_trusted_data(cls, data: Dict[str, Any]) -> 'ProjectContext':
+        data = dict(data)
+        resolved = []
+        for list_name in TASK_LISTS:
+            tasks = []
+            for task in data.get(list_name, []):
+                details = task.get('details')
+                details_cls = _DETAILS_BY_TYPE.get(task.get('type'))
+                if isinstance(details, dict) and details_cls is not None \
+                        and details.keys() == details_cls.model_fields.keys():
+                    task = {**task, 'details': None}
+                    resolved.append((list_name, len(tasks), details_cls, details, task.get('updated_at')))
+                tasks.append(task)
+            data[list_name] = tasks
+
+        context = cls(**data)
+        for list_name, position, details_cls, details, updated_at in resolved:
+            task = getattr(context, list_name)[position]
+            # Atribuição comum: Task não valida atribuições, então o validador de updated_at não reescreve o valor gravado
+            task.details = details_cls.model_validate(details)
+            if isinstance(updated_at, str):
+                task.updated_at = datetime.fromisoformat(updated_at)
+        return context
+
+    @classmethod
+    def load_from_file(cls, context_file: Path, trusted: bool = True) -> 'ProjectContext':
+        """
+        Carrega o contexto reaplicando o journal sobre o checkpoint (context.json
+        ou context.bin; arquivos JSON legados são migrados ao ler)
+        """
+        context_file = Path(context_file)
+        data, generation, entries = ContextJournal.replay(context_file)
+
         # Converter string de volta para Path
         if 'workspace_path' in data:
             data['workspace_path'] = Path(data['workspace_path'])
-            
-        return cls(**data)
\ No newline at end of file
+
+        context = cls.from_data(data, trusted)
+        if context.get_context_file() == context_file:
+            context._get_journal().track(context, generation, entries)
+        return context
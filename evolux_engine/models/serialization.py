@@ -0,0 +1,170 @@
+import gc
+import gzip
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import msgpack
+    IS_MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    IS_MSGPACK_AVAILABLE = False
+
+try:
+    import orjson
+    IS_ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    IS_ORJSON_AVAILABLE = False
+
+# Formato binário: MAGIC + versão do envelope (1 byte) + codec (1 byte) + corpo
+# codificado {"schema": tipo do documento, "version": versão do schema, "data": ...}
+MAGIC = b"EVXB"
+FORMAT_VERSION = 1
+GZIP_MAGIC = b"\x1f\x8b"
+
+STORAGE_FORMATS = ("json", "binary")
+BINARY_SUFFIX = ".bin"
+
+CODECS = {"msgpack": 1, "orjson": 2, "json": 3}
+_CODEC_NAMES = {codec_id: name for name, codec_id in CODECS.items()}
+
+# Versão atual do schema de cada tipo de documento. Arquivos JSON legados
+# (sem envelope) são tratados como versão 0.
+SCHEMA_VERSIONS = {
+    "ProjectContext": 1,
+    "ContextSnapshot": 2,
+    "BackupManifest": 2,
+}
+
+# (tipo, versão) -> função que converte os dados dessa versão para a seguinte
+MIGRATIONS: Dict[Tuple[str, int], Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+
+def register_migration(kind: str, from_version: int):
+    """Registra a migração dos dados de `kind` da versão `from_version` para a seguinte."""
+    def decorator(function: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        MIGRATIONS[(kind, from_version)] = function
+        return function
+    return decorator
+
+
+def _from_legacy_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    # A versão 1 tem o mesmo layout dos arquivos JSON gravados antes do envelope
+    return data
+
+
+for _kind in SCHEMA_VERSIONS:
+    register_migration(_kind, 0)(_from_legacy_json)
+
+
+@register_migration("ContextSnapshot", 1)
+def _snapshot_full_copy(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Na versão 2 os snapshots podem ser keyframes ou deltas; os anteriores são cópias
+    # completas. Snapshots json.gz não têm envelope e chegam aqui com o `kind` já gravado
+    return {"kind": "full", **data}
+
+
+@register_migration("BackupManifest", 1)
+def _manifest_zip_format(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Na versão 2 os backups são manifestos com blobs endereçados por conteúdo; os anteriores são .zip.
+    # Manifestos JSON não têm envelope e chegam aqui com o `format` já gravado
+    return {"format": "zip", **data}
+
+
+@contextmanager
+def paused_gc():
+    """
+    Suspende o coletor de ciclos enquanto um documento grande é decodificado
+    e validado: os milhares de dicts e modelos criados disparam coletas
+    repetidas, que chegam a dominar o tempo de carga.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def default_codec() -> str:
+    """Codec usado por padrão: msgpack, orjson ou, na falta de ambos, JSON compacto."""
+    if IS_MSGPACK_AVAILABLE:
+        return "msgpack"
+    if IS_ORJSON_AVAILABLE:
+        return "orjson"
+    return "json"
+
+
+def _dumps(codec: str, body: Dict[str, Any]) -> bytes:
+    if codec == "msgpack":
+        return msgpack.packb(body, use_bin_type=True)
+    if codec == "orjson":
+        return orjson.dumps(body)
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _loads(codec: str, payload: bytes) -> Dict[str, Any]:
+    if codec == "msgpack":
+        if not IS_MSGPACK_AVAILABLE:
+            raise ValueError("Documento gravado com msgpack, mas o pacote msgpack não está instalado")
+        return msgpack.unpackb(payload, raw=False)
+    if codec == "orjson" and IS_ORJSON_AVAILABLE:
+        return orjson.loads(payload)
+    # orjson grava JSON padrão: sem o pacote, o json da biblioteca padrão lê o documento
+    return json.loads(payload)
+
+
+def is_binary_document(payload: bytes) -> bool:
+    return payload[:len(MAGIC)] == MAGIC
+
+
+def encode_document(kind: str, data: Dict[str, Any], codec: Optional[str] = None) -> bytes:
+    """
+    Codifica `data` (somente tipos JSON: use `model_dump(mode="json")`) no
+    formato binário, registrando o tipo do documento e a versão do schema.
+    """
+    codec = codec or default_codec()
+    if codec not in CODECS:
+        raise ValueError(f"Codec desconhecido: {codec}")
+    body = {"schema": kind, "version": SCHEMA_VERSIONS[kind], "data": data}
+    return MAGIC + bytes([FORMAT_VERSION, CODECS[codec]]) + _dumps(codec, body)
+
+
+def decode_document(payload: bytes, kind: str) -> Dict[str, Any]:
+    """
+    Decodifica um documento de `kind` no formato binário ou em JSON legado
+    (opcionalmente com gzip) e o migra para a versão atual do schema.
+    """
+    if payload[:2] == GZIP_MAGIC:
+        payload = gzip.decompress(payload)
+
+    if is_binary_document(payload):
+        format_version, codec_id = payload[len(MAGIC)], payload[len(MAGIC) + 1]
+        if format_version != FORMAT_VERSION or codec_id not in _CODEC_NAMES:
+            raise ValueError(f"Envelope binário não suportado (formato {format_version}, codec {codec_id})")
+        with paused_gc():
+            body = _loads(_CODEC_NAMES[codec_id], payload[len(MAGIC) + 2:])
+        if body.get("schema") != kind:
+            raise ValueError(f"Documento do tipo '{body.get('schema')}' lido como '{kind}'")
+        version, data = body["version"], body["data"]
+    else:
+        with paused_gc():
+            version, data = 0, json.loads(payload)
+
+    current = SCHEMA_VERSIONS[kind]
+    if version > current:
+        raise ValueError(f"{kind} na versão {version} do schema; esta versão do engine lê até a {current}")
+    while version < current:
+        data = MIGRATIONS[(kind, version)](data)
+        version += 1
+    return data
+
+
+def read_document(path: Union[str, Path], kind: str) -> Dict[str, Any]:
+    """Lê e decodifica um documento de `kind` de um arquivo binário ou JSON legado."""
+    with open(path, "rb") as f:
+        return decode_document(f.read(), kind)
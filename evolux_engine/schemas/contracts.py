@@ -76,6 +76,9 @@ class ResourceUsage(BaseModel):
     cpu_percent_peak: Optional[float] = None
     memory_mb_peak: Optional[float] = None
     execution_time_ms: Optional[int] = None
+    cpu_time_ms: Optional[int] = None # CPU de usuário + sistema da árvore de processos
+    io_read_bytes: Optional[int] = None
+    io_write_bytes: Optional[int] = None
 
 class ExecutionResult(BaseModel):
     """Resultado da execução de um comando ou ação."""
@@ -399,9 +402,33 @@ class GlobalConfig(BaseSettings):
     default_model_executor_command_gen: str = Field(default="gemini-2.5-flash", env="EVOLUX_MODEL_EXECUTOR_COMMAND_GEN")
     default_model_validator: str = Field(default="gemini-2.5-flash", env="EVOLUX_MODEL_VALIDATOR")
 
-    max_concurrent_tasks: int = Field(default=1, env="EVOLUX_MAX_CONCURRENT_TASKS") # Começar com 1 para simplicidade
+    max_concurrent_tasks: int = Field(default=5, env="EVOLUX_MAX_CONCURRENT_TASKS") # Limite de tarefas simultâneas do ReadyQueueScheduler
     logging_level: str = Field(default="INFO", env="EVOLUX_LOGGING_LEVEL")
+
+    # Cache cognitivo persistente (SQLite em WAL, compartilhado entre processos)
+    cognitive_cache_persistent: bool = Field(default=True, env="EVOLUX_COGNITIVE_CACHE_PERSISTENT")
+    cognitive_cache_path: Optional[str] = Field(None, env="EVOLUX_COGNITIVE_CACHE_PATH") # Padrão: <project_base_dir>/.cognitive_cache.db
+
+    # Cota inicial por provedor + chave de API, compartilhada por todos os LLMClients (ajustada pelos cabeçalhos do provedor)
+    llm_requests_per_minute: int = Field(default=15, env="EVOLUX_LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: Optional[int] = Field(None, env="EVOLUX_LLM_TOKENS_PER_MINUTE") # None: definido pelos cabeçalhos do provedor
+
+    # Cache de respostas completas da LLM (compartilhado por todos os LLMClients)
+    llm_response_cache_enabled: bool = Field(default=True, env="EVOLUX_LLM_RESPONSE_CACHE_ENABLED")
+    llm_response_cache_deterministic_only: bool = Field(default=True, env="EVOLUX_LLM_RESPONSE_CACHE_DETERMINISTIC_ONLY") # Só temperatura 0
+    llm_response_cache_max_entries: int = Field(default=1000, env="EVOLUX_LLM_RESPONSE_CACHE_MAX_ENTRIES")
+    llm_response_cache_persistent: bool = Field(default=False, env="EVOLUX_LLM_RESPONSE_CACHE_PERSISTENT") # Opt-in: grava SQLite em disco
+    llm_response_cache_path: Optional[str] = Field(None, env="EVOLUX_LLM_RESPONSE_CACHE_PATH") # Padrão: <project_base_dir>/.llm_response_cache.db
+
+    # Hedging: após o p95 de latência do modelo primário, a requisição também vai ao próximo modelo da cadeia de fallback
+    llm_hedging_enabled: bool = Field(default=False, env="EVOLUX_LLM_HEDGING_ENABLED")
+    llm_hedging_min_samples: int = Field(default=20, env="EVOLUX_LLM_HEDGING_MIN_SAMPLES")
+    llm_hedging_max_cost_ratio: float = Field(default=1.0, env="EVOLUX_LLM_HEDGING_MAX_COST_RATIO") # Custo do modelo de hedge / primário
+    llm_hedging_max_extra_token_ratio: float = Field(default=0.1, env="EVOLUX_LLM_HEDGING_MAX_EXTRA_TOKEN_RATIO") # Tokens extras / tokens totais
     execution_mode: str = Field(default="producao", env="EVOLUX_EXECUTION_MODE")
+
+    # Orçamento de tokens do contexto do projeto injetado nos prompts (seções comprimidas antes de serem descartadas)
+    prompt_context_max_tokens: int = Field(default=2000, env="EVOLUX_PROMPT_CONTEXT_MAX_TOKENS")
     
     # Configurações de timeout (em segundos)
     default_task_timeout: int = Field(default=300, env="EVOLUX_DEFAULT_TASK_TIMEOUT")  # 5 minutos padrão
@@ -3,19 +3,26 @@ import asyncio
 import pickle
 import gzip
 import shutil
-from typing import Dict, List, Optional, Any, Set, Union
+from typing import Dict, List, Optional, Any, Set, Tuple, Union
 from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime, timedelta
 from enum import Enum
 import hashlib
 import threading
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict
+from functools import partial
 import uuid
 
-from evolux_engine.models.project_context import ProjectContext
+from evolux_engine.models.project_context import ProjectContext, CONTEXT_FILES
+from evolux_engine.models.context_journal import context_records, fingerprint_records, records_to_data
+from evolux_engine.models.serialization import encode_document, read_document
 from evolux_engine.utils.logging_utils import get_structured_logger
 from evolux_engine.config.advanced_config import AdvancedSystemConfig
+from evolux_engine.utils.coalescing_writer import atomic_write_bytes, get_context_writer
+from evolux_engine.services.workspace_usage import get_workspace_usage
+from evolux_engine.services.context_search_index import ContextSearchIndex
+from evolux_engine.services.backup_system import BackupSystem
 
 logger = get_structured_logger("advanced_context_manager")
 
@@ -35,14 +42,21 @@ class PersistenceFormat(Enum):
 
 @dataclass
 class ContextSnapshot:
-    """Snapshot de um contexto em um momento específico"""
+    """
+    Snapshot de um contexto em um momento específico. Em memória ficam só os
+    metadados: `data` é None e o conteúdo é reconstruído do disco sob demanda
+    (`AdvancedContextManager.get_snapshot_data`).
+    """
     snapshot_id: str
     context_id: str
     timestamp: datetime
     version: int
-    data: Dict[str, Any]
+    data: Optional[Dict[str, Any]] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
     checksum: Optional[str] = None
+    kind: str = "keyframe"  # "keyframe", "delta" ou "full" (cópia completa legada)
+    base_version: Optional[int] = None
+    size_bytes: int = 0
 
 @dataclass
 class ContextIndex:
@@ -60,11 +74,18 @@ class ContextIndex:
 
 @dataclass
 class CacheEntry:
-    """Entrada do cache de contextos"""
+    """
+    Entrada do cache de contextos. `fingerprint` é o hash da última versão
+    serializada gravada (ou lida), usado para detectar modificações feitas
+    no contexto sem `mark_dirty`; `size_bytes` é o tamanho serializado, que
+    estima a memória ocupada.
+    """
     context: ProjectContext
     last_accessed: datetime
     access_count: int = 0
     dirty: bool = False
+    fingerprint: Optional[bytes] = None
+    size_bytes: int = 0
 
 class AdvancedContextManager:
     """
@@ -84,25 +105,47 @@ class AdvancedContextManager:
         self.base_dir = Path(config.project_base_directory)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
-        # Cache settings
-        self.cache_size = 100  # Maximum contexts in memory
-        self.cache: Dict[str, CacheEntry] = {}
-        self.cache_access_order = deque()
+        # Cache LRU (ordem de acesso do OrderedDict), limitado por número de
+        # contextos e pela memória estimada
+        self.cache_size = config.context_cache_size
+        self.cache_max_bytes = config.context_cache_max_mb * 1024 * 1024
+        self.cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.cache_bytes = 0
+        self.write_back_interval = config.context_write_back_seconds
         
-        # Index for fast search
+        # Index for fast search: em memória para acesso por ID e em SQLite (FTS5)
+        # para busca, paginação e facetas; só os contextos alterados são regravados
         self.context_index: Dict[str, ContextIndex] = {}
-        self.index_path = self.base_dir / ".context_index.json"
+        self.index_path = self.base_dir / ".context_index.db"
+        self.legacy_index_path = self.base_dir / ".context_index.json"
+        self.search_index = ContextSearchIndex(str(self.index_path))
+        self._index_dirty: Dict[str, Optional[List[str]]] = {}
         
         # Versioning
         self.snapshots: Dict[str, List[ContextSnapshot]] = defaultdict(list)
         self.snapshots_dir = self.base_dir / ".snapshots"
         self.snapshots_dir.mkdir(exist_ok=True)
+        # Snapshots são gravados como deltas estruturais sobre o anterior, com
+        # um keyframe completo a cada `snapshot_keyframe_interval` versões
+        self.snapshot_keyframe_interval = 10
+        self._snapshot_fingerprints: Dict[str, Dict[str, bytes]] = {}
+        self._snapshot_history_loaded: Set[str] = set()
         
         # Backup settings
         self.backup_dir = self.base_dir / ".backups"
         self.backup_dir.mkdir(exist_ok=True)
         self.backup_interval = timedelta(hours=config.backup_interval_hours)
         self.last_backup = datetime.now()
+        self.backup_keep_count = 5  # Backups automáticos mantidos por projeto
+        self.backup_system = BackupSystem(str(self.backup_dir), storage_format=config.context_storage_format)
+        
+        # Saves coalescidos por projeto e gravados fora da thread chamadora
+        self._writer = get_context_writer()
+        self.compression_threshold = 100 * 1024  # > 100KB, use compression
+        self.storage_format = config.context_storage_format
+        
+        # Tamanho e arquivos de cada workspace, mantidos pelos eventos do FileService
+        self._usage = get_workspace_usage()
         
         # Threading
         self._lock = threading.RLock()
@@ -117,15 +160,16 @@ class AdvancedContextManager:
             'cache_hits': 0,
             'cache_misses': 0,
             'snapshots_created': 0,
-            'backups_created': 0
+            'backups_created': 0,
+            'cache_evictions': 0,
+            'write_backs': 0
         }
         
         # Load existing index
         self._load_index()
         
-        # Start background tasks if configured
-        if config.backup_enabled:
-            self._start_background_tasks()
+        # Start background tasks (write-back do cache; backup se configurado)
+        self._start_background_tasks()
         
         logger.info("AdvancedContextManager initialized")
     
@@ -138,27 +182,35 @@ class AdvancedContextManager:
         self._background_thread.start()
     
     def _background_loop(self):
-        """Loop de tarefas em background"""
-        while not self._shutdown_event.is_set():
+        """
+        Loop de tarefas em background: grava os contextos modificados a cada
+        `write_back_interval` segundos e faz a manutenção a cada 5 minutos
+        """
+        last_maintenance = datetime.now()
+        while not self._shutdown_event.wait(self.write_back_interval):
             try:
                 # Auto-save dirty cache entries
                 self._auto_save_dirty_cache()
                 
+                if datetime.now() - last_maintenance < timedelta(seconds=300):
+                    continue
+                last_maintenance = datetime.now()
+                
                 # Backup if needed
-                if self._should_create_backup():
+                if self.config.backup_enabled and self._should_create_backup():
                     self._create_automatic_backup()
                 
                 # Cleanup old snapshots
                 self._cleanup_old_snapshots()
                 
+                # Reconcile workspace sizes changed outside the FileService
+                self.reconcile_workspace_usage()
+                
                 # Update index
                 self._save_index()
                 
             except Exception as e:
                 logger.error(f"Error in background loop: {str(e)}")
-            
-            # Wait before next iteration
-            self._shutdown_event.wait(300)
     
     def create_new_project_context(self, 
                                  goal: str,
@@ -183,6 +235,7 @@ class AdvancedContextManager:
             
             # Create directory structure
             self._create_workspace_structure(workspace_path)
+            usage = self._usage.reconcile(workspace_path)
             
             # Create context
             context = ProjectContext(
@@ -208,9 +261,10 @@ class AdvancedContextManager:
                 created_at=datetime.now(),
                 last_modified=datetime.now(),
                 tags=tags or set(),
-                size_bytes=0,
-                file_count=0
+                size_bytes=usage.size_bytes,
+                file_count=usage.file_count
             )
+            self._mark_index_dirty(project_id, list(context.artifacts_state))
             
             # Add to cache
             self._add_to_cache(context)
@@ -236,7 +290,7 @@ class AdvancedContextManager:
                 cache_entry = self.cache[project_id]
                 cache_entry.last_accessed = datetime.now()
                 cache_entry.access_count += 1
-                self._update_cache_order(project_id)
+                self.cache.move_to_end(project_id)
                 self.metrics['cache_hits'] += 1
                 
                 logger.debug(f"Context loaded from cache for project_id: {project_id}")
@@ -262,6 +316,7 @@ class AdvancedContextManager:
             # Update index access time
             if project_id in self.context_index:
                 self.context_index[project_id].last_modified = datetime.now()
+                self._mark_index_dirty(project_id)
             
             logger.info(f"Project context loaded for project_id: {project_id}, version: {version}")
             
@@ -281,14 +336,16 @@ class AdvancedContextManager:
                     return False
                 
                 # Save to disk
-                success = self._save_context_to_disk(context)
-                if not success:
+                payload = self._save_context_to_disk(context)
+                if payload is None:
                     return False
                 
                 # Update cache
-                if context.project_id in self.cache:
-                    self.cache[context.project_id].context = context
-                    self.cache[context.project_id].dirty = False
+                entry = self.cache.get(context.project_id)
+                if entry is not None:
+                    entry.context = context
+                    self._mark_clean(entry, payload)
+                    self._enforce_cache_limits()
                 
                 # Create snapshot if requested
                 if create_snapshot:
@@ -310,145 +367,341 @@ class AdvancedContextManager:
     
     def _load_context_from_disk(self, project_id: str) -> ProjectContext:
         """Carrega contexto do disco"""
-        context_path = self.base_dir / project_id / "context.json"
+        # Um save ainda pendente deste projeto precisa chegar ao disco antes da leitura
+        self._writer.flush(self._writer_key(project_id))
         
-        if not context_path.exists():
-            # Try compressed format
-            compressed_path = self.base_dir / project_id / "context.json.gz"
-            if compressed_path.exists():
-                with gzip.open(compressed_path, 'rt') as f:
-                    data = json.load(f)
-            else:
-                raise FileNotFoundError(f"No project found with ID '{project_id}'")
-        else:
-            with open(context_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        context_path = ProjectContext.find_context_file(self.base_dir / project_id)
+        
+        if context_path is not None:
+            # Checkpoint + journal gravados por ProjectContext.save_context
+            return ProjectContext.load_from_file(context_path)
+        
+        # Try compressed format
+        compressed_path = self.base_dir / project_id / "context.json.gz"
+        if not compressed_path.exists():
+            raise FileNotFoundError(f"No project found with ID '{project_id}'")
+        with gzip.open(compressed_path, 'rt') as f:
+            data = json.load(f)
         
         # Convert to ProjectContext
         context = ProjectContext(**data)
         return context
     
-    def _save_context_to_disk(self, context: ProjectContext) -> bool:
-        """Salva contexto no disco"""
+    def _writer_key(self, project_id: str) -> str:
+        return f"{self.base_dir / project_id}:advanced_context"
+    
+    def _serialize_context(self, context: ProjectContext) -> bytes:
+        if self.storage_format == "binary":
+            return context.to_bytes()
+        return context.model_dump_json().encode('utf-8')
+    
+    def _save_context_to_disk(self, context: ProjectContext, payload: Optional[bytes] = None) -> Optional[bytes]:
+        """
+        Serializa o contexto uma única vez e agenda a gravação no escritor
+        compartilhado: saves do mesmo projeto dentro da janela de coalescência
+        viram uma única escrita, feita fora da thread chamadora com fsync e
+        rename atômico. Use `flush` para esperar a gravação. Retorna o
+        conteúdo agendado, ou None em caso de erro.
+        """
         try:
+            binary = self.storage_format == "binary"
+            if payload is None:
+                payload = self._serialize_context(context)
             project_path = self.base_dir / context.project_id
-            project_path.mkdir(parents=True, exist_ok=True)
-            
-            # Prepare data
-            data = context.model_dump()
-            
-            # Choose format based on size
-            json_data = json.dumps(data, indent=2, default=str)
-            data_size = len(json_data.encode('utf-8'))
-            
-            if data_size > 100 * 1024:  # > 100KB, use compression
-                context_path = project_path / "context.json.gz"
-                with gzip.open(context_path, 'wt', encoding='utf-8') as f:
-                    f.write(json_data)
-            else:
-                context_path = project_path / "context.json"
-                with open(context_path, 'w', encoding='utf-8') as f:
-                    f.write(json_data)
-            
-            return True
+            self._writer.submit(self._writer_key(context.project_id),
+                                partial(self._write_context_payload, project_path, payload, binary))
+            return payload
             
         except Exception as e:
             logger.error(f"Failed to save context to disk for project_id: {context.project_id}, error: {str(e)}")
-            return False
+            return None
+    
+    def _write_context_payload(self, project_path: Path, payload: bytes, binary: bool = False):
+        """Grava o contexto serializado (executado no pool do escritor)"""
+        project_path.mkdir(parents=True, exist_ok=True)
+        
+        # Choose format based on size
+        if binary:
+            context_path = project_path / CONTEXT_FILES["binary"]
+        elif len(payload) > self.compression_threshold:
+            context_path = project_path / "context.json.gz"
+            payload = gzip.compress(payload)
+        else:
+            context_path = project_path / CONTEXT_FILES["json"]
+        old_size = context_path.stat().st_size if context_path.exists() else None
+        atomic_write_bytes(context_path, payload)
+        self._usage.record_write(project_path, old_size, len(payload))
+        
+        # Arquivos nos outros formatos ficariam desatualizados e poderiam ter precedência na leitura
+        for stale_name in (*CONTEXT_FILES.values(), "context.json.gz"):
+            stale_path = project_path / stale_name
+            if stale_path != context_path and stale_path.exists():
+                self._usage.record_delete(project_path, stale_path.stat().st_size)
+                stale_path.unlink(missing_ok=True)
+    
+    def _snapshot_path(self, project_id: str, version: int) -> Path:
+        """Caminho do snapshot: o arquivo existente em qualquer formato, ou o do formato atual"""
+        candidates = [self.snapshots_dir / f"{project_id}_{version}.bin",
+                      self.snapshots_dir / f"{project_id}_{version}.json.gz"]
+        for path in candidates:
+            if path.exists():
+                return path
+        return candidates[0] if self.storage_format == "binary" else candidates[1]
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Barreira para shutdown e timeouts: espera os saves pendentes serem gravados"""
+        return self._writer.flush(timeout=timeout)
     
     def _create_snapshot(self, 
                        context: ProjectContext,
                        message: str = "") -> ContextSnapshot:
-        """Cria snapshot do contexto"""
-        
+        """
+        Cria snapshot do contexto. Grava só os registros (cabeçalho, tarefas,
+        ordem das listas e artefatos) que mudaram desde o snapshot anterior,
+        ou um keyframe com todos eles a cada `snapshot_keyframe_interval`
+        versões, quando não há base em memória ou quando há IDs de tarefa
+        repetidos (caso em que grava uma cópia completa).
+        """
+        project_id = context.project_id
+        history = self._get_snapshot_history(project_id)
         snapshot_id = str(uuid.uuid4())
-        version = len(self.snapshots[context.project_id]) + 1
+        version = history[-1].version + 1 if history else 1
         
         # Create snapshot data
-        data = context.model_dump()
-        data_json = json.dumps(data, default=str)
-        checksum = hashlib.sha256(data_json.encode()).hexdigest()
+        records, duplicated = context_records(context)
+        fingerprints = fingerprint_records(records)
+        previous = self._snapshot_fingerprints.get(project_id)
+        since_keyframe = 0
+        for snapshot in reversed(history):
+            if snapshot.kind != "delta":
+                break
+            since_keyframe += 1
+        
+        document: Dict[str, Any] = {
+            'snapshot_id': snapshot_id,
+            'context_id': project_id,
+            'timestamp': datetime.now().isoformat(),
+            'version': version,
+            'metadata': {"message": message},
+        }
+        if duplicated:
+            data = context.model_dump(mode='json')
+            document.update(kind="full", data=data)
+            checksum = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+            fingerprints = None
+        elif previous is None or not history or since_keyframe + 1 >= self.snapshot_keyframe_interval:
+            document.update(kind="keyframe", records=records)
+        else:
+            document.update(
+                kind="delta",
+                base_version=history[-1].version,
+                set={key: value for key, value in records.items() if previous.get(key) != fingerprints[key]},
+                remove=[key for key in previous.keys() - fingerprints.keys()],
+            )
+        if fingerprints is not None:
+            checksum = hashlib.sha256(b"".join(
+                key.encode() + fingerprints[key] for key in sorted(fingerprints)
+            )).hexdigest()
+        document['checksum'] = checksum
+        
+        # Save snapshot to disk
+        snapshot_path = self._snapshot_path(project_id, version)
+        size_bytes = self._write_snapshot_document(snapshot_path, document)
         
         snapshot = ContextSnapshot(
             snapshot_id=snapshot_id,
-            context_id=context.project_id,
-            timestamp=datetime.now(),
+            context_id=project_id,
+            timestamp=datetime.fromisoformat(document['timestamp']),
             version=version,
-            data=data,
-            metadata={"message": message},
-            checksum=checksum
+            metadata=document['metadata'],
+            checksum=checksum,
+            kind=document['kind'],
+            base_version=document.get('base_version'),
+            size_bytes=size_bytes
         )
         
-        # Save snapshot to disk
-        snapshot_path = self.snapshots_dir / f"{context.project_id}_{version}.json.gz"
-        with gzip.open(snapshot_path, 'wt', encoding='utf-8') as f:
-            json.dump({
-                'snapshot_id': snapshot_id,
-                'context_id': context.project_id,
-                'timestamp': snapshot.timestamp.isoformat(),
-                'version': version,
-                'data': data,
-                'metadata': snapshot.metadata,
-                'checksum': checksum
-            }, f, indent=2, default=str)
-        
-        # Add to memory
-        self.snapshots[context.project_id].append(snapshot)
+        # Add to memory (metadata only)
+        history.append(snapshot)
+        if fingerprints is None:
+            self._snapshot_fingerprints.pop(project_id, None)
+        else:
+            self._snapshot_fingerprints[project_id] = fingerprints
         
         # Update metrics
         self.metrics['snapshots_created'] += 1
         
-        logger.debug(f"Context snapshot created for project_id: {context.project_id}, version: {version}, message: {message}")
+        logger.debug(f"Context snapshot created for project_id: {project_id}, version: {version}, kind: {snapshot.kind}, size_bytes: {size_bytes}, message: {message}")
         
         return snapshot
     
-    def _load_context_from_snapshot(self, project_id: str, version: int) -> ProjectContext:
-        """Carrega contexto de um snapshot específico"""
-        
-        # Check in memory first
-        for snapshot in self.snapshots[project_id]:
-            if snapshot.version == version:
-                return ProjectContext(**snapshot.data)
-        
-        # Load from disk
-        snapshot_path = self.snapshots_dir / f"{project_id}_{version}.json.gz"
-        if not snapshot_path.exists():
-            raise FileNotFoundError(f"Snapshot version {version} not found for project {project_id}")
-        
-        with gzip.open(snapshot_path, 'rt', encoding='utf-8') as f:
-            snapshot_data = json.load(f)
+    def _write_snapshot_document(self, snapshot_path: Path, document: Dict[str, Any]) -> int:
+        """Grava o documento do snapshot (binário ou json.gz) e retorna seu tamanho em disco"""
+        if snapshot_path.suffix == ".bin":
+            payload = encode_document("ContextSnapshot", document)
+        else:
+            payload = gzip.compress(json.dumps(document, default=str).encode('utf-8'))
+        atomic_write_bytes(snapshot_path, payload, fsync=False)
+        return len(payload)
+    
+    def _get_snapshot_history(self, project_id: str) -> List[ContextSnapshot]:
+        """
+        Metadados dos snapshots do projeto, carregados do disco na primeira vez
+        (snapshots de execuções anteriores continuam a numeração e as cadeias)
+        """
+        history = self.snapshots[project_id]
+        if project_id in self._snapshot_history_loaded:
+            return history
+        self._snapshot_history_loaded.add(project_id)
         
-        return ProjectContext(**snapshot_data['data'])
+        known = {snapshot.version for snapshot in history}
+        for path in self.snapshots_dir.glob(f"{project_id}_*"):
+            name = path.name.removesuffix(".bin").removesuffix(".json.gz")
+            owner, _, version = name.rpartition("_")
+            if owner != project_id or not version.isdigit() or int(version) in known:
+                continue
+            try:
+                document = read_document(path, "ContextSnapshot")
+            except Exception as e:
+                logger.warning(f"Could not read snapshot {path.name}: {str(e)}")
+                continue
+            history.append(ContextSnapshot(
+                snapshot_id=document['snapshot_id'],
+                context_id=project_id,
+                timestamp=datetime.fromisoformat(str(document['timestamp'])),
+                version=int(version),
+                metadata=document.get('metadata', {}),
+                checksum=document.get('checksum'),
+                kind=document['kind'],
+                base_version=document.get('base_version'),
+                size_bytes=path.stat().st_size
+            ))
+        history.sort(key=lambda snapshot: snapshot.version)
+        return history
     
-    def _add_to_cache(self, context: ProjectContext):
-        """Adiciona contexto ao cache com LRU"""
+    def _rebuild_snapshot(self, project_id: str, version: int) -> Tuple[Optional[Dict[str, str]], Optional[Dict[str, Any]]]:
+        """
+        Lê a cadeia de deltas da versão até o keyframe anterior e aplica os
+        registros alterados em ordem. Retorna (registros, None), ou (None, dados)
+        quando a base é uma cópia completa.
+        """
+        chain = []
+        current: Optional[int] = version
+        while current is not None:
+            snapshot_path = self._snapshot_path(project_id, current)
+            if not snapshot_path.exists():
+                raise FileNotFoundError(f"Snapshot version {current} not found for project {project_id}")
+            document = read_document(snapshot_path, "ContextSnapshot")
+            chain.append(document)
+            current = document.get('base_version') if document['kind'] == "delta" else None
         
+        base = chain.pop()
+        if base['kind'] == "full":
+            return None, base['data']
+        records = dict(base['records'])
+        for delta in reversed(chain):
+            for key in delta['remove']:
+                records.pop(key, None)
+            records.update(delta['set'])
+        return records, None
+    
+    def get_snapshot_data(self, project_id: str, version: int) -> Dict[str, Any]:
+        """Reconstrói os dados do contexto em uma versão a partir do disco"""
+        records, data = self._rebuild_snapshot(project_id, version)
+        return data if records is None else records_to_data(records)
+    
+    def _load_context_from_snapshot(self, project_id: str, version: int) -> ProjectContext:
+        """Carrega contexto de um snapshot específico"""
+        return ProjectContext.from_data(self.get_snapshot_data(project_id, version))
+    
+    def _rebase_snapshot(self, project_id: str, snapshot: ContextSnapshot):
+        """Regrava um snapshot delta como keyframe, para que seus ancestrais possam ser removidos"""
+        if snapshot.kind == "full":
+            return
+        snapshot_path = self._snapshot_path(project_id, snapshot.version)
+        document = read_document(snapshot_path, "ContextSnapshot")
+        if document['kind'] == "delta":
+            records, _ = self._rebuild_snapshot(project_id, snapshot.version)
+            for key in ('set', 'remove', 'base_version'):
+                document.pop(key, None)
+            document.update(kind="keyframe", records=records)
+            snapshot.size_bytes = self._write_snapshot_document(snapshot_path, document)
+        snapshot.kind, snapshot.base_version = "keyframe", None
+    
+    def _add_to_cache(self, context: ProjectContext, payload: Optional[bytes] = None):
+        """
+        Adiciona contexto ao cache com LRU. `payload` é a versão serializada
+        que está em disco (se omitida, o contexto é serializado aqui), base da
+        detecção de modificações e da estimativa de memória.
+        """
         project_id = context.project_id
+        self._remove_from_cache(project_id)
         
-        # Check if cache is full
-        if len(self.cache) >= self.cache_size and project_id not in self.cache:
-            # Remove LRU item
-            lru_id = self.cache_access_order.popleft()
-            if lru_id in self.cache:
-                # Save if dirty
-                if self.cache[lru_id].dirty:
-                    self.save_project_context(self.cache[lru_id].context)
-                del self.cache[lru_id]
-        
-        # Add/update cache entry
-        self.cache[project_id] = CacheEntry(
+        entry = CacheEntry(
             context=context,
             last_accessed=datetime.now(),
             access_count=1
         )
-        
-        self._update_cache_order(project_id)
+        self._mark_clean(entry, payload if payload is not None else self._serialize_context(context))
+        self.cache[project_id] = entry
+        self.cache_bytes += entry.size_bytes
+        self._enforce_cache_limits()
+    
+    def _enforce_cache_limits(self):
+        """Remove as entradas menos usadas até o cache caber nos limites de número e memória"""
+        while len(self.cache) > 1 and (len(self.cache) > self.cache_size or
+                                       self.cache_bytes > self.cache_max_bytes):
+            _, lru_entry = self.cache.popitem(last=False)
+            self.cache_bytes -= lru_entry.size_bytes
+            self.metrics['cache_evictions'] += 1
+            self._schedule_write_back(lru_entry)
+    
+    def _remove_from_cache(self, project_id: str) -> Optional[CacheEntry]:
+        entry = self.cache.pop(project_id, None)
+        if entry is not None:
+            self.cache_bytes -= entry.size_bytes
+        return entry
+    
+    def _mark_clean(self, entry: CacheEntry, payload: bytes):
+        """Registra `payload` como a versão persistida da entrada"""
+        if self.cache.get(entry.context.project_id) is entry:
+            self.cache_bytes += len(payload) - entry.size_bytes
+        entry.dirty = False
+        entry.fingerprint = hashlib.blake2b(payload, digest_size=16).digest()
+        entry.size_bytes = len(payload)
+    
+    def mark_dirty(self, project_id: str):
+        """Marca o contexto em cache como modificado; ele é gravado no próximo write-back"""
+        with self._lock:
+            entry = self.cache.get(project_id)
+            if entry is not None:
+                entry.dirty = True
+    
+    def _changed_payload(self, entry: CacheEntry) -> Optional[bytes]:
+        """
+        Serializa o contexto da entrada e retorna o resultado se ele difere da
+        versão persistida (marcado com `mark_dirty` ou modificado diretamente)
+        """
+        payload = self._serialize_context(entry.context)
+        if entry.dirty or hashlib.blake2b(payload, digest_size=16).digest() != entry.fingerprint:
+            return payload
+        return None
     
-    def _update_cache_order(self, project_id: str):
-        """Atualiza ordem de acesso do cache"""
-        if project_id in self.cache_access_order:
-            self.cache_access_order.remove(project_id)
-        self.cache_access_order.append(project_id)
+    def _schedule_write_back(self, entry: CacheEntry):
+        """
+        Agenda a gravação de uma entrada removida do cache, se modificada: a
+        serialização e a escrita rodam no pool do escritor, fora do lock
+        """
+        project_id = entry.context.project_id
+        self._writer.submit(self._writer_key(project_id), partial(self._write_back, entry))
+    
+    def _write_back(self, entry: CacheEntry):
+        """Grava a entrada removida do cache (executado no pool do escritor)"""
+        payload = self._changed_payload(entry)
+        if payload is None:
+            return
+        self._write_context_payload(self.base_dir / entry.context.project_id, payload,
+                                    self.storage_format == "binary")
+        self.metrics['write_backs'] += 1
     
     def _validate_context(self, context: ProjectContext) -> bool:
         """Valida integridade do contexto"""
@@ -474,48 +727,90 @@ class AdvancedContextManager:
             index_entry = self.context_index[project_id]
             index_entry.last_modified = datetime.now()
             index_entry.project_name = context.project_name
+            self._mark_index_dirty(project_id, list(context.artifacts_state))
             
-            # Update size and file count
+            # Tamanho e arquivos vêm do índice de uso (O(1)); mudanças feitas
+            # por fora do FileService são reconciliadas em background
             workspace_path = Path(context.workspace_path)
-            if workspace_path.exists():
-                total_size = sum(f.stat().st_size for f in workspace_path.rglob('*') if f.is_file())
-                file_count = len(list(workspace_path.rglob('*')))
-                index_entry.size_bytes = total_size
-                index_entry.file_count = file_count
+            usage = self._usage.get(workspace_path)
+            if usage is None:
+                self._usage.track(workspace_path, index_entry.size_bytes, index_entry.file_count)
+            else:
+                index_entry.size_bytes = usage.size_bytes
+                index_entry.file_count = usage.file_count
+            if self._usage.needs_reconcile(workspace_path):
+                self._writer.submit(f"usage:{workspace_path}", partial(self._reconcile_project_usage, project_id, workspace_path))
+    
+    def _reconcile_project_usage(self, project_id: str, workspace_path: Path):
+        """Varre o workspace e atualiza o tamanho e a contagem de arquivos no índice"""
+        if not workspace_path.exists():
+            return
+        usage = self._usage.reconcile(workspace_path)
+        index_entry = self.context_index.get(project_id)
+        if index_entry is not None:
+            index_entry.size_bytes = usage.size_bytes
+            index_entry.file_count = usage.file_count
+            self._mark_index_dirty(project_id)
+    
+    def reconcile_workspace_usage(self, force: bool = False):
+        """Reconciliação dos workspaces desatualizados (ou de todos, com `force=True`)"""
+        for project_id, index_entry in list(self.context_index.items()):
+            workspace_path = self.base_dir / project_id
+            if force or self._usage.needs_reconcile(workspace_path):
+                try:
+                    self._reconcile_project_usage(project_id, workspace_path)
+                except Exception as e:
+                    logger.warning(f"Failed to reconcile workspace usage for project_id: {project_id}, error: {str(e)}")
     
     def search_contexts(self, 
                        query: Optional[str] = None,
                        tags: Optional[Set[str]] = None,
                        status: Optional[ContextStatus] = None,
                        created_after: Optional[datetime] = None,
-                       limit: int = 50) -> List[ContextIndex]:
-        """Busca contextos baseado em critérios"""
-        
-        results = []
-        
-        for context_index in self.context_index.values():
-            # Filter by query
-            if query and query.lower() not in context_index.project_name.lower() and query.lower() not in context_index.project_goal.lower():
-                continue
-            
-            # Filter by tags
-            if tags and not tags.intersection(context_index.tags):
-                continue
-            
-            # Filter by status
-            if status and context_index.status != status:
-                continue
-            
-            # Filter by creation date
-            if created_after and context_index.created_at < created_after:
-                continue
-            
-            results.append(context_index)
-        
-        # Sort by last modified (newest first)
-        results.sort(key=lambda x: x.last_modified, reverse=True)
-        
-        return results[:limit]
+                       limit: int = 50,
+                       offset: int = 0) -> List[ContextIndex]:
+        """
+        Busca contextos baseado em critérios. `query` casa com prefixos das
+        palavras do nome, objetivo, tags e caminhos de artefatos; resultados
+        ordenados pela última modificação (mais recentes primeiro)
+        """
+        return self.search_contexts_page(query, tags, status, created_after, limit, offset,
+                                         with_facets=False)['results']
+    
+    def search_contexts_page(self,
+                             query: Optional[str] = None,
+                             tags: Optional[Set[str]] = None,
+                             status: Optional[ContextStatus] = None,
+                             created_after: Optional[datetime] = None,
+                             limit: int = 50,
+                             offset: int = 0,
+                             with_facets: bool = True) -> Dict[str, Any]:
+        """
+        Página de resultados da busca com o total de contextos encontrados e,
+        opcionalmente, as contagens por status e por tag (facetas)
+        """
+        self._save_index()
+        status_value = status.value if isinstance(status, ContextStatus) else status
+        rows, total = self.search_index.search(query, tags, status_value, created_after, limit, offset)
+        page = {
+            'results': [self.context_index.get(row['context_id']) or self._index_from_row(row) for row in rows],
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+        }
+        if with_facets:
+            page['facets'] = self.search_index.facets(query, tags, status_value, created_after)
+        return page
+    
+    @staticmethod
+    def _index_from_row(row: Dict[str, Any]) -> ContextIndex:
+        return ContextIndex(**{**row, 'status': ContextStatus(row['status'])})
+    
+    def _mark_index_dirty(self, project_id: str, artifacts: Optional[List[str]] = None):
+        """Agenda a gravação da entrada no índice persistente (`artifacts` None mantém os indexados)"""
+        if artifacts is None and self._index_dirty.get(project_id) is not None:
+            return
+        self._index_dirty[project_id] = artifacts
     
     def list_all_contexts(self) -> List[ContextIndex]:
         """Lista todos os contextos"""
@@ -531,27 +826,28 @@ class AdvancedContextManager:
                     self.archive_project_context(project_id)
                 
                 # Remove from cache
-                if project_id in self.cache:
-                    del self.cache[project_id]
-                    if project_id in self.cache_access_order:
-                        self.cache_access_order.remove(project_id)
+                self._remove_from_cache(project_id)
                 
                 # Remove workspace directory
                 workspace_path = self.base_dir / project_id
                 if workspace_path.exists():
                     shutil.rmtree(workspace_path)
+                self._usage.forget(workspace_path)
                 
                 # Remove snapshots
-                for snapshot in self.snapshots[project_id]:
-                    snapshot_path = self.snapshots_dir / f"{project_id}_{snapshot.version}.json.gz"
+                for snapshot in self._get_snapshot_history(project_id):
+                    snapshot_path = self._snapshot_path(project_id, snapshot.version)
                     if snapshot_path.exists():
                         snapshot_path.unlink()
                 
                 del self.snapshots[project_id]
+                self._snapshot_fingerprints.pop(project_id, None)
                 
                 # Remove from index
                 if project_id in self.context_index:
                     del self.context_index[project_id]
+                self._index_dirty.pop(project_id, None)
+                self.search_index.delete(project_id)
                 
                 logger.info(f"Project context deleted for project_id: {project_id}")
                 return True
@@ -567,6 +863,7 @@ class AdvancedContextManager:
             # Update status in index
             if project_id in self.context_index:
                 self.context_index[project_id].status = ContextStatus.ARCHIVED
+                self._mark_index_dirty(project_id)
             
             # Create archive
             archive_path = self.backup_dir / f"{project_id}_archive_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tar.gz"
@@ -587,8 +884,8 @@ class AdvancedContextManager:
             return False
     
     def get_context_history(self, project_id: str) -> List[ContextSnapshot]:
-        """Obtém histórico de snapshots do contexto"""
-        return self.snapshots.get(project_id, [])
+        """Obtém histórico de snapshots do contexto (somente metadados)"""
+        return list(self._get_snapshot_history(project_id))
     
     def restore_context_from_snapshot(self, project_id: str, version: int) -> bool:
         """Restaura contexto de um snapshot"""
@@ -634,37 +931,65 @@ class AdvancedContextManager:
         logger.debug(f"Template applied to context for project_id: {context.project_id}, template_id: {template_id}")
     
     def _auto_save_dirty_cache(self):
-        """Salva automaticamente contextos modificados no cache"""
-        dirty_contexts = [
-            entry.context for entry in self.cache.values()
-            if entry.dirty
-        ]
+        """
+        Write-back em lote: serializa os contextos em cache fora do lock e
+        agenda a gravação dos que mudaram desde a última versão persistida
+        (os saves do lote rodam em paralelo no pool do escritor)
+        """
+        with self._lock:
+            entries = list(self.cache.values())
         
-        for context in dirty_contexts:
-            self.save_project_context(context)
+        for entry in entries:
+            try:
+                payload = self._changed_payload(entry)
+            except Exception as e:
+                logger.error(f"Failed to serialize cached context for project_id: {entry.context.project_id}, error: {str(e)}")
+                continue
+            if payload is None:
+                continue
+            with self._lock:
+                if self._save_context_to_disk(entry.context, payload) is not None:
+                    self._mark_clean(entry, payload)
+                    self.metrics['write_backs'] += 1
     
     def _should_create_backup(self) -> bool:
         """Verifica se deve criar backup"""
         return (datetime.now() - self.last_backup) >= self.backup_interval
     
     def _create_automatic_backup(self):
-        """Cria backup automático"""
+        """
+        Cria backup automático incremental de cada workspace no chunk store
+        do BackupSystem: só conteúdos novos são gravados, projetos sem
+        mudanças não geram backup e os backups antigos (com os blobs que só
+        eles usavam) são removidos
+        """
         try:
-            backup_name = f"contexts_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            backup_path = self.backup_dir / f"{backup_name}.tar.gz"
-            
-            # Create backup of entire contexts directory
-            shutil.make_archive(
-                str(backup_path.with_suffix('')),
-                'gztar',
-                self.base_dir,
-                '.'
-            )
+            self.flush(timeout=30)
+            created = removed = 0
+            # Uma única listagem dos backups por execução (só nomes de arquivos), agrupada por projeto
+            backup_index = self.backup_system.index_backups()
+            for project_id, index_entry in list(self.context_index.items()):
+                workspace_path = self.base_dir / project_id
+                if not workspace_path.exists():
+                    continue
+                backups = backup_index.get(project_id, [])
+                backup_file = self.backup_system.create_directory_backup(
+                    project_id, str(workspace_path), "Automatic backup", index_entry.status.value,
+                    backups=backups
+                )
+                if not backups or backup_file != str(backups[0]):
+                    created += 1
+                    backups = [Path(backup_file)] + backups
+                removed += self.backup_system.cleanup_old_backups(
+                    project_id, self.backup_keep_count, backups=backups, collect_garbage=False
+                )
+            if removed:
+                self.backup_system.garbage_collect()
             
             self.last_backup = datetime.now()
-            self.metrics['backups_created'] += 1
+            self.metrics['backups_created'] += created
             
-            logger.info(f"Automatic backup created at: {str(backup_path)}")
+            logger.info(f"Automatic backup finished: {created} project(s) backed up")
             
         except Exception as e:
             logger.error(f"Failed to create automatic backup: {str(e)}")
@@ -676,20 +1001,30 @@ class AdvancedContextManager:
         for project_id, snapshots in self.snapshots.items():
             old_snapshots = [s for s in snapshots if s.timestamp < cutoff_date]
             
+            # Keep at least 3 snapshots per project
+            if not old_snapshots or len(snapshots) - len(old_snapshots) < 3:
+                continue
+            
+            # O primeiro snapshot mantido não pode depender de deltas removidos
+            removed = {snapshot.version for snapshot in old_snapshots}
+            first_kept = next(s for s in snapshots if s.version not in removed)
+            self._rebase_snapshot(project_id, first_kept)
+            
             for snapshot in old_snapshots:
-                # Keep at least 3 snapshots per project
-                if len(snapshots) - len(old_snapshots) >= 3:
-                    snapshot_path = self.snapshots_dir / f"{project_id}_{snapshot.version}.json.gz"
-                    if snapshot_path.exists():
-                        snapshot_path.unlink()
-                    
-                    snapshots.remove(snapshot)
+                snapshot_path = self._snapshot_path(project_id, snapshot.version)
+                if snapshot_path.exists():
+                    snapshot_path.unlink()
+                
+                snapshots.remove(snapshot)
     
     def _load_index(self):
-        """Carrega índice de contextos"""
-        if self.index_path.exists():
-            try:
-                with open(self.index_path, 'r', encoding='utf-8') as f:
+        """Carrega índice de contextos (migrando o .context_index.json legado para o SQLite)"""
+        try:
+            for row in self.search_index.all_entries():
+                self.context_index[row['context_id']] = self._index_from_row(row)
+            
+            if not self.context_index and self.legacy_index_path.exists():
+                with open(self.legacy_index_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                 
                 for context_id, index_data in data.items():
@@ -701,35 +1036,41 @@ class AdvancedContextManager:
                     index_data['dependencies'] = set(index_data['dependencies'])
                     
                     self.context_index[context_id] = ContextIndex(**index_data)
+                    self._mark_index_dirty(context_id)
                 
-                logger.debug(f"Context index loaded with {len(self.context_index)} contexts")
-                
-            except Exception as e:
-                logger.error(f"Failed to load context index: {str(e)}")
+                self._save_index()
+                self.legacy_index_path.rename(self.legacy_index_path.with_name(self.legacy_index_path.name + ".migrated"))
+                logger.info(f"Legacy context index migrated to {self.index_path.name}")
+            
+            for context_id, index_entry in self.context_index.items():
+                # Valores persistidos valem até a primeira reconciliação
+                self._usage.track(self.base_dir / context_id, index_entry.size_bytes, index_entry.file_count)
+            
+            logger.debug(f"Context index loaded with {len(self.context_index)} contexts")
+            
+        except Exception as e:
+            logger.error(f"Failed to load context index: {str(e)}")
     
     def _save_index(self):
-        """Salva índice de contextos"""
+        """Grava no índice persistente, em uma transação, só as entradas alteradas"""
+        with self._lock:
+            dirty, self._index_dirty = self._index_dirty, {}
+            rows = []
+            for context_id, artifacts in dirty.items():
+                index_entry = self.context_index.get(context_id)
+                if index_entry is None:
+                    continue
+                rows.append({**vars(index_entry), 'status': index_entry.status.value, 'artifacts': artifacts})
+        if not rows:
+            return
+        
         try:
-            data = {}
-            for context_id, index_entry in self.context_index.items():
-                data[context_id] = {
-                    'context_id': index_entry.context_id,
-                    'project_name': index_entry.project_name,
-                    'project_goal': index_entry.project_goal,
-                    'status': index_entry.status.value,
-                    'created_at': index_entry.created_at.isoformat(),
-                    'last_modified': index_entry.last_modified.isoformat(),
-                    'tags': list(index_entry.tags),
-                    'dependencies': list(index_entry.dependencies),
-                    'size_bytes': index_entry.size_bytes,
-                    'file_count': index_entry.file_count
-                }
-            
-            with open(self.index_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
-                
+            self.search_index.upsert_many(rows)
         except Exception as e:
             logger.error(f"Failed to save context index: {str(e)}")
+            with self._lock:
+                for context_id, artifacts in dirty.items():
+                    self._index_dirty.setdefault(context_id, artifacts)
     
     def get_manager_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do manager"""
@@ -737,9 +1078,13 @@ class AdvancedContextManager:
             return {
                 'total_contexts': len(self.context_index),
                 'cached_contexts': len(self.cache),
+                'cache_bytes': self.cache_bytes,
                 'total_snapshots': sum(len(snapshots) for snapshots in self.snapshots.values()),
+                'snapshot_bytes': sum(s.size_bytes for snapshots in self.snapshots.values() for s in snapshots),
                 'cache_hit_rate': self.metrics['cache_hits'] / max(1, self.metrics['cache_hits'] + self.metrics['cache_misses']),
                 'metrics': self.metrics.copy(),
+                'writer_stats': self._writer.get_stats(),
+                'workspace_usage_stats': self._usage.get_stats(),
                 'storage_stats': self._get_storage_stats(),
                 'backup_info': {
                     'last_backup': self.last_backup.isoformat(),
@@ -749,20 +1094,22 @@ class AdvancedContextManager:
             }
     
     def _get_storage_stats(self) -> Dict[str, Any]:
-        """Obtém estatísticas de armazenamento"""
-        total_size = 0
-        total_files = 0
-        
-        for path in self.base_dir.rglob('*'):
-            if path.is_file():
-                total_size += path.stat().st_size
-                total_files += 1
+        """
+        Obtém estatísticas de armazenamento em O(projetos), a partir do índice
+        de contextos e dos metadados dos snapshots, sem percorrer o disco
+        """
+        workspaces_size = sum(entry.size_bytes for entry in self.context_index.values())
+        snapshots = [s for history in self.snapshots.values() for s in history]
+        snapshots_size = sum(s.size_bytes for s in snapshots)
+        total_size = workspaces_size + snapshots_size
         
         return {
             'total_size_bytes': total_size,
             'total_size_mb': total_size / 1024 / 1024,
-            'total_files': total_files,
-            'contexts_count': len(list(self.base_dir.glob('proj_*')))
+            'total_files': sum(entry.file_count for entry in self.context_index.values()) + len(snapshots),
+            'workspaces_size_bytes': workspaces_size,
+            'snapshots_size_bytes': snapshots_size,
+            'contexts_count': len(self.context_index)
         }
     
     def cleanup_and_shutdown(self):
@@ -779,9 +1126,12 @@ class AdvancedContextManager:
         # Save all dirty cache entries
         with self._lock:
             self._auto_save_dirty_cache()
-            
-            # Save index
-            self._save_index()
+        
+        if not self.flush(timeout=30):
+            logger.warning("Timed out waiting for pending context saves to be written")
+        
+        # Save index (inclusive entradas atualizadas pelas gravações acima)
+        self._save_index()
         
         logger.info("AdvancedContextManager shutdown complete")
     
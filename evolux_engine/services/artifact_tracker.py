@@ -0,0 +1,307 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import stat
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple, Union
+
+from loguru import logger
+
+from evolux_engine.schemas.contracts import ArtifactChange, ArtifactChangeType
+from evolux_engine.services.chunk_store import hash_file
+
+# Constantes do inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _child(relative_dir: str, name: str) -> str:
+    return f"{relative_dir}/{name}" if relative_dir else name
+
+
+def _is_under(path: str, relative_dir: str) -> bool:
+    return not relative_dir or path == relative_dir or path.startswith(relative_dir + "/")
+
+
+class FileSignature(NamedTuple):
+    """Identifica uma versão do arquivo sem lê-lo"""
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def _signature(path: str) -> Optional[FileSignature]:
+    """Assinatura do arquivo regular em `path`, ou None se ele não existe (links e diretórios são ignorados)"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    return FileSignature(st.st_size, st.st_mtime_ns, st.st_ino) if stat.S_ISREG(st.st_mode) else None
+
+
+class _Inotify:
+    """Watches inotify (Linux, via libc) em uma árvore de diretórios"""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: Dict[int, str] = {}  # wd -> diretório relativo ao workspace
+
+    def add_watch(self, directory: str, relative_dir: str) -> bool:
+        """Observa `directory`; False se ele não existe mais. Esgotar o limite de watches é um erro"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return False
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+        self.dirs[wd] = relative_dir
+        return True
+
+    def remove_watches_under(self, relative_dir: str):
+        for wd, watched in list(self.dirs.items()):
+            if _is_under(watched, relative_dir):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                self.dirs.pop(wd, None)
+
+    def read_events(self) -> Iterator[Tuple[Optional[str], int, str]]:
+        """Eventos pendentes (diretório relativo, máscara, nome), sem bloquear"""
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                yield self.dirs.get(wd), mask, os.fsdecode(name)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class ArtifactChangeTracker:
+    """
+    Detecta os arquivos criados, modificados e removidos no diretório de
+    artefatos entre `start()` e `collect()` (ex.: durante um comando).
+
+    No Linux usa inotify: só os caminhos com eventos são examinados, então
+    o custo é proporcional ao que mudou, não ao número de artefatos. Sem
+    inotify (ou se a fila de eventos transbordar) compara um snapshot de
+    tamanho/mtime/inode com uma nova varredura. Em ambos os casos só os
+    arquivos cuja assinatura mudou são lidos para calcular o hash.
+
+    Os caminhos reportados são relativos ao workspace (ex.:
+    "artifacts/app/main.py"), como as chaves de `artifacts_state`; com
+    `subdir=""` o próprio workspace é observado.
+    Diretórios de dependências e caches (IGNORED_DIRS) não são observados.
+    """
+    IGNORED_DIRS = frozenset({
+        ".git", "__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".tox",
+        "node_modules", ".venv", "venv",
+    })
+
+    def __init__(self, workspace_path: Union[str, Path], subdir: str = "artifacts", use_inotify: Optional[bool] = None):
+        self.workspace_path = str(workspace_path)
+        self.prefix = subdir.strip("/")
+        self.root = os.path.join(self.workspace_path, self.prefix) if self.prefix else self.workspace_path
+        self.use_inotify = sys.platform.startswith("linux") if use_inotify is None else use_inotify
+        self._snapshot: Dict[str, FileSignature] = {}
+        self._hashes: Dict[str, str] = {}  # Hashes calculados pelo próprio tracker, para caminhos fora do artifacts_state
+        self._inotify: Optional[_Inotify] = None
+        self._armed = False
+        self._active_windows = 0
+        self._lock = threading.Lock()
+        self._stats = {"collections": 0, "full_scans": 0, "events": 0, "hashed": 0}
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "snapshot"
+
+    # --- Janela de observação ---
+
+    def start(self):
+        """
+        Abre uma janela de observação. Mudanças anteriores (ex.: escritas do
+        FileService, já registradas) são absorvidas sem serem reportadas,
+        a menos que outra janela esteja aberta.
+        """
+        with self._lock:
+            if not self._armed:
+                self._snapshot = self._arm()
+            elif self._active_windows == 0:
+                for path, signature in self._pending_changes().items():
+                    self._apply(path, signature)
+            self._active_windows += 1
+
+    def collect(self, artifacts_state: Mapping[str, Any]) -> List[ArtifactChange]:
+        """
+        Fecha a janela aberta por `start()` e retorna as mudanças desde
+        então. `artifacts_state` fornece os hashes conhecidos: um arquivo
+        tocado com o mesmo conteúdo não é reportado.
+        """
+        with self._lock:
+            self._active_windows = max(0, self._active_windows - 1)
+            self._stats["collections"] += 1
+            pending = self._pending_changes() if self._armed else self._diff(self._arm())
+            changes = []
+            for path, signature in sorted(pending.items()):
+                previous = self._snapshot.get(path)
+                state = artifacts_state.get(path)
+                old_hash = getattr(state, "hash", None) or self._hashes.get(path)
+                if signature is None:
+                    if previous is not None or state is not None:
+                        changes.append(ArtifactChange(path=path, change_type=ArtifactChangeType.DELETED, old_hash=old_hash))
+                    self._apply(path, None)
+                    continue
+                if previous == signature:
+                    continue
+                try:
+                    new_hash = hash_file(os.path.join(self.workspace_path, path))
+                except OSError:
+                    continue  # Removido enquanto era lido; o evento da remoção vem na próxima consulta
+                self._stats["hashed"] += 1
+                self._apply(path, signature, new_hash)
+                if previous is None and state is None:
+                    changes.append(ArtifactChange(path=path, change_type=ArtifactChangeType.CREATED, new_hash=new_hash))
+                elif new_hash != old_hash:
+                    changes.append(ArtifactChange(path=path, change_type=ArtifactChangeType.MODIFIED,
+                                                  old_hash=old_hash, new_hash=new_hash))
+            logger.debug(f"Artifact tracker ({self.mode}) collected {len(changes)} change(s) in {self.root}")
+            return changes
+
+    def close(self):
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            self._armed = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "mode": self.mode, "tracked_files": len(self._snapshot)}
+
+    # --- Internos ---
+
+    def _arm(self) -> Dict[str, FileSignature]:
+        """Varredura completa, (re)criando os watches do inotify quando disponível"""
+        self._stats["full_scans"] += 1
+        if self.use_inotify and self._inotify is None:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, falling back to snapshot diffs: {e}")
+                self.use_inotify = False
+        elif self._inotify is not None:
+            self._inotify.remove_watches_under(self.prefix)
+        try:
+            scanned = self._scan(self.root, self.prefix)
+        except OSError as e:
+            # Ex.: limite de watches (fs.inotify.max_user_watches) esgotado
+            logger.warning(f"inotify watches failed for {self.root}, falling back to snapshot diffs: {e}")
+            self._inotify.close()
+            self._inotify = None
+            self.use_inotify = False
+            scanned = self._scan(self.root, self.prefix)
+        self._armed = os.path.isdir(self.root)
+        return scanned
+
+    def _scan(self, directory: str, relative_dir: str) -> Dict[str, FileSignature]:
+        """Assinaturas de todos os arquivos sob `directory`, adicionando watches com inotify"""
+        signatures = {}
+        pending = [(directory, relative_dir)]
+        while pending:
+            current, relative = pending.pop()
+            if self._inotify is not None and not self._inotify.add_watch(current, relative):
+                continue
+            try:
+                entries = os.scandir(current)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.IGNORED_DIRS:
+                                pending.append((entry.path, _child(relative, entry.name)))
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            signatures[_child(relative, entry.name)] = FileSignature(st.st_size, st.st_mtime_ns, st.st_ino)
+                    except OSError:
+                        continue
+        return signatures
+
+    def _diff(self, current: Dict[str, FileSignature]) -> Dict[str, Optional[FileSignature]]:
+        changed = {path: signature for path, signature in current.items() if self._snapshot.get(path) != signature}
+        changed.update((path, None) for path in self._snapshot.keys() - current.keys())
+        return changed
+
+    def _pending_changes(self) -> Dict[str, Optional[FileSignature]]:
+        """Caminhos possivelmente alterados desde a última consulta, com a assinatura atual (None = não existe)"""
+        if self._inotify is None:
+            self._stats["full_scans"] += 1
+            return self._diff(self._scan(self.root, self.prefix))
+
+        candidates: Set[str] = set()
+        changed: Dict[str, Optional[FileSignature]] = {}
+        for relative_dir, mask, name in self._inotify.read_events():
+            self._stats["events"] += 1
+            if mask & IN_Q_OVERFLOW or (relative_dir == self.prefix and mask & (IN_DELETE_SELF | IN_MOVE_SELF)):
+                logger.info(f"inotify lost track of {self.root} (queue overflow or root moved), rescanning")
+                return self._diff(self._arm())
+            if relative_dir is None or not name:
+                continue
+            path = _child(relative_dir, name)
+            if not mask & IN_ISDIR:
+                candidates.add(path)
+            elif name in self.IGNORED_DIRS:
+                continue
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                # Arquivos criados antes do watch do novo diretório entram pela varredura dele
+                changed.update(self._scan(os.path.join(self.workspace_path, path), path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._inotify.remove_watches_under(path)
+                candidates.update(p for p in self._snapshot if _is_under(p, path))
+        for path in candidates - changed.keys():
+            changed[path] = _signature(os.path.join(self.workspace_path, path))
+        return changed
+
+    def _apply(self, path: str, signature: Optional[FileSignature], content_hash: Optional[str] = None):
+        if signature is None:
+            self._snapshot.pop(path, None)
+            self._hashes.pop(path, None)
+            return
+        self._snapshot[path] = signature
+        if content_hash is not None:
+            self._hashes[path] = content_hash
+        else:
+            self._hashes.pop(path, None)  # Mudou sem ser relido: o hash anterior não vale mais
@@ -1,15 +1,33 @@
+import asyncio
 import json
-import shutil
+import os
+import re
+import threading
 import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Tuple
 from dataclasses import dataclass
 
+from evolux_engine.models.serialization import decode_document, encode_document
+from evolux_engine.services.chunk_store import ChunkStore
+from evolux_engine.utils.coalescing_writer import atomic_write_bytes
 from evolux_engine.utils.logging_utils import get_structured_logger
 
 logger = get_structured_logger("backup_system")
 
+# Chamado com (arquivos processados, total) a cada lote concluído, na thread do backup
+ProgressCallback = Callable[[int, int], None]
+
+# "<project_id>_<timestamp>" + sufixo: projeto e data do backup saem do nome, sem ler o manifesto
+BACKUP_FILE_NAME = re.compile(
+    r"^(?P<project_id>.+)_(?P<timestamp>\d{8}_\d{6}(?:_\d{6})?)(?P<suffix>\.manifest\.bin|\.manifest\.json|\.zip)$"
+)
+
 @dataclass
 class BackupManifest:
     """Manifesto de um backup contendo metadados"""
@@ -21,19 +39,70 @@ class BackupManifest:
     backup_size_bytes: int
     backup_path: str
     description: Optional[str] = None
+    logical_size_bytes: int = 0   # Tamanho original dos arquivos do backup
+    format: str = "chunks"        # "chunks" (manifesto + blobs) ou "zip" (legado)
+
+
+def _store_batch(store: ChunkStore, batch: List[Tuple[str, str, int]]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Hash e compressão de um lote de arquivos (roda numa thread ou num processo do pool)"""
+    results = []
+    for name, path, mtime_ns in batch:
+        try:
+            results.append((name, {**store.put_file(path), "mtime_ns": mtime_ns}))
+        except FileNotFoundError:
+            results.append((name, None))  # Removido durante o backup
+    return results
+
+
+def _restore_batch(store: ChunkStore, root: str, batch: List[Tuple[str, str]]) -> int:
+    """Restaura um lote de arquivos (nome relativo, digest) sob `root`"""
+    for name, digest in batch:
+        store.restore_to(digest, os.path.join(root, name))
+    return len(batch)
 
 class BackupSystem:
     """
     Sistema de backup para snapshots do projeto conforme especificação.
     Implementa backup/restore de contexto e artefatos.
+
+    Os backups são manifestos (`manifests/<backup_id>.manifest.json|.bin`)
+    que listam cada arquivo com o SHA-256 do seu conteúdo; o conteúdo fica
+    em um ChunkStore compartilhado (`objects/`), então arquivos que não
+    mudaram entre backups, ou que se repetem entre projetos, são gravados
+    uma única vez. Backups incrementais nem releem arquivos cujo tamanho e
+    mtime não mudaram desde o backup anterior do projeto. Backups .zip
+    legados continuam listáveis e restauráveis.
+
+    Hash, compressão (zstd, ou zlib sem o pacote zstandard) e restauração
+    rodam em lotes num pool de threads ou, para muitos arquivos, de
+    processos, com um número limitado de lotes em andamento; cada arquivo é
+    lido e gravado em blocos, então a memória usada não depende do tamanho
+    do workspace. As variantes `*_async` rodam fora do event loop.
     """
+    MANIFEST_SUFFIXES = (".manifest.bin", ".manifest.json")
+    MAX_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+    BATCH_FILES = 64                # Arquivos por tarefa enviada ao pool
+    PROCESS_POOL_MIN_FILES = 2000   # Com parallelism="auto", a partir daqui usa processos
     
-    def __init__(self, base_backup_dir: str = "./project_workspaces/backups"):
+    def __init__(self, base_backup_dir: str = "./project_workspaces/backups", storage_format: str = "json",
+                 max_workers: int = MAX_WORKERS, codec: Optional[str] = None, parallelism: str = "auto"):
         self.backup_dir = Path(base_backup_dir)
+        # "json" (context.json/manifest.json) ou "binary" (context.bin/manifest.bin versionados)
+        self.storage_format = storage_format
         self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir = self.backup_dir / "manifests"
+        self.manifests_dir.mkdir(exist_ok=True)
+        self.chunk_store = ChunkStore(self.backup_dir, codec=codec)
+        self.max_workers = max_workers
+        # "threads", "processes" ou "auto" (processos só para muitos arquivos, em
+        # que o trabalho em Python por arquivo limitaria as threads pelo GIL)
+        self.parallelism = parallelism
+        # Backups e coleta de lixo não podem se intercalar (um blob deduplicado seria removido)
+        self._store_lock = threading.RLock()
         logger.info(f"BackupSystem initialized at: {str(self.backup_dir)}")
     
-    def create_snapshot(self, project_context, artifacts_dir: str, description: str = None) -> str:
+    def create_snapshot(self, project_context, artifacts_dir: str, description: str = None,
+                        progress: Optional[ProgressCallback] = None) -> str:
         """
         Cria snapshot completo do projeto (contexto + artefatos).
         
@@ -41,71 +110,244 @@ class BackupSystem:
             project_context: Instância do ProjectContext
             artifacts_dir: Caminho para diretório de artefatos
             description: Descrição opcional do backup
+            progress: Callback opcional com (arquivos processados, total)
             
         Returns:
-            Caminho para o arquivo de backup criado
+            Caminho para o manifesto do backup criado
+        """
+        return self._snapshot_job(project_context, artifacts_dir, description, progress)()
+    
+    async def create_snapshot_async(self, project_context, artifacts_dir: str, description: str = None,
+                                    progress: Optional[ProgressCallback] = None) -> str:
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_id = f"{project_context.project_id}_{timestamp}"
-        backup_file = self.backup_dir / f"{backup_id}.zip"
+        Como `create_snapshot`, sem bloquear o event loop: o contexto é
+        serializado agora e a varredura, o hash e a compressão dos arquivos
+        rodam numa thread.
+        """
+        return await asyncio.to_thread(self._snapshot_job(project_context, artifacts_dir, description, progress))
+    
+    def _snapshot_job(self, project_context, artifacts_dir: str, description: Optional[str],
+                      progress: Optional[ProgressCallback]) -> Callable[[], str]:
+        """Lê o contexto no chamador e devolve o trabalho sobre os arquivos, que pode rodar em outra thread"""
+        # 1. Contexto (context.json ou context.bin)
+        if self.storage_format == "binary":
+            payloads = {"context.bin": project_context.to_bytes()}
+        else:
+            payloads = {"context.json": project_context.model_dump_json(indent=2).encode("utf-8")}
+        project_id, project_status = project_context.project_id, project_context.status.value
+        hints = self._artifact_hints(project_context, Path(artifacts_dir))
+        logs_dir = Path(project_context.workspace_path) / "logs"
         
-        logger.info(f"Creating project snapshot for project_id: {project_context.project_id}, backup_id: {backup_id}")
+        def job() -> str:
+            # 2. Artefatos e 3. logs, se existirem
+            files = self._collect_files(Path(artifacts_dir), "artifacts/")
+            if logs_dir.exists():
+                files.extend((f"logs/{log_file.name}", log_file) for log_file in logs_dir.glob("*.log"))
+            return self._create_backup(project_id, project_status, files, payloads, description,
+                                       self._latest_manifest(project_id), hints=hints, progress=progress)
         
-        try:
-            with zipfile.ZipFile(backup_file, 'w', zipfile.ZIP_DEFLATED) as backup_zip:
-                # 1. Backup do contexto (context.json)
-                context_data = project_context.model_dump_json(indent=2)
-                backup_zip.writestr("context.json", context_data)
-                
-                # 2. Backup dos artefatos
-                artifacts_path = Path(artifacts_dir)
-                if artifacts_path.exists():
-                    for file_path in artifacts_path.rglob("*"):
-                        if file_path.is_file():
-                            relative_path = file_path.relative_to(artifacts_path)
-                            backup_zip.write(file_path, f"artifacts/{relative_path}")
-                
-                # 3. Backup de logs se existirem
-                logs_dir = Path(project_context.workspace_path) / "logs"
-                if logs_dir.exists():
-                    for log_file in logs_dir.glob("*.log"):
-                        backup_zip.write(log_file, f"logs/{log_file.name}")
-                
-                # 4. Criar manifesto do backup
-                manifest = BackupManifest(
-                    backup_id=backup_id,
-                    project_id=project_context.project_id,
-                    created_at=datetime.now(),
-                    project_status=project_context.status.value,
-                    total_files=len(backup_zip.namelist()),
-                    backup_size_bytes=0,  # Será atualizado após fechar o zip
-                    backup_path=str(backup_file),
-                    description=description
-                )
-                
-                backup_zip.writestr("manifest.json", json.dumps(manifest.__dict__, default=str, indent=2))
+        return job
+    
+    def create_directory_backup(self, project_id: str, root_dir: str, description: str = None,
+                                project_status: str = "unknown", skip_unchanged: bool = True,
+                                progress: Optional[ProgressCallback] = None,
+                                backups: Optional[List[Path]] = None) -> str:
+        """
+        Cria um backup de todos os arquivos de um diretório (ex.: o workspace
+        inteiro do projeto). Com `skip_unchanged`, se nada mudou desde o
+        backup anterior do projeto, nenhum manifesto novo é gravado e o
+        caminho do anterior é retornado. `backups` (de `index_backups`)
+        evita listar o diretório de manifestos de novo.
+        """
+        previous = self._latest_manifest(project_id, backups)
+        return self._create_backup(project_id, project_status, self._collect_files(Path(root_dir), ""), {},
+                                   description, previous, skip_unchanged=skip_unchanged, progress=progress)
+    
+    @staticmethod
+    def _collect_files(root: Path, prefix: str) -> List[Tuple[str, Path]]:
+        files = []
+        if not root.exists():
+            return files
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith((".tmp", ".partial")):
+                    continue
+                file_path = Path(directory) / name
+                files.append((prefix + file_path.relative_to(root).as_posix(), file_path))
+        return files
+    
+    @staticmethod
+    def _artifact_hints(project_context, artifacts_path: Path) -> Dict[Path, Tuple[str, float]]:
+        """
+        Hashes já conhecidos no ArtifactState, por caminho absoluto. Só valem
+        se o arquivo não foi modificado depois do registro (`last_modified`).
+        """
+        hints = {}
+        for relative_path, state in project_context.artifacts_state.items():
+            if not state.hash or len(state.hash) != 64 or state.last_modified is None:
+                continue
+            for base in (artifacts_path, Path(project_context.workspace_path)):
+                hints[(base / relative_path).resolve()] = (state.hash, state.last_modified.timestamp())
+        return hints
+    
+    def _create_backup(self, project_id: str, project_status: str, files: List[Tuple[str, Path]],
+                       payloads: Dict[str, bytes], description: Optional[str], previous: Optional[Dict[str, Any]],
+                       hints: Optional[Dict[Path, Tuple[str, float]]] = None, skip_unchanged: bool = False,
+                       progress: Optional[ProgressCallback] = None) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        backup_id = f"{project_id}_{timestamp}"
+        suffix = self.MANIFEST_SUFFIXES[0] if self.storage_format == "binary" else self.MANIFEST_SUFFIXES[1]
+        manifest_file = self.manifests_dir / f"{backup_id}{suffix}"
+        
+        logger.info(f"Creating project snapshot for project_id: {project_id}, backup_id: {backup_id}, files: {len(files)}")
+        
+        previous_files = previous.get("files", {}) if previous else {}
+        hints = hints or {}
+        
+        with self._store_lock:
+            entries: Dict[str, Dict[str, Any]] = {}
+            for name, payload in payloads.items():
+                entries[name] = self.chunk_store.put_bytes(payload)
             
-            # Atualizar tamanho no manifesto
-            backup_size = backup_file.stat().st_size
-            manifest.backup_size_bytes = backup_size
+            # Arquivos inalterados (pelo backup anterior ou pelo ArtifactState) não são lidos
+            pending: List[Tuple[str, str, int]] = []
+            for name, file_path in files:
+                try:
+                    stat = file_path.stat()
+                except FileNotFoundError:
+                    continue
+                digest = None
+                known = previous_files.get(name)
+                if known and known["size"] == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+                    digest = known["digest"]  # Inalterado desde o backup anterior
+                elif hints and file_path.resolve() in hints:
+                    hinted, recorded_at = hints[file_path.resolve()]
+                    if stat.st_mtime <= recorded_at:
+                        digest = hinted
+                if digest is not None and self.chunk_store.has(digest):
+                    entries[name] = {"digest": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "stored_bytes": 0}
+                else:
+                    pending.append((name, str(file_path), stat.st_mtime_ns))
+            reused = len(entries) - len(payloads)
             
-            logger.info(f"Snapshot created successfully at: {str(backup_file)}, size_mb: {round(backup_size / 1024 / 1024, 2)}")
+            # Hash e compressão dos demais em paralelo
+            for results in self._run_batches(partial(_store_batch, self.chunk_store), pending, progress,
+                                             done=len(entries), total=len(entries) + len(pending)):
+                entries.update((name, entry) for name, entry in results if entry is not None)
+            entries = dict(sorted(entries.items()))
             
-            return str(backup_file)
+            stored_bytes = sum(entry.pop("stored_bytes") for entry in entries.values())
+            if skip_unchanged and previous and \
+                    {name: e["digest"] for name, e in entries.items()} == {name: e["digest"] for name, e in previous_files.items()}:
+                logger.info(f"Backup skipped for project_id: {project_id}, nothing changed since {previous['backup_id']}")
+                return previous["backup_file"]
             
-        except Exception as e:
-            logger.error(f"Failed to create snapshot: {str(e)}", exc_info=True)
-            if backup_file.exists():
-                backup_file.unlink()  # Cleanup on failure
-            raise
+            manifest = BackupManifest(
+                backup_id=backup_id,
+                project_id=project_id,
+                created_at=datetime.now(),
+                project_status=project_status,
+                total_files=len(entries),
+                backup_size_bytes=stored_bytes,  # Bytes novos gravados no store por este backup
+                backup_path=str(manifest_file),
+                description=description,
+                logical_size_bytes=sum(entry["size"] for entry in entries.values()),
+            )
+            manifest_data = {**manifest.__dict__, "created_at": manifest.created_at.isoformat(), "files": entries}
+            if self.storage_format == "binary":
+                payload = encode_document("BackupManifest", manifest_data)
+            else:
+                payload = json.dumps(manifest_data, indent=2).encode("utf-8")
+            atomic_write_bytes(manifest_file, payload)
+        
+        logger.info(f"Snapshot created successfully at: {str(manifest_file)}, files: {len(entries)}, "
+                    f"unchanged: {reused}, hashed: {len(pending)}, new_bytes: {stored_bytes}")
+        
+        return str(manifest_file)
     
-    def restore_snapshot(self, backup_file: str, restore_dir: str) -> Dict[str, Any]:
+    def _run_batches(self, function: Callable[[List], Any], items: List, progress: Optional[ProgressCallback],
+                     done: int, total: int) -> Iterator[Any]:
+        """
+        Executa `function` sobre `items` em lotes de BATCH_FILES no pool,
+        com no máximo dois lotes por worker em andamento, e devolve os
+        resultados na ordem dos lotes, informando o progresso a cada um.
         """
-        Restaura snapshot do projeto.
+        if progress:
+            progress(done, total)
+        if not items:
+            return
+        use_processes = self.parallelism == "processes" or (self.parallelism == "auto" and (os.cpu_count() or 1) > 1
+                                                            and len(items) >= self.PROCESS_POOL_MIN_FILES)
+        if use_processes:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="backup")
+        
+        batches = (items[i:i + self.BATCH_FILES] for i in range(0, len(items), self.BATCH_FILES))
+        in_flight = deque()
+        with executor:
+            while True:
+                for batch in islice(batches, self.max_workers * 2 - len(in_flight)):
+                    in_flight.append((len(batch), executor.submit(function, batch)))
+                if not in_flight:
+                    break
+                size, future = in_flight.popleft()
+                yield future.result()
+                done += size
+                if progress:
+                    progress(done, total)
+    
+    def index_backups(self) -> Dict[str, List[Path]]:
+        """
+        Arquivos de backup (manifestos e .zip legados) de cada projeto, do mais
+        recente ao mais antigo. Usa apenas os nomes dos arquivos: nenhum
+        manifesto é lido, então o custo não depende do tamanho dos backups.
+        """
+        dated: Dict[str, List[Tuple[str, Path]]] = {}
+        for directory in (self.manifests_dir, self.backup_dir):
+            for entry in os.scandir(directory):
+                match = BACKUP_FILE_NAME.match(entry.name)
+                if match and (directory == self.manifests_dir) != (match["suffix"] == ".zip"):
+                    dated.setdefault(match["project_id"], []).append((match["timestamp"], Path(entry.path)))
+        return {project_id: [path for _, path in sorted(files, reverse=True)] for project_id, files in dated.items()}
+    
+    def _latest_manifest(self, project_id: str, backups: Optional[List[Path]] = None) -> Optional[Dict[str, Any]]:
+        """Manifesto mais recente do projeto; só ele é lido (ou o seguinte, se estiver ilegível)"""
+        if backups is None:
+            backups = self.index_backups().get(project_id, [])
+        manifest_files = [path for path in backups if path.name.endswith(self.MANIFEST_SUFFIXES)]
+        return next(iter(self._iter_manifests(manifest_files)), None)
+    
+    def _iter_manifests(self, manifest_files: Optional[Iterable[Path]] = None) -> Iterable[Dict[str, Any]]:
+        for manifest_file in manifest_files if manifest_files is not None else self.manifests_dir.iterdir():
+            if not manifest_file.name.endswith(self.MANIFEST_SUFFIXES):
+                continue
+            try:
+                manifest_data = self._load_manifest(manifest_file)
+            except Exception as e:
+                logger.warning(f"Could not read backup manifest for backup_file: {str(manifest_file)}, error: {str(e)}")
+                continue
+            manifest_data["backup_file"] = str(manifest_file)
+            yield manifest_data
+    
+    @staticmethod
+    def _load_manifest(manifest_file: Path) -> Dict[str, Any]:
+        with open(manifest_file, "rb") as f:
+            return decode_document(f.read(), "BackupManifest")
+    
+    def restore_snapshot(self, backup_file: str, restore_dir: str,
+                         paths: Optional[Iterable[str]] = None,
+                         progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Restaura snapshot do projeto. Cada arquivo é descomprimido em blocos
+        e só substitui o destino se o SHA-256 conferir com o manifesto.
         
         Args:
-            backup_file: Caminho para arquivo de backup
+            backup_file: Caminho para o manifesto (ou arquivo .zip legado) do backup
             restore_dir: Diretório onde restaurar
+            paths: Arquivos ou diretórios (ex.: "artifacts/app.py", "logs/") a
+                restaurar; por padrão, todos
+            progress: Callback opcional com (arquivos restaurados, total)
             
         Returns:
             Dicionário com informações da restauração
@@ -117,28 +359,42 @@ class BackupSystem:
             raise FileNotFoundError(f"Backup file not found: {backup_file}")
         
         logger.info(f"Restoring snapshot from: {backup_file} to: {restore_dir}")
+        selected = None if paths is None else [p.lstrip("/") for p in paths]
+        
+        def wanted(name: str) -> bool:
+            return selected is None or any(name == p or (p.endswith("/") and name.startswith(p)) for p in selected)
         
         try:
             # Criar diretório de restauração
             restore_path.mkdir(parents=True, exist_ok=True)
             
-            with zipfile.ZipFile(backup_path, 'r') as backup_zip:
-                # Extrair todos os arquivos
-                backup_zip.extractall(restore_path)
+            if backup_path.suffix == ".zip":
+                with zipfile.ZipFile(backup_path, 'r') as backup_zip:
+                    members = [name for name in backup_zip.namelist() if wanted(name)]
+                    backup_zip.extractall(restore_path, members)
+                    manifest_data = self._read_manifest(backup_zip) or {}
+                restored = len(members)
+                if progress:
+                    progress(restored, restored)
+            else:
+                manifest_data = self._load_manifest(backup_path)
+                entries = {name: entry for name, entry in manifest_data.pop("files", {}).items() if wanted(name)}
+                if selected is not None and not entries:
+                    raise FileNotFoundError(f"None of {selected} found in backup {backup_file}")
+                root = str(restore_path.resolve())
+                for name in entries:
+                    if not os.path.normpath(os.path.join(root, name)).startswith(root + os.sep):
+                        raise ValueError(f"Backup entry outside of the restore directory: {name}")
                 
-                # Ler manifesto se disponível
-                manifest_data = {}
-                if "manifest.json" in backup_zip.namelist():
-                    manifest_content = backup_zip.read("manifest.json").decode('utf-8')
-                    manifest_data = json.loads(manifest_content)
+                items = [(name, entry["digest"]) for name, entry in entries.items()]
+                restored = sum(self._run_batches(partial(_restore_batch, self.chunk_store, root), items,
+                                                 progress, done=0, total=len(items)))
             
-            restored_files = list(restore_path.rglob("*"))
-            
-            logger.info(f"Snapshot restored successfully with {len(restored_files)} files to: {str(restore_path)}")
+            logger.info(f"Snapshot restored successfully with {restored} files to: {str(restore_path)}")
             
             return {
                 "success": True,
-                "restored_files": len(restored_files),
+                "restored_files": restored,
                 "restore_path": str(restore_path),
                 "manifest": manifest_data
             }
@@ -147,17 +403,28 @@ class BackupSystem:
             logger.error(f"Failed to restore snapshot: {str(e)}", exc_info=True)
             raise
     
+    async def restore_snapshot_async(self, backup_file: str, restore_dir: str,
+                                     paths: Optional[Iterable[str]] = None,
+                                     progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Como `restore_snapshot`, numa thread, sem bloquear o event loop"""
+        return await asyncio.to_thread(self.restore_snapshot, backup_file, restore_dir, paths, progress)
+    
     def list_backups(self, project_id: Optional[str] = None) -> list[Dict[str, Any]]:
         """Lista backups disponíveis, opcionalmente filtrados por projeto"""
         backups = []
         
+        # Com projeto, só os manifestos dele são lidos
+        manifest_files = self.index_backups().get(project_id, []) if project_id is not None else None
+        for manifest_data in self._iter_manifests(manifest_files):
+            if project_id is None or manifest_data.get("project_id") == project_id:
+                manifest_data.pop("files", None)
+                backups.append(manifest_data)
+        
         for backup_file in self.backup_dir.glob("*.zip"):
             try:
                 with zipfile.ZipFile(backup_file, 'r') as backup_zip:
-                    if "manifest.json" in backup_zip.namelist():
-                        manifest_content = backup_zip.read("manifest.json").decode('utf-8')
-                        manifest_data = json.loads(manifest_content)
-                        
+                    manifest_data = self._read_manifest(backup_zip)
+                    if manifest_data is not None:
                         # Filtrar por projeto se especificado
                         if project_id is None or manifest_data.get("project_id") == project_id:
                             manifest_data["backup_file"] = str(backup_file)
@@ -170,7 +437,8 @@ class BackupSystem:
                             "project_id": "unknown",
                             "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
                             "backup_size_bytes": stat.st_size,
-                            "backup_file": str(backup_file)
+                            "backup_file": str(backup_file),
+                            "format": "zip"
                         })
                         
             except Exception as e:
@@ -181,33 +449,54 @@ class BackupSystem:
         
         return backups
     
-    def cleanup_old_backups(self, project_id: str, keep_count: int = 5) -> int:
+    @staticmethod
+    def _read_manifest(backup_zip: zipfile.ZipFile) -> Optional[Dict[str, Any]]:
+        """Lê o manifesto do backup (binário ou JSON legado), se existir"""
+        names = backup_zip.namelist()
+        for name in ("manifest.bin", "manifest.json"):
+            if name in names:
+                return decode_document(backup_zip.read(name), "BackupManifest")
+        return None
+    
+    def garbage_collect(self) -> Dict[str, int]:
+        """Remove do store os blobs que nenhum manifesto referencia"""
+        with self._store_lock:
+            referenced = set()
+            for manifest_data in self._iter_manifests():
+                referenced.update(entry["digest"] for entry in manifest_data.get("files", {}).values())
+            return self.chunk_store.garbage_collect(referenced)
+    
+    def cleanup_old_backups(self, project_id: str, keep_count: int = 5, backups: Optional[List[Path]] = None,
+                            collect_garbage: bool = True) -> int:
         """
-        Remove backups antigos, mantendo apenas os mais recentes.
+        Remove backups antigos, mantendo apenas os mais recentes, e depois
+        os blobs que só eles referenciavam.
         
         Args:
             project_id: ID do projeto
             keep_count: Número de backups a manter
+            backups: Backups do projeto, do mais recente ao mais antigo (de `index_backups`)
+            collect_garbage: Se False, a coleta de lixo fica a cargo do chamador
+                (ex.: uma única vez após limpar vários projetos)
             
         Returns:
             Número de backups removidos
         """
-        project_backups = self.list_backups(project_id)
+        if backups is None:
+            backups = self.index_backups().get(project_id, [])
         
-        if len(project_backups) <= keep_count:
-            return 0
-        
-        backups_to_remove = project_backups[keep_count:]
         removed_count = 0
-        
-        for backup in backups_to_remove:
+        for backup_path in backups[keep_count:]:
             try:
-                backup_path = Path(backup["backup_file"])
-                if backup_path.exists():
-                    backup_path.unlink()
-                    removed_count += 1
-                    logger.info(f"Old backup removed: {str(backup_path)}")
+                backup_path.unlink()
+                removed_count += 1
+                logger.info(f"Old backup removed: {str(backup_path)}")
+            except FileNotFoundError:
+                continue
             except Exception as e:
-                logger.error(f"Failed to remove old backup: {backup.get('backup_file')}, error: {str(e)}")
+                logger.error(f"Failed to remove old backup: {str(backup_path)}, error: {str(e)}")
+        
+        if removed_count and collect_garbage:
+            self.garbage_collect()
         
         return removed_count
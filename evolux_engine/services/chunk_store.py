@@ -0,0 +1,264 @@
+import hashlib
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Set, Union
+
+from loguru import logger
+
+try:
+    import zstandard
+    IS_ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    IS_ZSTD_AVAILABLE = False
+
+READ_SIZE = 1024 * 1024
+
+# Cada blob começa com um byte que identifica a compressão do restante
+CODEC_RAW = b"\x00"
+CODEC_ZLIB = b"\x01"
+CODEC_ZSTD = b"\x02"
+
+COMPRESSION_LEVELS = {"zlib": 6, "zstd": 3}
+# Arquivos a partir deste tamanho são comprimidos com várias threads do zstd;
+# os menores já são comprimidos em paralelo, um por worker
+ZSTD_MULTITHREAD_MIN_SIZE = 16 * 1024 * 1024
+
+# Extensões de arquivos já comprimidos, gravados sem nova compressão
+INCOMPRESSIBLE_SUFFIXES = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp3", ".mp4", ".pdf", ".whl",
+}
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    """SHA-256 do conteúdo do arquivo (mesmo formato de `FileService.get_file_hash`)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _open_for_writing(path: Path) -> BinaryIO:
+    """Abre `path` para escrita, criando o diretório só quando ele ainda não existe"""
+    try:
+        return open(path, "wb")
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, "wb")
+
+
+# Contextos do zstd são caros de criar e não podem ser usados por duas
+# threads ao mesmo tempo: cada thread mantém os seus
+_zstd_contexts = threading.local()
+
+
+def _zstd_compressor(level: int, threads: int = 0):
+    cache = _zstd_contexts.__dict__.setdefault("compressors", {})
+    if (level, threads) not in cache:
+        cache[level, threads] = zstandard.ZstdCompressor(level=level, threads=threads)
+    return cache[level, threads]
+
+
+def _zstd_decompressor():
+    if not hasattr(_zstd_contexts, "decompressor"):
+        _zstd_contexts.decompressor = zstandard.ZstdDecompressor()
+    return _zstd_contexts.decompressor
+
+
+def default_codec() -> str:
+    """Compressão usada por padrão: zstd, se o pacote zstandard estiver instalado, ou zlib"""
+    return "zstd" if IS_ZSTD_AVAILABLE else "zlib"
+
+
+class ChunkStore:
+    """
+    Armazenamento endereçado por conteúdo: cada arquivo é gravado uma única
+    vez em `objects/<2 primeiros dígitos>/<sha256>`, comprimido com zstd ou
+    zlib (ou sem compressão, se já for um formato comprimido), e os backups passam a
+    ser manifestos que apontam para esses blobs. Conteúdos repetidos entre
+    backups e entre projetos ocupam espaço uma única vez.
+
+    Os blobs são gravados em arquivo temporário e renomeados, então escritas
+    concorrentes do mesmo conteúdo são seguras; `garbage_collect` remove os
+    blobs que nenhum manifesto referencia.
+
+    Leitura e escrita são em blocos de READ_SIZE: a memória usada não
+    depende do tamanho dos arquivos. O codec de cada blob fica no seu
+    primeiro byte, então stores com blobs zlib e zstd misturados continuam
+    legíveis.
+    """
+
+    def __init__(self, root: Union[str, Path], compression_level: Optional[int] = None, codec: Optional[str] = None):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.codec = codec or default_codec()
+        if self.codec not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unsupported chunk store codec: {self.codec}")
+        if self.codec == "zstd" and not IS_ZSTD_AVAILABLE:
+            raise ValueError("Codec zstd solicitado, mas o pacote zstandard não está instalado")
+        self.compression_level = compression_level if compression_level is not None else COMPRESSION_LEVELS[self.codec]
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    # --- Escrita ---
+
+    def put_file(self, path: Union[str, Path], digest: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Armazena o conteúdo do arquivo. Com `digest` conhecido (e o blob já
+        presente), o arquivo nem é lido. Retorna o digest, o tamanho original
+        e quantos bytes novos foram gravados no store (0 se deduplicado).
+
+        Arquivos de até READ_SIZE são lidos uma única vez (hash e compressão
+        sobre o mesmo buffer); os maiores são lidos em blocos, uma vez para o
+        hash e outra, só se o conteúdo for novo, para a compressão.
+        """
+        path = Path(path)
+        compress = path.suffix.lower() not in INCOMPRESSIBLE_SUFFIXES
+        size = path.stat().st_size
+        if digest is None and size <= READ_SIZE:
+            with open(path, "rb") as f:
+                data = f.read()
+            return self.put_bytes(data, compress)
+        if digest is None:
+            digest = hash_file(path)
+        if self.has(digest):
+            return {"digest": digest, "size": size, "stored_bytes": 0}
+
+        with open(path, "rb") as f:
+            stored = self._write_blob(digest, f, compress, size)
+        return {"digest": digest, "size": size, "stored_bytes": stored}
+
+    def put_bytes(self, payload: bytes, compress: bool = True) -> Dict[str, Any]:
+        digest = hashlib.sha256(payload).hexdigest()
+        stored = 0 if self.has(digest) else self._write_blob(digest, payload, compress, len(payload))
+        return {"digest": digest, "size": len(payload), "stored_bytes": stored}
+
+    def _write_blob(self, digest: str, source: Union[bytes, BinaryIO], compress: bool, size: int) -> int:
+        """Grava o blob a partir de um buffer ou, em blocos, de um arquivo aberto; retorna os bytes gravados"""
+        blob_path = self.blob_path(digest)
+        temp_path = blob_path.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with _open_for_writing(temp_path) as out:
+                if not compress:
+                    out.write(CODEC_RAW)
+                    blocks = [source] if isinstance(source, bytes) else iter(lambda: source.read(READ_SIZE), b"")
+                    for block in blocks:
+                        out.write(block)
+                elif isinstance(source, bytes):
+                    out.write(self._codec_byte)
+                    out.write(self._compress(source))
+                else:
+                    out.write(self._codec_byte)
+                    compressor = self._compressobj(size)
+                    for block in iter(lambda: source.read(READ_SIZE), b""):
+                        out.write(compressor.compress(block))
+                    out.write(compressor.flush())
+                stored = out.tell()
+            os.replace(temp_path, blob_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return stored
+
+    @property
+    def _codec_byte(self) -> bytes:
+        return CODEC_ZSTD if self.codec == "zstd" else CODEC_ZLIB
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return _zstd_compressor(self.compression_level).compress(data)
+        return zlib.compress(data, self.compression_level)
+
+    def _compressobj(self, size: int):
+        """Compressão em blocos (objeto com compress/flush) de um conteúdo de `size` bytes"""
+        if self.codec == "zstd":
+            threads = -1 if size >= ZSTD_MULTITHREAD_MIN_SIZE else 0
+            # Sem o tamanho no cabeçalho: o arquivo pode crescer durante a leitura
+            return _zstd_compressor(self.compression_level, threads).compressobj()
+        return zlib.compressobj(self.compression_level)
+
+    # --- Leitura ---
+
+    def iter_blob(self, digest: str) -> Iterator[bytes]:
+        """Conteúdo original do blob em blocos, verificando o SHA-256 ao final"""
+        corruption_errors = (zlib.error, zstandard.ZstdError) if IS_ZSTD_AVAILABLE else (zlib.error,)
+        check = hashlib.sha256()
+        try:
+            with open(self.blob_path(digest), "rb") as f:
+                for data in self._iter_decompressed(digest, f):
+                    check.update(data)
+                    yield data
+        except corruption_errors as e:
+            raise ValueError(f"Blob {digest} corrompido: {e}") from e
+        if check.hexdigest() != digest:
+            raise ValueError(f"Blob {digest} corrompido: o conteúdo não confere com o hash")
+
+    @staticmethod
+    def _iter_decompressed(digest: str, f: BinaryIO) -> Iterator[bytes]:
+        """Descomprime o blob em blocos de no máximo READ_SIZE bytes"""
+        codec = f.read(1)
+        if codec == CODEC_RAW:
+            yield from iter(lambda: f.read(READ_SIZE), b"")
+        elif codec == CODEC_ZSTD:
+            if not IS_ZSTD_AVAILABLE:
+                raise ValueError(f"Blob {digest} gravado com zstd, mas o pacote zstandard não está instalado")
+            yield from _zstd_decompressor().read_to_iter(f, read_size=READ_SIZE, write_size=READ_SIZE)
+        elif codec == CODEC_ZLIB:
+            decompressor = zlib.decompressobj()
+            for block in iter(lambda: f.read(READ_SIZE), b""):
+                while block:
+                    yield decompressor.decompress(block, READ_SIZE)
+                    block = decompressor.unconsumed_tail
+            yield decompressor.flush()
+        else:
+            raise ValueError(f"Blob {digest} com codec desconhecido: {codec!r}")
+
+    def read_bytes(self, digest: str) -> bytes:
+        return b"".join(self.iter_blob(digest))
+
+    def restore_to(self, digest: str, destination: Union[str, Path]):
+        """Grava o blob em `destination` (via arquivo temporário, só se o hash conferir)"""
+        destination = Path(destination)
+        temp_path = destination.with_name(destination.name + ".restoring")
+        try:
+            with _open_for_writing(temp_path) as out:
+                for block in self.iter_blob(digest):
+                    out.write(block)
+            os.replace(temp_path, destination)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    # --- Manutenção ---
+
+    def iter_digests(self) -> Iterator[str]:
+        for blob_path in self.objects_dir.glob("*/*"):
+            if not blob_path.name.endswith(".tmp"):
+                yield blob_path.name
+
+    def garbage_collect(self, referenced: Set[str]) -> Dict[str, int]:
+        """Remove os blobs fora de `referenced` e retorna quantos blobs e bytes foram liberados"""
+        removed = freed = 0
+        for digest in list(self.iter_digests()):
+            if digest in referenced:
+                continue
+            blob_path = self.blob_path(digest)
+            try:
+                size = blob_path.stat().st_size
+                blob_path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += size
+        if removed:
+            logger.info(f"Chunk store garbage collection removed {removed} blobs ({freed} bytes)")
+        return {"removed_blobs": removed, "freed_bytes": freed}
@@ -46,18 +46,17 @@ class ContextManager:
 
     def load_project_context(self, project_id: str) -> ProjectContext:
         """
-        Carrega um contexto de projeto existente a partir de seu arquivo JSON.
+        Carrega um contexto de projeto existente a partir de seu arquivo (JSON ou binário).
         """
         log.info(f"Loading project context for '{project_id}'.")
-        context_path = self.base_dir / project_id / "context.json"
+        context_path = ProjectContext.find_context_file(self.base_dir / project_id)
         
-        if not context_path.exists():
-            log.error("Project context file not found.", path=str(context_path))
+        if context_path is None:
+            log.error("Project context file not found.", path=str(self.base_dir / project_id))
             raise FileNotFoundError(f"No project found with ID '{project_id}'.")
             
         try:
-            data = json.loads(context_path.read_text(encoding='utf-8'))
-            context = ProjectContext(**data)
+            context = ProjectContext.load_from_file(context_path)
             log.info("Project context loaded successfully.")
             return context
         except Exception as e:
@@ -66,14 +65,18 @@ class ContextManager:
 
     def save_project_context(self, context: ProjectContext):
         """
-        Salva o estado atual do contexto do projeto em seu arquivo JSON.
+        Salva o estado atual do contexto do projeto em seu arquivo, no formato
+        definido em engine_config.storage_format.
         """
         project_path = self.base_dir / context.project_id
         project_path.mkdir(parents=True, exist_ok=True)
-        context_path = project_path / "context.json"
+        context_path = project_path / context.get_context_file().name
         
         try:
-            context_path.write_text(context.model_dump_json(indent=2), encoding='utf-8')
+            if context.engine_config.storage_format == "binary":
+                context_path.write_bytes(context.to_bytes())
+            else:
+                context_path.write_text(context.model_dump_json(indent=2), encoding='utf-8')
             log.info(f"Project context for '{context.project_id}' saved.", path=str(context_path))
         except Exception as e:
             log.error("Failed to save project context.", error=str(e), exc_info=True)
@@ -0,0 +1,283 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+
+class ContextSearchIndex:
+    """
+    Índice de contextos de projeto em SQLite (modo WAL), com busca textual
+    FTS5 sobre nome, objetivo, tags e caminhos de artefatos, filtros por
+    tags, status e data de criação, paginação e contagens por faceta.
+
+    Cada contexto é atualizado individualmente (`upsert_many` grava um lote
+    em uma única transação), então nenhuma operação reescreve o índice
+    inteiro, e as consultas usam os índices do banco em vez de percorrer
+    todos os projetos. As contagens por status e por tag são mantidas por
+    triggers, então as facetas sem filtro não dependem do número de projetos.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contexts (
+            id INTEGER PRIMARY KEY,
+            context_id TEXT NOT NULL UNIQUE,
+            project_name TEXT NOT NULL,
+            project_goal TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_modified REAL NOT NULL,
+            tags TEXT NOT NULL DEFAULT '[]',
+            dependencies TEXT NOT NULL DEFAULT '[]',
+            size_bytes INTEGER NOT NULL DEFAULT 0,
+            file_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_contexts_last_modified ON contexts(last_modified);
+        CREATE INDEX IF NOT EXISTS idx_contexts_status ON contexts(status, last_modified);
+        CREATE INDEX IF NOT EXISTS idx_contexts_created ON contexts(created_at);
+        CREATE TABLE IF NOT EXISTS context_tags (
+            tag TEXT NOT NULL,
+            id INTEGER NOT NULL REFERENCES contexts(id) ON DELETE CASCADE,
+            PRIMARY KEY (tag, id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_context_tags_id ON context_tags(id);
+        CREATE VIRTUAL TABLE IF NOT EXISTS contexts_fts USING fts5(
+            project_name, project_goal, tags, artifacts,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+        CREATE TABLE IF NOT EXISTS context_facets (
+            facet TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (facet, value)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS trg_contexts_insert AFTER INSERT ON contexts BEGIN
+            INSERT INTO context_facets (facet, value, count) VALUES ('status', NEW.status, 1)
+                ON CONFLICT(facet, value) DO UPDATE SET count = count + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_contexts_status AFTER UPDATE OF status ON contexts
+        WHEN OLD.status != NEW.status BEGIN
+            UPDATE context_facets SET count = count - 1 WHERE facet = 'status' AND value = OLD.status;
+            INSERT INTO context_facets (facet, value, count) VALUES ('status', NEW.status, 1)
+                ON CONFLICT(facet, value) DO UPDATE SET count = count + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_contexts_delete AFTER DELETE ON contexts BEGIN
+            UPDATE context_facets SET count = count - 1 WHERE facet = 'status' AND value = OLD.status;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_context_tags_insert AFTER INSERT ON context_tags BEGIN
+            INSERT INTO context_facets (facet, value, count) VALUES ('tag', NEW.tag, 1)
+                ON CONFLICT(facet, value) DO UPDATE SET count = count + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_context_tags_delete AFTER DELETE ON context_tags BEGIN
+            UPDATE context_facets SET count = count - 1 WHERE facet = 'tag' AND value = OLD.tag;
+        END;
+    """
+    # Fração dos contextos a partir da qual um filtro de tags é percorrido pela
+    # ordem de modificação (parando ao completar a página) em vez de materializado
+    COMMON_TAG_FRACTION = 0.05
+
+    _COLUMNS = ("context_id, project_name, project_goal, status, created_at, last_modified, "
+                "tags, dependencies, size_bytes, file_count")
+    _TOKEN = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.SCHEMA)
+        logger.debug(f"ContextSearchIndex inicializado em '{db_path}'")
+
+    # --- Escrita ---
+
+    def upsert_many(self, rows: Iterable[Dict[str, Any]]):
+        """
+        Insere ou atualiza contextos em uma única transação. Cada linha tem as
+        chaves de `ContextIndex` (status como string, datas como datetime) e,
+        opcionalmente, `artifacts`: os caminhos dos artefatos, indexados só
+        para a busca textual (None mantém os já indexados).
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    self._upsert(row)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _upsert(self, row: Dict[str, Any]):
+        tags = sorted(row.get('tags') or ())
+        self._conn.execute(
+            """INSERT INTO contexts (context_id, project_name, project_goal, status, created_at, last_modified,
+                                     tags, dependencies, size_bytes, file_count)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(context_id) DO UPDATE SET
+                   project_name = excluded.project_name, project_goal = excluded.project_goal,
+                   status = excluded.status, created_at = excluded.created_at,
+                   last_modified = excluded.last_modified, tags = excluded.tags,
+                   dependencies = excluded.dependencies, size_bytes = excluded.size_bytes,
+                   file_count = excluded.file_count""",
+            (row['context_id'], row['project_name'], row['project_goal'], row['status'],
+             row['created_at'].timestamp(), row['last_modified'].timestamp(), json.dumps(tags),
+             json.dumps(sorted(row.get('dependencies') or ())), row.get('size_bytes', 0), row.get('file_count', 0)),
+        )
+        row_id = self._conn.execute("SELECT id FROM contexts WHERE context_id = ?", (row['context_id'],)).fetchone()[0]
+
+        self._conn.execute("DELETE FROM context_tags WHERE id = ?", (row_id,))
+        self._conn.executemany("INSERT INTO context_tags (tag, id) VALUES (?, ?)", [(tag, row_id) for tag in tags])
+
+        artifacts = row.get('artifacts')
+        if artifacts is None:
+            previous = self._conn.execute("SELECT artifacts FROM contexts_fts WHERE rowid = ?", (row_id,)).fetchone()
+            artifacts_text = previous[0] if previous else ""
+        else:
+            artifacts_text = " ".join(artifacts)
+        self._conn.execute("DELETE FROM contexts_fts WHERE rowid = ?", (row_id,))
+        self._conn.execute(
+            "INSERT INTO contexts_fts (rowid, project_name, project_goal, tags, artifacts) VALUES (?, ?, ?, ?, ?)",
+            (row_id, row['project_name'], row['project_goal'], " ".join(tags), artifacts_text),
+        )
+
+    def delete(self, context_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT id FROM contexts WHERE context_id = ?", (context_id,)).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM contexts_fts WHERE rowid = ?", row)
+                    self._conn.execute("DELETE FROM context_tags WHERE id = ?", row)
+                    self._conn.execute("DELETE FROM contexts WHERE id = ?", row)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # --- Consulta ---
+
+    @classmethod
+    def _match_expression(cls, query: str) -> Optional[str]:
+        # Cada palavra da consulta vira um prefixo obrigatório: "api aut" casa com "API de autenticação"
+        tokens = cls._TOKEN.findall(query)
+        return " AND ".join(f'"{token}"*' for token in tokens) or None
+
+    def _where(self, query: Optional[str], tags: Optional[Set[str]], status: Optional[str],
+               created_after: Optional[datetime], correlated_tags: bool = False) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        match = self._match_expression(query) if query else None
+        if match:
+            clauses.append("c.id IN (SELECT rowid FROM contexts_fts WHERE contexts_fts MATCH ?)")
+            params.append(match)
+        if tags:
+            placeholders = ", ".join("?" * len(tags))
+            if correlated_tags:
+                # Correlacionado: o SQLite percorre o índice de last_modified e para ao completar a página
+                clauses.append(f"EXISTS (SELECT 1 FROM context_tags t WHERE t.id = c.id AND t.tag IN ({placeholders}))")
+            else:
+                clauses.append(f"c.id IN (SELECT id FROM context_tags WHERE tag IN ({placeholders}))")
+            params.extend(sorted(tags))
+        if status:
+            clauses.append("c.status = ?")
+            params.append(status)
+        if created_after:
+            clauses.append("c.created_at >= ?")
+            params.append(created_after.timestamp())
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _facet_counts(self, facet: str) -> Dict[str, int]:
+        return dict(self._conn.execute(
+            "SELECT value, count FROM context_facets WHERE facet = ? AND count > 0 ORDER BY count DESC, value",
+            (facet,),
+        ).fetchall())
+
+    def _tags_are_common(self, tags: Set[str]) -> bool:
+        counts = self._facet_counts("tag")
+        total = sum(self._facet_counts("status").values())
+        return sum(counts.get(tag, 0) for tag in tags) >= total * self.COMMON_TAG_FRACTION
+
+    def search(self, query: Optional[str] = None, tags: Optional[Set[str]] = None,
+               status: Optional[str] = None, created_after: Optional[datetime] = None,
+               limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Página de resultados (mais recentemente modificados primeiro) e o total de resultados"""
+        with self._lock:
+            total = self._count(query, tags, status, created_after)
+            where, params = self._where(query, tags, status, created_after,
+                                        correlated_tags=bool(tags) and self._tags_are_common(tags))
+            rows = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM contexts c{where} ORDER BY c.last_modified DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows], total
+
+    def _count(self, query: Optional[str], tags: Optional[Set[str]], status: Optional[str],
+               created_after: Optional[datetime]) -> int:
+        # Filtros isolados são contados pelas contagens das facetas ou pelo próprio FTS
+        if not (query or created_after) and not (tags and status):
+            if tags and len(tags) == 1:
+                return self._facet_counts("tag").get(next(iter(tags)), 0)
+            if not tags:
+                counts = self._facet_counts("status")
+                return counts.get(status, 0) if status else sum(counts.values())
+        match = self._match_expression(query) if query else None
+        if match and not (tags or status or created_after):
+            return self._conn.execute("SELECT COUNT(*) FROM contexts_fts WHERE contexts_fts MATCH ?", (match,)).fetchone()[0]
+        where, params = self._where(query, tags, status, created_after)
+        return self._conn.execute(f"SELECT COUNT(*) FROM contexts c{where}", params).fetchone()[0]
+
+    def facets(self, query: Optional[str] = None, tags: Optional[Set[str]] = None,
+               status: Optional[str] = None, created_after: Optional[datetime] = None,
+               max_tags: int = 50) -> Dict[str, Dict[str, int]]:
+        """Contagens por status e por tag (as `max_tags` mais frequentes) dos contextos que casam com os filtros"""
+        with self._lock:
+            if not (query or tags or status or created_after):
+                by_tag = list(self._facet_counts("tag").items())[:max_tags]
+                return {"status": self._facet_counts("status"), "tags": dict(by_tag)}
+            where, params = self._where(query, tags, status, created_after)
+            by_status = self._conn.execute(
+                f"SELECT c.status, COUNT(*) FROM contexts c{where} GROUP BY c.status", params
+            ).fetchall()
+            by_tag = self._conn.execute(
+                f"""SELECT t.tag, COUNT(*) FROM context_tags t JOIN contexts c ON c.id = t.id{where}
+                    GROUP BY t.tag ORDER BY COUNT(*) DESC, t.tag LIMIT ?""",
+                [*params, max_tags],
+            ).fetchall()
+        return {"status": dict(by_status), "tags": dict(by_tag)}
+
+    def all_entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {self._COLUMNS} FROM contexts").fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(self._facet_counts("status").values())
+
+    @staticmethod
+    def _row_to_dict(row: Tuple) -> Dict[str, Any]:
+        (context_id, project_name, project_goal, status, created_at, last_modified,
+         tags, dependencies, size_bytes, file_count) = row
+        return {
+            'context_id': context_id,
+            'project_name': project_name,
+            'project_goal': project_goal,
+            'status': status,
+            'created_at': datetime.fromtimestamp(created_at),
+            'last_modified': datetime.fromtimestamp(last_modified),
+            'tags': set(json.loads(tags)),
+            'dependencies': set(json.loads(dependencies)),
+            'size_bytes': size_bytes,
+            'file_count': file_count,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -4,6 +4,63 @@ import os
 import hashlib
 from pathlib import Path
 from .observability_service import log
+from .workspace_usage import get_workspace_usage
+
+
+def _file_size(path: Path) -> int | None:
+    """Size of an existing file, or None if there is none"""
+    try:
+        return path.stat().st_size if path.is_file() else None
+    except OSError:
+        return None
+
+
+class IncrementalFileWriter:
+    """
+    Writes a file piece by piece into '<name>.partial' and moves it onto the
+    target on exit (os.replace), so readers never see a half-written file.
+    The partial file is removed on discard() or if an exception is raised.
+    """
+
+    def __init__(self, path: Path, file_path: str, workspace_path: Path = None):
+        self.path = path
+        self.file_path = file_path
+        self.workspace_path = workspace_path
+        self.partial_path = path.with_name(path.name + ".partial")
+        self._handle = None
+        self._discarded = False
+
+    def __enter__(self) -> "IncrementalFileWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.partial_path.open("w", encoding="utf-8")
+        return self
+
+    def write(self, text: str):
+        if text:
+            self._handle.write(text)
+            self._handle.flush()
+
+    def rewrite(self, text: str):
+        """Replaces everything written so far"""
+        self._handle.seek(0)
+        self._handle.truncate()
+        self.write(text)
+
+    def discard(self):
+        self._discarded = True
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self._handle.close()
+        if exc_type or self._discarded:
+            self.partial_path.unlink(missing_ok=True)
+            return False
+        old_size = _file_size(self.path)
+        os.replace(self.partial_path, self.path)
+        if self.workspace_path is not None:
+            get_workspace_usage().record_write(self.workspace_path, old_size, self.path.stat().st_size)
+        log.info(f"Successfully wrote to {self.file_path} (incremental)")
+        return False
+
 
 class FileService:
     def __init__(self, workspace_path: str):
@@ -21,7 +78,9 @@ class FileService:
         log.info(f"Writing file: {path}")
         try:
             path.parent.mkdir(parents=True, exist_ok=True)
+            old_size = _file_size(path)
             path.write_text(content, encoding='utf-8')
+            get_workspace_usage().record_write(self.workspace_path, old_size, path.stat().st_size)
             log.info(f"Successfully wrote to {file_path}")
         except Exception as e:
             log.error(f"Failed to write file {file_path}", error=str(e), exc_info=True)
@@ -52,6 +111,12 @@ class FileService:
                 all_files.append(str(relative_path))
         return all_files
 
+    def open_incremental(self, file_path: str) -> IncrementalFileWriter:
+        """Context manager to write a file as its content is produced (e.g. LLM streaming)"""
+        path = self._get_full_path(file_path)
+        log.info(f"Writing file incrementally: {path}")
+        return IncrementalFileWriter(path, file_path, self.workspace_path)
+
     def save_file(self, file_path: str, content: str):
         """Alias for write_file for compatibility"""
         return self.write_file(file_path, content)
@@ -76,8 +141,14 @@ class FileService:
             log.warn(f"File not found for deletion: {file_path}")
             return
         try:
+            old_size = path.stat().st_size
             path.unlink()
+            get_workspace_usage().record_delete(self.workspace_path, old_size)
             log.info(f"Successfully deleted file: {file_path}")
         except Exception as e:
             log.error(f"Failed to delete file {file_path}", error=str(e), exc_info=True)
             raise
+
+    def note_external_changes(self):
+        """Marks the workspace as changed outside this service (e.g. by a shell command)"""
+        get_workspace_usage().mark_stale(self.workspace_path)
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from loguru import logger
+
+
+@dataclass
+class WorkspaceUsage:
+    """Tamanho e número de arquivos de um workspace"""
+    size_bytes: int = 0
+    file_count: int = 0
+    stale: bool = True            # Mudanças não contabilizadas (ex.: comandos); precisa de reconciliação
+    reconciled_at: float = 0.0    # time.monotonic() da última varredura completa (0 = nunca)
+
+
+def scan_workspace(workspace_path: Union[str, Path]) -> Tuple[int, int]:
+    """Varredura completa (uma única passada com os.scandir): retorna (bytes, arquivos)"""
+    size_bytes = file_count = 0
+    pending = [str(workspace_path)]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        size_bytes += entry.stat(follow_symlinks=False).st_size
+                        file_count += 1
+                except OSError:
+                    continue
+    return size_bytes, file_count
+
+
+class WorkspaceUsageIndex:
+    """
+    Índice do uso de disco por workspace, mantido incrementalmente.
+
+    O FileService registra cada escrita e remoção (`record_write` /
+    `record_delete`), então o tamanho e a contagem de arquivos ficam corretos
+    sem percorrer o workspace. Mudanças feitas fora dele (comandos do shell)
+    só marcam o workspace como desatualizado (`mark_stale`); uma varredura de
+    reconciliação, rodada em background, corrige os valores e também absorve
+    eventuais desvios do contador.
+    """
+    RECONCILE_INTERVAL = 3600.0  # Segundos entre reconciliações de um workspace que não mudou por fora
+
+    def __init__(self, reconcile_interval: float = RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        self._usage: Dict[str, WorkspaceUsage] = {}
+        self._lock = threading.Lock()
+        self._stats = {"writes": 0, "deletes": 0, "stale_marks": 0, "reconciliations": 0}
+
+    @staticmethod
+    def _key(workspace_path: Union[str, Path]) -> str:
+        return os.path.abspath(workspace_path)
+
+    # --- Eventos ---
+
+    def track(self, workspace_path: Union[str, Path], size_bytes: int = 0, file_count: int = 0, stale: bool = True):
+        """Passa a acompanhar um workspace, com valores iniciais (ex.: os persistidos no índice de contextos)"""
+        with self._lock:
+            self._usage.setdefault(self._key(workspace_path), WorkspaceUsage(size_bytes, file_count, stale))
+
+    def record_write(self, workspace_path: Union[str, Path], old_size: Optional[int], new_size: int):
+        """Registra a escrita de um arquivo; `old_size` é None se o arquivo não existia"""
+        with self._lock:
+            usage = self._usage.setdefault(self._key(workspace_path), WorkspaceUsage())
+            usage.size_bytes += new_size - (old_size or 0)
+            if old_size is None:
+                usage.file_count += 1
+            self._stats["writes"] += 1
+
+    def record_delete(self, workspace_path: Union[str, Path], old_size: int):
+        """Registra a remoção de um arquivo de `old_size` bytes"""
+        with self._lock:
+            usage = self._usage.setdefault(self._key(workspace_path), WorkspaceUsage())
+            usage.size_bytes = max(0, usage.size_bytes - old_size)
+            usage.file_count = max(0, usage.file_count - 1)
+            self._stats["deletes"] += 1
+
+    def mark_stale(self, workspace_path: Union[str, Path]):
+        """O workspace mudou por fora do FileService (ex.: um comando); a próxima reconciliação o varre"""
+        with self._lock:
+            self._usage.setdefault(self._key(workspace_path), WorkspaceUsage()).stale = True
+            self._stats["stale_marks"] += 1
+
+    def forget(self, workspace_path: Union[str, Path]):
+        with self._lock:
+            self._usage.pop(self._key(workspace_path), None)
+
+    # --- Consulta e reconciliação ---
+
+    def get(self, workspace_path: Union[str, Path]) -> Optional[WorkspaceUsage]:
+        """Cópia do uso conhecido do workspace (O(1)), ou None se ele não é acompanhado"""
+        with self._lock:
+            usage = self._usage.get(self._key(workspace_path))
+            return None if usage is None else WorkspaceUsage(**vars(usage))
+
+    def needs_reconcile(self, workspace_path: Union[str, Path]) -> bool:
+        with self._lock:
+            usage = self._usage.get(self._key(workspace_path))
+            return usage is None or usage.stale or \
+                time.monotonic() - usage.reconciled_at >= self.reconcile_interval
+
+    def reconcile(self, workspace_path: Union[str, Path]) -> WorkspaceUsage:
+        """Recalcula o uso do workspace com uma varredura completa"""
+        key = self._key(workspace_path)
+        with self._lock:
+            # Eventos registrados durante a varredura são absorvidos pelo resultado dela
+            usage = self._usage.setdefault(key, WorkspaceUsage())
+            usage.stale = False
+        size_bytes, file_count = scan_workspace(key)
+        with self._lock:
+            usage = self._usage.setdefault(key, WorkspaceUsage())
+            usage.size_bytes, usage.file_count = size_bytes, file_count
+            usage.reconciled_at = time.monotonic()
+            self._stats["reconciliations"] += 1
+            logger.debug(f"Workspace usage reconciled for {key}: {size_bytes} bytes, {file_count} files")
+            return WorkspaceUsage(**vars(usage))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "workspaces": len(self._usage),
+                    "stale": sum(1 for usage in self._usage.values() if usage.stale)}
+
+
+# Índice compartilhado por todos os serviços do processo
+_workspace_usage_instance: Optional[WorkspaceUsageIndex] = None
+_workspace_usage_lock = threading.Lock()
+
+
+def get_workspace_usage() -> WorkspaceUsageIndex:
+    """Retorna a instância singleton do WorkspaceUsageIndex"""
+    global _workspace_usage_instance
+    if _workspace_usage_instance is None:
+        with _workspace_usage_lock:
+            if _workspace_usage_instance is None:
+                _workspace_usage_instance = WorkspaceUsageIndex()
+    return _workspace_usage_instance
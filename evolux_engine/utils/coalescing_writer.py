@@ -0,0 +1,188 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from loguru import logger
+
+
+def atomic_write_bytes(path: Union[str, Path], payload: bytes, fsync: bool = True):
+    """Grava `payload` em um arquivo temporário e o renomeia atomicamente sobre `path`."""
+    path = Path(path)
+    temp_file = path.with_name(path.name + ".tmp")
+    with open(temp_file, "wb") as f:
+        f.write(payload)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(temp_file, path)
+
+
+@dataclass
+class _KeyState:
+    write: Optional[Callable[[], Any]] = None   # Escrita pendente (ainda não iniciada)
+    future: Optional[Future] = None             # Future compartilhado pelos pedidos pendentes
+    timer: Optional[threading.Timer] = None
+    running: Optional[Future] = None            # Escrita em andamento
+
+
+class CoalescingWriter:
+    """
+    Escritor de arquivos fora do event loop, com coalescência por chave.
+
+    `submit(key, write)` agenda `write` (uma função sem argumentos que faz a
+    gravação) para rodar em um pool de threads depois de uma janela de
+    `window` segundos. Pedidos para a mesma chave que chegam antes de a
+    escrita começar substituem a escrita pendente e compartilham o mesmo
+    Future, então uma rajada de saves vira uma única gravação com o estado
+    mais recente. Escritas da mesma chave nunca rodam em paralelo.
+
+    `flush()` é a barreira para shutdown e timeouts: antecipa as escritas
+    pendentes e espera que terminem.
+    """
+    DEFAULT_WINDOW = 0.05
+    MAX_WORKERS = 4
+
+    def __init__(self, window: float = DEFAULT_WINDOW, max_workers: int = MAX_WORKERS):
+        self.window = window
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="context-writer")
+        self._keys: Dict[str, _KeyState] = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "written": 0, "coalesced": 0, "failed": 0}
+
+    # --- Agendamento ---
+
+    def submit(self, key: str, write: Callable[[], Any]) -> Future:
+        """Agenda `write` para a chave `key`, substituindo uma escrita ainda pendente."""
+        with self._lock:
+            state = self._keys.setdefault(key, _KeyState())
+            self._stats["submitted"] += 1
+            state.write = write
+            if state.future is not None:
+                self._stats["coalesced"] += 1
+                return state.future
+            state.future = Future()
+            if state.running is None:
+                self._schedule(key, state, self.window)
+            return state.future
+
+    async def write(self, key: str, write: Callable[[], Any]) -> Any:
+        """Versão assíncrona de `submit`: aguarda a gravação sem bloquear o event loop."""
+        return await asyncio.wrap_future(self.submit(key, write))
+
+    def _schedule(self, key: str, state: _KeyState, delay: float):
+        # Chamado com self._lock adquirido
+        if delay > 0:
+            state.timer = threading.Timer(delay, self._dispatch, (key,))
+            state.timer.daemon = True
+            state.timer.start()
+        else:
+            state.timer = None
+            self._executor.submit(self._run, key)
+
+    def _dispatch(self, key: str):
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None or state.timer is None:
+                return
+            state.timer = None
+            self._executor.submit(self._run, key)
+
+    def _run(self, key: str):
+        with self._lock:
+            state = self._keys.get(key)
+            # Sem escrita pendente (já antecipada por um flush) ou outra em andamento,
+            # que reagenda a pendente ao terminar
+            if state is None or state.future is None or state.running is not None:
+                return
+            write, future = state.write, state.future
+            state.write, state.future, state.running = None, None, future
+            if state.timer is not None:
+                state.timer.cancel()
+                state.timer = None
+
+        try:
+            result = write()
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"Falha na escrita coalescida de '{key}': {e}")
+            future.set_exception(e)
+        else:
+            self._stats["written"] += 1
+            future.set_result(result)
+        finally:
+            with self._lock:
+                state.running = None
+                if state.future is not None:
+                    # Pedidos que chegaram durante a escrita já esperaram uma janela
+                    self._schedule(key, state, 0)
+                elif self._keys.get(key) is state:
+                    del self._keys[key]
+
+    # --- Barreira ---
+
+    def _collect(self, key: Optional[str]) -> List[Future]:
+        with self._lock:
+            futures = []
+            for state_key in ([key] if key is not None else list(self._keys)):
+                state = self._keys.get(state_key)
+                if state is None:
+                    continue
+                if state.future is not None:
+                    futures.append(state.future)
+                    if state.timer is not None and state.running is None:
+                        state.timer.cancel()
+                        self._schedule(state_key, state, 0)
+                if state.running is not None:
+                    futures.append(state.running)
+            return futures
+
+    def flush(self, key: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Antecipa as escritas pendentes (de `key` ou de todas as chaves) e espera
+        que terminem. Retorna False se `timeout` expirar antes.
+        """
+        futures = self._collect(key)
+        if not futures:
+            return True
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+    async def aflush(self, key: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Versão assíncrona de `flush`."""
+        futures = [asyncio.wrap_future(future) for future in self._collect(key)]
+        if not futures:
+            return True
+        _, not_done = await asyncio.wait(futures, timeout=timeout)
+        return not not_done
+
+    def pending_keys(self) -> List[str]:
+        with self._lock:
+            return list(self._keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "pending": len(self._keys), "window": self.window}
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Grava o que estiver pendente e encerra o pool de threads."""
+        flushed = self.flush(timeout=timeout)
+        self._executor.shutdown(wait=flushed)
+        return flushed
+
+
+# Escritor compartilhado por todos os contextos do processo
+_context_writer_instance: Optional[CoalescingWriter] = None
+_context_writer_lock = threading.Lock()
+
+
+def get_context_writer() -> CoalescingWriter:
+    """Retorna a instância singleton do CoalescingWriter usada na persistência de contextos."""
+    global _context_writer_instance
+    if _context_writer_instance is None:
+        with _context_writer_lock:
+            if _context_writer_instance is None:
+                _context_writer_instance = CoalescingWriter()
+    return _context_writer_instance
@@ -1,6 +1,6 @@
 import asyncio
 import time
-from typing import Optional, Deque
+from typing import Optional, Deque, Dict, Any, Callable, Awaitable, Tuple
 from collections import deque
 from loguru import logger
 
@@ -34,7 +34,9 @@ class CircuitBreaker:
 
     async def __aexit__(self, exc_type, exc_val, traceback):
         async with self._lock:
-            if exc_type:
+            # GeneratorExit (consumidor de um streaming parou de ler) e CancelledError
+            # (ex.: perdedor de um hedge) não são falhas do serviço
+            if exc_type and not issubclass(exc_type, (GeneratorExit, asyncio.CancelledError)):
                 if self._state == "half-open":
                     self._open_circuit()
                     logger.error(f"CircuitBreaker '{self.name}' falhou no estado HALF-OPEN. Reabrindo o circuito.")
@@ -60,29 +62,175 @@ class CircuitBreaker:
 
 class RateLimiter:
     """
-    Um limitador de taxa simples baseado no algoritmo de token bucket.
+    Limitador de taxa por token bucket com dois orçamentos: requisições por
+    minuto (RPM) e, opcionalmente, tokens por minuto (TPM).
+
+    Cada chamada reserva sua parte dos dois buckets de forma síncrona (o nível
+    pode ficar negativo, como dívida) e dorme fora de qualquer lock até a dívida
+    ser paga. Assim as esperas são atendidas em ordem de chegada e um waiter
+    dormindo não bloqueia os demais. Os cabeçalhos do provedor corrigem os
+    buckets via `apply_feedback`, e `settle` devolve a diferença entre a reserva
+    estimada e os tokens realmente usados.
     """
-    def __init__(self, requests_per_minute: int, name: str = "default"):
+    def __init__(self, requests_per_minute: int, name: str = "default", tokens_per_minute: Optional[int] = None):
         self.rate_limit = requests_per_minute
-        self.tokens = float(self.rate_limit)
+        self.tokens = float(self.rate_limit)  # requisições disponíveis
+        self.token_limit = tokens_per_minute
+        self.token_budget = float(tokens_per_minute or 0)  # tokens disponíveis
         self.last_refill = time.monotonic()
         self.name = name
-        self._lock = asyncio.Lock()
-        logger.info(f"RateLimiter '{self.name}' inicializado: {requests_per_minute} reqs/min")
+        self._blocked_until = 0.0
+        self._stats = {"acquired": 0, "waited": 0, "total_wait_s": 0.0, "refunded_tokens": 0}
+        logger.info(f"RateLimiter '{self.name}' inicializado: {requests_per_minute} reqs/min, {tokens_per_minute or 'sem limite de'} tokens/min")
 
-    async def wait_for_token(self):
-        async with self._lock:
-            now = time.monotonic()
-            time_since_refill = now - self.last_refill
-            
-            refill_amount = time_since_refill * (self.rate_limit / 60.0)
-            if refill_amount > 0:
-                self.tokens = min(self.rate_limit, self.tokens + refill_amount)
-                self.last_refill = now
-
-            if self.tokens < 1:
-                wait_time = (1 - self.tokens) * (60.0 / self.rate_limit)
-                logger.warning(f"RateLimiter '{self.name}' atingiu o limite. Aguardando {wait_time:.2f}s.")
+    def _refill(self, now: float):
+        elapsed = now - self.last_refill
+        if elapsed <= 0:
+            return
+        self.tokens = min(float(self.rate_limit), self.tokens + elapsed * self.rate_limit / 60.0)
+        if self.token_limit:
+            self.token_budget = min(float(self.token_limit), self.token_budget + elapsed * self.token_limit / 60.0)
+        self.last_refill = now
+
+    def _reserve(self, tokens: int) -> Tuple[float, int]:
+        """Desconta uma requisição e `tokens` tokens; retorna (espera em s, tokens reservados)."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = -self.tokens * 60.0 / self.rate_limit
+        reserved = 0
+        if self.token_limit and tokens:
+            reserved = min(tokens, self.token_limit)  # Uma requisição maior que a cota nunca caberia
+            self.token_budget -= reserved
+            wait = max(wait, -self.token_budget * 60.0 / self.token_limit)
+        return max(0.0, wait, self._blocked_until - now), reserved
+
+    async def wait_for_token(self, tokens: int = 0) -> int:
+        """
+        Aguarda capacidade para uma requisição que deve consumir ~`tokens`
+        (prompt + completion). Retorna os tokens reservados, a informar em `settle`.
+        """
+        wait_time, reserved = self._reserve(tokens)
+        self._stats["acquired"] += 1
+        if wait_time > 0:
+            self._stats["waited"] += 1
+            self._stats["total_wait_s"] += wait_time
+            logger.warning(f"RateLimiter '{self.name}' atingiu o limite. Aguardando {wait_time:.2f}s.")
+            try:
                 await asyncio.sleep(wait_time)
-            
-            self.tokens -= 1
+            except asyncio.CancelledError:
+                # Devolver a reserva de quem desistiu da fila, sem passar da capacidade dos buckets
+                self.tokens = min(float(self.rate_limit), self.tokens + 1)
+                if self.token_limit:
+                    self.token_budget = min(float(self.token_limit), self.token_budget + reserved)
+                raise
+        return reserved
+
+    def settle(self, reserved_tokens: int, used_tokens: Optional[int]):
+        """
+        Corrige o bucket de tokens com o uso real informado pelo provedor. Sem
+        uso informado (requisição que falhou, foi cancelada ou interrompida
+        antes do fim) a reserva é devolvida inteira; os cabeçalhos de tokens
+        restantes (`apply_feedback`) corrigem o bucket se houve consumo.
+        """
+        if not self.token_limit:
+            return
+        difference = reserved_tokens - (used_tokens or 0)
+        self.token_budget = min(float(self.token_limit), self.token_budget + difference)
+        if difference > 0:
+            self._stats["refunded_tokens"] += difference
+
+    def apply_feedback(self, limit: Optional[int] = None, remaining: Optional[int] = None,
+                       retry_after: Optional[float] = None, token_limit: Optional[int] = None,
+                       token_remaining: Optional[int] = None):
+        """
+        Ajusta os buckets a partir dos cabeçalhos de rate limit do provedor:
+        limites por minuto informados, requisições/tokens restantes na janela
+        atual e pausa obrigatória (retry-after).
+        """
+        self._refill(time.monotonic())
+        if limit and limit != self.rate_limit:
+            logger.info(f"RateLimiter '{self.name}' ajustado pelo provedor: {self.rate_limit} -> {limit} reqs/min")
+            self.rate_limit = limit
+            self.tokens = min(self.tokens, float(limit))
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+        if token_limit and token_limit != self.token_limit:
+            logger.info(f"RateLimiter '{self.name}' ajustado pelo provedor: {self.token_limit} -> {token_limit} tokens/min")
+            if not self.token_limit:
+                self.token_budget = float(token_limit)
+            self.token_limit = token_limit
+            self.token_budget = min(self.token_budget, float(token_limit))
+        if token_remaining is not None and self.token_limit:
+            self.token_budget = min(self.token_budget, float(token_remaining))
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            logger.warning(f"RateLimiter '{self.name}' pausado por {retry_after:.1f}s (retry-after do provedor).")
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            **self._stats,
+            "requests_per_minute": self.rate_limit,
+            "tokens_per_minute": self.token_limit,
+            "available_requests": round(self.tokens, 2),
+            "available_tokens": round(self.token_budget) if self.token_limit else None,
+        }
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave em uma única execução:
+    a primeira chamada executa e as demais aguardam o mesmo resultado (ou
+    exceção). Se a execução líder for cancelada, um dos que aguardavam assume.
+    """
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stats = {"executions": 0, "coalesced": 0, "saved": 0}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]],
+                 savings: Optional[Callable[[Any], int]] = None) -> Tuple[Any, bool]:
+        """
+        Executa `factory()` ou aguarda a execução em andamento para `key`.
+        Retorna (resultado, compartilhado). `savings(resultado)` estima o custo
+        poupado por cada chamada agrupada, somado em `get_stats()["saved"]`.
+        """
+        while True:
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    continue  # Líder cancelado: tentar assumir a execução
+                raise
+            self._stats["coalesced"] += 1
+            if savings is not None:
+                self._stats["saved"] += savings(result)
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self._stats["executions"] += 1
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Evita o aviso de exceção não consumida quando ninguém aguardava
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self._stats, "in_flight": len(self._in_flight)}
@@ -395,4 +395,138 @@ def extract_file_content_from_response(response: str, language: str = None) -> s
         return content
     
     # Fallback: limpa e retorna a resposta inteira
-    return clean_llm_response(response)
\ No newline at end of file
+    return clean_llm_response(response)
+
+class StreamingContentExtractor:
+    """
+    Parser incremental de respostas de LLM recebidas em streaming.
+
+    O formato é decidido pelos primeiros caracteres não brancos:
+    - "code": bloco ```linguagem ... ```; o conteúdo (sem as cercas) é liberado
+      linha a linha e `done` fica verdadeiro ao chegar a cerca de fechamento.
+      Blocos aninhados (```bash dentro de um ```markdown) são contados: só a
+      cerca que fecha o bloco externo encerra o conteúdo.
+      Um bloco ```json é tratado como "json";
+    - "json": objeto JSON, acumulado até fechar a chave de nível superior
+      (chaves dentro de strings são ignoradas), quando `done` fica verdadeiro;
+    - "text": texto livre, liberado assim que chega.
+
+    `feed` retorna o texto pronto para ser gravado, `content` acumula tudo o que
+    já foi liberado e `raw` guarda a resposta recebida até o ponto de parada.
+    """
+
+    def __init__(self):
+        self.mode: str | None = None
+        self.done = False
+        self.raw = ""
+        self.content = ""
+        self._pending = ""
+        self._line = ""
+        self._header_seen = False
+        self._blank_lines = 0
+        self._fence_depth = 0  # Blocos ```linguagem abertos dentro do bloco externo
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> str:
+        """Processa um trecho e retorna o conteúdo liberado por ele."""
+        if self.done or not chunk:
+            return ""
+        if self.mode is None:
+            self._pending += chunk
+            stripped = self._pending.lstrip()
+            if not stripped or (len(stripped) < 3 and "```".startswith(stripped)):
+                return ""  # Ainda não dá para decidir o formato
+            if stripped.startswith("{"):
+                self.mode = "json"
+            elif stripped.startswith("```"):
+                self.mode = "code"
+            else:
+                self.mode = "text"
+            chunk, self._pending = self._pending, ""
+
+        if self.mode == "code":
+            return self._feed_code(chunk)
+        if self.mode == "json":
+            self._feed_json(chunk)
+            return ""
+        self.raw += chunk
+        self.content += chunk
+        return chunk
+
+    def finish(self) -> str:
+        """Libera o que ficou retido ao fim do streaming (ou da interrupção)."""
+        if self.mode is None:
+            self.mode = "text"
+            return self.feed(self._pending) if self._pending else ""
+        if self.mode != "code" or self.done or not self._line:
+            return ""
+        line, self._line = self._line, ""
+        self.raw += line
+        if line.strip() == "```" and self._fence_depth == 0:
+            self.done = True
+            return ""
+        if line.rstrip().endswith("```") and self._fence_depth == 0:
+            line = line.rstrip()[:-3]
+        return self._emit_line(line)
+
+    def _feed_code(self, data: str) -> str:
+        output = []
+        self._line += data
+        while "\n" in self._line and not self.done:
+            line, self._line = self._line.split("\n", 1)
+            self.raw += line + "\n"
+            line = line.rstrip("\r")
+            if not self._header_seen:
+                self._header_seen = True
+                if line.strip()[3:].strip().lower() == "json":
+                    self.mode = "json"
+                    remainder, self._line = self._line, ""
+                    self._feed_json(remainder)
+                    break
+                continue
+            fence = line.strip()
+            if fence == "```" and self._fence_depth == 0:
+                self.raw = self.raw[:-1]
+                self._line = ""
+                self.done = True
+                break
+            if fence == "```":
+                self._fence_depth -= 1
+            elif fence.startswith("```") and fence[3:].strip():
+                self._fence_depth += 1
+            output.append(self._emit_line(line))
+        return "".join(output)
+
+    def _emit_line(self, line: str) -> str:
+        # Linhas vazias no início são descartadas e no fim ficam retidas (como em strip())
+        if not line.strip():
+            if self.content:
+                self._blank_lines += 1
+            return ""
+        text = ("\n" if self.content else "") + "\n" * self._blank_lines + line
+        self._blank_lines = 0
+        self.content += text
+        return text
+
+    def _feed_json(self, data: str):
+        for index, char in enumerate(data):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.raw += data[:index + 1]
+                    self.done = True
+                    return
+        self.raw += data
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Process-wide registries: one encoder per encoding name and one counter (with its cache) per encoding
+_encoders: Dict[str, Any] = {}
+_counters: Dict[str, "TokenCounter"] = {}
+_registry_lock = threading.Lock()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def resolve_encoding_name(model_name: str) -> str:
+    """
+    Maps a model name to its tiktoken encoding without loading it. Provider
+    prefixes ("openai/gpt-4o-mini") are ignored; unknown models use cl100k_base.
+    """
+    try:
+        return tiktoken.encoding_name_for_model(model_name.rsplit("/", 1)[-1])
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+def get_encoder(encoding_name: str = DEFAULT_ENCODING) -> Any:
+    """Returns the shared encoder for `encoding_name`, loading it on first use."""
+    encoder = _encoders.get(encoding_name)
+    if encoder is None:
+        with _registry_lock:
+            encoder = _encoders.get(encoding_name)
+            if encoder is None:
+                encoder = tiktoken.get_encoding(encoding_name)
+                _encoders[encoding_name] = encoder
+    return encoder
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TokenCounter.MAX_WORKERS, thread_name_prefix="token-counter")
+    return _executor
+
+
+class TokenCounter:
+    """
+    Shared token-counting service for one encoding.
+
+    The encoder is only loaded on the first count that misses the cache, and
+    counts are memoized in a bounded LRU keyed by a hash of the content, so
+    system prompts and templates counted by every client are encoded once per
+    process. `count_many` counts a batch at once: repeated texts are encoded
+    once, and when the uncached part of the batch is large it is spread over a
+    thread pool (tiktoken releases the GIL while encoding).
+    """
+    CACHE_SIZE = 8192
+    PARALLEL_MIN_CHARS = 200_000  # Uncached characters in a batch before the thread pool is used
+    MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING, encoder: Any = None, cache_size: Optional[int] = None):
+        self.encoding_name = encoding_name
+        self._encoder = encoder
+        self.cache_size = cache_size or self.CACHE_SIZE
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "batches": 0, "parallel_batches": 0}
+
+    @property
+    def encoder(self) -> Any:
+        if self._encoder is None:
+            self._encoder = get_encoder(self.encoding_name)
+        return self._encoder
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _encode_count(self, text: str) -> int:
+        # Special-token text ("<|endoftext|>") is counted as plain text instead of raising
+        encoder = self.encoder
+        encode = getattr(encoder, "encode_ordinary", None) or encoder.encode
+        return len(encode(text))
+
+    def _lookup(self, key: bytes) -> Optional[int]:
+        with self._lock:
+            count = self._cache.get(key)
+            if count is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["hits"] += 1
+                self._cache.move_to_end(key)
+            return count
+
+    def _store(self, key: bytes, count: int):
+        with self._lock:
+            self._cache[key] = count
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        """Number of tokens in `text`."""
+        key = self._key(text)
+        count = self._lookup(key)
+        if count is None:
+            count = self._encode_count(text)
+            self._store(key, count)
+        return count
+
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        """Token counts for `texts`, in order."""
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+        counts: Dict[bytes, int] = {}
+        pending: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key in counts or key in pending:
+                continue
+            count = self._lookup(key)
+            if count is None:
+                pending[key] = text
+            else:
+                counts[key] = count
+
+        with self._lock:
+            self._stats["batches"] += 1
+        if pending:
+            items = list(pending.items())
+            if (self.MAX_WORKERS > 1 and len(items) > 1
+                    and sum(len(text) for _, text in items) >= self.PARALLEL_MIN_CHARS):
+                with self._lock:
+                    self._stats["parallel_batches"] += 1
+                encoded = list(_get_executor().map(self._encode_count, (text for _, text in items)))
+            else:
+                encoded = [self._encode_count(text) for _, text in items]
+            for (key, _), count in zip(items, encoded):
+                counts[key] = count
+                self._store(key, count)
+
+        return [counts[key] for key in keys]
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "encoding": self.encoding_name,
+                "cached_entries": len(self._cache),
+                "hit_rate": f"{(self._stats['hits'] / lookups * 100) if lookups else 0:.1f}%",
+            }
+
+
+def get_token_counter(model_name: str = "gpt-4") -> TokenCounter:
+    """Returns the process-wide counter for the encoding used by `model_name`."""
+    encoding_name = resolve_encoding_name(model_name)
+    counter = _counters.get(encoding_name)
+    if counter is None:
+        with _registry_lock:
+            counter = _counters.setdefault(encoding_name, TokenCounter(encoding_name))
+    return counter
+
+
+def list_token_counters() -> Dict[str, Dict[str, Any]]:
+    """Metrics of every shared counter, by encoding."""
+    return {name: counter.get_stats() for name, counter in _counters.items()}
@@ -1,52 +1,284 @@
-import tiktoken
-from typing import List, Dict, Optional
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any
+
+from evolux_engine.utils.token_counter import TokenCounter, get_token_counter
+
 
 class TokenOptimizer:
     """
     A utility class for managing and optimizing token usage in LLM prompts.
+    Counting is delegated to the process-wide TokenCounter of the model's
+    encoding, so creating an optimizer does not load an encoder and counts are
+    shared (and cached) across every client using the same encoding.
     """
-    def __init__(self, model_name: str = "gpt-4"):
-        try:
-            self.encoder = tiktoken.encoding_for_model(model_name)
-        except KeyError:
-            self.encoder = tiktoken.get_encoding("cl100k_base")
+
+    def __init__(self, model_name: str = "gpt-4", counter: Optional[TokenCounter] = None):
+        self.counter = counter or get_token_counter(model_name)
+
+    @property
+    def encoder(self) -> Any:
+        return self.counter.encoder
 
     def count_tokens(self, text: str) -> int:
         """Counts the number of tokens in a given text."""
-        return len(self.encoder.encode(text))
+        return self.counter.count(text)
+
+    def count_tokens_many(self, texts: List[str]) -> List[int]:
+        """Counts the tokens of several texts in one batch."""
+        return self.counter.count_many(texts)
 
     def truncate_messages(self, messages: List[Dict[str, str]], max_tokens: int) -> List[Dict[str, str]]:
         """
-        Truncates a list of messages to fit within a specified token limit,
-        prioritizing more recent messages.
+        Truncates a list of messages to fit within a specified token limit.
+        System messages and the last message are always kept (the last one is
+        shortened if needed); older conversation messages are dropped first.
         """
-        total_tokens = sum(self.count_tokens(msg["content"]) for msg in messages)
-        if total_tokens <= max_tokens:
+        counts = self.count_tokens_many([msg["content"] for msg in messages])
+        if sum(counts) <= max_tokens:
             return messages
 
-        truncated_messages = []
-        current_tokens = 0
-        
-        # Always include the last message
-        last_message = messages[-1]
-        last_message_tokens = self.count_tokens(last_message["content"])
-        
-        if last_message_tokens > max_tokens:
-            # If the last message alone exceeds the limit, truncate it
-            truncated_content = self.encoder.decode(self.encoder.encode(last_message["content"])[:max_tokens])
-            truncated_messages.append({"role": last_message["role"], "content": truncated_content})
-            return truncated_messages
-
-        truncated_messages.append(last_message)
-        current_tokens += last_message_tokens
-
-        # Add previous messages until the token limit is reached
-        for msg in reversed(messages[:-1]):
-            msg_tokens = self.count_tokens(msg["content"])
-            if current_tokens + msg_tokens <= max_tokens:
-                truncated_messages.insert(0, msg)
-                current_tokens += msg_tokens
+        last_index = len(messages) - 1
+        keep = {index for index, msg in enumerate(messages) if msg["role"] == "system"} | {last_index}
+        pinned_tokens = sum(counts[index] for index in keep)
+
+        if pinned_tokens > max_tokens:
+            # System prompt and last message alone exceed the limit: shorten the last message first
+            last_budget = max(0, max_tokens - (pinned_tokens - counts[last_index]))
+            kept = [dict(messages[index]) for index in sorted(keep)]
+            if last_budget == 0:
+                # Not even the system prompt fits: keep only the (truncated) last message
+                last_message = messages[-1]
+                return [{"role": last_message["role"], "content": truncate_text(self, last_message["content"], max_tokens)}]
+            kept[-1]["content"] = truncate_text(self, messages[-1]["content"], last_budget)
+            return kept
+
+        # Add previous messages, most recent first, until the token limit is reached
+        current_tokens = pinned_tokens
+        for index in range(last_index - 1, -1, -1):
+            if index in keep:
+                continue
+            if current_tokens + counts[index] > max_tokens:
+                break
+            keep.add(index)
+            current_tokens += counts[index]
+
+        return [messages[index] for index in sorted(keep)]
+
+
+def truncate_text(counter: Any, text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    Shortens `text` to at most `max_tokens` (according to `counter.count_tokens`),
+    cutting at line boundaries when possible. `keep="tail"` keeps the end.
+    """
+    if max_tokens <= 0:
+        return ""
+    if counter.count_tokens(text) <= max_tokens:
+        return text
+    marker = "\n[...]" if keep == "head" else "[...]\n"
+    budget = max(1, max_tokens - counter.count_tokens(marker))
+
+    def fits(candidate: str) -> bool:
+        return counter.count_tokens(candidate) <= budget
+
+    lines = text.split("\n")
+    if keep == "tail":
+        lines.reverse()
+    # Largest number of whole lines that fits (binary search)
+    low, high = 0, len(lines)
+    while low < high:
+        middle = (low + high + 1) // 2
+        candidate = "\n".join(lines[:middle] if keep == "head" else reversed(lines[:middle]))
+        if fits(candidate):
+            low = middle
+        else:
+            high = middle - 1
+    if low > 0:
+        kept = lines[:low] if keep == "head" else list(reversed(lines[:low]))
+        result = "\n".join(kept)
+    else:
+        # Not even one line fits: cut the first (or last) line by characters
+        line = lines[0]
+        low, high = 0, len(line)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if fits(line[:middle] if keep == "head" else line[-middle:]):
+                low = middle
             else:
+                high = middle - 1
+        result = line[:low] if keep == "head" else line[len(line) - low:]
+    return result + marker if keep == "head" else marker + result
+
+
+# Lines kept by the "signatures" compression: declarations, imports and list headers
+_SIGNATURE_LINE = re.compile(
+    r"^\s*(?:from\s|import\s|class\s|def\s|async\s+def\s|@|function\s|export\s|interface\s|- |\*\s|#+\s|[A-Za-zÀ-ú ]+:$)"
+)
+
+
+def extract_signatures(text: str) -> str:
+    """Keeps only declaration-like lines (imports, classes, functions, list items, headers)."""
+    lines = [line.rstrip() for line in text.split("\n") if _SIGNATURE_LINE.match(line)]
+    return "\n".join(lines)
+
+
+def summarize_paragraphs(text: str) -> str:
+    """
+    Extractive summary: keeps the first line of each paragraph or list and
+    notes how many lines were omitted.
+    """
+    summary = []
+    for block in re.split(r"\n\s*\n", text.strip()):
+        lines = [line for line in block.split("\n") if line.strip()]
+        if not lines:
+            continue
+        summary.append(lines[0])
+        if len(lines) > 1:
+            summary.append(f"  (+{len(lines) - 1} linhas omitidas)")
+    return "\n".join(summary)
+
+
+def keep_recent_lines(text: str, max_lines: int = 10) -> str:
+    """Keeps the last `max_lines` non-empty lines (most recent entries of a history)."""
+    lines = [line for line in text.split("\n") if line.strip()]
+    if len(lines) <= max_lines:
+        return "\n".join(lines)
+    return f"(+{len(lines) - max_lines} entradas anteriores omitidas)\n" + "\n".join(lines[-max_lines:])
+
+
+COMPRESSORS = {
+    "signatures": extract_signatures,
+    "summary": summarize_paragraphs,
+    "recent": keep_recent_lines,
+}
+
+
+@dataclass
+class ContextSection:
+    """
+    A named part of a prompt with its own budget.
+    priority 0 marks a required section (never compressed or dropped);
+    higher values are less important and are reduced first.
+    """
+    name: str
+    content: str
+    priority: int = 1
+    max_tokens: Optional[int] = None
+    compression: Optional[str] = "summary"  # Key of COMPRESSORS, or None to only truncate
+    title: Optional[str] = None
+
+    def render(self) -> str:
+        return f"{self.title}:\n{self.content}" if self.title else self.content
+
+
+@dataclass
+class BudgetResult:
+    text: str
+    tokens: int
+    original_tokens: int
+    sections: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class ContextBudgeter:
+    """
+    Fits prompt sections (system, goal, artifacts, related tasks, error
+    history...) into a token budget. Instead of dropping whole messages from
+    the start, each section is first capped to its own budget, and when the
+    total is still too large the least important sections are compressed
+    (signatures, extractive summary or most recent entries), then truncated,
+    and only then dropped. Required sections (priority 0) are kept intact.
+    """
+    MIN_SECTION_TOKENS = 24  # Below this a truncated section is dropped instead
+
+    def __init__(self, token_counter: Any, separator: str = "\n\n"):
+        self.counter = token_counter
+        self.separator = separator
+        self._stats = {"calls": 0, "tokens_in": 0, "tokens_out": 0, "compressed": 0, "truncated": 0, "dropped": 0}
+
+    def _tokens(self, section: ContextSection) -> int:
+        return self.counter.count_tokens(section.render())
+
+    def _compress(self, section: ContextSection) -> bool:
+        compressor = COMPRESSORS.get(section.compression or "")
+        if compressor is None:
+            return False
+        compressed = compressor(section.content)
+        if not compressed.strip() or len(compressed) >= len(section.content):
+            return False
+        section.content = compressed
+        return True
+
+    def _truncate(self, section: ContextSection, max_tokens: int) -> bool:
+        title_tokens = self._tokens(section) - self.counter.count_tokens(section.content)
+        keep = "tail" if section.compression == "recent" else "head"
+        truncated = truncate_text(self.counter, section.content, max_tokens - title_tokens, keep=keep)
+        if not truncated.strip():
+            return False
+        section.content = truncated
+        return True
+
+    def fit(self, sections: List[ContextSection], max_tokens: int) -> BudgetResult:
+        """Returns the rendered sections (in their original order) within `max_tokens`."""
+        working = [
+            ContextSection(s.name, s.content, s.priority, s.max_tokens, s.compression, s.title)
+            for s in sections if s.content and s.content.strip()
+        ]
+        report = {s.name: {"original_tokens": self._tokens(s), "action": "kept"} for s in working}
+        original_tokens = sum(entry["original_tokens"] for entry in report.values())
+
+        def mark(section: ContextSection, action: str):
+            report[section.name]["action"] = action
+            self._stats[action] += 1
+
+        # 1. Per-section caps
+        for section in working:
+            if section.max_tokens is None or section.priority == 0 or self._tokens(section) <= section.max_tokens:
+                continue
+            if self._compress(section):
+                mark(section, "compressed")
+            if self._tokens(section) > section.max_tokens and self._truncate(section, section.max_tokens):
+                mark(section, "truncated")
+
+        separator_tokens = self.counter.count_tokens(self.separator)
+
+        def total() -> int:
+            return sum(self._tokens(s) for s in working) + separator_tokens * max(0, len(working) - 1)
+
+        # 2. Compress, then truncate, then drop, least important first
+        optional = sorted((s for s in working if s.priority > 0), key=lambda s: -s.priority)
+        for section in optional:
+            if total() <= max_tokens:
+                break
+            if report[section.name]["action"] == "kept" and self._compress(section):
+                mark(section, "compressed")
+        for section in optional:
+            excess = total() - max_tokens
+            if excess <= 0:
                 break
-        
-        return truncated_messages
+            remaining = self._tokens(section) - excess
+            if remaining >= self.MIN_SECTION_TOKENS and self._truncate(section, remaining):
+                mark(section, "truncated")
+            else:
+                working.remove(section)
+                mark(section, "dropped")
+
+        text = self.separator.join(s.render() for s in working)
+        if self.counter.count_tokens(text) > max_tokens:
+            # Only required sections are left and they still do not fit
+            text = truncate_text(self.counter, text, max_tokens)
+
+        for section in working:
+            report[section.name]["final_tokens"] = self._tokens(section)
+        tokens = self.counter.count_tokens(text)
+        self._stats["calls"] += 1
+        self._stats["tokens_in"] += original_tokens
+        self._stats["tokens_out"] += tokens
+        return BudgetResult(text=text, tokens=tokens, original_tokens=original_tokens, sections=report)
+
+    def get_stats(self) -> Dict[str, Any]:
+        saved = self._stats["tokens_in"] - self._stats["tokens_out"]
+        return {
+            **self._stats,
+            "saved_tokens": saved,
+            "reduction": f"{(saved / self._stats['tokens_in'] * 100) if self._stats['tokens_in'] else 0:.1f}%",
+        }
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Testes do AdvancedContextManager: snapshots em cadeias de keyframes e deltas.
+"""
+
+import gzip
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.config.advanced_config import AdvancedSystemConfig
+from evolux_engine.models.project_context import ProjectContext, ArtifactState
+from evolux_engine.services.advanced_context_manager import AdvancedContextManager, ContextStatus
+from evolux_engine.services.file_service import FileService
+from evolux_engine.services.backup_system import BackupSystem
+from evolux_engine.schemas.contracts import Task, TaskType, TaskStatus, TaskDetailsCreateFile
+
+
+def make_task(i: int) -> Task:
+    return Task(
+        task_id=f"task-{i}",
+        description=f"Criar módulo {i}",
+        type=TaskType.CREATE_FILE,
+        details=TaskDetailsCreateFile(file_path=f"app/module_{i}.py", content_guideline="código " * 20),
+        acceptance_criteria="arquivo criado",
+    )
+
+
+def state(context: ProjectContext):
+    return (
+        context.status,
+        [[(t.task_id, t.status) for t in getattr(context, name)]
+         for name in ("task_queue", "completed_tasks", "failed_tasks")],
+        {path: artifact.hash for path, artifact in context.artifacts_state.items()},
+    )
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    managers = []
+
+    def factory(**overrides) -> AdvancedContextManager:
+        settings = {"project_base_directory": str(tmp_path), "backup_enabled": False, "development_mode": True}
+        config = AdvancedSystemConfig(**{**settings, **overrides})
+        manager = AdvancedContextManager(config)
+        managers.append(manager)
+        return manager
+
+    yield factory
+    for manager in managers:
+        manager.cleanup_and_shutdown()
+
+
+def complete_next(context: ProjectContext, i: int):
+    task = context.task_queue.pop(0)
+    task.status = TaskStatus.COMPLETED
+    context.completed_tasks.append(task)
+    context.update_artifact_state(f"app/module_{i}.py", ArtifactState(path=f"app/module_{i}.py", hash=f"h{i}"))
+
+
+class TestSnapshotChains:
+    @pytest.mark.parametrize("storage_format", ["json", "binary"])
+    def test_snapshots_are_deltas_between_keyframes_and_rebuild_exactly(self, make_manager, storage_format):
+        manager = make_manager(context_storage_format=storage_format)
+        manager.snapshot_keyframe_interval = 4
+        context = manager.create_new_project_context("API de tarefas com autenticação")
+        context.task_queue = [make_task(i) for i in range(50)]
+
+        expected = {1: state(ProjectContext.from_data(manager.get_snapshot_data(context.project_id, 1)))}
+        for i in range(8):
+            complete_next(context, i)
+            snapshot = manager._create_snapshot(context, f"iteração {i}")
+            expected[snapshot.version] = state(context)
+
+        history = manager.get_context_history(context.project_id)
+        assert [s.kind for s in history] == ["keyframe", "delta", "delta", "delta",
+                                             "keyframe", "delta", "delta", "delta", "keyframe"]
+        assert all(s.data is None for s in history)
+        assert history[2].size_bytes < history[4].size_bytes / 2
+        for version, expected_state in expected.items():
+            assert state(manager._load_context_from_snapshot(context.project_id, version)) == expected_state
+
+    def test_history_survives_a_restart_and_keeps_numbering(self, make_manager):
+        manager = make_manager()
+        context = manager.create_new_project_context("API de tarefas com autenticação")
+        context.task_queue = [make_task(i) for i in range(5)]
+        manager._create_snapshot(context)
+        complete_next(context, 0)
+        manager._create_snapshot(context)
+        manager.cleanup_and_shutdown()
+
+        restarted = make_manager()
+        complete_next(context, 1)
+        snapshot = restarted._create_snapshot(context)
+
+        assert snapshot.version == 4 and snapshot.kind == "keyframe"  # Sem base em memória
+        assert [s.kind for s in restarted.get_context_history(context.project_id)] == ["keyframe", "delta", "delta", "keyframe"]
+        assert state(restarted._load_context_from_snapshot(context.project_id, 3))[1][1] == [("task-0", TaskStatus.COMPLETED)]
+
+    def test_cleanup_rebases_the_first_kept_delta(self, make_manager):
+        manager = make_manager()
+        context = manager.create_new_project_context("API de tarefas com autenticação")
+        context.task_queue = [make_task(i) for i in range(10)]
+        for i in range(6):
+            complete_next(context, i)
+            manager._create_snapshot(context)
+        expected = state(manager._load_context_from_snapshot(context.project_id, 4))
+
+        history = manager.get_context_history(context.project_id)
+        for snapshot in history[:3]:
+            snapshot.timestamp = datetime.now() - timedelta(days=40)
+        manager._cleanup_old_snapshots()
+
+        remaining = manager.get_context_history(context.project_id)
+        assert [s.version for s in remaining] == [4, 5, 6, 7]
+        assert remaining[0].kind == "keyframe"
+        assert state(manager._load_context_from_snapshot(context.project_id, 4)) == expected
+        assert len(manager._load_context_from_snapshot(context.project_id, 7).completed_tasks) == 6
+
+    def test_legacy_full_snapshots_are_still_readable(self, make_manager, tmp_path):
+        manager = make_manager()
+        context = manager.create_new_project_context("API de tarefas com autenticação")
+        context.task_queue = [make_task(i) for i in range(3)]
+        legacy_path = tmp_path / ".snapshots" / f"{context.project_id}_2.json.gz"
+        with gzip.open(legacy_path, 'wt', encoding='utf-8') as f:
+            json.dump({'snapshot_id': 's', 'context_id': context.project_id, 'timestamp': datetime.now().isoformat(),
+                       'version': 2, 'data': context.model_dump(), 'metadata': {}, 'checksum': None}, f, default=str)
+
+        restarted = make_manager()
+        assert [s.kind for s in restarted.get_context_history(context.project_id)] == ["keyframe", "full"]
+        assert state(restarted._load_context_from_snapshot(context.project_id, 2)) == state(context)
+        assert restarted._create_snapshot(context).kind == "keyframe"
+
+
+class TestWorkspaceUsage:
+    def test_file_service_events_keep_the_index_current_without_scans(self, make_manager, monkeypatch):
+        manager = make_manager()
+        context = manager.create_new_project_context("API de tarefas com autenticação")
+        manager.flush()
+        baseline = manager._usage.get(context.workspace_path)
+        files, size = baseline.file_count, baseline.size_bytes
+
+        monkeypatch.setattr(Path, "rglob", lambda *args: pytest.fail("rglob não deve ser usado"))
+        file_service = FileService(str(context.workspace_path))
+        file_service.write_file("artifacts/app.py", "x" * 100)
+        file_service.write_file("artifacts/app.py", "x" * 40)
+        with file_service.open_incremental("artifacts/util.py") as writer:
+            writer.write("y" * 10)
+        file_service.write_file("artifacts/tmp.txt", "z")
+        file_service.delete_file("artifacts/tmp.txt")
+        manager._update_context_index(context)
+
+        entry = manager.context_index[context.project_id]
+        assert (entry.file_count, entry.size_bytes) == (files + 2, size + 50)
+        stats = manager.get_manager_stats()['storage_stats']
+        assert stats['contexts_count'] == 1 and stats['workspaces_size_bytes'] == entry.size_bytes
+
+    def test_external_changes_are_reconciled_in_background(self, make_manager):
+        manager = make_manager()
+        context = manager.create_new_project_context("API de tarefas com autenticação")
+        manager.flush()
+        files = manager._usage.get(context.workspace_path).file_count
+
+        (context.workspace_path / "artifacts" / "build.log").write_text("saída do comando" * 10)
+        FileService(str(context.workspace_path)).note_external_changes()
+        manager._update_context_index(context)
+        assert manager.flush(timeout=5)
+
+        entry = manager.context_index[context.project_id]
+        assert entry.file_count == files + 1
+        assert not manager._usage.needs_reconcile(context.workspace_path)
+
+
+class TestAutomaticBackups:
+    def test_each_run_reads_only_the_latest_manifest_of_each_project(self, make_manager, monkeypatch):
+        manager = make_manager()
+        manager.backup_keep_count = 2
+        contexts = [manager.create_new_project_context(f"Projeto {i} de tarefas") for i in range(4)]
+        manager.flush()
+
+        loads = []
+        original = BackupSystem._load_manifest
+        monkeypatch.setattr(BackupSystem, "_load_manifest", staticmethod(lambda path: loads.append(path) or original(path)))
+        collections = []
+        monkeypatch.setattr(manager.backup_system, "garbage_collect", lambda: collections.append(1))
+        for run in range(4):
+            for context in contexts:
+                (context.workspace_path / "artifacts" / "app.py").write_text(f"VERSAO = {run}\n")
+            loads.clear()
+            manager._create_automatic_backup()
+            # Só o manifesto anterior de cada projeto é lido (nenhum na primeira execução)
+            assert len(loads) == (len(contexts) if run else 0)
+
+        index = manager.backup_system.index_backups()
+        assert all(len(index[context.project_id]) == 2 for context in contexts)
+        assert len(collections) == 2  # Uma coleta de lixo por execução que removeu backups
+
+
+class TestContextCache:
+    def test_evicted_contexts_are_written_back_only_when_modified(self, make_manager):
+        manager = make_manager(context_cache_size=2)
+        first = manager.create_new_project_context("API de tarefas com autenticação")
+        second = manager.create_new_project_context("Dashboard de métricas")
+        first.task_queue = [make_task(0)]  # Modificado sem save nem mark_dirty
+
+        third = manager.create_new_project_context("CLI de migração de dados")
+        assert list(manager.cache) == [second.project_id, third.project_id]
+        assert manager.flush(timeout=5)
+        assert manager.metrics['write_backs'] == 1
+
+        reloaded = manager.load_project_context(first.project_id)
+        assert [t.task_id for t in reloaded.task_queue] == ["task-0"]
+        assert list(manager.cache) == [third.project_id, first.project_id]
+
+    def test_cache_is_bounded_by_memory(self, make_manager):
+        manager = make_manager(context_cache_max_mb=1)
+        contexts = []
+        for i in range(3):
+            context = manager.create_new_project_context(f"Projeto {i}")
+            context.task_queue = [make_task(j) for j in range(800)]
+            manager.save_project_context(context)
+            contexts.append(context)
+
+        assert manager.cache_bytes <= manager.cache_max_bytes
+        assert contexts[0].project_id not in manager.cache
+        assert manager.cache_bytes == sum(entry.size_bytes for entry in manager.cache.values())
+
+    def test_auto_save_writes_dirty_and_modified_entries_in_one_pass(self, make_manager):
+        manager = make_manager()
+        clean, marked, modified = (manager.create_new_project_context(f"Projeto {i}") for i in range(3))
+        manager.mark_dirty(marked.project_id)
+        modified.completed_tasks.append(make_task(1))
+
+        manager._auto_save_dirty_cache()
+        assert manager.metrics['write_backs'] == 2
+        assert not any(entry.dirty for entry in manager.cache.values())
+
+        manager._auto_save_dirty_cache()
+        assert manager.metrics['write_backs'] == 2
+
+
+class TestContextSearch:
+    def make_projects(self, manager):
+        api = manager.create_new_project_context("API REST de autenticação", "API Auth", tags={"backend", "python"})
+        dashboard = manager.create_new_project_context("Painel de métricas", "Dashboard", tags={"frontend"})
+        cli = manager.create_new_project_context("Ferramenta de migração", "CLI", tags={"python"})
+        cli.update_artifact_state("src/migrator.py", ArtifactState(path="src/migrator.py"))
+        manager.save_project_context(cli)
+        manager.archive_project_context(dashboard.project_id)
+        return api, dashboard, cli
+
+    def test_full_text_prefix_search_with_filters(self, make_manager):
+        manager = make_manager()
+        api, dashboard, cli = self.make_projects(manager)
+
+        assert [c.context_id for c in manager.search_contexts("autenticacao")] == [api.project_id]
+        assert [c.context_id for c in manager.search_contexts("api aut")] == [api.project_id]
+        assert [c.context_id for c in manager.search_contexts("migrator")] == [cli.project_id]
+        assert {c.context_id for c in manager.search_contexts(tags={"python"})} == {api.project_id, cli.project_id}
+        assert [c.context_id for c in manager.search_contexts(status=ContextStatus.ARCHIVED)] == [dashboard.project_id]
+        assert manager.search_contexts("inexistente") == []
+
+    def test_pages_and_facets(self, make_manager):
+        manager = make_manager()
+        self.make_projects(manager)
+
+        page = manager.search_contexts_page(limit=2)
+        assert page['total'] == 3 and len(page['results']) == 2
+        assert page['facets']['status'] == {"active": 2, "archived": 1}
+        assert page['facets']['tags'] == {"python": 2, "backend": 1, "frontend": 1}
+        rest = manager.search_contexts_page(limit=2, offset=2, with_facets=False)
+        assert len(rest['results']) == 1 and 'facets' not in rest
+        assert {c.context_id for c in page['results'] + rest['results']} == set(manager.context_index)
+
+        filtered = manager.search_contexts_page(tags={"python"})
+        assert filtered['facets']['status'] == {"active": 2}
+
+    def test_index_persists_incrementally_and_migrates_legacy_json(self, make_manager, tmp_path):
+        manager = make_manager()
+        api, _, _ = self.make_projects(manager)
+        manager.cleanup_and_shutdown()
+
+        restarted = make_manager()
+        assert set(restarted.context_index) == set(manager.context_index)
+        assert restarted.context_index[api.project_id].tags == {"backend", "python"}
+        assert [c.context_id for c in restarted.search_contexts("auth")] == [api.project_id]
+
+        legacy = tmp_path / "legacy"
+        legacy.mkdir()
+        entry = manager.context_index[api.project_id]
+        (legacy / ".context_index.json").write_text(json.dumps({api.project_id: {
+            **vars(entry), 'status': entry.status.value, 'created_at': entry.created_at.isoformat(),
+            'last_modified': entry.last_modified.isoformat(), 'tags': sorted(entry.tags), 'dependencies': [],
+        }}))
+        migrated = make_manager(project_base_directory=str(legacy))
+        assert [c.context_id for c in migrated.search_contexts("autenticação")] == [api.project_id]
+        assert (legacy / ".context_index.json.migrated").exists()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Testes do ArtifactChangeTracker: detecção de artefatos criados, modificados
+e removidos por comandos, com inotify e com o diff de snapshots.
+"""
+
+import asyncio
+import hashlib
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.core.executor import TaskExecutorAgent
+from evolux_engine.models.project_context import ArtifactState
+from evolux_engine.schemas.contracts import ArtifactChangeType, Task, TaskDetailsExecuteCommand, TaskType
+from evolux_engine.services import artifact_tracker
+from evolux_engine.services.artifact_tracker import ArtifactChangeTracker
+
+MODES = [pytest.param(False, id="snapshot"),
+         pytest.param(True, id="inotify", marks=pytest.mark.skipif(not sys.platform.startswith("linux"),
+                                                                   reason="inotify só existe no Linux"))]
+
+
+def make_workspace(root: Path, files: int = 10):
+    artifacts = root / "artifacts"
+    for i in range(files):
+        path = artifacts / "app" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"VALOR = {i}\n")
+    return {f"artifacts/app/module_{i}.py": ArtifactState(
+        path=f"artifacts/app/module_{i}.py", hash=hashlib.sha256(f"VALOR = {i}\n".encode()).hexdigest())
+        for i in range(files)}
+
+
+def run(command: str, cwd: Path):
+    subprocess.run(command, shell=True, check=True, cwd=cwd)
+
+
+@pytest.fixture
+def count_hashes(monkeypatch):
+    hashed = []
+    original = artifact_tracker.hash_file
+    monkeypatch.setattr(artifact_tracker, "hash_file", lambda path: hashed.append(Path(path).name) or original(path))
+    return hashed
+
+
+@pytest.mark.parametrize("use_inotify", MODES)
+class TestArtifactChangeTracker:
+    def test_reports_created_modified_and_deleted_files(self, tmp_path, use_inotify, count_hashes):
+        state = make_workspace(tmp_path)
+        tracker = ArtifactChangeTracker(tmp_path, use_inotify=use_inotify)
+        tracker.start()
+        run("echo '# alterado' >> app/module_1.py && rm app/module_2.py && touch app/module_3.py && "
+            "mkdir -p build/lib && echo gerado > build/lib/out.txt && echo lock > requirements.lock && "
+            "mkdir -p .venv/lib __pycache__ && echo x > .venv/lib/pkg.py && echo x > __pycache__/m.pyc",
+            tmp_path / "artifacts")
+
+        changes = {change.path: change for change in tracker.collect(state)}
+
+        assert {path: change.change_type for path, change in changes.items()} == {
+            "artifacts/app/module_1.py": ArtifactChangeType.MODIFIED,
+            "artifacts/app/module_2.py": ArtifactChangeType.DELETED,
+            "artifacts/build/lib/out.txt": ArtifactChangeType.CREATED,
+            "artifacts/requirements.lock": ArtifactChangeType.CREATED,
+        }
+        modified = changes["artifacts/app/module_1.py"]
+        assert modified.old_hash == state["artifacts/app/module_1.py"].hash
+        assert modified.new_hash == hashlib.sha256(b"VALOR = 1\n# alterado\n").hexdigest()
+        assert changes["artifacts/app/module_2.py"].old_hash == state["artifacts/app/module_2.py"].hash
+        # module_3.py foi só tocado: relido, mas sem mudança de conteúdo; os demais nem são lidos
+        assert sorted(count_hashes) == ["module_1.py", "module_3.py", "out.txt", "requirements.lock"]
+        assert tracker.mode == ("inotify" if use_inotify else "snapshot")
+
+    def test_changes_before_start_are_absorbed(self, tmp_path, use_inotify):
+        state = make_workspace(tmp_path)
+        tracker = ArtifactChangeTracker(tmp_path, use_inotify=use_inotify)
+        tracker.start()
+        assert tracker.collect(state) == []
+
+        # Escrita do FileService entre comandos, já registrada no artifacts_state
+        (tmp_path / "artifacts" / "app" / "module_0.py").write_text("novo\n")
+        state["artifacts/app/module_0.py"] = ArtifactState(path="artifacts/app/module_0.py",
+                                                           hash=hashlib.sha256(b"novo\n").hexdigest())
+        tracker.start()
+        run("echo x > novo.txt", tmp_path / "artifacts")
+        assert [change.path for change in tracker.collect(state)] == ["artifacts/novo.txt"]
+
+    def test_directories_created_and_moved_during_the_command(self, tmp_path, use_inotify):
+        state = make_workspace(tmp_path, files=3)
+        tracker = ArtifactChangeTracker(tmp_path, use_inotify=use_inotify)
+        tracker.start()
+        run("mkdir -p dist/a/b && echo 1 > dist/a/b/pkg.whl && mv app src", tmp_path / "artifacts")
+
+        changes = sorted((change.change_type.value, change.path) for change in tracker.collect(state))
+        assert changes == sorted(
+            [("created", "artifacts/dist/a/b/pkg.whl")]
+            + [("deleted", f"artifacts/app/module_{i}.py") for i in range(3)]
+            + [("created", f"artifacts/src/module_{i}.py") for i in range(3)]
+        )
+
+        tracker.start()
+        run("echo 2 >> src/module_0.py", tmp_path / "artifacts")
+        [change] = tracker.collect({})
+        assert (change.change_type, change.path) == (ArtifactChangeType.MODIFIED, "artifacts/src/module_0.py")
+
+
+def test_inotify_only_examines_touched_paths(tmp_path, count_hashes):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("inotify só existe no Linux")
+    state = make_workspace(tmp_path, files=200)
+    tracker = ArtifactChangeTracker(tmp_path, use_inotify=True)
+    tracker.start()
+    scans = tracker.get_stats()["full_scans"]
+    run("echo 1 >> app/module_7.py", tmp_path / "artifacts")
+
+    assert [change.path for change in tracker.collect(state)] == ["artifacts/app/module_7.py"]
+    assert count_hashes == ["module_7.py"]
+    assert tracker.get_stats()["full_scans"] == scans
+    tracker.close()
+
+
+def test_missing_artifacts_directory_is_tracked_once_created(tmp_path):
+    tracker = ArtifactChangeTracker(tmp_path)
+    tracker.start()
+    (tmp_path / "artifacts").mkdir()
+    (tmp_path / "artifacts" / "main.py").write_text("print()\n")
+    [change] = tracker.collect({})
+    assert (change.change_type, change.path) == (ArtifactChangeType.CREATED, "artifacts/main.py")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_commands_each_report_their_own_changes(tmp_path):
+    (tmp_path / "artifacts").mkdir()
+    state = {}
+
+    async def save_context():
+        pass
+
+    async def execute_command(command, working_directory, timeout):
+        process = await asyncio.create_subprocess_shell(command, cwd=working_directory)
+        return {"exit_code": await process.wait(), "stdout": "", "stderr": ""}
+
+    async def simulate_command_execution(command, task_context):
+        return {"is_safe_to_proceed": True, "predicted_outcome": "ok", "potential_side_effects": []}
+
+    executor = TaskExecutorAgent.__new__(TaskExecutorAgent)
+    executor.agent_id = "test"
+    executor.project_context = SimpleNamespace(
+        workspace_path=tmp_path, artifacts_state=state, save_context=save_context,
+        get_project_path=lambda subdir="": str(tmp_path / subdir),
+        get_artifacts_structure_summary=lambda: "",
+        update_artifact_state=state.__setitem__, remove_artifact_state=state.pop,
+    )
+    executor.cache = MagicMock(get=lambda task: {"command_to_execute": task.details.command_description})
+    executor.simulation_engine = SimpleNamespace(simulate_command_execution=simulate_command_execution)
+    executor.security_gateway = None
+    executor.secure_executor = None
+    executor.shell_service = SimpleNamespace(execute_command=execute_command)
+    executor.file_service = MagicMock()
+
+    def command_task(task_id: str, command: str) -> Task:
+        return Task(task_id=task_id, description=command, type=TaskType.EXECUTE_COMMAND, acceptance_criteria="ok",
+                    details=TaskDetailsExecuteCommand(command_description=command, expected_outcome="ok"))
+
+    # O comando lento escreve logo no início; o rápido termina (e coleta) antes dele
+    slow, fast = await asyncio.gather(
+        executor._execute_command(command_task("slow", "echo lento > slow.txt && sleep 0.5")),
+        executor._execute_command(command_task("fast", "sleep 0.1 && echo rapido > fast.txt")),
+    )
+
+    assert [change.path for change in slow.artifacts_changed] == ["artifacts/slow.txt"]
+    assert [change.path for change in fast.artifacts_changed] == ["artifacts/fast.txt"]
+    assert state["artifacts/slow.txt"].summary.endswith("slow.txt && sleep 0.5")
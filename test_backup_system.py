@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Testes do BackupSystem: backups como manifestos sobre um chunk store
+endereçado por conteúdo (deduplicação, incrementais, restauração parcial,
+coleta de lixo) e o processamento paralelo, com progresso, fora do event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.models.project_context import ProjectContext, ArtifactState
+from evolux_engine.services.backup_system import BackupSystem
+from evolux_engine.services import chunk_store
+
+
+def make_project(root: Path, project_id: str = "proj-1", files: int = 20) -> ProjectContext:
+    artifacts = root / project_id / "artifacts"
+    for i in range(files):
+        path = artifacts / "app" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"def handler_{i}():\n    return {i}\n" * 50)
+    (artifacts / "README.md").write_text("# Projeto\n")
+    return ProjectContext(project_id=project_id, project_name="Projeto", project_goal="API de tarefas",
+                          workspace_path=root / project_id)
+
+
+@pytest.fixture
+def backups(tmp_path):
+    return BackupSystem(str(tmp_path / "backups"))
+
+
+@pytest.fixture
+def count_reads(monkeypatch):
+    reads = []
+    original = chunk_store.ChunkStore.put_file
+    monkeypatch.setattr(chunk_store.ChunkStore, "put_file",
+                        lambda self, path, digest=None: reads.append(Path(path).name) or original(self, path, digest))
+    return reads
+
+
+class TestChunkedBackups:
+    def test_incremental_backup_only_reads_and_stores_changed_files(self, tmp_path, backups, count_reads):
+        context = make_project(tmp_path)
+        artifacts = context.workspace_path / "artifacts"
+        first = backups.create_snapshot(context, str(artifacts), "primeiro")
+        assert len(count_reads) == 21
+
+        count_reads.clear()
+        (artifacts / "app" / "module_3.py").write_text("alterado\n")
+        second = backups.create_snapshot(context, str(artifacts), "segundo")
+
+        assert count_reads == ["module_3.py"]
+        [newest, oldest] = backups.list_backups("proj-1")
+        assert (newest["backup_file"], oldest["backup_file"]) == (second, first)
+        assert 0 < newest["backup_size_bytes"] < oldest["backup_size_bytes"] / 10
+        assert newest["total_files"] == 22 and "files" not in newest
+
+    def test_known_artifact_hashes_skip_reading(self, tmp_path, backups, count_reads):
+        context = make_project(tmp_path, files=2)
+        artifacts = context.workspace_path / "artifacts"
+        backups.create_snapshot(make_project(tmp_path / "other", files=2), str(tmp_path / "other" / "proj-1" / "artifacts"))
+        for name in ("module_0.py", "module_1.py"):
+            content = (artifacts / "app" / name).read_bytes()
+            context.update_artifact_state(f"app/{name}", ArtifactState(
+                path=f"app/{name}", hash=hashlib.sha256(content).hexdigest(),
+                last_modified=datetime.now() + timedelta(seconds=1)))
+
+        count_reads.clear()
+        backups.create_snapshot(context, str(artifacts))
+        assert count_reads == ["README.md"]  # Sem hash conhecido nem backup anterior inalterado
+
+    def test_identical_content_is_stored_once_across_projects(self, tmp_path, backups):
+        backups.create_snapshot(make_project(tmp_path, "proj-a"), str(tmp_path / "proj-a" / "artifacts"))
+        blobs = len(list(backups.chunk_store.iter_digests()))
+        backups.create_snapshot(make_project(tmp_path, "proj-b"), str(tmp_path / "proj-b" / "artifacts"))
+
+        assert len(list(backups.chunk_store.iter_digests())) == blobs + 1  # Só o context.json é novo
+        assert backups.list_backups("proj-b")[0]["backup_size_bytes"] < 2000
+
+    def test_restore_single_files_and_directories(self, tmp_path, backups):
+        context = make_project(tmp_path)
+        backup_file = backups.create_snapshot(context, str(context.workspace_path / "artifacts"))
+
+        result = backups.restore_snapshot(backup_file, str(tmp_path / "one"), paths=["artifacts/app/module_7.py"])
+        assert result["restored_files"] == 1 and result["manifest"]["project_id"] == "proj-1"
+        assert [p.name for p in (tmp_path / "one").rglob("*") if p.is_file()] == ["module_7.py"]
+        assert (tmp_path / "one" / "artifacts" / "app" / "module_7.py").read_text() == \
+            (context.workspace_path / "artifacts" / "app" / "module_7.py").read_text()
+
+        assert backups.restore_snapshot(backup_file, str(tmp_path / "dir"), paths=["artifacts/app/"])["restored_files"] == 20
+        full = backups.restore_snapshot(backup_file, str(tmp_path / "all"))
+        assert full["restored_files"] == 22
+        assert ProjectContext.load_from_file(tmp_path / "all" / "context.json").project_id == "proj-1"
+
+        with pytest.raises(FileNotFoundError):
+            backups.restore_snapshot(backup_file, str(tmp_path / "none"), paths=["artifacts/missing.py"])
+
+    def test_corrupted_blobs_are_detected_on_restore(self, tmp_path, backups):
+        context = make_project(tmp_path, files=1)
+        backup_file = backups.create_snapshot(context, str(context.workspace_path / "artifacts"))
+        digest = hashlib.sha256((context.workspace_path / "artifacts" / "README.md").read_bytes()).hexdigest()
+        blob = backups.chunk_store.blob_path(digest)
+        blob.write_bytes(blob.read_bytes()[:1] + b"outro conteudo")  # Blob sem compressão de outro conteúdo
+
+        with pytest.raises(ValueError, match="corrompido"):
+            backups.restore_snapshot(backup_file, str(tmp_path / "restored"), paths=["artifacts/README.md"])
+        assert not (tmp_path / "restored" / "artifacts" / "README.md").exists()
+
+    def test_cleanup_collects_unreferenced_blobs_only(self, tmp_path, backups):
+        context = make_project(tmp_path, files=3)
+        module = context.workspace_path / "artifacts" / "app" / "module_0.py"
+        for version in range(4):
+            module.write_text(f"versão {version}\n")
+            os.utime(module, ns=(version, version))
+            backups.create_snapshot(context, str(context.workspace_path / "artifacts"))
+
+        assert backups.cleanup_old_backups("proj-1", keep_count=2) == 2
+        remaining = backups.list_backups("proj-1")
+        assert len(remaining) == 2
+        for backup in remaining:
+            backups.restore_snapshot(backup["backup_file"], str(tmp_path / backup["backup_id"]))
+        digests = set(backups.chunk_store.iter_digests())
+        assert hashlib.sha256("versão 0\n".encode()).hexdigest() not in digests
+        assert hashlib.sha256("versão 3\n".encode()).hexdigest() in digests
+
+    def test_unchanged_directories_do_not_create_new_backups(self, tmp_path, backups):
+        make_project(tmp_path)
+        first = backups.create_directory_backup("proj-1", str(tmp_path / "proj-1"))
+        assert backups.create_directory_backup("proj-1", str(tmp_path / "proj-1")) == first
+        (tmp_path / "proj-1" / "notes.txt").write_text("novo")
+        assert backups.create_directory_backup("proj-1", str(tmp_path / "proj-1")) != first
+
+    def test_legacy_zip_backups_are_still_listed_and_restored(self, tmp_path, backups):
+        legacy = backups.backup_dir / "proj-1_20240101_000000.zip"
+        with zipfile.ZipFile(legacy, "w") as backup_zip:
+            backup_zip.writestr("context.json", "{}")
+            backup_zip.writestr("artifacts/app.py", "print('ok')\n")
+            backup_zip.writestr("manifest.json", json.dumps({"backup_id": "proj-1_20240101_000000",
+                                                             "project_id": "proj-1", "created_at": "2024-01-01T00:00:00"}))
+
+        [backup] = backups.list_backups("proj-1")
+        assert backup["format"] == "zip"
+        result = backups.restore_snapshot(backup["backup_file"], str(tmp_path / "restored"), paths=["artifacts/app.py"])
+        assert result["restored_files"] == 1
+        assert (tmp_path / "restored" / "artifacts" / "app.py").read_text() == "print('ok')\n"
+
+
+class TestParallelBackups:
+    def test_process_pool_backup_and_restore_report_progress(self, tmp_path):
+        backups = BackupSystem(str(tmp_path / "backups"), parallelism="processes", max_workers=2)
+        backups.BATCH_FILES = 4
+        context = make_project(tmp_path, files=30)
+        seen = []
+        backup_file = backups.create_snapshot(context, str(context.workspace_path / "artifacts"),
+                                              progress=lambda done, total: seen.append((done, total)))
+        assert seen[0] == (1, 32) and seen[-1] == (32, 32)  # O contexto já conta como processado
+        assert [done for done, _ in seen] == sorted(done for done, _ in seen)
+
+        restored = []
+        result = backups.restore_snapshot(backup_file, str(tmp_path / "restored"),
+                                          progress=lambda done, total: restored.append(done))
+        assert result["restored_files"] == 32 and restored[-1] == 32
+        assert (tmp_path / "restored" / "artifacts" / "app" / "module_29.py").read_text() == \
+            (context.workspace_path / "artifacts" / "app" / "module_29.py").read_text()
+
+    def test_async_snapshot_runs_off_the_event_loop(self, tmp_path, backups):
+        context = make_project(tmp_path, files=5)
+        threads = set()
+
+        async def run():
+            backup_file = await backups.create_snapshot_async(
+                context, str(context.workspace_path / "artifacts"),
+                progress=lambda done, total: threads.add(threading.get_ident()))
+            return await backups.restore_snapshot_async(backup_file, str(tmp_path / "restored"))
+
+        assert asyncio.run(run())["restored_files"] == 7
+        assert threading.get_ident() not in threads
+
+    def test_stores_with_different_codecs_share_blobs(self, tmp_path):
+        pytest.importorskip("zstandard")
+        context = make_project(tmp_path, files=3)
+        artifacts = str(context.workspace_path / "artifacts")
+        old = BackupSystem(str(tmp_path / "backups"), codec="zlib").create_snapshot(context, artifacts)
+        (context.workspace_path / "artifacts" / "novo.txt").write_text("conteúdo novo\n" * 100)
+
+        backups = BackupSystem(str(tmp_path / "backups"), codec="zstd")
+        new = backups.create_snapshot(context, artifacts)
+        digest = hashlib.sha256(("conteúdo novo\n" * 100).encode()).hexdigest()
+        assert backups.chunk_store.blob_path(digest).read_bytes()[:1] == chunk_store.CODEC_ZSTD
+        for backup_file in (old, new):
+            assert backups.restore_snapshot(backup_file, str(tmp_path / Path(backup_file).stem))["success"]
+
+    def test_large_blobs_are_streamed_in_bounded_blocks(self, tmp_path, backups, monkeypatch):
+        monkeypatch.setattr(chunk_store, "READ_SIZE", 4096)
+        payload = b"0123456789abcdef" * 64 * 1024  # 1 MiB muito compressível
+        digest = backups.chunk_store.put_bytes(payload)["digest"]
+        blocks = list(backups.chunk_store.iter_blob(digest))
+        assert b"".join(blocks) == payload
+        assert max(len(block) for block in blocks) <= 4096
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Testes do CognitiveCache: índices, evicção LFU, expiração por TTL, busca semântica e backend persistente.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.cache.cache_backends import SQLiteCacheBackend
+from evolux_engine.cache.cognitive_cache import CognitiveCache
+from evolux_engine.cache.similarity_index import SimilarityIndex
+from evolux_engine.schemas.contracts import Task, TaskType, TaskDetailsExecuteCommand, TaskDetailsCreateFile
+
+
+def make_task(description: str, task_type: TaskType = TaskType.EXECUTE_COMMAND, **details) -> Task:
+    return Task(
+        description=description,
+        type=task_type,
+        details=TaskDetailsExecuteCommand(
+            command_description=description,
+            expected_outcome=details.get("expected_outcome", "ok"),
+        ),
+        acceptance_criteria="ok",
+    )
+
+
+def make_file_task(description: str, file_path: str) -> Task:
+    return Task(
+        description=description,
+        type=TaskType.CREATE_FILE,
+        details=TaskDetailsCreateFile(file_path=file_path, content_guideline=description),
+        acceptance_criteria="ok",
+    )
+
+
+class TestCognitiveCache:
+    """Testes do cache cognitivo em memória"""
+
+    def test_put_and_get_roundtrip(self):
+        cache = CognitiveCache()
+        task = make_task("instalar dependencias do projeto")
+        cache.put(task, {"command": "pip install -r requirements.txt"})
+
+        assert cache.get(task) == {"command": "pip install -r requirements.txt"}
+        stats = cache.get_stats()
+        assert stats["cache_size"] == 1
+        assert stats["total_hits"] == 1
+
+    def test_replacing_an_entry_keeps_indexes_consistent(self):
+        cache = CognitiveCache()
+        task = make_task("rodar testes unitarios")
+        cache.put(task, "pytest")
+        cache.put(task, "pytest -q")
+
+        assert cache.get(task) == "pytest -q"
+        assert cache._semantic_index["testes"] == {cache._generate_cache_key(task)}
+
+    def test_evicts_least_frequently_used_entry(self):
+        cache = CognitiveCache(max_cache_size=2)
+        popular = make_task("compilar frontend")
+        unpopular = make_task("gerar documentacao")
+        cache.put(popular, "npm run build")
+        cache.put(unpopular, "mkdocs build")
+        cache.get(popular)
+
+        cache.put(make_task("executar linter"), "ruff check")
+
+        assert cache.get_stats()["cache_size"] == 2
+        assert cache.get_stats()["evictions"] == 1
+        assert cache.get(popular) == "npm run build"
+        assert "documentacao" not in cache._semantic_index
+
+    def test_expired_entries_are_removed_by_the_ttl_wheel(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(time, "time", lambda: now[0])
+        cache = CognitiveCache(default_ttl=60)
+        task = make_task("migrar banco de dados")
+        cache.put(task, "alembic upgrade head")
+
+        now[0] += 30
+        assert cache.get(task) == "alembic upgrade head"
+
+        now[0] += 40
+        assert cache.get(task) is None
+        stats = cache.get_stats()
+        assert stats["cache_size"] == 0
+        assert stats["expirations"] == 1
+        assert cache._semantic_index == {}
+
+
+class TestSemanticSearch:
+    """Testes da busca semântica vetorial e por palavras-chave"""
+
+    def test_vector_search_matches_near_duplicates(self):
+        cache = CognitiveCache()
+        assert cache.similarity_mode == "vector"
+        cache.put(make_task("executar os testes unitarios do modulo de pagamentos"), "pytest tests/payments")
+
+        assert cache.get(make_task("executar testes unitarios do modulo pagamentos")) == "pytest tests/payments"
+        assert cache.get(make_task("gerar relatorio de cobertura")) is None
+
+    @pytest.mark.parametrize("mode", ["vector", "keywords"])
+    def test_search_is_filtered_by_task_type_and_file_path(self, mode):
+        cache = CognitiveCache(similarity_mode=mode)
+        cache.put(make_file_task("criar modelo de usuario com validacao", "models/user.py"), "class User: ...")
+
+        assert cache.get(make_file_task("criar modelo de usuario com validacao de email", "models/user.py")) == "class User: ..."
+        assert cache.get(make_file_task("criar modelo de usuario com validacao de email", "models/admin.py")) is None
+        assert cache.get(make_task("criar modelo de usuario com validacao de email")) is None
+
+    def test_threshold_is_configurable(self):
+        strict = CognitiveCache(similarity_threshold=0.99)
+        strict.put(make_task("executar os testes unitarios do modulo de pagamentos"), "pytest")
+        assert strict.get(make_task("executar testes unitarios do modulo pagamentos")) is None
+
+    def test_index_skips_removed_entries(self):
+        index = SimilarityIndex()
+        for i in range(200):
+            index.add(f"k{i}", f"compilar componente {i} do frontend", "p")
+        index.add("target", "publicar pacote no registro npm", "p")
+        assert index.search("publicar pacote no registro npm", "p", 0.9)[0] == "target"
+
+        index.remove("target")
+        assert index.search("publicar pacote no registro npm", "p", 0.9) is None
+        assert len(index) == 200
+
+
+class TestSQLiteCacheBackend:
+    """Testes da camada persistente compartilhada"""
+
+    def test_entries_survive_a_new_cache_instance(self, tmp_path):
+        db_path = str(tmp_path / "cache.db")
+        task = make_task("configurar ambiente virtual")
+        first = CognitiveCache(backend=SQLiteCacheBackend(db_path))
+        first.put(task, {"command": "python -m venv .venv"})
+        first.backend.close()
+
+        second = CognitiveCache(backend=SQLiteCacheBackend(db_path))
+        assert second.get(task) == {"command": "python -m venv .venv"}
+        assert second.get(task) == {"command": "python -m venv .venv"}
+
+        stats = second.get_stats()["backends"]
+        assert stats["memory"]["total_hits"] == 1
+        assert stats["memory"]["total_misses"] == 1
+        assert stats["sqlite"]["total_hits"] == 1
+        assert stats["sqlite"]["entries"] == 1
+
+    def test_backend_enforces_ttl(self, tmp_path, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(time, "time", lambda: now[0])
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), default_ttl=60)
+        backend.put("k", {"data": "v", "keywords": ["alpha"], "task_type": "EXECUTE_COMMAND"})
+
+        assert backend.get("k")["data"] == "v"
+        now[0] += 61
+        assert backend.get("k") is None
+        assert backend.find_similar(["alpha"], min_overlap=0.5) is None
+        assert backend.cleanup_expired() == 1
+        assert backend.get_stats()["entries"] == 0
+
+    def test_backend_enforces_size_cap_with_lfu(self, tmp_path):
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries=2)
+        backend.put("popular", {"data": 1, "keywords": []})
+        backend.put("unpopular", {"data": 2, "keywords": ["beta"]})
+        backend.get("popular")
+        backend.put("new", {"data": 3, "keywords": []})
+
+        stats = backend.get_stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        assert backend.get("unpopular") is None
+        assert backend.get("popular")["data"] == 1
+
+    def test_semantic_lookup_falls_back_to_backend(self, tmp_path):
+        db_path = str(tmp_path / "cache.db")
+        writer = CognitiveCache(backend=SQLiteCacheBackend(db_path))
+        writer.put(make_task("executar testes de integracao da api"), "pytest tests/integration")
+
+        reader = CognitiveCache(backend=SQLiteCacheBackend(db_path))
+        assert reader.get(make_task("executar testes de integracao")) == "pytest tests/integration"
+        assert reader.get(make_file_task("executar testes de integracao", "tests/test_api.py")) is None
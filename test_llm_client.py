@@ -0,0 +1,636 @@
+#!/usr/bin/env python3
+"""
+Testes do LLMClient: cache de respostas completas, agrupamento de requisições
+idênticas, recursos compartilhados por provedor, rate limiting por RPM/TPM,
+geração em streaming e hedging de requisições.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import evolux_engine.llms.llm_client as llm_client_module
+from evolux_engine.cache.cache_backends import SQLiteCacheBackend
+from evolux_engine.cache.llm_response_cache import LLMResponseCache
+# O pacote expõe a classe real mesmo se outro teste substituir llm_client.LLMClient por um mock
+from evolux_engine.llms import LLMClient
+from evolux_engine.llms.hedging import HedgingPolicy, RequestHedger
+from evolux_engine.llms.model_router import ModelRouter, TaskCategory
+from evolux_engine.llms.provider_pool import get_provider_pool
+from evolux_engine.schemas.contracts import LLMProvider
+from evolux_engine.utils.resilience import RateLimiter, SingleFlight
+from evolux_engine.utils.string_utils import StreamingContentExtractor
+
+
+class FakeTokenOptimizer:
+    """Contagem por palavras, para não depender do download dos encoders do tiktoken"""
+
+    def __init__(self, model_name: str = "gpt-4"):
+        pass
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def count_tokens_many(self, texts):
+        return [self.count_tokens(text) for text in texts]
+
+    def truncate_messages(self, messages, max_tokens):
+        return messages
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    monkeypatch.setattr(llm_client_module, "TokenOptimizer", FakeTokenOptimizer)
+
+    def factory(response_cache=None, responses=("resposta",), api_key="test-key", model_name="test/model", **kwargs):
+        kwargs.setdefault("model_router", MagicMock())
+        client = LLMClient(
+            api_key=api_key,
+            model_name=model_name,
+            provider=LLMProvider.OPENROUTER,
+            response_cache=response_cache,
+            **kwargs,
+        )
+        client._generate_httpx_response = AsyncMock(side_effect=list(responses))
+        return client
+
+    return factory
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+MESSAGES = [
+    {"role": "system", "content": "Você é um planejador."},
+    {"role": "user", "content": "Crie um plano para uma API REST."},
+]
+
+
+class TestLLMResponseCache:
+    """Testes do cache de respostas completas da LLM"""
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_hit_the_cache(self, make_client):
+        cache = LLMResponseCache(deterministic_only=False)
+        client = make_client(cache, responses=["plano v1", "plano v2"])
+
+        first = await client.generate_response(MESSAGES, category=TaskCategory.PLANNING)
+        # Espaços à direita e quebras de linha diferentes não mudam a chave
+        second = await client.generate_response(
+            [{"role": m["role"], "content": m["content"] + "  \r\n"} for m in MESSAGES],
+            category=TaskCategory.PLANNING,
+        )
+
+        assert first == second == "plano v1"
+        assert client._generate_httpx_response.await_count == 1
+        stats = cache.get_stats()
+        assert stats["categories"]["planning"]["hits"] == 1
+        assert stats["categories"]["planning"]["misses"] == 1
+        assert stats["saved_tokens"] > 0
+
+    @pytest.mark.asyncio
+    async def test_key_includes_temperature_and_cache_can_be_bypassed(self, make_client):
+        cache = LLMResponseCache(deterministic_only=False)
+        client = make_client(cache, responses=["a", "b", "c"])
+
+        await client.generate_response(MESSAGES, category=TaskCategory.PLANNING, temperature=0.5)
+        assert await client.generate_response(MESSAGES, category=TaskCategory.PLANNING, temperature=0.0) == "b"
+        assert await client.generate_response(MESSAGES, category=TaskCategory.PLANNING, use_cache=False) == "c"
+        assert client._generate_httpx_response.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_deterministic_only_mode_skips_sampled_requests(self, make_client):
+        cache = LLMResponseCache(deterministic_only=True)
+        client = make_client(cache, responses=["a", "b", "c"])
+
+        await client.generate_response(MESSAGES, category=TaskCategory.VALIDATION, temperature=0.7)
+        await client.generate_response(MESSAGES, category=TaskCategory.VALIDATION, temperature=0.7)
+        await client.generate_response(MESSAGES, category=TaskCategory.VALIDATION, temperature=0)
+        assert await client.generate_response(MESSAGES, category=TaskCategory.VALIDATION, temperature=0) == "c"
+        assert client._generate_httpx_response.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_sampled_requests_are_not_cached_by_default(self, make_client):
+        client = make_client(LLMResponseCache(), responses=["a", "b"])
+
+        await client.generate_response(MESSAGES, category=TaskCategory.PLANNING, temperature=0.5)
+        assert await client.generate_response(MESSAGES, category=TaskCategory.PLANNING, temperature=0.5) == "b"
+
+    @pytest.mark.asyncio
+    async def test_rejected_responses_are_invalidated_by_tag(self, make_client, tmp_path):
+        cache = LLMResponseCache(backend=SQLiteCacheBackend(str(tmp_path / "responses.db")))
+        client = make_client(cache, responses=["saída ruim", "saída corrigida"])
+
+        await client.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, temperature=0, cache_tag="task-1")
+        assert cache.invalidate_tag("task-1") == 1
+        assert cache.backend.get(LLMResponseCache.make_key("test/model", MESSAGES, 0, 8000)) is None
+        assert await client.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, temperature=0,
+                                              cache_tag="task-1") == "saída corrigida"
+        assert cache.invalidate_tag("outra-tarefa") == 0
+
+    def test_lru_eviction_keeps_recently_used_entries(self):
+        cache = LLMResponseCache(max_entries=2)
+        cache.put("a", "generic", "A")
+        cache.put("b", "generic", "B")
+        cache.get("a", "generic")
+        cache.put("c", "generic", "C")
+
+        assert cache.get("b", "generic") is None
+        assert cache.get("a", "generic") == "A"
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_evicted_and_missing_entries_leave_the_tag_index(self):
+        cache = LLMResponseCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            assert cache.get(key, "generic", tag=f"task-{key}") is None
+            cache.put(key, "generic", key.upper(), tag=f"task-{key}")
+        assert cache.get("desconhecida", "generic", tag="task-x") is None
+
+        assert cache._keys_by_tag == {"task-b": {"b"}, "task-c": {"c"}}
+        assert list(cache._tags_by_key) == ["b", "c"]
+        assert cache.invalidate_tag("task-a") == 0
+        assert cache.invalidate_tag("task-b") == 1
+        assert cache._keys_by_tag == {"task-c": {"c"}}
+
+    @pytest.mark.asyncio
+    async def test_responses_persist_on_disk(self, make_client, tmp_path):
+        db_path = str(tmp_path / "responses.db")
+        writer = make_client(LLMResponseCache(deterministic_only=False, backend=SQLiteCacheBackend(db_path)), responses=["persistido"])
+        await writer.generate_response(MESSAGES, category=TaskCategory.PLANNING)
+
+        reader = make_client(LLMResponseCache(deterministic_only=False, backend=SQLiteCacheBackend(db_path)), responses=["novo"])
+        assert await reader.generate_response(MESSAGES, category=TaskCategory.PLANNING) == "persistido"
+        reader._generate_httpx_response.assert_not_awaited()
+
+
+class TestSingleFlight:
+    """Testes do agrupamento de requisições concorrentes idênticas"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_one_call(self, make_client):
+        client = make_client(LLMResponseCache(), responses=["compartilhada", "segunda"])
+        gate = asyncio.Event()
+
+        async def slow_response(*args):
+            await gate.wait()
+            return "compartilhada"
+
+        client._generate_httpx_response = AsyncMock(side_effect=slow_response)
+        before = LLMClient.get_coalescing_stats()
+        messages = [{"role": "user", "content": "Gerar comando para instalar dependências"}]
+
+        calls = [asyncio.create_task(client.generate_response(messages, category=TaskCategory.CODE_GENERATION,
+                                                              temperature=0))
+                 for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*calls)
+
+        assert results == ["compartilhada"] * 3
+        assert client._generate_httpx_response.await_count == 1
+        after = LLMClient.get_coalescing_stats()
+        assert after["requests_coalesced"] - before["requests_coalesced"] == 2
+        assert after["saved_tokens"] > before["saved_tokens"]
+        assert after["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_sampled_and_uncached_requests_are_not_shared(self, make_client):
+        client = make_client(LLMResponseCache())
+        gate = asyncio.Event()
+        answers = iter(["a", "b", "c", "d"])
+
+        async def slow_response(*args):
+            await gate.wait()
+            return next(answers)
+
+        client._generate_httpx_response = AsyncMock(side_effect=slow_response)
+        calls = [
+            client.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, temperature=0.7),
+            client.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, temperature=0.7),
+            client.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, temperature=0, use_cache=False),
+            client.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, temperature=0, use_cache=False),
+        ]
+        calls = [asyncio.create_task(call) for call in calls]
+        await asyncio.sleep(0)
+        gate.set()
+
+        assert sorted(await asyncio.gather(*calls)) == ["a", "b", "c", "d"]
+        assert client._generate_httpx_response.await_count == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("falha compartilhada")
+
+        results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.get_stats()["executions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_waiter_takes_over_when_leader_is_cancelled(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == (2, False)
+        assert len(calls) == 2
+
+
+class TestProviderPool:
+    """Testes dos recursos compartilhados por provedor e chave de API"""
+
+    @pytest.mark.asyncio
+    async def test_clients_of_the_same_provider_share_limiter_breaker_and_connections(self, make_client):
+        planner = make_client(api_key="shared-key", model_name="model/a")
+        critic = make_client(api_key="shared-key", model_name="model/b")
+        other_account = make_client(api_key="other-key", model_name="model/a")
+
+        assert planner._rate_limiter is critic._rate_limiter
+        assert planner._circuit_breaker is critic._circuit_breaker
+        assert await planner._get_async_client() is await critic._get_async_client()
+        assert planner._rate_limiter is not other_account._rate_limiter
+
+    def test_rate_limit_headers_adjust_the_shared_bucket(self):
+        pool = get_provider_pool(LLMProvider.OPENAI, "headers-key")
+        pool.record_response(200, {"x-ratelimit-limit-requests": "500", "x-ratelimit-remaining-requests": "3"})
+        assert pool.rate_limiter.rate_limit == 500
+        assert pool.rate_limiter.tokens == 3
+
+        pool.record_response(429, {"Retry-After": "2"})
+        assert pool.rate_limiter._blocked_until - time.monotonic() > 1.5
+        assert pool.get_stats()["rate_limited"] == 1
+
+    def test_token_headers_set_the_tokens_per_minute_budget(self):
+        pool = get_provider_pool(LLMProvider.OPENAI, "token-headers-key")
+        pool.record_response(200, {"x-ratelimit-limit-tokens": "40000", "x-ratelimit-remaining-tokens": "1200"})
+
+        stats = pool.get_stats()["rate_limiter"]
+        assert stats["tokens_per_minute"] == 40000
+        assert stats["available_tokens"] <= 1201
+
+    def test_http_client_is_recreated_for_a_new_event_loop(self):
+        pool = get_provider_pool(LLMProvider.OPENAI, "loop-key")
+
+        async def get_client():
+            return pool.get_http_client()
+
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+        assert first is not second
+
+    def test_client_of_a_finished_loop_has_its_sockets_closed(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        pool = get_provider_pool(LLMProvider.OPENAI, "finished-loop-key")
+
+        async def request():
+            client = pool.get_http_client()
+            await client.get(f"http://127.0.0.1:{server.server_port}/")
+            return client
+
+        try:
+            first = asyncio.run(request())
+            [connection] = first._transport._pool._connections
+            sock = connection._connection._network_stream.get_extra_info("socket")
+            assert sock.fileno() != -1  # Conexão mantida em keep-alive
+
+            second = asyncio.run(request())
+            assert second is not first
+            assert sock.fileno() == -1 and first._transport._pool._connections == []
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_client_of_a_running_loop_is_closed_on_that_loop(self):
+        pool = get_provider_pool(LLMProvider.OPENAI, "running-loop-key")
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+
+        async def get_client():
+            return pool.get_http_client()
+
+        try:
+            first = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result(timeout=5)
+            assert asyncio.run(get_client()) is not first
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result(timeout=5)
+            assert first.is_closed
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(timeout=5)
+            other_loop.close()
+
+
+class TestRateLimiter:
+    """Testes do token bucket com orçamento de requisições e de tokens"""
+
+    @pytest.mark.asyncio
+    async def test_waiters_queue_in_order_without_serializing_sleeps(self):
+        limiter = RateLimiter(requests_per_minute=600)  # 1 requisição a cada 0,1s
+        limiter.tokens = 0
+        finished = []
+
+        async def call(index):
+            await limiter.wait_for_token()
+            finished.append(index)
+
+        start = time.monotonic()
+        await asyncio.gather(*(call(i) for i in range(3)))
+        elapsed = time.monotonic() - start
+
+        assert finished == [0, 1, 2]
+        # Esperas de 0,1s, 0,2s e 0,3s concorrentes, não 0,6s em série
+        assert elapsed < 0.5
+        assert limiter.get_stats()["waited"] == 3
+
+    @pytest.mark.asyncio
+    async def test_token_budget_delays_large_requests(self):
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=6000)  # 100 tokens/s
+
+        assert await limiter.wait_for_token(6000) == 6000
+        start = time.monotonic()
+        await limiter.wait_for_token(20)
+        assert 0.1 < time.monotonic() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_settle_refunds_overestimated_tokens(self):
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=6000)
+
+        reserved = await limiter.wait_for_token(5000)
+        limiter.settle(reserved, used_tokens=1000)
+
+        assert limiter.get_stats()["available_tokens"] >= 5000
+        assert limiter.get_stats()["refunded_tokens"] == 4000
+
+    @pytest.mark.asyncio
+    async def test_settle_without_reported_usage_refunds_the_reservation(self):
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=6000)
+
+        reserved = await limiter.wait_for_token(5000)
+        limiter.settle(reserved, used_tokens=None)
+
+        assert limiter.get_stats()["available_tokens"] == 6000
+        assert limiter.get_stats()["refunded_tokens"] == 5000
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_returns_its_reservation(self):
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+        limiter.tokens = 0
+        waiter = asyncio.create_task(limiter.wait_for_token(3000))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert limiter.tokens > -0.5
+        assert limiter.token_budget > 5900
+
+    @pytest.mark.asyncio
+    async def test_cancelled_refund_does_not_overflow_the_buckets(self):
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+        limiter.tokens = 0
+        waiter = asyncio.create_task(limiter.wait_for_token(3000))
+        await asyncio.sleep(0.01)
+        # Os cabeçalhos do provedor restauraram a cota enquanto a requisição esperava
+        limiter.tokens, limiter.token_budget = 60.0, 6000.0
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert (limiter.tokens, limiter.token_budget) == (60.0, 6000.0)
+
+    @pytest.mark.asyncio
+    async def test_client_reserves_estimate_and_settles_with_reported_usage(self, make_client):
+        client = make_client(api_key="tpm-key")
+        del client._generate_httpx_response  # Usar a implementação real sobre um transporte falso
+
+        def handler(request):
+            return httpx.Response(
+                200,
+                json={"choices": [{"message": {"content": "ok"}}], "usage": {"total_tokens": 50}},
+                headers={"x-ratelimit-limit-tokens": "100000"},
+            )
+
+        pool = client._pool
+        pool._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        pool._http_client_loop = asyncio.get_running_loop()
+        pool.rate_limiter.apply_feedback(token_limit=100000)
+
+        assert await client.generate_response(MESSAGES, category=TaskCategory.PLANNING, max_tokens=5000) == "ok"
+        stats = pool.rate_limiter.get_stats()
+        assert stats["refunded_tokens"] == sum(len(m["content"].split()) for m in MESSAGES) + 5000 - 50
+        assert stats["available_tokens"] >= 100000 - 51
+
+
+    @pytest.mark.asyncio
+    async def test_failed_requests_return_their_reservation(self, make_client):
+        client = make_client(api_key="tpm-error-key")
+        del client._generate_httpx_response
+
+        pool = client._pool
+        pool._http_client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(429, json={"error": "rate limited"})))
+        pool._http_client_loop = asyncio.get_running_loop()
+        pool.rate_limiter.apply_feedback(token_limit=100000)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await client._generate_httpx_response(MESSAGES, max_tokens=8000, temperature=0.5, estimated_tokens=8000)
+        assert pool.rate_limiter.get_stats()["available_tokens"] == 100000
+
+
+def sse_body(*texts, usage=None):
+    """Corpo de resposta SSE no formato do OpenRouter/OpenAI"""
+    events = [": OPENROUTER PROCESSING", ""]
+    for text in texts:
+        events += [f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}", ""]
+    if usage:
+        events += [f"data: {json.dumps({'choices': [], 'usage': usage})}", ""]
+    events += ["data: [DONE]", ""]
+    return "\n".join(events).encode()
+
+
+@pytest.fixture
+def make_streaming_client(make_client):
+    def factory(body, response_cache=None, api_key="stream-key"):
+        client = make_client(response_cache, api_key=api_key)
+        pool = client._pool
+        pool._http_client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+        ))
+        pool._http_client_loop = asyncio.get_running_loop()
+        return client
+
+    return factory
+
+
+class TestStreaming:
+    """Testes da geração em streaming e do parser incremental"""
+
+    @pytest.mark.asyncio
+    async def test_chunks_arrive_in_order_and_metrics_are_recorded(self, make_streaming_client):
+        client = make_streaming_client(sse_body("def ", "main():\n", "    pass", usage={"total_tokens": 30}))
+
+        chunks = [chunk async for chunk in client.generate_response_stream(MESSAGES, category=TaskCategory.CODE_GENERATION)]
+
+        assert chunks == ["def ", "main():\n", "    pass"]
+        model_name, category, ttfb_ms, tokens_per_second = client.model_router.update_stream_performance.call_args.args
+        assert (model_name, category) == ("test/model", TaskCategory.CODE_GENERATION)
+        assert ttfb_ms >= 0 and tokens_per_second >= 0
+
+    @pytest.mark.asyncio
+    async def test_completed_streams_are_cached_and_aborted_ones_are_not(self, make_streaming_client):
+        cache = LLMResponseCache(deterministic_only=False)
+        client = make_streaming_client(sse_body("```python\n", "x = 1\n", "```\n", "Explicação extra"), cache)
+
+        stream = client.generate_response_stream(MESSAGES, category=TaskCategory.CODE_GENERATION)
+        async for chunk in stream:
+            break
+        await stream.aclose()
+        assert cache.get_stats()["entries"] == 0
+        assert client._circuit_breaker.state == "closed"
+        assert len(client._circuit_breaker._failures) == 0
+
+        full = "".join([chunk async for chunk in client.generate_response_stream(MESSAGES, category=TaskCategory.CODE_GENERATION)])
+        cached = [chunk async for chunk in client.generate_response_stream(MESSAGES, category=TaskCategory.CODE_GENERATION)]
+        assert cached == [full]
+
+    def test_extractor_stops_at_closing_fence(self):
+        extractor = StreamingContentExtractor()
+        text = "``", "`python\n\nimport os\n", "\nprint(os.getcwd())\n`", "``\nTexto depois do bloco"
+        written = "".join(extractor.feed(chunk) for chunk in text) + extractor.finish()
+
+        assert extractor.mode == "code" and extractor.done
+        assert written == extractor.content == "import os\n\nprint(os.getcwd())"
+        assert extractor.raw == "```python\n\nimport os\n\nprint(os.getcwd())\n```"
+
+    def test_extractor_keeps_nested_fenced_blocks(self):
+        extractor = StreamingContentExtractor()
+        readme = "# Projeto\n\n## Instalação\n\n```bash\npip install -r requirements.txt\n```\n\n## Uso\n\nRode `main.py`."
+        response = f"```markdown\n{readme}\n```\nObservações do modelo"
+        written = "".join(extractor.feed(response[i:i + 7]) for i in range(0, len(response), 7)) + extractor.finish()
+
+        assert extractor.done
+        assert written == extractor.content == readme
+
+    @pytest.mark.parametrize("prefix", ["", "```json\n"])
+    def test_extractor_stops_when_json_object_closes(self, prefix):
+        extractor = StreamingContentExtractor()
+        payload = json.dumps({"file_content": "body { color: red; }", "notes": "}"})
+        for chunk in [prefix + payload[:10], payload[10:], "\n```\nmais texto"]:
+            assert extractor.feed(chunk) == ""
+            if extractor.done:
+                break
+
+        assert extractor.mode == "json"
+        assert extractor.raw == prefix + payload
+
+
+class TestHedging:
+    """Testes do hedging entre o modelo primário e o próximo da cadeia de fallback"""
+
+    @pytest.fixture
+    def make_hedged_pair(self, make_client):
+        def factory(primary_model, primary_delay_s, hedge_delay_s=0.0, response_cache=None):
+            router = ModelRouter()
+            for _ in range(20):
+                router.update_model_performance(primary_model, TaskCategory.CODE_GENERATION, True, latency_ms=50)
+            hedger = RequestHedger(HedgingPolicy(enabled=True, min_delay_s=0.01))
+            hedger.total_tokens = 10_000  # Orçamento de tokens extras disponível
+            clients = {}
+
+            def responder(answer, delay):
+                async def respond(*args):
+                    await asyncio.sleep(delay)
+                    return answer
+                return AsyncMock(side_effect=respond)
+
+            primary = make_client(response_cache, model_name=primary_model, api_key="hedge-key", model_router=router,
+                                  hedger=hedger, client_resolver=lambda name: clients.get(name))
+            primary._generate_httpx_response = responder("primária", primary_delay_s)
+            fallback = router.get_fallback_model(primary_model, TaskCategory.CODE_GENERATION)
+            hedge = make_client(model_name=fallback.name, api_key="hedge-key", model_router=router)
+            hedge._generate_httpx_response = responder("hedge", hedge_delay_s)
+            clients[fallback.name] = hedge
+            return primary, hedge, hedger
+
+        return factory
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_loses_to_the_hedge_and_is_cancelled(self, make_hedged_pair):
+        primary, hedge, hedger = make_hedged_pair("gpt-4o-mini", primary_delay_s=5)
+
+        start = time.monotonic()
+        response = await primary.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, use_cache=False)
+
+        assert response == "hedge"
+        assert time.monotonic() - start < 1
+        stats = hedger.get_stats()
+        assert stats["hedges_launched"] == stats["hedge_wins"] == 1
+        assert stats["extra_tokens"] > 0 and stats["p95_latency_ms"] < 1000
+
+    @pytest.mark.asyncio
+    async def test_hedge_answer_is_cached_under_the_hedge_model(self, make_hedged_pair):
+        cache = LLMResponseCache()
+        primary, hedge, hedger = make_hedged_pair("gpt-4o-mini", primary_delay_s=5, response_cache=cache)
+
+        assert await primary.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, temperature=0) == "hedge"
+        assert cache.get(LLMResponseCache.make_key("gpt-4o-mini", MESSAGES, 0, 8000), "generic") is None
+        assert cache.get(LLMResponseCache.make_key(hedge.model_name, MESSAGES, 0, 8000), "generic") == "hedge"
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_does_not_hedge(self, make_hedged_pair):
+        primary, hedge, hedger = make_hedged_pair("gpt-4o-mini", primary_delay_s=0)
+
+        assert await primary.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, use_cache=False) == "primária"
+        hedge._generate_httpx_response.assert_not_awaited()
+        assert hedger.get_stats()["hedges_launched"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cost_caps_block_hedging(self, make_hedged_pair):
+        # gemini-2.5-pro (próximo da cadeia) é mais caro que gemini-2.5-flash
+        primary, hedge, hedger = make_hedged_pair("gemini-2.5-flash", primary_delay_s=0.1)
+        assert await primary.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, use_cache=False) == "primária"
+        assert hedger.get_stats()["skipped_by_cost"] == 1
+
+        # Orçamento de tokens extras esgotado
+        primary, hedge, hedger = make_hedged_pair("gpt-4o-mini", primary_delay_s=0.1)
+        hedger.extra_tokens = 2_000
+        assert await primary.generate_response(MESSAGES, category=TaskCategory.CODE_GENERATION, use_cache=False) == "primária"
+        hedge._generate_httpx_response.assert_not_awaited()
+        assert hedger.get_stats()["skipped_by_budget"] == 1
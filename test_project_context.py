@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Testes da persistência incremental do ProjectContext: journal de deltas,
+checkpoints compactados, recuperação após queda, saves coalescidos e o
+formato binário versionado.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.config.advanced_config import AdvancedSystemConfig
+from evolux_engine.models.context_journal import ContextJournal
+from evolux_engine.models.serialization import (
+    MAGIC, SCHEMA_VERSIONS, decode_document, encode_document, is_binary_document,
+)
+from evolux_engine.models.project_context import ProjectContext, ArtifactState
+from evolux_engine.services.advanced_context_manager import AdvancedContextManager
+from evolux_engine.services.backup_system import BackupSystem
+from evolux_engine.utils.coalescing_writer import CoalescingWriter
+from evolux_engine.schemas.contracts import Task, TaskType, TaskStatus, TaskDetailsCreateFile, TaskDetailsExecuteCommand, ProjectStatus
+
+
+def make_task(i: int) -> Task:
+    return Task(
+        task_id=f"task-{i}",
+        description=f"Criar módulo {i}",
+        type=TaskType.CREATE_FILE,
+        details=TaskDetailsCreateFile(file_path=f"app/module_{i}.py", content_guideline="código"),
+        acceptance_criteria="arquivo criado",
+    )
+
+
+def make_context(tmp_path, tasks: int = 20) -> ProjectContext:
+    return ProjectContext(
+        project_id="proj-1",
+        project_name="Projeto",
+        project_goal="API de tarefas",
+        workspace_path=tmp_path,
+        task_queue=[make_task(i) for i in range(tasks)],
+    )
+
+
+def state(context: ProjectContext):
+    """Estado comparável (updated_at é sempre recalculado ao validar uma Task)"""
+    return (
+        context.status,
+        [[(t.task_id, t.status, t.retries) for t in getattr(context, name)]
+         for name in ("task_queue", "completed_tasks", "failed_tasks")],
+        {path: artifact.model_dump() for path, artifact in context.artifacts_state.items()},
+        context.metrics.model_dump(),
+    )
+
+
+async def run_iteration(context: ProjectContext, i: int):
+    """Uma iteração como a do orquestrador: tarefa concluída, artefato salvo, métricas."""
+    task = context.task_queue.pop(0)
+    task.status = TaskStatus.COMPLETED
+    context.completed_tasks.append(task)
+    context.update_artifact_state(f"app/module_{i}.py", ArtifactState(path=f"app/module_{i}.py", hash=f"h{i}"))
+    context.metrics.total_iterations += 1
+    await context.save_context()
+
+
+class TestContextJournal:
+    @pytest.mark.asyncio
+    async def test_saves_append_only_the_delta_and_load_replays_it(self, tmp_path):
+        context = make_context(tmp_path)
+        await context.save_context()
+        checkpoint_size = (tmp_path / "context.json").stat().st_size
+
+        await run_iteration(context, 0)
+        journal = (tmp_path / "context.journal.jsonl").read_text().splitlines()
+        assert len(journal) == 1 and len(journal[0]) < checkpoint_size / 4
+        assert "Criar módulo 5" not in journal[0]  # Tarefas inalteradas não são regravadas
+
+        context.remove_artifact_state("app/module_0.py")
+        context.status = ProjectStatus.RUNNING
+        await context.save_context()
+        await context.save_context()  # Nada mudou: nenhuma linha nova
+        assert len((tmp_path / "context.journal.jsonl").read_text().splitlines()) == 2
+
+        loaded = ProjectContext.load_from_file(tmp_path / "context.json")
+        assert state(loaded) == state(context)
+
+    @pytest.mark.asyncio
+    async def test_loaded_context_keeps_journaling_from_where_it_stopped(self, tmp_path):
+        context = make_context(tmp_path)
+        await context.save_context()
+        await run_iteration(context, 0)
+
+        loaded = ProjectContext.load_from_file(tmp_path / "context.json")
+        await run_iteration(loaded, 1)
+
+        assert len((tmp_path / "context.journal.jsonl").read_text().splitlines()) == 2
+        assert state(ProjectContext.load_from_file(tmp_path / "context.json")) == state(loaded)
+
+    @pytest.mark.asyncio
+    async def test_journal_is_compacted_into_an_atomic_checkpoint(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ContextJournal, "CHECKPOINT_INTERVAL", 3)
+        context = make_context(tmp_path)
+        await context.save_context()
+        for i in range(4):
+            await run_iteration(context, i)
+
+        # 3 linhas compactadas no checkpoint da 4ª iteração
+        assert (tmp_path / "context.journal.jsonl").read_text() == ""
+        assert not (tmp_path / "context.json.tmp").exists()
+        data = json.loads((tmp_path / "context.json").read_text())
+        assert len(data["completed_tasks"]) == 4
+        assert state(ProjectContext.load_from_file(tmp_path / "context.json")) == state(context)
+
+    @pytest.mark.asyncio
+    async def test_crash_recovery_is_exact(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ContextJournal, "CHECKPOINT_INTERVAL", 2)
+        context = make_context(tmp_path)
+        await context.save_context()
+        await run_iteration(context, 0)
+        await run_iteration(context, 1)
+        stale_lines = (tmp_path / "context.journal.jsonl").read_text()
+
+        await run_iteration(context, 2)  # checkpoint
+        expected = state(context)
+        # Queda entre o rename do checkpoint e a limpeza do journal
+        journal_file = tmp_path / "context.journal.jsonl"
+        journal_file.write_text(stale_lines)
+        assert state(ProjectContext.load_from_file(tmp_path / "context.json")) == expected
+
+        # Queda no meio de um append: a linha incompleta é descartada
+        journal_file.write_text("")
+        await run_iteration(context, 3)
+        expected = state(context)
+        context.metrics.total_iterations += 1
+        await context.save_context()
+        lines = journal_file.read_text().splitlines()
+        journal_file.write_text(lines[0] + "\n" + lines[1][: len(lines[1]) // 2])
+        assert state(ProjectContext.load_from_file(tmp_path / "context.json")) == expected
+
+    @pytest.mark.asyncio
+    async def test_external_rewrite_of_context_json_forces_checkpoint(self, tmp_path):
+        context = make_context(tmp_path)
+        await context.save_context()
+        # Outro componente grava o context.json completo (sem geração de journal)
+        (tmp_path / "context.json").write_text(context.model_dump_json(indent=2))
+
+        await run_iteration(context, 0)
+
+        assert "journal_generation" in json.loads((tmp_path / "context.json").read_text())
+        assert state(ProjectContext.load_from_file(tmp_path / "context.json")) == state(context)
+
+
+class TestCoalescedSaves:
+    @pytest.mark.asyncio
+    async def test_concurrent_saves_become_a_single_write(self, tmp_path):
+        context = make_context(tmp_path)
+        await context.save_context()
+
+        async def complete(i: int):
+            context.task_queue[i].status = TaskStatus.IN_PROGRESS
+            await context.save_context()
+
+        await asyncio.gather(*(complete(i) for i in range(10)))
+
+        journal = (tmp_path / "context.journal.jsonl").read_text().splitlines()
+        assert len(journal) == 1
+        assert context._journal.get_stats()["coalesced"] == 9
+        assert state(ProjectContext.load_from_file(tmp_path / "context.json")) == state(context)
+
+    @pytest.mark.asyncio
+    async def test_flush_is_a_barrier_for_saves_that_were_not_awaited(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ContextJournal, "COALESCE_WINDOW", 10)
+        context = make_context(tmp_path)
+        await context.save_context(wait=False)
+        assert not (tmp_path / "context.json").exists()
+
+        assert await context.flush_context(timeout=5)
+        assert state(ProjectContext.load_from_file(tmp_path / "context.json")) == state(context)
+
+    def test_writer_coalesces_per_key_and_never_overlaps_writes(self):
+        writer = CoalescingWriter(window=0.05)
+        written = []
+        active = []
+
+        def write(key, value):
+            active.append(key)
+            assert active.count(key) == 1
+            time.sleep(0.01)
+            written.append((key, value))
+            active.remove(key)
+
+        futures = [writer.submit(key, lambda k=key, v=value: write(k, v)) for value in range(5) for key in "ab"]
+        assert writer.flush(timeout=5)
+        assert sorted(written) == [("a", 4), ("b", 4)]
+        assert all(future.done() for future in futures)
+        assert writer.get_stats()["coalesced"] == 8
+        writer.shutdown()
+
+    def test_advanced_context_manager_saves_through_the_writer(self, tmp_path):
+        config = AdvancedSystemConfig(project_base_directory=str(tmp_path), backup_enabled=False, development_mode=True)
+        with AdvancedContextManager(config) as manager:
+            context = manager.create_new_project_context("API de tarefas com autenticação")
+            context.task_queue = [make_task(i) for i in range(3)]
+            for _ in range(5):
+                assert manager.save_project_context(context)
+            assert manager.flush(timeout=5)
+
+            manager.cache.clear()
+            loaded = manager.load_project_context(context.project_id)
+            assert [t.task_id for t in loaded.task_queue] == ["task-0", "task-1", "task-2"]
+
+
+class TestBinaryFormat:
+    def test_binary_round_trip_keeps_details_types_and_timestamps(self, tmp_path):
+        context = make_context(tmp_path, tasks=5)
+        context.task_queue[1].type = TaskType.EXECUTE_COMMAND
+        context.task_queue[1].details = TaskDetailsExecuteCommand(command_description="rodar testes", expected_outcome="ok")
+
+        payload = context.to_bytes()
+        assert is_binary_document(payload)
+        loaded = ProjectContext.from_bytes(payload)
+
+        assert state(loaded) == state(context)
+        assert [type(t.details) for t in loaded.task_queue] == [type(t.details) for t in context.task_queue]
+        assert [t.updated_at for t in loaded.task_queue] == [t.updated_at for t in context.task_queue]
+        assert ProjectContext.from_bytes(context.to_bytes(codec="json"), trusted=False).model_dump(exclude={"task_queue"}) \
+            == context.model_dump(exclude={"task_queue"})
+
+    def test_legacy_json_is_migrated_and_newer_schemas_are_rejected(self, tmp_path):
+        context = make_context(tmp_path, tasks=3)
+        legacy = context.model_dump_json(indent=2).encode("utf-8")
+        assert state(ProjectContext.from_bytes(legacy)) == state(context)
+
+        msgpack = pytest.importorskip("msgpack")
+        newer = encode_document("ProjectContext", context.model_dump(mode="json"), codec="msgpack")
+        body = msgpack.unpackb(newer[len(MAGIC) + 2:])
+        body["version"] = SCHEMA_VERSIONS["ProjectContext"] + 1
+        with pytest.raises(ValueError):
+            decode_document(newer[:len(MAGIC) + 2] + msgpack.packb(body), "ProjectContext")
+        with pytest.raises(ValueError):
+            decode_document(newer, "BackupManifest")
+
+    @pytest.mark.asyncio
+    async def test_binary_checkpoint_replaces_the_legacy_json_file(self, tmp_path):
+        context = make_context(tmp_path)
+        await context.save_context()
+        await run_iteration(context, 0)
+
+        loaded = ProjectContext.load_from_file(ProjectContext.find_context_file(tmp_path))
+        loaded.engine_config.storage_format = "binary"
+        await run_iteration(loaded, 1)
+        await run_iteration(loaded, 2)
+
+        assert not (tmp_path / "context.json").exists()
+        assert ProjectContext.find_context_file(tmp_path) == tmp_path / "context.bin"
+        assert len((tmp_path / "context.journal.jsonl").read_text().splitlines()) == 1
+        assert state(ProjectContext.load_from_file(tmp_path / "context.bin")) == state(loaded)
+
+    def test_binary_backup_manifest_and_snapshots(self, tmp_path):
+        context = make_context(tmp_path, tasks=3)
+        for storage_format in ("binary", "json"):
+            backup_system = BackupSystem(str(tmp_path / storage_format), storage_format=storage_format)
+            backup_file = backup_system.create_snapshot(context, str(tmp_path / "artifacts"), storage_format)
+            [backup] = backup_system.list_backups("proj-1")
+            assert backup["backup_file"] == backup_file and backup["description"] == storage_format
+            assert backup_system.restore_snapshot(backup_file, str(tmp_path / "restored"))["manifest"]["project_id"] == "proj-1"
+
+        config = AdvancedSystemConfig(project_base_directory=str(tmp_path / "contexts"), backup_enabled=False,
+                                      development_mode=True, context_storage_format="binary")
+        with AdvancedContextManager(config) as manager:
+            created = manager.create_new_project_context("API de tarefas com autenticação")
+            created.task_queue = [make_task(i) for i in range(3)]
+            assert manager.save_project_context(created, create_snapshot=True)
+            manager.flush()
+            manager.snapshots.clear()
+
+            project_dir = tmp_path / "contexts" / created.project_id
+            assert (project_dir / "context.bin").exists() and not (project_dir / "context.json").exists()
+            restored = manager.load_project_context(created.project_id, version=2)
+            assert [t.task_id for t in restored.task_queue] == ["task-0", "task-1", "task-2"]
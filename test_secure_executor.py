@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Testes da sandbox local do SecureExecutor: uso real de recursos (CPU,
+pico de memória, timeout do grupo de processos) e arquivos criados,
+modificados e removidos pelo comando.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.execution.process_accounting import run_accounted
+from evolux_engine.execution.secure_executor import ResourceLimits, SecureExecutor
+from evolux_engine.schemas.contracts import ResourceUsage
+
+PYTHON = sys.executable
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setattr(SecureExecutor, "_check_docker_availability", lambda self: False)
+    return SecureExecutor()
+
+
+async def run_local(executor: SecureExecutor, command: str, cwd: Path, timeout_seconds: int = 30):
+    return await executor._execute_local_sandbox(
+        execution_id="test", command=command, working_directory=str(cwd),
+        limits=ResourceLimits(), environment=None, timeout_seconds=timeout_seconds,
+    )
+
+
+class TestRunAccounted:
+    def test_measures_peak_memory_and_cpu_of_the_child(self, tmp_path):
+        outcome = run_accounted(
+            f'"{PYTHON}" -c "data = bytearray(64 * 1024 * 1024); total = sum(range(5 * 10**6)); print(len(data))"',
+            str(tmp_path), None, 30,
+        )
+        assert (outcome.exit_code, outcome.stdout.strip()) == (0, str(64 * 1024 * 1024).encode())
+        assert outcome.usage.memory_mb_peak >= 60
+        assert outcome.usage.cpu_time_ms > 0
+        assert outcome.usage.execution_time_ms >= outcome.usage.cpu_user_ms / 2
+
+    def test_timeout_kills_the_whole_process_group(self, tmp_path):
+        started = time.monotonic()
+        # O neto em background herda o stdout: sem matar o grupo, a leitura só terminaria em 30s
+        outcome = run_accounted("sleep 30 & sleep 30", str(tmp_path), None, 1)
+        assert outcome.timed_out and outcome.exit_code == 124
+        assert time.monotonic() - started < 10
+
+    def test_exit_code_and_stderr_are_preserved(self, tmp_path):
+        outcome = run_accounted("echo falhou >&2; exit 3", str(tmp_path), None, 30)
+        assert (outcome.exit_code, outcome.stderr, outcome.timed_out) == (3, b"falhou\n", False)
+
+
+class TestLocalSandbox:
+    @pytest.mark.asyncio
+    async def test_reports_real_resource_usage(self, executor, tmp_path):
+        result = await run_local(executor, f'"{PYTHON}" -c "data = bytearray(64 * 1024 * 1024)"', tmp_path)
+        assert result.exit_code == 0
+        assert result.resource_usage["memory_mb_peak"] >= 60
+        assert "cpu_percent_peak" not in result.resource_usage  # Não é amostrado: nada de valores estimados
+        usage = ResourceUsage(**{key: value for key, value in result.resource_usage.items()
+                                 if key in ResourceUsage.model_fields})
+        assert usage.cpu_time_ms == result.resource_usage["cpu_user_ms"] + result.resource_usage["cpu_system_ms"]
+
+    @pytest.mark.asyncio
+    async def test_reports_created_modified_and_deleted_files(self, executor, tmp_path):
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "app.py").write_text("print('a')\n")
+        (tmp_path / "old.txt").write_text("velho\n")
+        (tmp_path / "same.txt").write_text("igual\n")
+
+        result = await run_local(executor, "echo '# novo' >> src/app.py && rm old.txt && "
+                                           "mkdir -p dist && echo pacote > dist/app.whl", tmp_path)
+        assert (result.files_created, result.files_modified, result.files_deleted) == (
+            ["dist/app.whl"], ["src/app.py"], ["old.txt"])
+
+        # O manifesto é mantido entre execuções; reescrever o mesmo conteúdo não é uma modificação
+        result = await run_local(executor, "echo '# novo' >> src/app.py && cp dist/app.whl dist/tmp && "
+                                           "cat dist/tmp > dist/app.whl && rm dist/tmp", tmp_path)
+        assert (result.files_created, result.files_modified, result.files_deleted) == ([], ["src/app.py"], [])
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_reported_with_usage(self, executor, tmp_path):
+        result = await run_local(executor, "sleep 30", tmp_path, timeout_seconds=1)
+        assert result.exit_code == 124 and result.stderr == "Execution timed out"
+        assert result.resource_usage["timeout"] is True
+        assert result.execution_time_ms < 10000
+
+    @pytest.mark.asyncio
+    async def test_file_tracking_can_be_left_to_the_caller(self, executor, tmp_path):
+        result = await executor._execute_local_sandbox(
+            execution_id="test", command="echo novo > novo.txt", working_directory=str(tmp_path),
+            limits=ResourceLimits(), environment=None, timeout_seconds=30, track_file_changes=False,
+        )
+        assert result.exit_code == 0 and (tmp_path / "novo.txt").exists()
+        assert (result.files_created, result.files_modified, result.files_deleted) == ([], [], [])
+        assert executor._trackers == {}
+
+    @pytest.mark.asyncio
+    async def test_only_recently_used_directories_stay_tracked(self, executor, tmp_path, monkeypatch):
+        monkeypatch.setattr(SecureExecutor, "MAX_TRACKERS", 2)
+        directories = [tmp_path / f"dir_{i}" for i in range(3)]
+        for directory in directories:
+            directory.mkdir()
+            await run_local(executor, "true", directory)
+        first = executor._change_tracker(str(directories[1]))
+
+        assert list(executor._trackers) == [str(directories[2]), str(directories[1])]
+        assert first is executor._trackers[str(directories[1])]
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Testes das novas tentativas de tarefas: o histórico de execução e de
+validação de uma tentativa rejeitada chega ao prompt da tentativa seguinte.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.core.dependency_graph import DependencyGraph
+from evolux_engine.core.executor import TaskExecutorAgent
+from evolux_engine.core.orchestrator import Orchestrator
+from evolux_engine.schemas.contracts import (
+    ExecutionResult, Task, TaskDetailsCreateFile, TaskStatus, TaskType, ValidationResult,
+)
+from evolux_engine.utils.token_counter import TokenCounter
+from evolux_engine.utils.token_optimizer import ContextBudgeter, TokenOptimizer
+
+
+class WordEncoder:
+    """Um token por palavra, para não depender do download dos encoders do tiktoken"""
+
+    def encode(self, text):
+        return text.split()
+
+
+def make_task() -> Task:
+    return Task(
+        task_id="task-app",
+        description="Criar a aplicação Flask",
+        type=TaskType.CREATE_FILE,
+        details=TaskDetailsCreateFile(file_path="app.py", content_guideline="aplicação Flask"),
+        acceptance_criteria="app.py sobe o servidor",
+    )
+
+
+@pytest.fixture
+def orchestrator():
+    project_context = SimpleNamespace(
+        project_goal="API de tarefas", project_type="web", artifacts_state={},
+        task_queue=[], completed_tasks=[], failed_tasks=[],
+    )
+    executor = TaskExecutorAgent.__new__(TaskExecutorAgent)
+    executor.project_context = project_context
+    executor.config_manager = MagicMock(get_global_setting=lambda key, default=None: default)
+    executor.cache = MagicMock()
+    executor.llm_factory = MagicMock()
+    executor._context_budgeter = ContextBudgeter(TokenOptimizer(counter=TokenCounter(encoder=WordEncoder())))
+    executor.prompts = []
+
+    async def execute_task(task):
+        executor.prompts.append(executor._build_project_context(task))
+        return ExecutionResult(exit_code=1, stderr="Traceback (most recent call last):\nModuleNotFoundError: No module named 'flask'")
+
+    executor.execute_task = execute_task
+
+    async def validate_task_output(task, execution_result):
+        return ValidationResult(validation_passed=False, identified_issues=["app.py não define a rota /tasks"])
+
+    orchestrator = Orchestrator.__new__(Orchestrator)
+    orchestrator.project_context = project_context
+    orchestrator.dependency_graph = DependencyGraph()
+    orchestrator.observability = None
+    orchestrator.task_executor_agent = executor
+    orchestrator.semantic_validator_agent = SimpleNamespace(validate_task_output=validate_task_output)
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_retried_task_prompt_contains_previous_errors(orchestrator):
+    task = make_task()
+    orchestrator.dependency_graph.add_task(task)
+
+    await orchestrator._execute_and_process_task(task)
+    assert task.status == TaskStatus.PENDING and task.retries == 1
+    await orchestrator._execute_and_process_task(task)
+
+    first_prompt, retry_prompt = orchestrator.task_executor_agent.prompts
+    assert "HISTÓRICO DE ERROS" not in first_prompt
+    assert "Tentativa 1: ModuleNotFoundError: No module named 'flask'" in retry_prompt
+    assert "Validação: app.py não define a rota /tasks" in retry_prompt
+    assert len(task.execution_history) == len(task.validation_history) == 2
+    # A saída rejeitada foi descartada dos caches antes da nova tentativa
+    orchestrator.task_executor_agent.cache.invalidate.assert_called_with(task)
+    orchestrator.task_executor_agent.llm_factory.invalidate_cached_responses.assert_called_with("task-app")
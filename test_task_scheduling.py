@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Testes do escalonamento de tarefas: DependencyGraph e ReadyQueueScheduler.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from evolux_engine.core.dependency_graph import DependencyGraph
+from evolux_engine.core.orchestrator import Orchestrator
+from evolux_engine.core.task_scheduler import ReadyQueueScheduler
+from evolux_engine.schemas.contracts import Task, TaskType, TaskStatus
+
+
+def make_task(task_id: str, dependencies=None, task_type: TaskType = TaskType.CREATE_FILE) -> Task:
+    return Task(
+        task_id=task_id,
+        description=f"Tarefa {task_id}",
+        type=task_type,
+        dependencies=dependencies or [],
+        acceptance_criteria="ok",
+    )
+
+
+def build_graph(*tasks: Task) -> DependencyGraph:
+    graph = DependencyGraph()
+    for task in tasks:
+        graph.add_task(task)
+    return graph
+
+
+class TestDependencyGraph:
+    """Testes do rastreamento incremental de dependências"""
+
+    def test_ready_set_follows_status_updates(self):
+        graph = build_graph(make_task("a"), make_task("b", ["a"]), make_task("c", ["a", "b"]))
+
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["a"]
+        graph.update_task_status("a", TaskStatus.IN_PROGRESS)
+        assert graph.get_runnable_tasks() == []
+        graph.update_task_status("a", TaskStatus.COMPLETED)
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["b"]
+        assert not graph.are_dependencies_met("c")
+        graph.update_task_status("b", TaskStatus.COMPLETED)
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["c"]
+        assert not graph.is_completed()
+        graph.update_task_status("c", TaskStatus.FAILED)
+        assert graph.is_completed()
+
+    def test_reopening_a_completed_task_blocks_dependents(self):
+        graph = build_graph(make_task("a"), make_task("b", ["a"]))
+        graph.update_task_status("a", TaskStatus.COMPLETED)
+        assert graph.are_dependencies_met("b")
+
+        graph.update_task_status("a", TaskStatus.PENDING)
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["a"]
+        assert not graph.are_dependencies_met("b")
+
+    def test_add_task_rejects_missing_dependencies_and_self_cycles(self):
+        graph = DependencyGraph()
+        with pytest.raises(ValueError, match="inexistentes"):
+            graph.add_task(make_task("b", ["a"]))
+        with pytest.raises(ValueError, match="Ciclo"):
+            graph.add_task(make_task("a", ["a"]))
+        assert graph.get_all_tasks() == []
+
+    def test_add_tasks_accepts_any_order_and_detects_cycles(self):
+        graph = DependencyGraph()
+        graph.add_tasks([make_task("c", ["b"]), make_task("b", ["a"]), make_task("a")])
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["a"]
+
+        with pytest.raises(ValueError, match="Ciclo"):
+            DependencyGraph().add_tasks([make_task("x", ["y"]), make_task("y", ["x"])])
+
+    def test_completed_tasks_satisfy_dependencies_on_insert(self):
+        done = make_task("done")
+        done.status = TaskStatus.COMPLETED
+        graph = DependencyGraph()
+        graph.add_tasks([make_task("next", ["done"]), done])
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["next"]
+
+    def test_set_dependencies_rejects_cycles(self):
+        graph = build_graph(make_task("a"), make_task("b"))
+        graph.set_dependencies("b", ["a"])
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["a"]
+        with pytest.raises(ValueError, match="Ciclo"):
+            graph.set_dependencies("a", ["b"])
+
+
+class TestCriticalPath:
+    """Testes de prioridade por caminho crítico"""
+
+    def test_runnable_tasks_ordered_by_longest_remaining_path(self):
+        graph = build_graph(
+            make_task("short"),
+            make_task("long_head"),
+            make_task("long_tail", ["long_head"], task_type=TaskType.EXECUTE_COMMAND),
+        )
+        assert [t.task_id for t in graph.get_runnable_tasks()] == ["long_head", "short"]
+        assert graph.get_remaining_path_ms("long_head") > graph.get_remaining_path_ms("short")
+
+    def test_historical_durations_drive_the_critical_path(self):
+        graph = build_graph(
+            make_task("cmd", task_type=TaskType.EXECUTE_COMMAND),
+            make_task("file_a"),
+            make_task("file_b", ["file_a"]),
+        )
+        graph.record_execution_time("cmd", 100)
+        graph.record_execution_time("file_a", 90000)
+
+        path, total_ms = graph.get_critical_path()
+        assert path == ["file_a", "file_b"]
+        assert total_ms == 2 * 90000
+        assert [t.task_id for t in graph.get_runnable_tasks()][0] == "file_a"
+
+        graph.update_task_status("file_a", TaskStatus.COMPLETED)
+        assert graph.get_critical_path() == (["file_b"], 90000)
+        assert graph.get_critical_path(remaining_only=False)[0] == ["file_a", "file_b"]
+
+    def test_mermaid_highlights_critical_path(self):
+        graph = build_graph(make_task("a"), make_task("b", ["a"]), make_task("side"))
+        mermaid = graph.to_mermaid(highlight_critical_path=True)
+
+        assert "a ==> b" in mermaid
+        assert "style a stroke:#d9534f,stroke-width:3px" in mermaid
+        assert "linkStyle 0 stroke:#d9534f" in mermaid
+        assert "style side" not in mermaid
+
+
+class TestReadyQueueScheduler:
+    """Testes do escalonador orientado a dependências"""
+
+    @pytest.mark.asyncio
+    async def test_dependent_starts_before_slow_sibling_finishes(self):
+        graph = build_graph(make_task("slow"), make_task("fast"), make_task("child", ["fast"]))
+        durations = {"slow": 0.3, "fast": 0.05, "child": 0.05}
+        events = []
+
+        async def execute(task: Task):
+            events.append(("start", task.task_id))
+            await asyncio.sleep(durations[task.task_id])
+            events.append(("end", task.task_id))
+            graph.update_task_status(task.task_id, TaskStatus.COMPLETED)
+            return task.task_id
+
+        report = await ReadyQueueScheduler(graph, max_concurrency=4).run(execute)
+
+        assert graph.is_completed()
+        assert events.index(("start", "child")) < events.index(("end", "slow"))
+        assert report.results == {"slow": "slow", "fast": "fast", "child": "child"}
+        assert report.wave_model_estimate_s > report.wall_clock_s
+        assert report.time_saved_s > 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap_is_respected(self):
+        graph = build_graph(*[make_task(f"t{i}") for i in range(6)])
+        running = 0
+        peak = 0
+
+        async def execute(task: Task):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            graph.update_task_status(task.task_id, TaskStatus.COMPLETED)
+
+        await ReadyQueueScheduler(graph, max_concurrency=2).run(execute)
+
+        assert peak == 2
+        assert graph.is_completed()
+
+    @pytest.mark.asyncio
+    async def test_exception_is_mapped_to_its_task(self):
+        graph = build_graph(make_task("ok"), make_task("boom"), make_task("after_boom", ["boom"]))
+
+        async def execute(task: Task):
+            if task.task_id == "boom":
+                raise RuntimeError("falha simulada")
+            graph.update_task_status(task.task_id, TaskStatus.COMPLETED)
+
+        report = await ReadyQueueScheduler(graph).run(execute)
+
+        assert list(report.errors) == ["boom"]
+        assert isinstance(report.errors["boom"], RuntimeError)
+        assert graph.get_task("boom").status == TaskStatus.FAILED
+        assert graph.get_task("after_boom").status == TaskStatus.PENDING
+
+    @pytest.mark.asyncio
+    async def test_retries_and_round_limit(self):
+        graph = build_graph(make_task("flaky"))
+        attempts = []
+
+        async def execute(task: Task):
+            attempts.append(task.task_id)
+            graph.update_task_status(task.task_id, TaskStatus.PENDING)
+
+        report = await ReadyQueueScheduler(graph).run(execute, max_rounds=3)
+
+        assert len(attempts) == 3
+        assert report.dispatch_rounds == 3
+        assert len(report.runs) == 3
+
+
+class TestOrchestratorIterations:
+    """Testes da contagem de iterações P.O.D.A. com o escalonador"""
+
+    def make_orchestrator(self, graph: DependencyGraph, max_iterations: int, total_iterations: int = 0) -> Orchestrator:
+        async def save_context(wait=True):
+            pass
+
+        orchestrator = Orchestrator.__new__(Orchestrator)
+        orchestrator.dependency_graph = graph
+        orchestrator.config_manager = SimpleNamespace(get_global_setting=lambda key, default=None: default)
+        orchestrator.project_context = SimpleNamespace(
+            engine_config=SimpleNamespace(max_project_iterations=max_iterations),
+            metrics=SimpleNamespace(total_iterations=total_iterations),
+            save_context=save_context,
+        )
+
+        async def execute(task: Task):
+            await asyncio.sleep(0)
+            graph.update_task_status(task.task_id, TaskStatus.COMPLETED)
+
+        orchestrator._execute_and_process_task = execute
+        return orchestrator
+
+    @pytest.mark.asyncio
+    async def test_iteration_limit_does_not_cap_dispatched_tasks(self):
+        graph = build_graph(*[make_task(f"t{i}") for i in range(120)])
+        orchestrator = self.make_orchestrator(graph, max_iterations=10)
+
+        report = await orchestrator._run_scheduler()
+
+        assert graph.is_completed()
+        assert len(report.runs) == 120 and report.dispatch_rounds > 10
+        assert orchestrator.project_context.metrics.total_iterations == 1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_iterations_dispatch_nothing(self):
+        graph = build_graph(make_task("a"))
+        orchestrator = self.make_orchestrator(graph, max_iterations=3, total_iterations=3)
+
+        report = await orchestrator._run_scheduler()
+
+        assert report.runs == [] and not graph.is_completed()
+        assert orchestrator.project_context.metrics.total_iterations == 3
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Testes do TokenOptimizer: serviço compartilhado de contagem (cache e lote),
+truncamento que preserva o prompt de sistema e orçamento de contexto por seções.
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar o diretório do projeto ao Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import evolux_engine.utils.token_counter as token_counter_module
+from evolux_engine.utils.token_counter import TokenCounter, get_token_counter
+from evolux_engine.utils.token_optimizer import (
+    TokenOptimizer,
+    ContextBudgeter,
+    ContextSection,
+    extract_signatures,
+    truncate_text,
+)
+
+
+class WordEncoder:
+    """Um token por palavra, para não depender do download dos encoders do tiktoken"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+
+def make_optimizer() -> TokenOptimizer:
+    return TokenOptimizer(counter=TokenCounter(encoder=WordEncoder()))
+
+
+SYSTEM_PROMPT = "Você é um desenvolvedor sênior. Retorne APENAS o código puro."
+
+ARTIFACTS = "\n".join(
+    f"- app/module_{i}.py\n  Imports: import os, import sys\n  Classes: Service{i}\n  Funções: handle_{i}, run_{i}"
+    for i in range(40)
+)
+
+
+class TestTokenCounter:
+    def test_batch_encodes_each_distinct_text_once(self):
+        counter = TokenCounter(encoder=WordEncoder())
+        counter.count(SYSTEM_PROMPT)
+
+        counts = counter.count_many([SYSTEM_PROMPT, "um dois", SYSTEM_PROMPT, "um dois", "três"])
+
+        assert counts == [10, 2, 10, 2, 1]
+        assert counter.encoder.calls == 3
+        assert counter.get_stats()["hits"] == 1
+
+    def test_large_batches_use_the_thread_pool(self):
+        counter = TokenCounter(encoder=WordEncoder())
+        counter.MAX_WORKERS = 2
+        counter.PARALLEL_MIN_CHARS = 100
+        texts = [f"documento {i} " + "palavra " * (i * 10) for i in range(20)]
+
+        assert counter.count_many(texts) == [len(text.split()) for text in texts]
+        assert counter.get_stats()["parallel_batches"] == 1
+
+    def test_cache_is_bounded(self):
+        counter = TokenCounter(encoder=WordEncoder(), cache_size=2)
+        counter.count_many(["a", "b c", "d e f"])
+        assert counter.get_stats()["cached_entries"] == 2
+        assert counter.count("a") == 1 and counter.encoder.calls == 4
+
+    def test_encoders_are_loaded_lazily_and_shared_per_encoding(self, monkeypatch):
+        loaded = []
+
+        def get_encoding(name):
+            loaded.append(name)
+            return WordEncoder()
+
+        monkeypatch.setattr(token_counter_module, "_encoders", {})
+        monkeypatch.setattr(token_counter_module, "_counters", {})
+        monkeypatch.setattr(token_counter_module.tiktoken, "get_encoding", get_encoding)
+
+        first = TokenOptimizer("gpt-4")
+        second = TokenOptimizer("gpt-3.5-turbo")
+        assert loaded == []  # Criar o otimizador não carrega o encoder
+
+        assert first.count_tokens(SYSTEM_PROMPT) == second.count_tokens(SYSTEM_PROMPT) == 10
+        assert first.counter is second.counter
+        assert loaded == ["cl100k_base"] and first.encoder.calls == 1
+        assert get_token_counter("openai/gpt-4o-mini").encoding_name == "o200k_base"
+
+
+class TestTokenCounting:
+    def test_counts_are_cached_per_content(self):
+        optimizer = make_optimizer()
+        assert optimizer.count_tokens(SYSTEM_PROMPT) == optimizer.count_tokens(SYSTEM_PROMPT) == 10
+        assert optimizer.encoder.calls == 1
+
+    def test_truncate_keeps_system_prompt_and_last_message(self):
+        optimizer = make_optimizer()
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": "mensagem antiga " * 50},
+            {"role": "assistant", "content": "resposta antiga " * 50},
+            {"role": "user", "content": "Crie o arquivo app.py"},
+        ]
+
+        truncated = optimizer.truncate_messages(messages, max_tokens=120)
+
+        assert [m["role"] for m in truncated] == ["system", "assistant", "user"]
+        assert truncated[0]["content"] == SYSTEM_PROMPT
+
+    def test_oversized_last_message_is_shortened_not_the_system_prompt(self):
+        optimizer = make_optimizer()
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "linha de contexto\n" * 200}]
+
+        truncated = optimizer.truncate_messages(messages, max_tokens=60)
+
+        assert truncated[0]["content"] == SYSTEM_PROMPT
+        assert sum(optimizer.count_tokens(m["content"]) for m in truncated) <= 60
+
+    def test_truncate_text_keeps_whole_lines_from_the_requested_end(self):
+        optimizer = make_optimizer()
+        text = "\n".join(f"erro {i}" for i in range(20))
+        tail = truncate_text(optimizer, text, 9, keep="tail")
+        assert tail.endswith("erro 19") and "erro 0\n" not in tail
+        assert optimizer.count_tokens(tail) <= 9
+
+
+class TestContextBudgeter:
+    def make_sections(self):
+        return [
+            ContextSection("goal", "OBJETIVO DO PROJETO: API REST de tarefas com autenticação JWT", priority=0),
+            ContextSection("artifacts", ARTIFACTS, priority=2, compression="signatures", title="ARQUIVOS EXISTENTES"),
+            ContextSection("related", "\n".join(f"- Criar endpoint {i} ✓\n  Arquivo: api/{i}.py" for i in range(10)),
+                           priority=3, title="TAREFAS RELACIONADAS"),
+            ContextSection("errors", "\n".join(f"- Tentativa {i}: ImportError em módulo {i}" for i in range(30)),
+                           priority=1, compression="recent", title="HISTÓRICO DE ERROS"),
+        ]
+
+    def test_everything_is_kept_when_it_fits(self):
+        budgeter = ContextBudgeter(make_optimizer())
+        result = budgeter.fit(self.make_sections(), max_tokens=10_000)
+        assert result.tokens == result.original_tokens
+        assert all(entry["action"] == "kept" for entry in result.sections.values())
+
+    def test_low_priority_sections_are_compressed_before_dropped(self):
+        optimizer = make_optimizer()
+        budgeter = ContextBudgeter(optimizer)
+        sections = self.make_sections()
+
+        result = budgeter.fit(sections, max_tokens=200)
+
+        assert result.tokens <= 200 < result.original_tokens
+        # Seção obrigatória intacta e erros mais recentes preservados
+        assert result.text.startswith(sections[0].content)
+        assert "Tentativa 29" in result.text
+        assert result.sections["artifacts"]["action"] in ("compressed", "truncated")
+        assert "- app/module_0.py" in result.text and "Imports:" not in result.text
+        assert budgeter.get_stats()["saved_tokens"] == result.original_tokens - result.tokens
+
+    def test_budgeting_loses_fewer_instructions_than_tail_truncation(self):
+        optimizer = make_optimizer()
+        sections = self.make_sections()
+        prompt = "\n\n".join(section.render() for section in sections)
+
+        # Comportamento anterior: cortar os tokens que passam do limite
+        cut = truncate_text(optimizer, prompt, 200)
+        budgeted = ContextBudgeter(optimizer).fit(sections, max_tokens=200).text
+
+        for section in ("OBJETIVO DO PROJETO", "ARQUIVOS EXISTENTES", "HISTÓRICO DE ERROS", "Tentativa 29"):
+            assert section in budgeted
+        assert "HISTÓRICO DE ERROS" not in cut
+
+    def test_per_section_caps_apply_even_when_total_fits(self):
+        budgeter = ContextBudgeter(make_optimizer())
+        sections = self.make_sections()
+        sections[3].max_tokens = 40
+
+        result = budgeter.fit(sections, max_tokens=10_000)
+
+        assert result.sections["errors"]["final_tokens"] <= 40
+        assert "Tentativa 29" in result.text
+
+    def test_extract_signatures_keeps_declarations(self):
+        code = "import os\n\nclass Service:\n    x = 1\n\n    def run(self):\n        return os.getcwd()\n"
+        assert extract_signatures(code) == "import os\nclass Service:\n    def run(self):"